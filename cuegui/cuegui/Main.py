@@ -28,6 +28,8 @@ from PySide2 import QtCore
 from PySide2 import QtGui
 from PySide2 import QtWidgets
 
+import opencue
+
 import cuegui.Constants
 import cuegui.Logger
 import cuegui.MainWindow
@@ -94,6 +96,11 @@ def startup(app_name, app_version, argv):
 
     cuegui.Style.init()
 
+    # Only cache layer lookups by default, the monitors refresh shows and
+    # hosts and should not show stale data.
+    if opencue.Cuebot.getConfig().get('cache.enabled', True):
+        opencue.cache.enable(ttls={'layer': 30})
+
     # If the config file does not exist, copy over the default
     local = settings.fileName()
     if not os.path.exists(local):
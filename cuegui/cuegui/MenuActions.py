@@ -291,8 +291,7 @@ class JobActions(AbstractActions):
         """pause selected jobs"""
         jobs = self._getOnlyJobObjects(rpcObjects)
         if jobs:
-            for job in jobs:
-                job.pause()
+            opencue.wrappers.job.Job.pauseMany(jobs)
             self._update()
 
     resume_info = ["&Unpause", None, "unpause"]
@@ -300,8 +299,7 @@ class JobActions(AbstractActions):
         """resume selected jobs"""
         jobs = self._getOnlyJobObjects(rpcObjects)
         if jobs:
-            for job in jobs:
-                job.resume()
+            opencue.wrappers.job.Job.resumeMany(jobs)
             self._update()
 
     kill_info = ["&Kill", None, "kill"]
@@ -311,8 +309,7 @@ class JobActions(AbstractActions):
             if cuegui.Utils.questionBoxYesNo(self._caller, "Kill jobs?",
                                              "Are you sure you want to kill these jobs?",
                                              [job.data.name for job in jobs]):
-                for job in jobs:
-                    job.kill()
+                opencue.wrappers.job.Job.killMany(jobs)
                 self._update()
 
     eatDead_info = ["Eat dead frames", None, "eat"]
@@ -1228,15 +1225,13 @@ class HostActions(AbstractActions):
     lock_info = ["Lock Host", None, "lock"]
     def lock(self, rpcObjects=None):
         hosts = self._getOnlyHostObjects(rpcObjects)
-        for host in hosts:
-            host.lock()
+        opencue.wrappers.host.Host.lockMany(hosts)
         self._update()
 
     unlock_info = ["Unlock Host", None, "lock"]
     def unlock(self, rpcObjects=None):
         hosts = self._getOnlyHostObjects(rpcObjects)
-        for host in hosts:
-            host.unlock()
+        opencue.wrappers.host.Host.unlockMany(hosts)
         self._update()
 
     delete_info = ["Delete Host", "Delete host from cuebot", "kill"]
@@ -20,6 +20,8 @@ from __future__ import division
 from __future__ import absolute_import
 import sys
 
+import opencue
+
 from PySide2 import QtWidgets
 
 from cuesubmit import Constants
@@ -59,6 +61,10 @@ class CueSubmitMainWindow(QtWidgets.QMainWindow):
 
 
 def main():
+    # Shows, allocations, services and limits only fill in the submit form,
+    # so they are looked up through the cache.
+    if opencue.Cuebot.getConfig().get('cache.enabled', True):
+        opencue.cache.enable()
     app = CueSubmitApp(sys.argv)
     app.startup()
     app.exec_()
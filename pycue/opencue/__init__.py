@@ -21,8 +21,10 @@ import logging
 
 from .cuebot import Cuebot
 from . import api
+from . import cache
 from . import wrappers
 from . import search
+from . import frameprofile
 
 from .exception import CueException
 from .exception import EntityNotFoundException
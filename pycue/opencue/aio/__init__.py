@@ -0,0 +1,42 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+The asyncio opencue API, built on grpc.aio. Requires Python 3.6 or later.
+
+Calls are coroutines, so one event loop can keep many queries in flight::
+
+    import asyncio
+    import opencue.aio
+
+    async def main():
+        jobs = await opencue.aio.api.getJobs(show=['pipe'])
+        frames = await asyncio.gather(*[job.getFrames() for job in jobs])
+        await opencue.aio.Cuebot.close()
+
+    asyncio.run(main())
+
+The messages, search options and exceptions are the ones of the opencue
+package.
+"""
+
+from opencue.aio import api
+from opencue.aio import wrappers
+from opencue.aio.cuebot import Cuebot
+from opencue.aio.wrappers import Frame
+from opencue.aio.wrappers import Host
+from opencue.aio.wrappers import Job
+from opencue.aio.wrappers import Layer
+from opencue.aio.wrappers import Proc
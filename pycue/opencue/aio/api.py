@@ -0,0 +1,715 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+The coroutine versions of the opencue Static API. Each function takes the
+same arguments as its counterpart in opencue.api and returns the objects of
+opencue.aio.wrappers.
+
+Project: opencue Library
+"""
+
+import grpc
+
+from opencue import search
+from opencue.aio import util
+from opencue.aio.cuebot import Cuebot
+from opencue.aio.wrappers import Allocation
+from opencue.aio.wrappers import Depend
+from opencue.aio.wrappers import Filter
+from opencue.aio.wrappers import Frame
+from opencue.aio.wrappers import Group
+from opencue.aio.wrappers import Host
+from opencue.aio.wrappers import Job
+from opencue.aio.wrappers import Layer
+from opencue.aio.wrappers import Limit
+from opencue.aio.wrappers import NestedHost
+from opencue.aio.wrappers import Owner
+from opencue.aio.wrappers import Proc
+from opencue.aio.wrappers import Service
+from opencue.aio.wrappers import Show
+from opencue.aio.wrappers import Subscription
+from opencue.compiled_proto import cue_pb2
+from opencue.compiled_proto import department_pb2
+from opencue.compiled_proto import depend_pb2
+from opencue.compiled_proto import facility_pb2
+from opencue.compiled_proto import filter_pb2
+from opencue.compiled_proto import host_pb2
+from opencue.compiled_proto import job_pb2
+from opencue.compiled_proto import limit_pb2
+from opencue.compiled_proto import service_pb2
+from opencue.compiled_proto import show_pb2
+from opencue.compiled_proto import subscription_pb2
+
+
+#
+# Services
+#
+@util.grpcExceptionParser
+async def getDefaultServices():
+    """Return the default service list.
+
+    :rtype: list
+    :return: List of Service objects
+    """
+    response = await Cuebot.getStub('service').GetDefaultServices(
+        service_pb2.ServiceGetDefaultServicesRequest(), timeout=Cuebot.Timeout)
+    return [Service(data) for data in response.services.services]
+
+
+@util.grpcExceptionParser
+async def getService(name):
+    """Return the service with the provided name, or None.
+
+    :type name: str
+    :param name: the name of the service
+    :rtype: Service
+    """
+    try:
+        response = await Cuebot.getStub('service').GetService(
+            service_pb2.ServiceGetServiceRequest(name=name), timeout=Cuebot.Timeout)
+    except grpc.RpcError as e:
+        if e.code() == grpc.StatusCode.NOT_FOUND:
+            return None
+        raise e
+    return Service(response.service)
+
+
+@util.grpcExceptionParser
+async def createService(data):
+    """Create the provided service and return it.
+
+    :type data: service_pb2.Service
+    :param data: Service object to create
+    :rtype: Service
+    """
+    response = await Cuebot.getStub('service').CreateService(
+        service_pb2.ServiceCreateServiceRequest(data=data), timeout=Cuebot.Timeout)
+    return Service(response.service)
+
+
+@util.grpcExceptionParser
+async def getSystemStats():
+    """Returns the system stats for a random OpenCue server in the cluster.
+
+    :rtype: SystemStats
+    :return: a struct of OpenCue application information."""
+    response = await Cuebot.getStub('cue').GetSystemStats(
+        cue_pb2.CueGetSystemStatsRequest(), timeout=Cuebot.Timeout)
+    return response.stats
+
+
+#
+# Facility
+#
+@util.grpcExceptionParser
+async def createFacility(name):
+    """Create a given facility by name or unique ID.
+
+    :type name: str
+    :param name: a facility name or unique ID
+    :rtype: Facility
+    :return: a facility object
+    """
+    response = await Cuebot.getStub('facility').Create(
+        facility_pb2.FacilityCreateRequest(name=name), timeout=Cuebot.Timeout)
+    return response.facility
+
+
+@util.grpcExceptionParser
+async def getFacility(name):
+    """Return a given facility by name or unique ID.
+
+    :type name: str
+    :param name: a facility name or unique ID
+    :rtype: Facility
+    :return: a facility object
+    """
+    response = await Cuebot.getStub('facility').Get(
+        facility_pb2.FacilityGetRequest(name=name), timeout=Cuebot.Timeout)
+    return response.facility
+
+
+@util.grpcExceptionParser
+async def renameFacility(facility, new_name):
+    """Rename a given facility by name or unique ID.
+
+    :type facility: str
+    :param facility: an existing facility name or unique ID
+    :type new_name: str
+    :param new_name: a new facility name or unique ID
+    """
+    await Cuebot.getStub('facility').Rename(
+        facility_pb2.FacilityRenameRequest(facility=facility, new_name=new_name),
+        timeout=Cuebot.Timeout)
+
+
+@util.grpcExceptionParser
+async def deleteFacility(name):
+    """Delete a given facility by name or unique ID.
+
+    :type name: str
+    :param name: a facility name or unique ID
+    """
+    await Cuebot.getStub('facility').Delete(
+        facility_pb2.FacilityDeleteRequest(name=name), timeout=Cuebot.Timeout)
+
+
+#
+# Departments
+#
+@util.grpcExceptionParser
+async def getDepartmentNames():
+    """Return a list of the known department names.
+
+    :rtype: list
+    :return: a list of str department names
+    """
+    response = await Cuebot.getStub('department').GetDepartmentNames(
+        department_pb2.DeptGetDepartmentNamesRequest(), timeout=Cuebot.Timeout)
+    return list(response.names)
+
+
+#
+# Shows
+#
+@util.grpcExceptionParser
+async def createShow(show):
+    """Creates a new show.
+
+    :type  show: str
+    :param show: a new show name to create
+    :rtype:  Show
+    :return: the created show object"""
+    response = await Cuebot.getStub('show').CreateShow(
+        show_pb2.ShowCreateShowRequest(name=show), timeout=Cuebot.Timeout)
+    return Show(response.show)
+
+
+@util.grpcExceptionParser
+async def deleteShow(show_id):
+    """Deletes a show.
+
+    :type  show_id: str
+    :param show_id: a show ID to delete"""
+    show = await findShow(show_id)
+    await Cuebot.getStub('show').Delete(
+        show_pb2.ShowDeleteRequest(show=show.data), timeout=Cuebot.Timeout)
+
+
+@util.grpcExceptionParser
+async def getShows():
+    """Returns a list of show objects.
+
+    :rtype:  list
+    :return: a list of Show objects"""
+    response = await Cuebot.getStub('show').GetShows(
+        show_pb2.ShowGetShowsRequest(), timeout=Cuebot.Timeout)
+    return [Show(s) for s in response.shows.shows]
+
+
+@util.grpcExceptionParser
+async def getActiveShows():
+    """Returns a list of all active shows.
+
+    :rtype:  list
+    :return: a list of Show objects"""
+    response = await Cuebot.getStub('show').GetActiveShows(
+        show_pb2.ShowGetActiveShowsRequest(), timeout=Cuebot.Timeout)
+    return [Show(s) for s in response.shows.shows]
+
+
+@util.grpcExceptionParser
+async def findShow(name):
+    """Returns the show with the given name.
+
+    :type  name: str
+    :param name: a string that represents a show to return
+    :rtype:  Show
+    :return: the matching Show object"""
+    response = await Cuebot.getStub('show').FindShow(
+        show_pb2.ShowFindShowRequest(name=name), timeout=Cuebot.Timeout)
+    return Show(response.show)
+
+
+#
+# Groups
+#
+@util.grpcExceptionParser
+async def findGroup(show, group):
+    """Returns a group object.
+
+    :type  show: str
+    :param show: the name of a show
+    :type  group: str
+    :param group: the name of a group
+    :rtype:  Group
+    :return: the matching group object"""
+    response = await Cuebot.getStub('group').FindGroup(
+        job_pb2.GroupFindGroupRequest(show=show, name=group), timeout=Cuebot.Timeout)
+    return Group(response.group)
+
+
+@util.grpcExceptionParser
+async def getGroup(uniq):
+    """Returns a Group object from its unique ID.
+
+    :type  uniq: str
+    :param uniq: a unique group identifier
+    :rtype:  Group
+    :return: the matching group object"""
+    response = await Cuebot.getStub('group').GetGroup(
+        job_pb2.GroupGetGroupRequest(id=uniq), timeout=Cuebot.Timeout)
+    return Group(response.group)
+
+
+#
+# Jobs
+#
+@util.grpcExceptionParser
+async def findJob(name):
+    """Returns a Job object for the given job name.
+
+    :type  name: str
+    :param name: a job name
+    :rtype:  Job
+    :return: a Job object"""
+    response = await Cuebot.getStub('job').FindJob(
+        job_pb2.JobFindJobRequest(name=name), timeout=Cuebot.Timeout)
+    return Job(response.job)
+
+
+@util.grpcExceptionParser
+async def getJob(uniq):
+    """Returns a Job object for the given job ID.
+
+    :type  uniq: str
+    :param uniq: a unique job identifier
+    :rtype:  Job
+    :return: a Job object"""
+    response = await Cuebot.getStub('job').GetJob(
+        job_pb2.JobGetJobRequest(id=uniq), timeout=Cuebot.Timeout)
+    return Job(response.job)
+
+
+@util.grpcExceptionParser
+async def getJobs(**options):
+    """Returns an array of Job objects using optional search criteria.
+    See opencue.api.getJobs for the options.
+
+    :rtype:  list
+    :return: a list of Job objects
+    """
+    criteria = search.JobSearch.criteriaFromOptions(**options)
+    response = await Cuebot.getStub('job').GetJobs(
+        job_pb2.JobGetJobsRequest(r=criteria), timeout=Cuebot.Timeout)
+    return [Job(j) for j in response.jobs.jobs]
+
+
+@util.grpcExceptionParser
+async def isJobPending(name):
+    """Returns true if there is an active job in the cue
+    in the pending state.
+
+    :type  name: str
+    :param name: a job name
+    :rtype: bool
+    :return: true if the job exists"""
+    response = await Cuebot.getStub('job').IsJobPending(
+        job_pb2.JobIsJobPendingRequest(name=name), timeout=Cuebot.Timeout)
+    return response.value
+
+
+@util.grpcExceptionParser
+async def launchSpec(spec):
+    """Launch a new job with the given spec xml data.
+
+    :type spec: str
+    :param spec: XML string containing job spec
+    :rtype: list
+    :return: List of str job names that were submitted
+    """
+    response = await Cuebot.getStub('job').LaunchSpec(
+        job_pb2.JobLaunchSpecRequest(spec=spec), timeout=Cuebot.Timeout)
+    return response.names
+
+
+@util.grpcExceptionParser
+async def launchSpecAndWait(spec):
+    """Launch a new job with the given spec xml data and wait until the job
+    is committed in the database.
+
+    :type spec: str
+    :param spec: XML string containing job spec
+    :rtype: list
+    :return: List of Job objects that were submitted
+    """
+    response = await Cuebot.getStub('job').LaunchSpecAndWait(
+        job_pb2.JobLaunchSpecAndWaitRequest(spec=spec), timeout=Cuebot.Timeout)
+    return [Job(j) for j in response.jobs.jobs]
+
+
+@util.grpcExceptionParser
+async def getJobNames(**options):
+    """Returns a list of job names that match the search parameters.
+    See opencue.api.getJobs for the job query options.
+
+    :type  options: dict
+    :param options: a variable list of search criteria
+    :rtype:  list
+    :return: List of matching str job names"""
+    criteria = search.JobSearch.criteriaFromOptions(**options)
+    response = await Cuebot.getStub('job').GetJobNames(
+        job_pb2.JobGetJobNamesRequest(r=criteria), timeout=Cuebot.Timeout)
+    return response.names
+
+
+#
+# Layers
+#
+@util.grpcExceptionParser
+async def findLayer(job, layer):
+    """Finds and returns a layer from the specified pending job.
+
+    :type job: str
+    :param job: the job name
+    :type layer: str
+    :param layer: the layer name
+    :rtype: Layer
+    :return: the layer matching the query"""
+    response = await Cuebot.getStub('layer').FindLayer(
+        job_pb2.LayerFindLayerRequest(job=job, layer=layer), timeout=Cuebot.Timeout)
+    return Layer(response.layer)
+
+
+@util.grpcExceptionParser
+async def getLayer(uniq):
+    """Returns a Layer object for the given layer ID.
+
+    :type  uniq: str
+    :param uniq: a unique layer identifier
+    :rtype:  Layer
+    :return: a Layer object"""
+    response = await Cuebot.getStub('layer').GetLayer(
+        job_pb2.LayerGetLayerRequest(id=uniq), timeout=Cuebot.Timeout)
+    return Layer(response.layer)
+
+
+#
+# Frames
+#
+@util.grpcExceptionParser
+async def findFrame(job, layer, number):
+    """Finds and returns a frame from the specified pending job.
+
+    :type job: str
+    :param job: the job name
+    :type layer: str
+    :param layer: the layer name
+    :type number: int
+    :param number: the frame number
+    :rtype: Frame
+    :return: the frame matching the query"""
+    response = await Cuebot.getStub('frame').FindFrame(
+        job_pb2.FrameFindFrameRequest(job=job, layer=layer, frame=number),
+        timeout=Cuebot.Timeout)
+    return Frame(response.frame)
+
+
+@util.grpcExceptionParser
+async def getFrame(uniq):
+    """Returns a Frame object from the unique ID.
+
+    :type  uniq: str
+    :param uniq: a unique frame identifier
+    :rtype:  Frame
+    :return: a Frame object"""
+    response = await Cuebot.getStub('frame').GetFrame(
+        job_pb2.FrameGetFrameRequest(id=uniq), timeout=Cuebot.Timeout)
+    return Frame(response.frame)
+
+
+@util.grpcExceptionParser
+async def getFrames(job, **options):
+    """Finds frames in a job that match the search critieria.
+
+    :type job: str
+    :param job: the job name
+    :rtype: list
+    :return: a list of matching Frame objects"""
+    criteria = search.FrameSearch.criteriaFromOptions(**options)
+    response = await Cuebot.getStub('frame').GetFrames(
+        job_pb2.FrameGetFramesRequest(job=job, r=criteria), timeout=Cuebot.Timeout)
+    return [Frame(f) for f in response.frames.frames]
+
+
+#
+# Depends
+#
+@util.grpcExceptionParser
+async def getDepend(uniq):
+    """Finds a dependency from its unique ID.
+
+    :type uniq: str
+    :param uniq: the unique ID of the Depend object
+    :rtype: Depend
+    :return: a dependency"""
+    response = await Cuebot.getStub('depend').GetDepend(
+        depend_pb2.DependGetDependRequest(id=uniq), timeout=Cuebot.Timeout)
+    return Depend(response.depend)
+
+
+#
+# Hosts
+#
+@util.grpcExceptionParser
+async def getHostWhiteboard():
+    """
+    :rtype:  list<NestedHost>
+    :return: the hosts with their procs"""
+    response = await Cuebot.getStub('host').GetHostWhiteboard(
+        host_pb2.HostGetHostWhiteboardRequest(), timeout=Cuebot.Timeout)
+    return [NestedHost(nh) for nh in response.nested_hosts.nested_hosts]
+
+
+@util.grpcExceptionParser
+async def getHosts(**options):
+    """Returns an array of Host objects using optional search criteria.
+    See opencue.api.getHosts for the options.
+
+    :rtype:  list
+    :return: a list of Host objects
+    """
+    criteria = search.HostSearch.criteriaFromOptions(**options)
+    response = await Cuebot.getStub('host').GetHosts(
+        host_pb2.HostGetHostsRequest(r=criteria), timeout=Cuebot.Timeout)
+    return [Host(host) for host in response.hosts.hosts]
+
+
+@util.grpcExceptionParser
+async def findHost(name):
+    """Returns the host for the matching hostname.
+
+    :type  name: str
+    :param name: the unique name of a host
+    :rtype:  Host
+    :return: The matching host object"""
+    response = await Cuebot.getStub('host').FindHost(
+        host_pb2.HostFindHostRequest(name=name), timeout=Cuebot.Timeout)
+    return Host(response.host)
+
+
+@util.grpcExceptionParser
+async def getHost(uniq):
+    """Returns a Host object from a unique identifier.
+
+    :type  uniq: str
+    :param uniq: a unique host identifier
+    :rtype:  Host
+    :return: A Host object"""
+    response = await Cuebot.getStub('host').GetHost(
+        host_pb2.HostGetHostRequest(id=uniq), timeout=Cuebot.Timeout)
+    return Host(response.host)
+
+
+#
+# Owners
+#
+@util.grpcExceptionParser
+async def getOwner(id):
+    """Return an Owner object from the ID or name.
+
+    :type  id: str
+    :param id: a unique owner identifier or name
+    :rtype:  Owner
+    :return: An Owner object"""
+    response = await Cuebot.getStub('owner').GetOwner(
+        host_pb2.OwnerGetOwnerRequest(name=id), timeout=Cuebot.Timeout)
+    return Owner(response.owner)
+
+
+#
+# Filters
+#
+@util.grpcExceptionParser
+async def findFilter(show_name, filter_name):
+    """Returns the matching filter.
+
+    :type  show_name: str
+    :param show_name: a show name
+    :type  filter_name: str
+    :param filter_name: a filter name
+    :rtype:  Filter
+    :return: the matching Filter object"""
+    response = await Cuebot.getStub('filter').FindFilter(
+        filter_pb2.FilterFindFilterRequest(show=show_name, name=filter_name),
+        timeout=Cuebot.Timeout)
+    return Filter(response.filter)
+
+
+#
+# Allocation
+#
+@util.grpcExceptionParser
+async def createAllocation(name, tag, facility):
+    """Creates and returns an allocation.
+
+    :type  name: str
+    :param name: the name of the allocation
+    :type  tag: str
+    :param tag: the tag for the allocation
+    :rtype:  Allocation
+    :return: the newly created Allocation object"""
+    response = await Cuebot.getStub('allocation').Create(
+        facility_pb2.AllocCreateRequest(name=name, tag=tag, facility=facility),
+        timeout=Cuebot.Timeout)
+    return Allocation(response.allocation)
+
+
+@util.grpcExceptionParser
+async def getAllocations():
+    """Returns a list of allocation objects.
+
+    :rtype:  list
+    :return: a list of Allocation objects"""
+    response = await Cuebot.getStub('allocation').GetAll(
+        facility_pb2.AllocGetAllRequest(), timeout=Cuebot.Timeout)
+    return [Allocation(a) for a in response.allocations.allocations]
+
+
+@util.grpcExceptionParser
+async def findAllocation(name):
+    """Returns the Allocation object that matches the name.
+
+    :type  name: str
+    :param name: the name of the allocation
+    :rtype:  Allocation
+    :return: an Allocation object"""
+    response = await Cuebot.getStub('allocation').Find(
+        facility_pb2.AllocFindRequest(name=name), timeout=Cuebot.Timeout)
+    return Allocation(response.allocation)
+
+
+@util.grpcExceptionParser
+async def getAllocation(allocId):
+    """Returns the Allocation object that matches the ID.
+
+    :type  allocId: str
+    :param allocId: the ID of the allocation
+    :rtype:  Allocation
+    :return: an Allocation object"""
+    response = await Cuebot.getStub('allocation').Get(
+        facility_pb2.AllocGetRequest(id=allocId), timeout=Cuebot.Timeout)
+    return Allocation(response.allocation)
+
+
+@util.grpcExceptionParser
+async def deleteAllocation(alloc):
+    return await Cuebot.getStub('allocation').Delete(
+        facility_pb2.AllocDeleteRequest(allocation=alloc), timeout=Cuebot.Timeout)
+
+
+@util.grpcExceptionParser
+async def allocSetBillable(alloc, is_billable):
+    return await Cuebot.getStub('allocation').SetBillable(
+        facility_pb2.AllocSetBillableRequest(allocation=alloc, value=is_billable),
+        timeout=Cuebot.Timeout)
+
+
+@util.grpcExceptionParser
+async def allocSetName(alloc, name):
+    return await Cuebot.getStub('allocation').SetName(
+        facility_pb2.AllocSetNameRequest(allocation=alloc, name=name), timeout=Cuebot.Timeout)
+
+
+@util.grpcExceptionParser
+async def allocSetTag(alloc, tag):
+    return await Cuebot.getStub('allocation').SetTag(
+        facility_pb2.AllocSetTagRequest(allocation=alloc, tag=tag), timeout=Cuebot.Timeout)
+
+
+#
+# Subscriptions
+#
+@util.grpcExceptionParser
+async def getSubscription(uniq):
+    """Returns a Subscription object from a unique identifier.
+
+    :type  uniq: str
+    :param uniq: a unique subscription identifier
+    :rtype:  Subscription
+    :return: a Subscription object"""
+    response = await Cuebot.getStub('subscription').Get(
+        subscription_pb2.SubscriptionGetRequest(id=uniq), timeout=Cuebot.Timeout)
+    return Subscription(response.subscription)
+
+
+@util.grpcExceptionParser
+async def findSubscription(name):
+    """Returns the subscription object that matches the name.
+
+    :type  name: str
+    :param name: the name of the subscription
+    :rtype:  Subscription
+    :return: a Subscription object"""
+    response = await Cuebot.getStub('subscription').Find(
+        subscription_pb2.SubscriptionFindRequest(name=name), timeout=Cuebot.Timeout)
+    return Subscription(response.subscription)
+
+
+#
+# Procs
+#
+@util.grpcExceptionParser
+async def getProcs(**options):
+    """Returns an array of Proc objects using optional search criteria.
+    See opencue.api.getProcs for the options.
+
+    :rtype:  list
+    :return: a list of Proc objects"""
+    criteria = search.ProcSearch.criteriaFromOptions(**options)
+    response = await Cuebot.getStub('proc').GetProcs(
+        host_pb2.ProcGetProcsRequest(r=criteria), timeout=Cuebot.Timeout)
+    return [Proc(p) for p in response.procs.procs]
+
+
+#
+# Limits
+#
+@util.grpcExceptionParser
+async def createLimit(name, maxValue):
+    """Create a new Limit with the given name and max value.
+
+    :type name: str
+    :param name: the name of the new Limit
+    :type maxValue: int
+    :param maxValue: the maximum number of running frames for this limit
+    :rtype: Limit
+    :return: the newly created Limit
+    """
+    response = await Cuebot.getStub('limit').Create(
+        limit_pb2.LimitCreateRequest(name=name, max_value=maxValue), timeout=Cuebot.Timeout)
+    return Limit(response)
+
+
+@util.grpcExceptionParser
+async def getLimits():
+    """Return a list of all known Limit objects.
+
+    :rtype: list
+    :return: a list of Limit objects"""
+    response = await Cuebot.getStub('limit').GetAll(
+        limit_pb2.LimitGetAllRequest(), timeout=Cuebot.Timeout)
+    return [Limit(limit) for limit in response.limits]
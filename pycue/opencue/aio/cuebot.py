@@ -0,0 +1,168 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Project: opencue Library
+
+Module: aio/cuebot.py - the grpc.aio connection to the Cuebot
+"""
+
+import asyncio
+import logging
+import os
+from random import shuffle
+
+import grpc
+import grpc.aio
+
+from opencue import cuebot
+from opencue.compiled_proto import cue_pb2
+from opencue.exception import ConnectionException
+from opencue.exception import CueException
+
+
+__all__ = ["Cuebot"]
+
+logger = logging.getLogger("opencue")
+
+
+class Cuebot(object):
+    """Manages the grpc.aio channel to the Cuebot. Hosts, ports and message
+       limits are read from the same configuration as opencue.Cuebot, and the
+       channel is opened on first use, so you don't have to call
+       Cuebot.connect() yourself.
+
+       A grpc.aio channel belongs to the event loop it was opened on. When
+       called from another loop, for example after a second asyncio.run(),
+       a new channel is opened."""
+    RpcChannel = None
+    Loop = None
+    Hosts = []
+    Timeout = cuebot.config.get('cuebot.timeout', 10000)
+
+    @staticmethod
+    def getHosts():
+        """Returns the configured cuebot hosts, see opencue.Cuebot.init.
+
+        :rtype:  list<str>
+        :return: host names, optionally with a port"""
+        if Cuebot.Hosts:
+            return list(Cuebot.Hosts)
+        if os.getenv("CUEBOT_HOSTS"):
+            return os.getenv("CUEBOT_HOSTS").split(",")
+        facility = cuebot.config.get("cuebot.facility_default")
+        hosts = cuebot.config.get("cuebot.facility", {}).get(facility)
+        if not hosts:
+            raise CueException('Cuebot host not set. Please ensure CUEBOT_HOSTS is set ' +
+                               'or a facility_default host is set in the yaml pycue config.')
+        if isinstance(hosts, str):
+            hosts = [hosts]
+        return list(hosts)
+
+    @staticmethod
+    def openChannel(host):
+        """Opens a grpc.aio channel to a host without testing it.
+
+        :type  host: str
+        :param host: a host name, optionally with a port
+        :rtype:  grpc.aio.Channel"""
+        if ':' in host:
+            connectStr = host
+        else:
+            connectStr = '%s:%s' % (host, cuebot.config.get('cuebot.grpc_port',
+                                                            cuebot.DEFAULT_GRPC_PORT))
+        maxMessageBytes = cuebot.config.get('cuebot.max_message_bytes',
+                                            cuebot.DEFAULT_MAX_MESSAGE_BYTES)
+        logger.debug('connecting to gRPC at %s', connectStr)
+        return grpc.aio.insecure_channel(connectStr, options=[
+            ('grpc.max_send_message_length', maxMessageBytes),
+            ('grpc.max_receive_message_length', maxMessageBytes)])
+
+    @staticmethod
+    def __setChannel(channel):
+        Cuebot.RpcChannel = channel
+        Cuebot.Loop = Cuebot.__runningLoop()
+
+    @staticmethod
+    def __runningLoop():
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    @staticmethod
+    async def connect():
+        """Connects to the first responding cuebot, in random order to
+        balance load across cuebots."""
+        await Cuebot.close()
+        hosts = Cuebot.getHosts()
+        shuffle(hosts)
+        for host in hosts:
+            channel = Cuebot.openChannel(host)
+            try:
+                await cuebot.Cuebot.getService('cue')(channel).GetSystemStats(
+                    cue_pb2.CueGetSystemStatsRequest(), timeout=Cuebot.Timeout)
+            except Exception:
+                logger.warning('Could not establish grpc channel with {}.'.format(host))
+                await channel.close()
+                continue
+            Cuebot.__setChannel(channel)
+            return None
+        raise ConnectionException('No grpc connection could be established. ' +
+                                  'Please check configured cuebot hosts.')
+
+    @staticmethod
+    async def close():
+        """Closes the channel, calls in progress are cancelled."""
+        channel = Cuebot.RpcChannel
+        Cuebot.RpcChannel = None
+        Cuebot.Loop = None
+        if channel is not None:
+            await channel.close()
+
+    @staticmethod
+    async def setHosts(hosts):
+        """Sets the cuebot host names and connects to one of them.
+
+        :param hosts: a list of hosts or a host
+        :type hosts: list<str> or str"""
+        if isinstance(hosts, str):
+            hosts = [hosts]
+        logger.debug("setting new server hosts to: %s" % hosts)
+        Cuebot.Hosts = hosts
+        await Cuebot.connect()
+
+    @staticmethod
+    def setTimeout(timeout):
+        """Sets the default network timeout.
+
+        :param timeout: The network connection timeout in millis.
+        :type timeout: int
+        """
+        logger.debug("setting new server timeout to: %d" % timeout)
+        Cuebot.Timeout = timeout
+
+    @staticmethod
+    def getStub(name):
+        """Returns an aio stub from opencue.Cuebot.SERVICE_MAP. The channel is
+        opened to a random host when there is none for the running loop.
+
+        :param name: name of stub key for SERVICE_MAP
+        :type name: str"""
+        if Cuebot.RpcChannel is None or Cuebot.Loop is not Cuebot.__runningLoop():
+            hosts = Cuebot.getHosts()
+            shuffle(hosts)
+            Cuebot.__setChannel(Cuebot.openChannel(hosts[0]))
+        return cuebot.Cuebot.getService(name)(Cuebot.RpcChannel)
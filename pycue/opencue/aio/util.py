@@ -0,0 +1,57 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Project: opencue Library
+Module: aio/util.py
+"""
+
+
+import asyncio
+import functools
+import logging
+
+import grpc
+
+import opencue.exception
+
+logger = logging.getLogger('opencue')
+
+
+def grpcExceptionParser(grpcFunc):
+    """Decorator to wrap coroutines making GRPC calls, the asyncio version of
+    opencue.util.grpcExceptionParser. Retries wait without blocking the loop."""
+    async def _decorator(*args, **kwargs):
+        triesRemaining = opencue.exception.getRetryCount() + 1
+        while triesRemaining > 0:
+            triesRemaining -= 1
+            try:
+                return await grpcFunc(*args, **kwargs)
+            except grpc.RpcError as exc:
+                code = exc.code()
+                details = exc.details() or "No details found. Check server logs."
+                exception = opencue.exception.EXCEPTION_MAP.get(code)
+                if exception:
+                    if exception.retryable and triesRemaining >= 1:
+                        logger.warning(exception.retryMsg)
+                        await asyncio.sleep(exception.retryBackoff)
+                    else:
+                        raise exception(exception.failMsg.format(details=details)) from exc
+                else:
+                    raise opencue.exception.CueException(
+                        "Encountered a server error. {code} : {details}".format(
+                            code=code, details=details)) from exc
+
+    return functools.wraps(grpcFunc)(_decorator)
@@ -0,0 +1,966 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Project: opencue Library
+
+Module: aio/wrappers.py - coroutine versions of the opencue wrappers
+
+Job, Layer, Frame, Host and Proc subclass the opencue wrappers, so every
+accessor of the data works unchanged, and replace each method calling the
+Cuebot with a coroutine of the same name and arguments. Other objects these
+return, such as dependencies and comments, carry their data only: their
+methods calling the Cuebot raise a CueException, use the opencue wrappers
+for those.
+"""
+
+import asyncio
+import os
+
+from opencue.aio.cuebot import Cuebot
+from opencue.compiled_proto import comment_pb2
+from opencue.compiled_proto import host_pb2
+from opencue.compiled_proto import job_pb2
+from opencue.exception import CueException
+import opencue.search
+import opencue.wrappers.allocation
+import opencue.wrappers.comment
+import opencue.wrappers.depend
+import opencue.wrappers.filter
+import opencue.wrappers.frame
+import opencue.wrappers.group
+import opencue.wrappers.host
+import opencue.wrappers.job
+import opencue.wrappers.layer
+import opencue.wrappers.limit
+import opencue.wrappers.owner
+import opencue.wrappers.proc
+import opencue.wrappers.service
+import opencue.wrappers.show
+import opencue.wrappers.subscription
+
+
+class _DataWrapper(object):
+    """Holds the data of a wrapper without a connection to the Cuebot"""
+
+    def __init__(self, data=None):
+        self.data = data
+
+    @property
+    def stub(self):
+        raise CueException('%s is not available in opencue.aio, use opencue.wrappers'
+                           % self.__class__.__name__)
+
+
+async def _iterFramePages(getPage, **options):
+    """Yields the pages of frames matching the options, like
+    opencue.search.FrameSearch.iterPages, fetching the next page while the
+    caller goes through the current one.
+
+    :type  getPage: coroutine function
+    :param getPage: returns the frame messages for a FrameSearchCriteria"""
+    maxLimit = opencue.search.FrameSearch.maxLimit
+    criteria = opencue.search.FrameSearch.criteriaFromOptions(**options)
+    criteria.limit = min(criteria.limit or maxLimit, maxLimit)
+    criteria.page = max(criteria.page, 1)
+    nextPage = asyncio.ensure_future(getPage(criteria))
+    try:
+        while nextPage is not None:
+            frames = await nextPage
+            nextPage = None
+            if len(frames) >= criteria.limit:
+                pageCriteria = job_pb2.FrameSearchCriteria()
+                pageCriteria.CopyFrom(criteria)
+                pageCriteria.page = criteria.page + 1
+                criteria = pageCriteria
+                nextPage = asyncio.ensure_future(getPage(criteria))
+            if frames:
+                yield frames
+    finally:
+        if nextPage is not None:
+            nextPage.cancel()
+
+
+class Allocation(_DataWrapper, opencue.wrappers.allocation.Allocation):
+    pass
+
+
+class Comment(_DataWrapper, opencue.wrappers.comment.Comment):
+    pass
+
+
+class Depend(_DataWrapper, opencue.wrappers.depend.Depend):
+    pass
+
+
+class Filter(_DataWrapper, opencue.wrappers.filter.Filter):
+    pass
+
+
+class Group(_DataWrapper, opencue.wrappers.group.Group):
+    pass
+
+
+class Limit(_DataWrapper, opencue.wrappers.limit.Limit):
+    pass
+
+
+class Owner(_DataWrapper, opencue.wrappers.owner.Owner):
+    pass
+
+
+class Service(_DataWrapper, opencue.wrappers.service.Service):
+    pass
+
+
+class Show(_DataWrapper, opencue.wrappers.show.Show):
+    pass
+
+
+class Subscription(_DataWrapper, opencue.wrappers.subscription.Subscription):
+    pass
+
+
+class Job(opencue.wrappers.job.Job):
+    """A job whose Cuebot calls are coroutines, see opencue.wrappers.job.Job"""
+
+    def __init__(self, job=None):
+        self.data = job
+        self.stub = Cuebot.getStub('job')
+
+    async def kill(self):
+        """Kills the job"""
+        await self.stub.Kill(job_pb2.JobKillRequest(job=self.data), timeout=Cuebot.Timeout)
+
+    async def pause(self):
+        """Pauses the job"""
+        await self.stub.Pause(job_pb2.JobPauseRequest(job=self.data), timeout=Cuebot.Timeout)
+
+    async def resume(self):
+        """Resumes the job"""
+        await self.stub.Resume(job_pb2.JobResumeRequest(job=self.data), timeout=Cuebot.Timeout)
+
+    async def killFrames(self, **request):
+        """Kills all frames that match the FrameSearch.
+
+        :type  request: Dict
+        :param request: FrameSearch parameters"""
+        criteria = opencue.search.FrameSearch.criteriaFromOptions(**request)
+        await self.stub.KillFrames(job_pb2.JobKillFramesRequest(job=self.data, req=criteria),
+                                   timeout=Cuebot.Timeout)
+
+    async def eatFrames(self, **request):
+        """Eats all frames that match the FrameSearch.
+
+        :type  request: Dict
+        :param request: FrameSearch parameters"""
+        criteria = opencue.search.FrameSearch.criteriaFromOptions(**request)
+        return await self.stub.EatFrames(
+            job_pb2.JobEatFramesRequest(job=self.data, req=criteria), timeout=Cuebot.Timeout)
+
+    async def retryFrames(self, **request):
+        """Retries all frames that match the FrameSearch.
+
+        :type  request: Dict
+        :param request: FrameSearch parameters"""
+        criteria = opencue.search.FrameSearch.criteriaFromOptions(**request)
+        return await self.stub.RetryFrames(
+            job_pb2.JobRetryFramesRequest(job=self.data, req=criteria), timeout=Cuebot.Timeout)
+
+    async def markdoneFrames(self, **request):
+        """Drops any dependency that requires any frame that matches the
+        FrameSearch.
+
+        :type  request: Dict
+        :param request: FrameSearch parameters"""
+        criteria = opencue.search.FrameSearch.criteriaFromOptions(**request)
+        return await self.stub.MarkDoneFrames(
+            job_pb2.JobMarkDoneFramesRequest(job=self.data, req=criteria),
+            timeout=Cuebot.Timeout)
+
+    async def markAsWaiting(self, **request):
+        """Changes the matching frames from the depend state to the waiting state.
+
+        :type  request: Dict
+        :param request: FrameSearch parameters"""
+        criteria = opencue.search.FrameSearch.criteriaFromOptions(**request)
+        return await self.stub.MarkAsWaiting(
+            job_pb2.JobMarkAsWaitingRequest(job=self.data, req=criteria),
+            timeout=Cuebot.Timeout)
+
+    async def setMinCores(self, minCores):
+        """Sets the minimum procs value.
+
+        :type  minCores: int
+        :param minCores: New minimum cores value"""
+        await self.stub.SetMinCores(job_pb2.JobSetMinCoresRequest(job=self.data, val=minCores),
+                                    timeout=Cuebot.Timeout)
+
+    async def setMaxCores(self, maxCores):
+        """Sets the maximum procs value.
+
+        :type  maxCores: int
+        :param maxCores: New maximum cores value"""
+        await self.stub.SetMaxCores(job_pb2.JobSetMaxCoresRequest(job=self.data, val=maxCores),
+                                    timeout=Cuebot.Timeout)
+
+    async def setPriority(self, priority):
+        """Sets the priority number.
+
+        :type  priority: int
+        :param priority: New priority number"""
+        await self.stub.SetPriority(job_pb2.JobSetPriorityRequest(job=self.data, val=priority),
+                                    timeout=Cuebot.Timeout)
+
+    async def setMaxRetries(self, maxRetries):
+        """Sets the number of retries before a frame goes dead.
+
+        :type  maxRetries: int
+        :param maxRetries: New max retries"""
+        await self.stub.SetMaxRetries(
+            job_pb2.JobSetMaxRetriesRequest(job=self.data, max_retries=maxRetries),
+            timeout=Cuebot.Timeout)
+
+    async def getLayers(self):
+        """Returns the list of layers.
+
+        :rtype:  list<Layer>
+        :return: List of layers"""
+        response = await self.stub.GetLayers(job_pb2.JobGetLayersRequest(job=self.data),
+                                             timeout=Cuebot.Timeout)
+        return [Layer(lyr) for lyr in response.layers.layers]
+
+    async def getFrames(self, **options):
+        """Returns the list of up to 1000 frames from within the job.
+
+        :rtype:  list<Frame>
+        :return: List of frames"""
+        criteria = opencue.search.FrameSearch.criteriaFromOptions(**options)
+        response = await self.stub.GetFrames(
+            job_pb2.JobGetFramesRequest(job=self.data, req=criteria), timeout=Cuebot.Timeout)
+        return [Frame(frm) for frm in response.frames.frames]
+
+    async def iterFrames(self, **options):
+        """Yields all frames of the job matching the options, a page at a
+        time, see opencue.wrappers.job.Job.iterFrames::
+
+            async for frame in job.iterFrames(state=['DEAD']):
+                ...
+
+        :rtype:  async_generator<Frame>
+        :return: the matching frames"""
+        async def getPage(criteria):
+            response = await self.stub.GetFrames(
+                job_pb2.JobGetFramesRequest(job=self.data, req=criteria), timeout=Cuebot.Timeout)
+            return response.frames.frames
+        async for page in _iterFramePages(getPage, **options):
+            for frameData in page:
+                yield Frame(frameData)
+
+    async def getUpdatedFrames(self, lastCheck, layers=None):
+        """Returns the frames changed since lastCheck and the current state of
+        the job, see opencue.wrappers.job.Job.getUpdatedFrames.
+
+        :type  lastCheck: int
+        :param lastCheck: Epoch when last updated
+        :type  layers: list<job_pb2.Layer>
+        :param layers: List of layers to check, empty list checks all
+        :rtype:  job_pb2.UpdatedFrameCheckResult
+        :return: Job state and a list of updatedFrames"""
+        if layers is not None:
+            layerSeq = job_pb2.LayerSeq()
+            layerSeq.layers.extend(layers)
+        else:
+            layerSeq = None
+        return await self.stub.GetUpdatedFrames(
+            job_pb2.JobGetUpdatedFramesRequest(job=self.data, last_check=lastCheck,
+                                               layer_filter=layerSeq),
+            timeout=Cuebot.Timeout)
+
+    async def setAutoEating(self, value):
+        """If set to true, any frames that would become dead, will become eaten.
+
+        :type  value: bool
+        :param value: State of autoeat"""
+        await self.stub.SetAutoEat(job_pb2.JobSetAutoEatRequest(job=self.data, value=value),
+                                   timeout=Cuebot.Timeout)
+
+    async def setAutoEat(self, value):
+        """Changes the state of autoeating. When frames become eaten instead of dead.
+
+        :type  value: bool
+        :param value: The new state for autoEat"""
+        await self.setAutoEating(value)
+        self.data.auto_eat = value
+
+    async def getWhatDependsOnThis(self):
+        """Returns a list of dependencies that depend directly on this job.
+
+        :rtype:  list<Depend>
+        :return: List of dependencies that depend directly on this job"""
+        response = await self.stub.GetWhatDependsOnThis(
+            job_pb2.JobGetWhatDependsOnThisRequest(job=self.data), timeout=Cuebot.Timeout)
+        return [Depend(dep) for dep in response.depends.depends]
+
+    async def getWhatThisDependsOn(self):
+        """Returns a list of dependencies that this job depends on.
+
+        :rtype:  list<Depend>
+        :return: dependencies that this job depends on"""
+        response = await self.stub.GetWhatThisDependsOn(
+            job_pb2.JobGetWhatThisDependsOnRequest(job=self.data), timeout=Cuebot.Timeout)
+        return [Depend(dep) for dep in response.depends.depends]
+
+    async def getDepends(self):
+        """Returns a list of all depends this job is involved with.
+
+        :rtype:  list<Depend>
+        :return: all depends involved with this job"""
+        response = await self.stub.GetDepends(
+            job_pb2.JobGetDependsRequest(job=self.data), timeout=Cuebot.Timeout)
+        return [Depend(dep) for dep in response.depends.depends]
+
+    async def dropDepends(self, target):
+        """Drops the desired dependency target.
+
+        :type  target: depend_pb2.DependTarget
+        :param target: The desired dependency target to drop"""
+        return await self.stub.DropDepends(
+            job_pb2.JobDropDependsRequest(job=self.data, target=target), timeout=Cuebot.Timeout)
+
+    async def createDependencyOnJob(self, job):
+        """Create and return a job on job dependency.
+
+        :type  job: opencue.wrappers.job.Job
+        :param job: the job you want this job to depend on
+        :rtype:  Depend
+        :return: The new dependency"""
+        response = await self.stub.CreateDependencyOnJob(
+            job_pb2.JobCreateDependencyOnJobRequest(job=self.data, on_job=job.data),
+            timeout=Cuebot.Timeout)
+        return Depend(response.depend)
+
+    async def createDependencyOnLayer(self, layer):
+        """Create and return a job on layer dependency.
+
+        :type  layer: opencue.wrappers.layer.Layer
+        :param layer: the layer you want this job to depend on
+        :rtype:  Depend
+        :return: the new dependency"""
+        response = await self.stub.CreateDependencyOnLayer(
+            job_pb2.JobCreateDependencyOnLayerRequest(job=self.data, layer=layer.data),
+            timeout=Cuebot.Timeout)
+        return Depend(response.depend)
+
+    async def createDependencyOnFrame(self, frame):
+        """Create and return a job on frame dependency.
+
+        :type  frame: opencue.wrappers.frame.Frame
+        :param frame: the frame you want this job to depend on
+        :rtype:  Depend
+        :return: the new dependency"""
+        response = await self.stub.CreateDependencyOnFrame(
+            job_pb2.JobCreateDependencyOnFrameRequest(job=self.data, frame=frame.data),
+            timeout=Cuebot.Timeout)
+        return Depend(response.depend)
+
+    async def addComment(self, subject, message):
+        """Appends a comment to the job's comment list.
+
+        :type  subject: str
+        :param subject: Subject data
+        :type  message: str
+        :param message: Message data"""
+        comment = comment_pb2.Comment(
+            user=os.getenv("USER", "unknown"),
+            subject=subject,
+            message=message or " ",
+            timestamp=0)
+        await self.stub.AddComment(
+            job_pb2.JobAddCommentRequest(job=self.data, new_comment=comment),
+            timeout=Cuebot.Timeout)
+
+    async def getComments(self):
+        """returns the jobs comments"""
+        response = await self.stub.GetComments(job_pb2.JobGetCommentsRequest(job=self.data),
+                                               timeout=Cuebot.Timeout)
+        return [Comment(cmt) for cmt in response.comments.comments]
+
+    async def setGroup(self, group):
+        """Sets the job to a new group.
+
+        :type  group: opencue.wrappers.group.Group
+        :param group: the group you want the job to be in."""
+        await self.stub.SetGroup(job_pb2.JobSetGroupRequest(job=self.data, group_id=group.id()),
+                                 timeout=Cuebot.Timeout)
+
+    async def reorderFrames(self, range, order):
+        """Reorders the specified frame range on this job.
+
+        :type  range: string
+        :param range: The frame range to reorder
+        :type  order: job_pb2.Order
+        :param order: First, Last or Reverse"""
+        await self.stub.ReorderFrames(
+            job_pb2.JobReorderFramesRequest(job=self.data, range=range, order=order),
+            timeout=Cuebot.Timeout)
+
+    async def staggerFrames(self, range, stagger):
+        """Staggers the specified frame range on this job.
+
+        :type  range: string
+        :param range: The frame range to stagger
+        :type  stagger: int
+        :param stagger: The amount to stagger by"""
+        await self.stub.StaggerFrames(
+            job_pb2.JobStaggerFramesRequest(job=self.data, range=range, stagger=stagger),
+            timeout=Cuebot.Timeout)
+
+
+class Layer(opencue.wrappers.layer.Layer):
+    """A layer whose Cuebot calls are coroutines, see opencue.wrappers.layer.Layer"""
+
+    def __init__(self, layer=None):
+        self.data = layer
+        self.stub = Cuebot.getStub('layer')
+
+    async def kill(self):
+        """Kill entire layer"""
+        return await self.stub.KillFrames(job_pb2.LayerKillFramesRequest(layer=self.data),
+                                          timeout=Cuebot.Timeout)
+
+    async def eat(self):
+        """Eat entire layer"""
+        return await self.stub.EatFrames(job_pb2.LayerEatFramesRequest(layer=self.data),
+                                         timeout=Cuebot.Timeout)
+
+    async def retry(self):
+        """Retry entire layer"""
+        return await self.stub.RetryFrames(job_pb2.LayerRetryFramesRequest(layer=self.data),
+                                           timeout=Cuebot.Timeout)
+
+    async def markdone(self):
+        """Drops any dependency that requires this layer or requires any frame
+        in the layer"""
+        return await self.stub.MarkdoneFrames(
+            job_pb2.LayerMarkdoneFramesRequest(layer=self.data), timeout=Cuebot.Timeout)
+
+    async def addLimit(self, limit_id):
+        """Add a limit to the current layer."""
+        return await self.stub.AddLimit(
+            job_pb2.LayerAddLimitRequest(layer=self.data, limit_id=limit_id),
+            timeout=Cuebot.Timeout)
+
+    async def dropLimit(self, limit_id):
+        """Remove a limit on the current layer."""
+        return await self.stub.DropLimit(
+            job_pb2.LayerDropLimitRequest(layer=self.data, limit_id=limit_id),
+            timeout=Cuebot.Timeout)
+
+    async def enableMemoryOptimizer(self, value):
+        """Set enableMemoryOptimizer to the value.
+
+        :type value: bool
+        :param value: boolean to enable/disable memory optimizer"""
+        return await self.stub.EnableMemoryOptimizer(
+            job_pb2.LayerEnableMemoryOptimizerRequest(layer=self.data, value=value),
+            timeout=Cuebot.Timeout)
+
+    async def getFrames(self, **options):
+        """Returns the list of up to 1000 frames from within the layer.
+
+        :rtype:  list<Frame>
+        :return: Sequence of Frame obejcts"""
+        criteria = opencue.search.FrameSearch.criteriaFromOptions(**options)
+        response = await self.stub.GetFrames(
+            job_pb2.LayerGetFramesRequest(layer=self.data, s=criteria), timeout=Cuebot.Timeout)
+        return [Frame(frameData) for frameData in response.frames.frames]
+
+    async def iterFrames(self, **options):
+        """Yields all frames of the layer matching the options, a page at a
+        time, see opencue.wrappers.layer.Layer.iterFrames.
+
+        :rtype:  async_generator<Frame>
+        :return: the matching frames"""
+        async def getPage(criteria):
+            response = await self.stub.GetFrames(
+                job_pb2.LayerGetFramesRequest(layer=self.data, s=criteria),
+                timeout=Cuebot.Timeout)
+            return response.frames.frames
+        async for page in _iterFramePages(getPage, **options):
+            for frameData in page:
+                yield Frame(frameData)
+
+    async def getOutputPaths(self):
+        """Return the output paths for this layer.
+
+        :rtype: list<str>
+        :return: list of output paths"""
+        response = await self.stub.GetOutputPaths(
+            job_pb2.LayerGetOutputPathsRequest(layer=self.data), timeout=Cuebot.Timeout)
+        return response.output_paths
+
+    async def setTags(self, tags):
+        """Sets the tags.
+
+        :type  tags: list<str>
+        :param tags: Layer tags"""
+        return await self.stub.SetTags(job_pb2.LayerSetTagsRequest(layer=self.data, tags=tags),
+                                       timeout=Cuebot.Timeout)
+
+    async def setMaxCores(self, cores):
+        """Sets the maximum number of cores that this layer requires.
+
+        :type  cores: float
+        :param cores: Core units, 100 reserves 1 core"""
+        return await self.stub.SetMaxCores(
+            job_pb2.LayerSetMaxCoresRequest(layer=self.data, cores=cores/100.0),
+            timeout=Cuebot.Timeout)
+
+    async def setMinCores(self, cores):
+        """Sets the minimum number of cores that this layer requires.
+
+        :type  cores: int
+        :param cores: Core units, 100 reserves 1 core"""
+        return await self.stub.SetMinCores(
+            job_pb2.LayerSetMinCoresRequest(layer=self.data, cores=cores/100.0),
+            timeout=Cuebot.Timeout)
+
+    async def setMinGpu(self, gpu):
+        """Sets the minimum number of gpu memory that this layer requires.
+
+        :type  gpu: int
+        :param gpu: gpu value"""
+        return await self.stub.SetMinGpu(
+            job_pb2.LayerSetMinGpuRequest(layer=self.data, gpu=gpu), timeout=Cuebot.Timeout)
+
+    async def setMinMemory(self, memory):
+        """Sets the minimum amount of memory that this layer requires. in Kb
+
+        :type  memory: int
+        :param memory: Minimum Kb memory reserved by each frame"""
+        return await self.stub.SetMinMemory(
+            job_pb2.LayerSetMinMemoryRequest(layer=self.data, memory=memory),
+            timeout=Cuebot.Timeout)
+
+    async def setThreadable(self, threadable):
+        """Set threadable to the value.
+
+        :type threadable: bool
+        :param threadable: boolean to enable/disable threadable"""
+        return await self.stub.SetThreadable(
+            job_pb2.LayerSetThreadableRequest(layer=self.data, threadable=threadable),
+            timeout=Cuebot.Timeout)
+
+    async def getWhatDependsOnThis(self):
+        """Gets a list of dependencies that depend directly on this layer.
+
+        :rtype:  list<Depend>
+        :return: List of dependencies that depend directly on this layer"""
+        response = await self.stub.GetWhatDependsOnThis(
+            job_pb2.LayerGetWhatDependsOnThisRequest(layer=self.data), timeout=Cuebot.Timeout)
+        return [Depend(dep) for dep in response.depends.depends]
+
+    async def getWhatThisDependsOn(self):
+        """Get a list of dependencies that this layer depends on.
+
+        :rtype:  list<Depend>
+        :return: List of dependences that this layer depends on"""
+        response = await self.stub.GetWhatThisDependsOn(
+            job_pb2.LayerGetWhatThisDependsOnRequest(layer=self.data), timeout=Cuebot.Timeout)
+        return [Depend(dep) for dep in response.depends.depends]
+
+    async def createDependencyOnJob(self, job):
+        """Create and return a layer on job dependency.
+
+        :type  job: opencue.wrappers.job.Job
+        :param job: the job you want this job to depend on
+        :rtype:  Depend
+        :return: the new dependency"""
+        response = await self.stub.CreateDependencyOnJob(
+            job_pb2.LayerCreateDependOnJobRequest(layer=self.data, job=job.data),
+            timeout=Cuebot.Timeout)
+        return Depend(response.depend)
+
+    async def createDependencyOnLayer(self, layer):
+        """Create and return a layer on layer dependency.
+
+        :type  layer: opencue.wrappers.layer.Layer
+        :param layer: the layer you want this layer to depend on
+        :rtype:  Depend
+        :return: the new dependency"""
+        response = await self.stub.CreateDependencyOnLayer(
+            job_pb2.LayerCreateDependOnLayerRequest(layer=self.data, depend_on_layer=layer.data),
+            timeout=Cuebot.Timeout)
+        return Depend(response.depend)
+
+    async def createDependencyOnFrame(self, frame):
+        """Create and return a layer on frame dependency.
+
+        :type  frame: opencue.wrappers.frame.Frame
+        :param frame: the frame you want this layer to depend on
+        :rtype:  Depend
+        :return: the new dependency"""
+        response = await self.stub.CreateDependencyOnFrame(
+            job_pb2.LayerCreateDependOnFrameRequest(layer=self.data, frame=frame.data),
+            timeout=Cuebot.Timeout)
+        return Depend(response.depend)
+
+    async def createFrameByFrameDependency(self, layer):
+        """Create and return a frame by frame frame dependency.
+
+        :param layer: the layer you want this layer to depend on
+        :type  layer: opencue.wrappers.layer.Layer
+        :rtype:  Depend
+        :return: the new dependency"""
+        response = await self.stub.CreateFrameByFrameDependency(
+            job_pb2.LayerCreateFrameByFrameDependRequest(
+                layer=self.data, depend_layer=layer.data, any_frame=False),
+            timeout=Cuebot.Timeout)
+        return Depend(response.depend)
+
+    async def registerOutputPath(self, outputPath):
+        """Register an output with the given layer.
+
+        :type outputPath: str
+        :param outputPath: Output path to register
+        """
+        await self.stub.RegisterOutputPath(
+            job_pb2.LayerRegisterOutputPathRequest(layer=self.data, spec=outputPath),
+            timeout=Cuebot.Timeout)
+
+    async def reorderFrames(self, range, order):
+        """Reorders the specified frame range on this layer.
+
+        :type  range: string
+        :param range: The frame range to reorder
+        :type  order: opencue.wrapper.layer.Layer.Order
+        :param order: First, Last or Reverse"""
+        await self.stub.ReorderFrames(
+            job_pb2.LayerReorderFramesRequest(layer=self.data, range=range, order=order),
+            timeout=Cuebot.Timeout)
+
+    async def staggerFrames(self, range, stagger):
+        """Staggers the specified frame range on this layer.
+
+        :type  range: string
+        :param range: The frame range to stagger
+        :type  stagger: int
+        :param stagger: The amount to stagger by"""
+        await self.stub.StaggerFrames(
+            job_pb2.LayerStaggerFramesRequest(layer=self.data, range=range, stagger=stagger),
+            timeout=Cuebot.Timeout)
+
+    async def getLimitDetails(self):
+        """Return the Limit objects for the given layer.
+
+        :rtype: list<Limit>
+        :return: The list of limits on this layer."""
+        response = await self.stub.GetLimits(job_pb2.LayerGetLimitsRequest(layer=self.data),
+                                             timeout=Cuebot.Timeout)
+        return [Limit(limit) for limit in response.limits]
+
+
+class Frame(opencue.wrappers.frame.Frame):
+    """A frame whose Cuebot calls are coroutines, see opencue.wrappers.frame.Frame"""
+
+    def __init__(self, frame=None):
+        self.data = frame
+        self.stub = Cuebot.getStub('frame')
+
+    async def eat(self):
+        """Eat frame"""
+        if self.data.state != job_pb2.FrameState.Value('EATEN'):
+            await self.stub.Eat(job_pb2.FrameEatRequest(frame=self.data), timeout=Cuebot.Timeout)
+
+    async def kill(self):
+        """Kill frame"""
+        if self.data.state == job_pb2.FrameState.Value('RUNNING'):
+            await self.stub.Kill(job_pb2.FrameKillRequest(frame=self.data),
+                                 timeout=Cuebot.Timeout)
+
+    async def retry(self):
+        """Retry frame"""
+        if self.data.state != job_pb2.FrameState.Value('WAITING'):
+            await self.stub.Retry(job_pb2.FrameRetryRequest(frame=self.data),
+                                  timeout=Cuebot.Timeout)
+
+    async def getWhatDependsOnThis(self):
+        """Returns a list of dependencies that depend directly on this frame.
+
+        :rtype:  list<Depend>
+        :return: List of dependencies that depend directly on this frame"""
+        response = await self.stub.GetWhatDependsOnThis(
+            job_pb2.FrameGetWhatDependsOnThisRequest(frame=self.data), timeout=Cuebot.Timeout)
+        return [Depend(dep) for dep in response.depends.depends]
+
+    async def getWhatThisDependsOn(self):
+        """Returns a list of dependencies that this frame depends on.
+
+        :rtype:  list<Depend>
+        :return: List of dependencies that this frame depends on"""
+        response = await self.stub.GetWhatThisDependsOn(
+            job_pb2.FrameGetWhatThisDependsOnRequest(frame=self.data), timeout=Cuebot.Timeout)
+        return [Depend(dep) for dep in response.depends.depends]
+
+    async def createDependencyOnJob(self, job):
+        """Create and return a frame on job dependency.
+
+        :type  job: opencue.wrappers.job.Job
+        :param job: the job you want this frame to depend on
+        :rtype:  Depend
+        :return: The new dependency"""
+        response = await self.stub.CreateDependencyOnJob(
+            job_pb2.FrameCreateDependencyOnJobRequest(frame=self.data, job=job.data),
+            timeout=Cuebot.Timeout)
+        return Depend(response.depend)
+
+    async def createDependencyOnLayer(self, layer):
+        """Create and return a frame on layer dependency.
+
+        :type layer: opencue.wrappers.layer.Layer
+        :param layer: the layer you want this frame to depend on
+        :rtype:  Depend
+        :return: The new dependency"""
+        response = await self.stub.CreateDependencyOnLayer(
+            job_pb2.FrameCreateDependencyOnLayerRequest(frame=self.data, layer=layer.data),
+            timeout=Cuebot.Timeout)
+        return Depend(response.depend)
+
+    async def createDependencyOnFrame(self, frame):
+        """Create and return a frame on frame dependency.
+
+        :type frame: opencue.wrappers.frame.Frame
+        :param frame: the frame you want this frame to depend on
+        :rtype:  Depend
+        :return: The new dependency"""
+        response = await self.stub.CreateDependencyOnFrame(
+            job_pb2.FrameCreateDependencyOnFrameRequest(frame=self.data,
+                                                        depend_on_frame=frame.data),
+            timeout=Cuebot.Timeout)
+        return Depend(response.depend)
+
+    async def markAsWaiting(self):
+        """Mark the frame as waiting, similar to drop depends. The frame will be
+        able to run even if the job has an external dependency."""
+        await self.stub.MarkAsWaiting(job_pb2.FrameMarkAsWaitingRequest(frame=self.data),
+                                      timeout=Cuebot.Timeout)
+
+
+class Host(opencue.wrappers.host.Host):
+    """A host whose Cuebot calls are coroutines, see opencue.wrappers.host.Host"""
+
+    def __init__(self, host=None):
+        self.data = host
+        self.stub = Cuebot.getStub('host')
+
+    async def lock(self):
+        """Locks the host so that it no longer accepts new frames"""
+        await self.stub.Lock(host_pb2.HostLockRequest(host=self.data), timeout=Cuebot.Timeout)
+
+    async def unlock(self):
+        """Unlocks the host and cancels any actions that were waiting for all
+        running frames to finish.
+        """
+        await self.stub.Unlock(host_pb2.HostUnlockRequest(host=self.data),
+                               timeout=Cuebot.Timeout)
+
+    async def delete(self):
+        """Delete the host from the cuebot"""
+        await self.stub.Delete(host_pb2.HostDeleteRequest(host=self.data),
+                               timeout=Cuebot.Timeout)
+
+    async def getProcs(self):
+        """Returns a list of procs under this host.
+
+        :rtype: list<Proc>
+        :return: A list of procs under this host
+        """
+        response = await self.stub.GetProcs(host_pb2.HostGetProcsRequest(host=self.data),
+                                            timeout=Cuebot.Timeout)
+        return [Proc(p) for p in response.procs.procs]
+
+    async def getRenderPartitions(self):
+        """Returns a list of render partitions associated with this host
+
+        :rtype: list<RenderPartition>
+        :return: A list of render partitions under this host
+        """
+        response = await self.stub.GetRenderPartitions(
+            host_pb2.HostGetRenderPartitionsRequest(host=self.data), timeout=Cuebot.Timeout)
+        return response.render_partitions.render_partitions
+
+    async def rebootWhenIdle(self):
+        """Causes the host to no longer accept new frames and
+        when the machine is idle it will reboot.
+        """
+        await self.stub.RebootWhenIdle(host_pb2.HostRebootWhenIdleRequest(host=self.data),
+                                       timeout=Cuebot.Timeout)
+
+    async def reboot(self):
+        """Causes the host to kill all running frames and reboot the machine."""
+        await self.stub.Reboot(host_pb2.HostRebootRequest(host=self.data),
+                               timeout=Cuebot.Timeout)
+
+    async def addTags(self, tags):
+        """Adds tags to a host.
+
+        :type tags: list<str>
+        :param tags: The tags to add
+        """
+        await self.stub.AddTags(host_pb2.HostAddTagsRequest(host=self.data, tags=tags),
+                                timeout=Cuebot.Timeout)
+
+    async def removeTags(self, tags):
+        """Remove tags from this host.
+
+        :type tags: list<str>
+        :param tags: The tags to remove
+        """
+        await self.stub.RemoveTags(host_pb2.HostRemoveTagsRequest(host=self.data, tags=tags),
+                                   timeout=Cuebot.Timeout)
+
+    async def renameTag(self, oldTag, newTag):
+        """Renames a tag.
+
+        :type oldTag: str
+        :param oldTag: The old tag to rename
+        :type newTag: str
+        :param newTag: The new name for the tag
+        """
+        await self.stub.RenameTag(
+            host_pb2.HostRenameTagRequest(host=self.data, old_tag=oldTag, new_tag=newTag),
+            timeout=Cuebot.Timeout)
+
+    async def setAllocation(self, allocation):
+        """Sets the host to the given allocation.
+
+        :type allocation: opencue.wrappers.allocation.Allocation
+        :param allocation: An allocation object
+        """
+        await self.stub.SetAllocation(
+            host_pb2.HostSetAllocationRequest(host=self.data, allocation_id=allocation.id()),
+            timeout=Cuebot.Timeout)
+
+    async def addComment(self, subject, message):
+        """Appends a comment to the hosts's comment list.
+
+        :type subject: str
+        :param subject: Subject data
+        :type message: str
+        :param message: Message data
+        """
+        comment = comment_pb2.Comment(
+            user=os.getenv("USER", "unknown"),
+            subject=subject,
+            message=message or " ",
+            timestamp=0
+        )
+        await self.stub.AddComment(
+            host_pb2.HostAddCommentRequest(host=self.data, new_comment=comment),
+            timeout=Cuebot.Timeout)
+
+    async def getComments(self):
+        """returns the hosts comments"""
+        response = await self.stub.GetComments(host_pb2.HostGetCommentsRequest(host=self.data),
+                                               timeout=Cuebot.Timeout)
+        return [Comment(c) for c in response.comments.comments]
+
+    async def setHardwareState(self, state):
+        """Sets the host's hardware state
+
+        :type state: host_pb2.HardwareState
+        :param state: state to set host to"""
+        await self.stub.SetHardwareState(
+            host_pb2.HostSetHardwareStateRequest(host=self.data, state=state),
+            timeout=Cuebot.Timeout)
+
+    async def setOs(self, osName):
+        """Sets the host operating system.
+
+        :type osName: string
+        :param osName: os value to set host to"""
+        await self.stub.SetOs(host_pb2.HostSetOsRequest(host=self.data, os=osName),
+                              timeout=Cuebot.Timeout)
+
+    async def setThreadMode(self, mode):
+        """Set the thread mode to mode.
+
+        :type mode: host_pb2.ThreadMode
+        :param mode: ThreadMode to set host to
+        """
+        await self.stub.SetThreadMode(
+            host_pb2.HostSetThreadModeRequest(host=self.data, mode=mode),
+            timeout=Cuebot.Timeout)
+
+
+class NestedHost(_DataWrapper, opencue.wrappers.host.NestedHost):
+    pass
+
+
+class Proc(opencue.wrappers.proc.Proc):
+    """A proc whose Cuebot calls are coroutines, see opencue.wrappers.proc.Proc"""
+
+    def __init__(self, proc=None):
+        self.data = proc
+        self.stub = Cuebot.getStub('proc')
+
+    async def kill(self):
+        """Kill the frame running on this proc"""
+        return await self.stub.Kill(host_pb2.ProcKillRequest(proc=self.data),
+                                    timeout=Cuebot.Timeout)
+
+    async def unbook(self, kill=False):
+        """Unbook the current frame.  If the value of kill is true,
+           the frame will be immediately killed.
+        """
+        return await self.stub.Unbook(host_pb2.ProcUnbookRequest(proc=self.data, kill=kill),
+                                      timeout=Cuebot.Timeout)
+
+    async def getHost(self):
+        """Return the host this proc is allocated from.
+
+        :rtype:  Host
+        :return: The host this proc is allocated from."""
+        response = await self.stub.GetHost(host_pb2.ProcGetHostRequest(proc=self.data),
+                                           timeout=Cuebot.Timeout)
+        return Host(response.host)
+
+    async def getFrame(self):
+        """Return the frame this proc is running.
+
+        :rtype:  Frame
+        :return: The fame this proc is running."""
+        response = await self.stub.GetFrame(host_pb2.ProcGetFrameRequest(proc=self.data),
+                                            timeout=Cuebot.Timeout)
+        return Frame(response.frame)
+
+    async def getLayer(self):
+        """Return the layer this proc is running.
+
+        :rtype:  Layer
+        :return: The layer this proc is running."""
+        response = await self.stub.GetLayer(host_pb2.ProcGetLayerRequest(proc=self.data),
+                                            timeout=Cuebot.Timeout)
+        return Layer(response.layer)
+
+    async def getJob(self):
+        """Return the job this proc is running.
+
+        :rtype:  Job
+        :return: The job this proc is running."""
+        response = await self.stub.GetJob(host_pb2.ProcGetJobRequest(proc=self.data),
+                                          timeout=Cuebot.Timeout)
+        return Job(response.job)
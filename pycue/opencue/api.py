@@ -23,6 +23,7 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import division
 
+from . import cache
 from . import search
 from . import util
 from opencue.compiled_proto import comment_pb2
@@ -42,6 +43,8 @@ from opencue.compiled_proto import show_pb2
 from opencue.compiled_proto import subscription_pb2
 from opencue.compiled_proto import task_pb2
 from .cuebot import Cuebot
+from .exception import BatchException
+from .exception import EntityNotFoundException
 from .wrappers.allocation import Allocation
 from .wrappers.comment import Comment
 from .wrappers.depend import Depend
@@ -70,11 +73,24 @@ __wrappers = [Action, Allocation, Comment, Depend, Filter, Frame, Group, Host, J
               NestedHost, Proc, Show, Subscription, Task]
 
 
+def _inIdOrder(ids, entities):
+    """Orders entities like ids, raising a BatchException for missing ones."""
+    found = dict((entity.id(), entity) for entity in entities)
+    results = [found.get(uniq) for uniq in ids]
+    errors = dict(
+        (index, EntityNotFoundException(EntityNotFoundException.failMsg.format(details=uniq)))
+        for index, uniq in enumerate(ids) if results[index] is None)
+    if errors:
+        raise BatchException(results, errors)
+    return results
+
+
 #
 # These are convenience methods that get imported into
 # the package namespace.
 #
 @util.grpcExceptionParser
+@cache.cached('service')
 def getDefaultServices():
     """
     Return the default service list.  Services
@@ -87,6 +103,7 @@ def getDefaultServices():
 
 
 @util.grpcExceptionParser
+@cache.cached('service')
 def getService(name):
     """
     Return the service with the provided name.
@@ -99,6 +116,7 @@ def getService(name):
 
 
 @util.grpcExceptionParser
+@cache.invalidates('service')
 def createService(data):
     """
     Create the provided service and return it.
@@ -195,6 +213,7 @@ def getDepartmentNames():
 # Shows
 #
 @util.grpcExceptionParser
+@cache.invalidates('show')
 def createShow(show):
     """Creates a new show.
 
@@ -207,6 +226,7 @@ def createShow(show):
 
 
 @util.grpcExceptionParser
+@cache.invalidates('show')
 def deleteShow(show_id):
     """Deletes a show.
 
@@ -218,6 +238,7 @@ def deleteShow(show_id):
 
 
 @util.grpcExceptionParser
+@cache.cached('show')
 def getShows():
     """Returns a list of show objects.
 
@@ -229,6 +250,7 @@ def getShows():
 
 
 @util.grpcExceptionParser
+@cache.cached('show')
 def getActiveShows():
     """Returns a list of all active shows.
 
@@ -240,6 +262,7 @@ def getActiveShows():
 
 
 @util.grpcExceptionParser
+@cache.cached('show')
 def findShow(name):
     """Returns a list of show objects.
 
@@ -309,6 +332,24 @@ def getJob(uniq):
         job_pb2.JobGetJobRequest(id=uniq), timeout=Cuebot.Timeout).job)
 
 
+@util.grpcExceptionParser
+def getJobsByIds(ids):
+    """Returns the Job objects for the given job IDs, finished or not,
+    with one call to the Cuebot.
+
+    :type  ids: list<str>
+    :param ids: unique job identifiers
+    :rtype:  list
+    :return: a Job object for each ID, in the same order
+    :raises: BatchException if some IDs have no job"""
+    ids = list(ids)
+    if not ids:
+        return []
+    criteria = job_pb2.JobSearchCriteria(ids=ids, include_finished=True)
+    jobSeq = Cuebot.getStub('job').GetJobs(
+        job_pb2.JobGetJobsRequest(r=criteria), timeout=Cuebot.Timeout).jobs
+    return _inIdOrder(ids, [Job(j) for j in jobSeq.jobs])
+
 @util.grpcExceptionParser
 def getJobs(**options):
     """
@@ -404,6 +445,7 @@ def getJobNames(**options):
 # Layers
 #
 @util.grpcExceptionParser
+@cache.cached('layer')
 def findLayer(job, layer):
     """Finds and returns a layer from the specified pending job.
 
@@ -475,6 +517,25 @@ def getFrames(job, **options):
     return [Frame(f) for f in framesSeq.frames]
 
 
+def iterFrames(job, **options):
+    """Yields all frames in a job that match the search criteria, fetching
+    them a page at a time instead of stopping at 1000 like getFrames.
+    See opencue.wrappers.job.Job.iterFrames.
+
+    :type job: str
+    :param job: the job name
+    :rtype: generator
+    :return: the matching Frame objects"""
+    @util.grpcExceptionParser
+    def getPage(criteria):
+        return Cuebot.getStub('frame').GetFrames(
+            job_pb2.FrameGetFramesRequest(job=job, r=criteria),
+            timeout=Cuebot.Timeout).frames.frames
+    for page in search.FrameSearch.iterPages(getPage, **options):
+        for frameData in page:
+            yield Frame(frameData)
+
+
 #
 # Depends
 #
@@ -530,6 +591,25 @@ def getHosts(**options):
 
 
 @util.grpcExceptionParser
+def getHostsByIds(ids):
+    """Returns the Host objects for the given host IDs with one call to
+    the Cuebot.
+
+    :type  ids: list<str>
+    :param ids: unique host identifiers
+    :rtype:  list
+    :return: a Host object for each ID, in the same order
+    :raises: BatchException if some IDs have no host"""
+    ids = list(ids)
+    if not ids:
+        return []
+    criteria = host_pb2.HostSearchCriteria(ids=ids)
+    hostSeq = Cuebot.getStub('host').GetHosts(
+        host_pb2.HostGetHostsRequest(r=criteria), timeout=Cuebot.Timeout).hosts
+    return _inIdOrder(ids, [Host(h) for h in hostSeq.hosts])
+
+@util.grpcExceptionParser
+@cache.cached('host')
 def findHost(name):
     """Returns the host for the matching hostname.
 
@@ -588,6 +668,7 @@ def findFilter(show_name, filter_name):
 # Allocation
 #
 @util.grpcExceptionParser
+@cache.invalidates('allocation')
 def createAllocation(name, tag, facility):
     """Creates and returns an allocation.
     The host tag will be the lowercase of the allocation name.
@@ -604,6 +685,7 @@ def createAllocation(name, tag, facility):
 
 
 @util.grpcExceptionParser
+@cache.cached('allocation')
 def getAllocations():
     """Returns a list of allocation objects.
 
@@ -615,6 +697,7 @@ def getAllocations():
 
 
 @util.grpcExceptionParser
+@cache.cached('allocation')
 def findAllocation(name):
     """Returns the Allocation object that matches the name.
 
@@ -639,12 +722,14 @@ def getAllocation(allocId):
 
 
 @util.grpcExceptionParser
+@cache.invalidates('allocation')
 def deleteAllocation(alloc):
     return Cuebot.getStub('allocation').Delete(
         facility_pb2.AllocDeleteRequest(allocation=alloc), timeout=Cuebot.Timeout)
 
 
 @util.grpcExceptionParser
+@cache.invalidates('allocation')
 def allocSetBillable(alloc, is_billable):
     return Cuebot.getStub('allocation').SetBillable(
         facility_pb2.AllocSetBillableRequest(allocation=alloc, value=is_billable),
@@ -652,12 +737,14 @@ def allocSetBillable(alloc, is_billable):
 
 
 @util.grpcExceptionParser
+@cache.invalidates('allocation')
 def allocSetName(alloc, name):
     return Cuebot.getStub('allocation').SetName(
         facility_pb2.AllocSetNameRequest(allocation=alloc, name=name), timeout=Cuebot.Timeout)
 
 
 @util.grpcExceptionParser
+@cache.invalidates('allocation')
 def allocSetTag(alloc, tag):
     return Cuebot.getStub('allocation').SetTag(
         facility_pb2.AllocSetTagRequest(allocation=alloc, tag=tag), timeout=Cuebot.Timeout)
@@ -726,6 +813,7 @@ def getProcs(**options):
 # Limits
 #
 @util.grpcExceptionParser
+@cache.invalidates('limit')
 def createLimit(name, maxValue):
     """Create a new Limit with the given name and max value.
 
@@ -740,6 +828,7 @@ def createLimit(name, maxValue):
         limit_pb2.LimitCreateRequest(name=name, max_value=maxValue), timeout=Cuebot.Timeout))
 
 @util.grpcExceptionParser
+@cache.cached('limit')
 def getLimits():
     """Return a list of all known Limit objects.
 
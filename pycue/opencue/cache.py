@@ -0,0 +1,223 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Project: opencue Library
+Module: cache.py
+
+An opt-in client side cache for lookups of entities that rarely change, such
+as shows, allocations, services and limits. Cached lookups return the result
+of an earlier call for up to the TTL of the entity kind, so they may be stale
+by that long. Mutating calls made through opencue invalidate their kind.
+
+The cache is off by default. Enable it with cache.enabled in the opencue
+config, or from a tool::
+
+    opencue.cache.enable()
+    opencue.cache.enable(ttls={'layer': 30})
+
+Tools that enable it themselves should leave it off when cache.enabled is
+set to false. The TTLs in cache.ttl apply on top of the ones a tool passes.
+
+Cached wrappers are shared between callers and should be treated as read only.
+"""
+
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from builtins import object
+import collections
+import functools
+import threading
+import time
+
+from opencue.cuebot import Cuebot
+
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_TTLS = {
+    'allocation': 300,
+    'host': 10,
+    'layer': 30,
+    'limit': 60,
+    'service': 300,
+    'show': 300,
+}
+
+
+class TtlCache(object):
+    """A thread safe, size bounded LRU cache whose entries expire after the
+    TTL of their kind. Kinds without a TTL are not cached."""
+
+    def __init__(self, ttls, maxEntries=DEFAULT_MAX_ENTRIES, clock=time.time):
+        """
+        :type ttls: dict
+        :param ttls: seconds to keep entries for, by kind
+        :type maxEntries: int
+        :param maxEntries: number of entries kept before the least recently
+                           used one is evicted
+        """
+        self.ttls = dict(ttls)
+        self.maxEntries = maxEntries
+        self.__clock = clock
+        self.__entries = collections.OrderedDict()
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def caches(self, kind):
+        """Returns whether entries of the kind are cached."""
+        return self.ttls.get(kind, 0) > 0
+
+    def get(self, kind, key):
+        """Returns a tuple of whether the key was found and its value.
+
+        :type kind: str
+        :param kind: the entity kind
+        :param key: a hashable key within the kind
+        :rtype: tuple"""
+        with self.__lock:
+            entry = self.__entries.pop((kind, key), None)
+            if entry is None or entry[0] <= self.__clock():
+                self.__misses += 1
+                return False, None
+            # Reinsert to mark the entry as the most recently used.
+            self.__entries[(kind, key)] = entry
+            self.__hits += 1
+            return True, entry[1]
+
+    def put(self, kind, key, value):
+        """Stores the value until the TTL of the kind runs out."""
+        if not self.caches(kind):
+            return
+        with self.__lock:
+            self.__entries.pop((kind, key), None)
+            self.__entries[(kind, key)] = (self.__clock() + self.ttls[kind], value)
+            while len(self.__entries) > self.maxEntries:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+    def invalidate(self, kind=None):
+        """Drops the entries of the kind, or every entry if kind is None."""
+        with self.__lock:
+            if kind is None:
+                self.__entries.clear()
+                return
+            for entryKey in [k for k in self.__entries if k[0] == kind]:
+                del self.__entries[entryKey]
+
+    def getStats(self):
+        """Returns the hits, misses, evictions and current size of the cache.
+
+        :rtype: dict"""
+        with self.__lock:
+            return {'hits': self.__hits,
+                    'misses': self.__misses,
+                    'evictions': self.__evictions,
+                    'size': len(self.__entries)}
+
+
+__cache = None
+
+
+def enable(ttls=None, maxEntries=None):
+    """Enables the cache, replacing any previous one.
+
+    :type ttls: dict
+    :param ttls: seconds to keep entries for, by kind, defaults to
+                 DEFAULT_TTLS. Only the given kinds and the kinds in
+                 cache.ttl in the config are cached, cache.ttl wins.
+    :type maxEntries: int
+    :param maxEntries: the size of the cache, defaults to cache.max_entries"""
+    global __cache
+    config = Cuebot.getConfig()
+    ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+    ttls.update(config.get('cache.ttl') or {})
+    if maxEntries is None:
+        maxEntries = config.get('cache.max_entries', DEFAULT_MAX_ENTRIES)
+    __cache = TtlCache(ttls, maxEntries)
+
+
+def disable():
+    """Disables the cache and drops its entries."""
+    global __cache
+    __cache = None
+
+
+def isEnabled():
+    """Returns whether the cache is enabled."""
+    return __cache is not None
+
+
+def invalidate(kind=None):
+    """Drops cached entries of the kind, or every entry if kind is None."""
+    cache = __cache
+    if cache is not None:
+        cache.invalidate(kind)
+
+
+def getStats():
+    """Returns the hits, misses, evictions and size of the cache, or None if
+    it is disabled.
+
+    :rtype: dict"""
+    cache = __cache
+    if cache is None:
+        return None
+    return cache.getStats()
+
+
+def cached(kind):
+    """Decorator caching the result of a lookup of the given entity kind,
+    keyed on the function and its arguments. Lists are copied on the way out
+    so callers can't change the cached one."""
+    def _decorator(func):
+        def _wrapper(*args, **kwargs):
+            cache = __cache
+            if cache is None or not cache.caches(kind):
+                return func(*args, **kwargs)
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            try:
+                found, value = cache.get(kind, key)
+            except TypeError:
+                # Unhashable arguments, such as lists, are not cached.
+                return func(*args, **kwargs)
+            if not found:
+                value = func(*args, **kwargs)
+                cache.put(kind, key, value)
+            if isinstance(value, list):
+                return list(value)
+            return value
+        return functools.wraps(func)(_wrapper)
+    return _decorator
+
+
+def invalidates(kind):
+    """Decorator dropping the cached entries of the given entity kind after
+    a call that changes them."""
+    def _decorator(func):
+        def _wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                invalidate(kind)
+        return functools.wraps(func)(_wrapper)
+    return _decorator
+
+
+if Cuebot.getConfig().get('cache.enabled'):
+    enable()
@@ -0,0 +1,293 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Project: opencue Library
+Module: channelpool.py
+
+A grpc channel that spreads calls over channels to several cuebots. Stubs
+made on the pool pick a cuebot on every call, so the stubs held by wrappers
+follow the pool as cuebots go down and come back.
+"""
+
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from builtins import object
+import logging
+import threading
+
+import grpc
+
+logger = logging.getLogger('opencue')
+
+
+class _Entry(object):
+    """A cuebot of the pool and the state of its channel."""
+
+    def __init__(self, target, channel):
+        self.target = target
+        self.channel = channel
+        self.healthy = True
+        self.outstanding = 0
+        self.callables = {}
+
+
+class ChannelPool(grpc.Channel):
+    """Routes each call to the healthy cuebot with the fewest calls in flight,
+    taking turns between equally busy ones. A call failing with UNAVAILABLE
+    marks its cuebot unhealthy and is sent to the next healthy one. A
+    background thread checks every cuebot, reopening the channels of the
+    unhealthy ones, until the pool is closed."""
+
+    def __init__(self, targets, openChannel, checkChannel, interval=0):
+        """
+        :type targets: list<str>
+        :param targets: host:port of the cuebots
+        :type openChannel: callable
+        :param openChannel: opens a grpc channel to a target
+        :type checkChannel: callable
+        :param checkChannel: makes a call on a channel, raising grpc.RpcError
+                             if the cuebot does not answer
+        :type interval: float
+        :param interval: seconds between health checks, 0 disables them
+        """
+        self.__openChannel = openChannel
+        self.__checkChannel = checkChannel
+        self.__lock = threading.Lock()
+        self.__entries = [_Entry(target, openChannel(target)) for target in targets]
+        self.__next = 0
+        self.__closed = threading.Event()
+        self.__wake = threading.Event()
+        self.__thread = None
+        if interval > 0:
+            self.__thread = threading.Thread(
+                target=self.__run, args=(interval,), name='opencue-channel-pool')
+            self.__thread.daemon = True
+            self.__thread.start()
+
+    def targets(self):
+        """Returns the cuebots of the pool.
+
+        :rtype: list<str>"""
+        return [entry.target for entry in self.__entries]
+
+    def healthyTargets(self):
+        """Returns the cuebots currently taking calls.
+
+        :rtype: list<str>"""
+        with self.__lock:
+            return [entry.target for entry in self.__entries if entry.healthy]
+
+    def checkHealth(self):
+        """Checks every cuebot, reopening the channels of unhealthy ones that
+        have no calls in flight first.
+
+        :rtype: int
+        :return: the number of healthy cuebots"""
+        for entry in self.__entries:
+            self.__check(entry)
+        return len(self.healthyTargets())
+
+    def checkUntilHealthy(self):
+        """Checks the cuebots in turn until one is healthy, leaving the rest
+        to the background checks so a few unreachable cuebots don't hold up
+        the caller.
+
+        :rtype: bool
+        :return: whether a healthy cuebot was found"""
+        for entry in self.__entries:
+            if self.__check(entry):
+                self.__wake.set()
+                return True
+        return False
+
+    def __check(self, entry):
+        with self.__lock:
+            if not entry.healthy and entry.outstanding == 0:
+                oldChannel = entry.channel
+                entry.channel = self.__openChannel(entry.target)
+                entry.callables = {}
+                oldChannel.close()
+            channel = entry.channel
+        try:
+            self.__checkChannel(channel)
+            healthy = True
+        except grpc.RpcError:
+            healthy = False
+        self.__setHealthy(entry, healthy)
+        return healthy
+
+    def __run(self, interval):
+        while not self.__closed.is_set():
+            self.__wake.wait(interval)
+            self.__wake.clear()
+            if self.__closed.is_set():
+                return
+            try:
+                self.checkHealth()
+            except Exception as exc:
+                logger.warning('Cuebot health check failed: %s', exc)
+
+    def __setHealthy(self, entry, healthy):
+        with self.__lock:
+            if entry.healthy == healthy:
+                return
+            entry.healthy = healthy
+        if healthy:
+            logger.info('Cuebot %s is available again', entry.target)
+        else:
+            logger.warning('Cuebot %s is unavailable', entry.target)
+            self.__wake.set()
+
+    def _acquire(self, exclude=()):
+        """Picks the cuebot for a call and counts the call as in flight.
+        Unhealthy cuebots are only picked when none is healthy."""
+        with self.__lock:
+            candidates = [e for e in self.__entries if e.healthy and e not in exclude]
+            if not candidates:
+                candidates = [e for e in self.__entries if e not in exclude]
+            if not candidates:
+                return None
+            start = self.__next % len(candidates)
+            self.__next += 1
+            entry = min(candidates[start:] + candidates[:start], key=lambda e: e.outstanding)
+            entry.outstanding += 1
+            return entry
+
+    def _release(self, entry):
+        with self.__lock:
+            entry.outstanding -= 1
+
+    def _markUnavailable(self, entry):
+        self.__setHealthy(entry, False)
+
+    @staticmethod
+    def _getCallable(entry, kind, method, kwargs):
+        multiCallable = entry.callables.get((kind, method))
+        if multiCallable is None:
+            multiCallable = getattr(entry.channel, kind)(method, **kwargs)
+            entry.callables[(kind, method)] = multiCallable
+        return multiCallable
+
+    def unary_unary(self, method, *args, **kwargs):
+        return _UnaryUnaryMultiCallable(self, method, kwargs)
+
+    def unary_stream(self, method, *args, **kwargs):
+        return _RoutedMultiCallable(self, 'unary_stream', method, kwargs)
+
+    def stream_unary(self, method, *args, **kwargs):
+        return _RoutedMultiCallable(self, 'stream_unary', method, kwargs)
+
+    def stream_stream(self, method, *args, **kwargs):
+        return _RoutedMultiCallable(self, 'stream_stream', method, kwargs)
+
+    def subscribe(self, callback, try_to_connect=False):
+        raise NotImplementedError('The pool tracks the cuebots with health checks')
+
+    def unsubscribe(self, callback):
+        raise NotImplementedError('The pool tracks the cuebots with health checks')
+
+    def close(self):
+        """Stops the health checks and closes every channel."""
+        self.__closed.set()
+        self.__wake.set()
+        with self.__lock:
+            for entry in self.__entries:
+                entry.channel.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+class _UnaryUnaryMultiCallable(grpc.UnaryUnaryMultiCallable):
+    """Sends a unary call through the pool, failing over on UNAVAILABLE."""
+
+    def __init__(self, pool, method, kwargs):
+        self.__pool = pool
+        self.__method = method
+        self.__kwargs = kwargs
+
+    def __invoke(self, name, request, args, kwargs):
+        tried = []
+        while True:
+            entry = self.__pool._acquire(tried)
+            try:
+                multiCallable = self.__pool._getCallable(
+                    entry, 'unary_unary', self.__method, self.__kwargs)
+                return getattr(multiCallable, name)(request, *args, **kwargs)
+            except grpc.RpcError as exc:
+                if exc.code() != grpc.StatusCode.UNAVAILABLE:
+                    raise
+                self.__pool._markUnavailable(entry)
+                tried.append(entry)
+                if len(tried) >= len(self.__pool.targets()):
+                    raise
+                logger.warning('Cuebot %s is unavailable, failing over', entry.target)
+            finally:
+                self.__pool._release(entry)
+
+    def __call__(self, request, *args, **kwargs):
+        return self.__invoke('__call__', request, args, kwargs)
+
+    def with_call(self, request, *args, **kwargs):
+        return self.__invoke('with_call', request, args, kwargs)
+
+    def future(self, request, *args, **kwargs):
+        entry = self.__pool._acquire()
+        try:
+            multiCallable = self.__pool._getCallable(
+                entry, 'unary_unary', self.__method, self.__kwargs)
+            future = multiCallable.future(request, *args, **kwargs)
+        except Exception:
+            self.__pool._release(entry)
+            raise
+        future.add_done_callback(lambda _: self.__pool._release(entry))
+        return future
+
+
+class _RoutedMultiCallable(object):
+    """Sends a streaming call to the next cuebot of the pool, without
+    failover since the stream may already be partly consumed."""
+
+    def __init__(self, pool, kind, method, kwargs):
+        self.__pool = pool
+        self.__kind = kind
+        self.__method = method
+        self.__kwargs = kwargs
+
+    def __invoke(self, name, args, kwargs):
+        entry = self.__pool._acquire()
+        try:
+            multiCallable = self.__pool._getCallable(
+                entry, self.__kind, self.__method, self.__kwargs)
+            return getattr(multiCallable, name)(*args, **kwargs)
+        finally:
+            self.__pool._release(entry)
+
+    def __call__(self, *args, **kwargs):
+        return self.__invoke('__call__', args, kwargs)
+
+    def with_call(self, *args, **kwargs):
+        return self.__invoke('with_call', args, kwargs)
+
+    def future(self, *args, **kwargs):
+        return self.__invoke('future', args, kwargs)
@@ -25,6 +25,7 @@ import logging
 import os
 import yaml
 
+from opencue.channelpool import ChannelPool
 from opencue.compiled_proto import comment_pb2
 from opencue.compiled_proto import comment_pb2_grpc
 from opencue.compiled_proto import criterion_pb2
@@ -74,6 +75,11 @@ if os.path.exists(fcnf):
 
 DEFAULT_MAX_MESSAGE_BYTES = 1024 ** 2 * 10
 DEFAULT_GRPC_PORT = 8443
+DEFAULT_HEALTH_CHECK_INTERVAL = 10
+DEFAULT_HEALTH_CHECK_TIMEOUT = 5
+# Keepalive pings are off unless configured, see cuebot.keepalive_time_ms
+DEFAULT_KEEPALIVE_TIME_MS = 0
+DEFAULT_KEEPALIVE_TIMEOUT_MS = 10000
 
 class Cuebot(object):
     """Used to manage the connection to the Cuebot.  Normally the connection
@@ -156,32 +162,64 @@ class Cuebot(object):
 
     @staticmethod
     def setChannel():
-        """Sets the gRPC channel connection"""
-        # gRPC must specify a single host. Randomize host list to balance load across cuebots.
+        """Sets the gRPC channel connection, a pool of channels to every
+        cuebot host. Returns once one host passes a health check, the pool
+        checks the others in the background."""
+        # Randomize host list to balance load across cuebots.
         hosts = list(Cuebot.Hosts)
         shuffle(hosts)
-        maxMessageBytes = config.get('cuebot.max_message_bytes', DEFAULT_MAX_MESSAGE_BYTES)
+        targets = []
         for host in hosts:
             if ':' in host:
-                connectStr = host
+                targets.append(host)
             else:
-                connectStr = '%s:%s' % (host, config.get('cuebot.grpc_port', DEFAULT_GRPC_PORT))
-            logger.debug('connecting to gRPC at %s', connectStr)
-            # TODO(bcipriano) Configure gRPC TLS. (Issue #150)
-            try:
-                Cuebot.RpcChannel = grpc.insecure_channel(connectStr, options=[
-                    ('grpc.max_send_message_length', maxMessageBytes),
-                    ('grpc.max_receive_message_length', maxMessageBytes)])
-                # Test the connection
-                Cuebot.getStub('cue').GetSystemStats(
-                    cue_pb2.CueGetSystemStatsRequest(), timeout=Cuebot.Timeout)
-            except Exception:
-                logger.warning('Could not establish grpc channel with {}.'.format(connectStr))
-                continue
-            atexit.register(Cuebot.closeChannel)
-            return None
-        raise ConnectionException('No grpc connection could be established. ' +
-                                  'Please check configured cuebot hosts.')
+                targets.append('%s:%s' % (host, config.get('cuebot.grpc_port', DEFAULT_GRPC_PORT)))
+        pool = ChannelPool(targets, Cuebot.openChannel, Cuebot.checkChannel,
+                           config.get('cuebot.health_check_interval',
+                                      DEFAULT_HEALTH_CHECK_INTERVAL))
+        if not pool.checkUntilHealthy():
+            pool.close()
+            raise ConnectionException('No grpc connection could be established. ' +
+                                      'Please check configured cuebot hosts.')
+        for target in set(targets) - set(pool.healthyTargets()):
+            logger.warning('Could not establish grpc channel with {}.'.format(target))
+        Cuebot.RpcChannel = pool
+        atexit.register(Cuebot.closeChannel)
+
+    @staticmethod
+    def openChannel(target):
+        """Opens a gRPC channel to one cuebot.
+
+        :type  target: str
+        :param target: host:port of the cuebot
+        :rtype: grpc.Channel"""
+        maxMessageBytes = config.get('cuebot.max_message_bytes', DEFAULT_MAX_MESSAGE_BYTES)
+        options = [
+            # Give each channel its own connection, so reopening a channel
+            # reconnects instead of reusing the failed one grpc shares.
+            ('grpc.use_local_subchannel_pool', 1),
+            ('grpc.max_send_message_length', maxMessageBytes),
+            ('grpc.max_receive_message_length', maxMessageBytes)]
+        keepaliveTimeMs = config.get('cuebot.keepalive_time_ms', DEFAULT_KEEPALIVE_TIME_MS)
+        if keepaliveTimeMs:
+            options.extend([
+                ('grpc.keepalive_time_ms', keepaliveTimeMs),
+                ('grpc.keepalive_timeout_ms',
+                 config.get('cuebot.keepalive_timeout_ms', DEFAULT_KEEPALIVE_TIMEOUT_MS))])
+        logger.debug('connecting to gRPC at %s', target)
+        # TODO(bcipriano) Configure gRPC TLS. (Issue #150)
+        return grpc.insecure_channel(target, options=options)
+
+    @staticmethod
+    def checkChannel(channel):
+        """Tests a channel with a GetSystemStats call, raising grpc.RpcError
+        if the cuebot does not answer in cuebot.health_check_timeout seconds.
+
+        :type  channel: grpc.Channel
+        :param channel: a channel opened by openChannel"""
+        cue_pb2_grpc.CueInterfaceStub(channel).GetSystemStats(
+            cue_pb2.CueGetSystemStatsRequest(),
+            timeout=config.get('cuebot.health_check_timeout', DEFAULT_HEALTH_CHECK_TIMEOUT))
 
     @staticmethod
     def closeChannel():
@@ -64,6 +64,18 @@ class ConnectionException(CueException):
     retryMsg = 'Unable to contact grpc server, checking again...'
     retryable = True
 
+class BatchException(CueException):
+    """Raised when some calls of a batch failed, see opencue.util.batch.
+    results holds the result of each item in order, None for the failed ones,
+    and errors maps the index of each failed item to its exception."""
+    failMsg = '{failed} of {total} calls failed. {details}'
+
+    def __init__(self, results, errors):
+        self.results = results
+        self.errors = errors
+        super(BatchException, self).__init__(self.failMsg.format(
+            failed=len(errors), total=len(results), details=errors[min(errors)]))
+
 
 def getRetryCount():
     """Return the configured number of retries a cuebot call can make.
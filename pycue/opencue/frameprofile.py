@@ -0,0 +1,153 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Reader for the resource profiles rqd writes next to frame logs.
+
+With RQD_FRAME_PROFILE enabled, rqd samples the rss, cpu, io bytes and
+threads of each frame at every rss update and writes them to a .rqprof file
+beside the frame's rqlog when the frame completes::
+
+    profile = opencue.frameprofile.readProfile(opencue.frameprofile.profilePath(job, frame))
+    print(profile.peakRss(), len(profile))
+"""
+
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from builtins import object
+import array
+import os
+import struct
+import sys
+
+import opencue.util
+
+
+MAGIC = b'RQPF'
+HEADER = struct.Struct('<4sHII')
+# Columns of each file version with their array typecodes, as written by rqd.rqprofile.
+COLUMNS = {
+    1: (('time', 'd'),
+        ('rss', 'q'),
+        ('pcpu', 'f'),
+        ('read_bytes', 'q'),
+        ('write_bytes', 'q'),
+        ('threads', 'i')),
+}
+SUFFIX = '.rqprof'
+
+
+class FrameProfile(object):
+    """The resource samples of one frame, oldest first."""
+
+    def __init__(self, columns, dropped=0):
+        """
+        :type  columns: dict
+        :param columns: Column name to a sequence of values, such as 'rss' in kB
+        :type  dropped: int
+        :param dropped: Samples rqd dropped because its buffer was full"""
+        self.columns = columns
+        self.dropped = dropped
+
+    def __len__(self):
+        return len(self.columns.get('time', ()))
+
+    def column(self, name):
+        """Returns the values of a column.
+
+        :type  name: str
+        :param name: time, rss, pcpu, read_bytes, write_bytes or threads
+        :rtype:  sequence
+        :return: One value per sample"""
+        return self.columns[name]
+
+    def samples(self):
+        """Returns the samples as dicts of column name to value.
+
+        :rtype:  list<dict>
+        :return: The samples, oldest first"""
+        names = list(self.columns)
+        return [dict(zip(names, values))
+                for values in zip(*[self.columns[name] for name in names])]
+
+    def peakRss(self):
+        """Returns the highest sampled rss.
+
+        :rtype:  int
+        :return: rss in kB, 0 without samples"""
+        return max(self.columns.get('rss', ()) or [0])
+
+    def duration(self):
+        """Returns the seconds between the first and the last sample.
+
+        :rtype:  float
+        :return: Seconds covered by the samples"""
+        times = self.columns.get('time', ())
+        return times[-1] - times[0] if len(times) > 1 else 0.0
+
+
+def profilePath(job, frame):
+    """Returns the path of a frame's resource profile.
+
+    :type  job: opencue.wrappers.job.Job
+    :param job: The frame's job
+    :type  frame: opencue.wrappers.frame.Frame
+    :param frame: The frame
+    :rtype:  str
+    :return: Path of the .rqprof file"""
+    return os.path.splitext(opencue.util.logPath(job, frame))[0] + SUFFIX
+
+
+def parseProfile(data):
+    """Parses the contents of a resource profile.
+
+    :type  data: bytes
+    :param data: The file contents
+    :rtype:  FrameProfile
+    :return: The parsed profile"""
+    if len(data) < HEADER.size:
+        raise ValueError('Resource profile is truncated')
+    magic, version, count, dropped = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('Not a resource profile')
+    if version not in COLUMNS:
+        raise ValueError('Unsupported resource profile version %d' % version)
+    offset = HEADER.size
+    columns = {}
+    for name, typecode in COLUMNS[version]:
+        values = array.array(typecode)
+        size = values.itemsize * count
+        if offset + size > len(data):
+            raise ValueError('Resource profile is truncated')
+        values.frombytes(data[offset:offset + size])
+        if sys.byteorder == 'big':
+            values.byteswap()
+        columns[name] = values
+        offset += size
+    return FrameProfile(columns, dropped)
+
+
+def readProfile(path):
+    """Reads a resource profile written by rqd.
+
+    :type  path: str
+    :param path: The .rqprof file, see profilePath
+    :rtype:  FrameProfile
+    :return: The parsed profile"""
+    with open(path, 'rb') as profileFile:
+        return parseProfile(profileFile.read())
@@ -53,6 +53,7 @@ from __future__ import print_function
 from __future__ import division
 
 from builtins import object
+from concurrent import futures
 import logging
 
 import six
@@ -105,6 +106,8 @@ class FrameSearch(BaseSearch):
     page = 1
     limit = 1000
     change_date = 0
+    # The most frames the Cuebot returns in a page.
+    maxLimit = 1000
 
     def __init__(self, **options):
         super(FrameSearch, self).__init__(**options)
@@ -127,6 +130,38 @@ class FrameSearch(BaseSearch):
     def byRange(cls, job, val):
         cls.byOptions(job, frame_range=val)
 
+    @classmethod
+    def iterPages(cls, getPage, **options):
+        """Yields the pages of frames matching the options, from the page
+        option on, until a page is not full. The next page is fetched in the
+        background while the caller goes through the current one.
+
+        :type  getPage: callable
+        :param getPage: returns the frame messages for a FrameSearchCriteria
+        :rtype:  generator
+        :return: the frame messages of each page"""
+        criteria = cls.criteriaFromOptions(**options)
+        criteria.limit = min(criteria.limit or cls.maxLimit, cls.maxLimit)
+        criteria.page = max(criteria.page, 1)
+        executor = futures.ThreadPoolExecutor(max_workers=1)
+        nextPage = executor.submit(getPage, criteria)
+        try:
+            while nextPage is not None:
+                frames = nextPage.result()
+                nextPage = None
+                if len(frames) >= criteria.limit:
+                    pageCriteria = job_pb2.FrameSearchCriteria()
+                    pageCriteria.CopyFrom(criteria)
+                    pageCriteria.page = criteria.page + 1
+                    criteria = pageCriteria
+                    nextPage = executor.submit(getPage, criteria)
+                if frames:
+                    yield frames
+        finally:
+            if nextPage is not None:
+                nextPage.cancel()
+            executor.shutdown(wait=False)
+
 
 class HostSearch(BaseSearch):
     def __init__(self, **options):
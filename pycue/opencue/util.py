@@ -24,6 +24,7 @@ from __future__ import print_function
 from __future__ import division
 
 from builtins import str
+from concurrent import futures
 import functools
 import future.utils
 import grpc
@@ -36,6 +37,8 @@ import opencue
 
 logger = logging.getLogger('opencue')
 
+DEFAULT_BATCH_PARALLELISM = 32
+
 
 def grpcExceptionParser(grpcFunc):
     """Decorator to wrap functions making GRPC calls.
@@ -65,6 +68,47 @@ def grpcExceptionParser(grpcFunc):
     return functools.wraps(grpcFunc)(_decorator)
 
 
+def getBatchParallelism():
+    """Return the configured number of calls a batch makes at once."""
+    return opencue.cuebot.Cuebot.getConfig().get('cuebot.batch_parallelism',
+                                                  DEFAULT_BATCH_PARALLELISM)
+
+
+def batch(func, items, parallelism=None):
+    """Calls func on each item, with up to parallelism calls in flight on the
+    Cuebot channel at once, and returns the results in the order of items.
+    Errors are mapped and retried as in grpcExceptionParser. Every item is
+    called even when some fail, a BatchException is then raised.
+
+    :type  func: callable
+    :param func: called with each item
+    :type  items: list
+    :param items: the items, such as wrappers or ids
+    :type  parallelism: int
+    :param parallelism: the most calls at once, defaults to cuebot.batch_parallelism
+    :rtype:  list
+    :return: the value func returned for each item"""
+    items = list(items)
+    if not items:
+        return []
+    call = grpcExceptionParser(func)
+    # Opens the channel before the workers share it.
+    opencue.cuebot.Cuebot.getStub('cue')
+    results = [None] * len(items)
+    errors = {}
+    workers = min(parallelism or getBatchParallelism(), len(items))
+    with futures.ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        pending = dict((executor.submit(call, item), index) for index, item in enumerate(items))
+        for done in futures.as_completed(pending):
+            try:
+                results[pending[done]] = done.result()
+            except Exception as e:
+                errors[pending[done]] = e
+    if errors:
+        raise opencue.exception.BatchException(results, errors)
+    return results
+
+
 def id(value):
     """extract(entity)
     extracts a string unique ID from a opencue entity or
@@ -92,7 +136,7 @@ def proxy(idOrObject, cls):
     :type cls: str
     :param cls: The Name of the protobuf message class to use.
     :rtype:  protobuf Message or list
-    :return: Cue object or list of objects"""
+    :return: Cue object or list of objects, a list is fetched with batch()"""
     def _proxy(idString):
         proto = opencue.Cuebot.PROTO_MAP.get(cls.lower())
         if proto:
@@ -103,13 +147,7 @@ def proxy(idOrObject, cls):
             raise AttributeError('Could not find a proto for {}'.format(cls))
 
     def _proxies(entities):
-        messages = []
-        for item in entities:
-            if hasattr(item, 'id'):
-                messages.append(_proxy(item.id))
-            else:
-                messages.append(_proxy(item))
-        return messages
+        return batch(lambda item: _proxy(item.id if hasattr(item, 'id') else item), entities)
 
     if hasattr(idOrObject, 'id'):
         return _proxy(idOrObject.id)
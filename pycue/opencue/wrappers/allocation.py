@@ -21,6 +21,7 @@ allocation module
 from opencue.compiled_proto import facility_pb2
 from opencue.compiled_proto import host_pb2
 from opencue.cuebot import Cuebot
+import opencue.cache
 import opencue.wrappers.host
 import opencue.wrappers.subscription
 
@@ -32,6 +33,7 @@ class Allocation(object):
         self.data = allocation
         self.stub = Cuebot.getStub('allocation')
 
+    @opencue.cache.invalidates('allocation')
     def delete(self):
         """Delete the record of the allocation from the cuebot"""
         self.stub.Delete(
@@ -60,6 +62,8 @@ class Allocation(object):
             timeout=Cuebot.Timeout).subscriptions
         return [opencue.wrappers.subscription.Subscription(sub) for sub in subscriptionSeq.subscriptions]
 
+    @opencue.cache.invalidates('allocation')
+    @opencue.cache.invalidates('host')
     def reparentHosts(self, hosts):
         """Moves the given hosts to the allocation
 
@@ -82,6 +86,7 @@ class Allocation(object):
         hosts = [opencue.wrappers.host.Host(host_pb2.Host(id=hostId)) for hostId in hostIds]
         self.reparentHosts(hosts)
 
+    @opencue.cache.invalidates('allocation')
     def setName(self, name):
         """Sets a new name for the allocation.
 
@@ -92,6 +97,7 @@ class Allocation(object):
             facility_pb2.AllocSetNameRequest(allocation=self.data, name=name),
             timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('allocation')
     def setTag(self, tag):
         """Sets a new tag for the allocation.
 
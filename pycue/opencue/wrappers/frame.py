@@ -25,6 +25,7 @@ import time
 
 from opencue import Cuebot
 from opencue.compiled_proto import job_pb2
+import opencue.util
 import opencue.wrappers.depend
 
 
@@ -72,6 +73,33 @@ class Frame(object):
         if self.data.state != job_pb2.FrameState.Value('WAITING'):
             self.stub.Retry(job_pb2.FrameRetryRequest(frame=self.data), timeout=Cuebot.Timeout)
 
+    @staticmethod
+    def eatMany(frames, parallelism=None):
+        """Eats the frames, making the calls in parallel. See opencue.util.batch
+        for the parallelism and the errors raised.
+
+        :type  frames: list<opencue.wrappers.frame.Frame>
+        :param frames: the frames to eat"""
+        opencue.util.batch(lambda frame: frame.eat(), frames, parallelism)
+
+    @staticmethod
+    def killMany(frames, parallelism=None):
+        """Kills the frames, making the calls in parallel. See opencue.util.batch
+        for the parallelism and the errors raised.
+
+        :type  frames: list<opencue.wrappers.frame.Frame>
+        :param frames: the frames to kill"""
+        opencue.util.batch(lambda frame: frame.kill(), frames, parallelism)
+
+    @staticmethod
+    def retryMany(frames, parallelism=None):
+        """Retries the frames, making the calls in parallel. See opencue.util.batch
+        for the parallelism and the errors raised.
+
+        :type  frames: list<opencue.wrappers.frame.Frame>
+        :param frames: the frames to retry"""
+        opencue.util.batch(lambda frame: frame.retry(), frames, parallelism)
+
     def getWhatDependsOnThis(self):
         """Returns a list of dependencies that depend directly on this frame.
 
@@ -28,6 +28,8 @@ import time
 from opencue import Cuebot
 from opencue.compiled_proto import comment_pb2
 from opencue.compiled_proto import host_pb2
+import opencue.cache
+import opencue.util
 import opencue.wrappers.comment
 import opencue.wrappers.proc
 
@@ -64,16 +66,37 @@ class Host(object):
         self.__id = host.id
         self.stub = Cuebot.getStub('host')
 
+    @opencue.cache.invalidates('host')
     def lock(self):
         """Locks the host so that it no longer accepts new frames"""
         self.stub.Lock(host_pb2.HostLockRequest(host=self.data), timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('host')
     def unlock(self):
         """Unlocks the host and cancels any actions that were waiting for all
         running frames to finish.
         """
         self.stub.Unlock(host_pb2.HostUnlockRequest(host=self.data), timeout=Cuebot.Timeout)
 
+    @staticmethod
+    def lockMany(hosts, parallelism=None):
+        """Locks the hosts, making the calls in parallel. See opencue.util.batch
+        for the parallelism and the errors raised.
+
+        :type  hosts: list<opencue.wrappers.host.Host>
+        :param hosts: the hosts to lock"""
+        opencue.util.batch(lambda host: host.lock(), hosts, parallelism)
+
+    @staticmethod
+    def unlockMany(hosts, parallelism=None):
+        """Unlocks the hosts, making the calls in parallel. See opencue.util.batch
+        for the parallelism and the errors raised.
+
+        :type  hosts: list<opencue.wrappers.host.Host>
+        :param hosts: the hosts to unlock"""
+        opencue.util.batch(lambda host: host.unlock(), hosts, parallelism)
+
+    @opencue.cache.invalidates('host')
     def delete(self):
         """Delete the host from the cuebot"""
         self.stub.Delete(host_pb2.HostDeleteRequest(host=self.data), timeout=Cuebot.Timeout)
@@ -99,6 +122,7 @@ class Host(object):
         partitionSeq = response.render_partitions
         return partitionSeq.render_partitions
 
+    @opencue.cache.invalidates('host')
     def rebootWhenIdle(self):
         """Causes the host to no longer accept new frames and
         when the machine is idle it will reboot.
@@ -106,10 +130,12 @@ class Host(object):
         self.stub.RebootWhenIdle(host_pb2.HostRebootWhenIdleRequest(host=self.data),
                                  timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('host')
     def reboot(self):
         """Causes the host to kill all running frames and reboot the machine."""
         self.stub.Reboot(host_pb2.HostRebootRequest(host=self.data), timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('host')
     def addTags(self, tags):
         """Adds tags to a host.
 
@@ -119,6 +145,7 @@ class Host(object):
         self.stub.AddTags(host_pb2.HostAddTagsRequest(host=self.data, tags=tags),
                           timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('host')
     def removeTags(self, tags):
         """Remove tags from this host.
 
@@ -128,6 +155,7 @@ class Host(object):
         self.stub.RemoveTags(host_pb2.HostRemoveTagsRequest(host=self.data, tags=tags),
                              timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('host')
     def renameTag(self, oldTag, newTag):
         """Renames a tag.
 
@@ -140,6 +168,8 @@ class Host(object):
             host_pb2.HostRenameTagRequest(host=self.data, old_tag=oldTag, new_tag=newTag),
             timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('allocation')
+    @opencue.cache.invalidates('host')
     def setAllocation(self, allocation):
         """Sets the host to the given allocation.
 
@@ -150,6 +180,7 @@ class Host(object):
             host_pb2.HostSetAllocationRequest(host=self.data, allocation_id=allocation.id()),
             timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('host')
     def addComment(self, subject, message):
         """Appends a comment to the hosts's comment list.
 
@@ -174,6 +205,7 @@ class Host(object):
         commentSeq = response.comments
         return [opencue.wrappers.comment.Comment(c) for c in commentSeq.comments]
 
+    @opencue.cache.invalidates('host')
     def setHardwareState(self, state):
         """Sets the host's hardware state
 
@@ -183,6 +215,7 @@ class Host(object):
             host_pb2.HostSetHardwareStateRequest(host=self.data, state=state),
             timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('host')
     def setOs(self, osName):
         """Sets the host operating system.
         :type osName: string
@@ -190,6 +223,7 @@ class Host(object):
         self.stub.SetOs(host_pb2.HostSetOsRequest(host=self.data, os=osName),
                         timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('host')
     def setThreadMode(self, mode):
         """Set the thread mode to mode.
 
@@ -29,6 +29,7 @@ from opencue import Cuebot
 from opencue.compiled_proto import comment_pb2
 from opencue.compiled_proto import job_pb2
 import opencue.search
+import opencue.util
 import opencue.wrappers.comment
 import opencue.wrappers.depend
 import opencue.wrappers.frame
@@ -62,6 +63,33 @@ class Job(object):
         """Resumes the job"""
         self.stub.Resume(job_pb2.JobResumeRequest(job=self.data), timeout=Cuebot.Timeout)
 
+    @staticmethod
+    def killMany(jobs, parallelism=None):
+        """Kills the jobs, making the calls in parallel. See opencue.util.batch
+        for the parallelism and the errors raised.
+
+        :type  jobs: list<opencue.wrappers.job.Job>
+        :param jobs: the jobs to kill"""
+        opencue.util.batch(lambda job: job.kill(), jobs, parallelism)
+
+    @staticmethod
+    def pauseMany(jobs, parallelism=None):
+        """Pauses the jobs, making the calls in parallel. See opencue.util.batch
+        for the parallelism and the errors raised.
+
+        :type  jobs: list<opencue.wrappers.job.Job>
+        :param jobs: the jobs to pause"""
+        opencue.util.batch(lambda job: job.pause(), jobs, parallelism)
+
+    @staticmethod
+    def resumeMany(jobs, parallelism=None):
+        """Resumes the jobs, making the calls in parallel. See opencue.util.batch
+        for the parallelism and the errors raised.
+
+        :type  jobs: list<opencue.wrappers.job.Job>
+        :param jobs: the jobs to resume"""
+        opencue.util.batch(lambda job: job.resume(), jobs, parallelism)
+
     def killFrames(self, **request):
         """Kills all frames that match the FrameSearch.
 
@@ -170,6 +198,27 @@ class Job(object):
         frameSeq = response.frames
         return [opencue.wrappers.frame.Frame(frm) for frm in frameSeq.frames]
 
+    def iterFrames(self, **options):
+        """Yields all frames of the job matching the options, fetching them a
+        page at a time instead of stopping at 1000 like getFrames. Takes the
+        options of getFrames, limit sets the page size.
+
+        For example, to go through the frames changed since the last pass::
+
+            thisPass = int(time.time())
+            for frame in job.iterFrames(change_date=lastPass):
+                ...
+            lastPass = thisPass
+
+        :rtype:  generator<opencue.wrappers.frame.Frame>
+        :return: the matching frames"""
+        def getPage(criteria):
+            return self.stub.GetFrames(job_pb2.JobGetFramesRequest(job=self.data, req=criteria),
+                                       timeout=Cuebot.Timeout).frames.frames
+        for page in opencue.search.FrameSearch.iterPages(getPage, **options):
+            for frameData in page:
+                yield opencue.wrappers.frame.Frame(frameData)
+
     def getUpdatedFrames(self, lastCheck, layers=None):
         """Returns a list of updated state information for frames that have
         changed since the last update time as well as the current state of the
@@ -760,6 +809,13 @@ class NestedJob(Job):
         :return: List of frames"""
         return self.asJob().getFrames(**options)
 
+    def iterFrames(self, **options):
+        """Yields all frames of the job matching the options, a page at a time.
+
+        :rtype:  generator<opencue.wrappers.frame.Frame>
+        :return: the matching frames"""
+        return self.asJob().iterFrames(**options)
+
     def getUpdatedFrames(self, lastCheck, layers=None):
         """Returns a list of updated state information for frames that have
         changed since the last update time as well as the current state of the
@@ -23,6 +23,7 @@ import enum
 
 from opencue.compiled_proto import job_pb2
 from opencue.cuebot import Cuebot
+import opencue.cache
 import opencue.search
 import opencue.wrappers.depend
 import opencue.wrappers.frame
@@ -48,38 +49,45 @@ class Layer(object):
         self.data = layer
         self.stub = Cuebot.getStub('layer')
 
+    @opencue.cache.invalidates('layer')
     def kill(self):
         """Kill entire layer"""
         return self.stub.KillFrames(job_pb2.LayerKillFramesRequest(layer=self.data),
                                     timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('layer')
     def eat(self):
         """Eat entire layer"""
         return self.stub.EatFrames(job_pb2.LayerEatFramesRequest(layer=self.data),
                                    timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('layer')
     def retry(self):
         """Retry entire layer"""
         return self.stub.RetryFrames(job_pb2.LayerRetryFramesRequest(layer=self.data),
                                      timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('layer')
     def markdone(self):
         """Drops any dependency that requires this layer or requires any frame
         in the layer"""
         return self.stub.MarkdoneFrames(job_pb2.LayerMarkdoneFramesRequest(layer=self.data),
                                         timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('layer')
     def addLimit(self, limit_id):
         """Add a limit to the current layer."""
         return self.stub.AddLimit(job_pb2.LayerAddLimitRequest(layer=self.data, limit_id=limit_id),
                                   timeout=Cuebot.Timeout)
     
+    @opencue.cache.invalidates('layer')
     def dropLimit(self, limit_id):
         """Remove a limit on the current layer."""
         return self.stub.DropLimit(
             job_pb2.LayerDropLimitRequest(layer=self.data, limit_id=limit_id),
             timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('layer')
     def enableMemoryOptimizer(self, value):
         """Set enableMemoryOptimizer to the value.
 
@@ -99,6 +107,20 @@ class Layer(object):
                                        timeout=Cuebot.Timeout)
         return [opencue.wrappers.frame.Frame(frameData) for frameData in response.frames.frames]
 
+    def iterFrames(self, **options):
+        """Yields all frames of the layer matching the options, fetching them
+        a page at a time instead of stopping at 1000 like getFrames.
+        See opencue.wrappers.job.Job.iterFrames.
+
+        :rtype:  generator<opencue.wrappers.frame.Frame>
+        :return: the matching frames"""
+        def getPage(criteria):
+            return self.stub.GetFrames(job_pb2.LayerGetFramesRequest(layer=self.data, s=criteria),
+                                       timeout=Cuebot.Timeout).frames.frames
+        for page in opencue.search.FrameSearch.iterPages(getPage, **options):
+            for frameData in page:
+                yield opencue.wrappers.frame.Frame(frameData)
+
     def getOutputPaths(self):
         """Return the output paths for this layer.
 
@@ -107,6 +129,7 @@ class Layer(object):
         return self.stub.GetOutputPaths(job_pb2.LayerGetOutputPathsRequest(layer=self.data),
                                         timeout=Cuebot.Timeout).output_paths
 
+    @opencue.cache.invalidates('layer')
     def setTags(self, tags):
         """Sets the tags, TODO: update description of tag structure.
 
@@ -115,6 +138,7 @@ class Layer(object):
         return self.stub.SetTags(job_pb2.LayerSetTagsRequest(layer=self.data, tags=tags),
                                  timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('layer')
     def setMaxCores(self, cores):
         """Sets the maximum number of cores that this layer requires.
 
@@ -124,6 +148,7 @@ class Layer(object):
             job_pb2.LayerSetMaxCoresRequest(layer=self.data, cores=cores/100.0),
             timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('layer')
     def setMinCores(self, cores):
         """Sets the minimum number of cores that this layer requires.
         Use 100 to reserve 1 core.
@@ -134,6 +159,7 @@ class Layer(object):
             job_pb2.LayerSetMinCoresRequest(layer=self.data, cores=cores/100.0),
             timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('layer')
     def setMinGpu(self, gpu):
         """Sets the minimum number of gpu memory that this layer requires.
 
@@ -143,6 +169,7 @@ class Layer(object):
             job_pb2.LayerSetMinGpuRequest(layer=self.data, gpu=gpu),
             timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('layer')
     def setMinMemory(self, memory):
         """Sets the minimum amount of memory that this layer requires. in Kb
 
@@ -152,6 +179,7 @@ class Layer(object):
             job_pb2.LayerSetMinMemoryRequest(layer=self.data, memory=memory),
             timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('layer')
     def setThreadable(self, threadable):
         """Set enableMemoryOptimizer to the value.
 
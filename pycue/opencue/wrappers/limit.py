@@ -22,6 +22,7 @@ Module: limit.py - opencue Library implementation of a limit
 
 from opencue import Cuebot
 from opencue.compiled_proto import limit_pb2
+import opencue.cache
 
 
 class Limit(object):
@@ -32,6 +33,7 @@ class Limit(object):
         self.data = limit
         self.stub = Cuebot.getStub('limit')
 
+    @opencue.cache.invalidates('limit')
     def create(self):
         """Create a new Limit from the current Limit object.
         
@@ -42,6 +44,7 @@ class Limit(object):
             limit_pb2.LimitCreateRequest(name=self.name(), max_value=self.maxValue()),
             timeout=Cuebot.Timeout))
 
+    @opencue.cache.invalidates('limit')
     def delete(self):
         """Delete the limit record"""
         self.stub.Delete(limit_pb2.LimitDeleteRequest(name=self.name()), timeout=Cuebot.Timeout)
@@ -66,6 +69,7 @@ class Limit(object):
         """
         return Limit(self.stub.Get(limit_pb2.LimitGetRequest(id=id), timeout=Cuebot.Timeout).limit)
 
+    @opencue.cache.invalidates('limit')
     def rename(self, newName):
         """Rename the current limit to the provided newName.
         
@@ -76,6 +80,7 @@ class Limit(object):
                          timeout=Cuebot.Timeout)
         self._update()
 
+    @opencue.cache.invalidates('limit')
     def setMaxValue(self, maxValue):
         """Set the max value of an existing limit.
         
@@ -25,6 +25,7 @@ import grpc
 
 from opencue.compiled_proto import service_pb2
 from opencue.cuebot import Cuebot
+import opencue.cache
 
 
 class Service(object):
@@ -34,12 +35,14 @@ class Service(object):
         self.data = service or service_pb2.Service()
         self.stub = Cuebot.getStub('service')
 
+    @opencue.cache.invalidates('service')
     def create(self):
         response = self.stub.CreateService(
             service_pb2.ServiceCreateServiceRequest(data=self.data),
             timeout=Cuebot.Timeout)
         return Service(response.service)
 
+    @opencue.cache.invalidates('service')
     def delete(self):
         return self.stub.Delete(
             service_pb2.ServiceDeleteRequest(service=self.data),
@@ -64,6 +67,7 @@ class Service(object):
             raise e
         return Service(response.service)
 
+    @opencue.cache.invalidates('service')
     def update(self):
         return self.stub.Update(
             service_pb2.ServiceUpdateRequest(service=self.data),
@@ -23,6 +23,7 @@ Module: show.py - opencue Library implementation of a show
 
 from opencue.compiled_proto import show_pb2
 from opencue.cuebot import Cuebot
+import opencue.cache
 import opencue.wrappers.filter
 import opencue.wrappers.group
 import opencue.wrappers.subscription
@@ -64,6 +65,7 @@ class Show(object):
             timeout=Cuebot.Timeout)
         return opencue.wrappers.subscription.Subscription(response.subscription)
 
+    @opencue.cache.invalidates('show')
     def delete(self):
         """Delete this show"""
         self.stub.Delete(show_pb2.ShowDeleteRequest(show=self.data), timeout=Cuebot.Timeout)
@@ -112,6 +114,7 @@ class Show(object):
         filterSeq = response.filters
         return [opencue.wrappers.filter.Filter(filter) for filter in filterSeq.filters]
 
+    @opencue.cache.invalidates('show')
     def setActive(self, value):
         """Set the active state of this show to value.
 
@@ -121,6 +124,7 @@ class Show(object):
         self.stub.SetActive(show_pb2.ShowSetActiveRequest(show=self.data, value=value),
                             timeout=Cuebot.Timeout)
 
+    @opencue.cache.invalidates('show')
     def setDefaultMaxCores(self, maxcores):
         """Sets the default maximum number of cores
         that new jobs are launched with.
@@ -135,6 +139,7 @@ class Show(object):
             timeout=Cuebot.Timeout)
         return response
 
+    @opencue.cache.invalidates('show')
     def setDefaultMinCores(self, mincores):
         """Sets the default minimum number of cores
         all new jobs are launched with.
@@ -207,6 +212,7 @@ class Show(object):
             timeout=Cuebot.Timeout)
         return opencue.wrappers.group.Group(response.group)
 
+    @opencue.cache.invalidates('show')
     def enableBooking(self, value):
         """Enable booking on the show.
 
@@ -221,6 +227,7 @@ class Show(object):
             timeout=Cuebot.Timeout)
         return response
 
+    @opencue.cache.invalidates('show')
     def enableDispatching(self, value):
         """Enable dispatching on the show.
 
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+import asyncio
+import unittest
+
+import grpc
+import grpc.aio
+
+import opencue
+import opencue.aio
+from opencue.compiled_proto import cue_pb2
+from opencue.compiled_proto import cue_pb2_grpc
+from opencue.compiled_proto import job_pb2
+from opencue.compiled_proto import job_pb2_grpc
+
+
+TEST_JOB_NAME = 'pipe-dev.cue-chambers_shell_v6'
+TEST_SHOW_NAME = 'pipe'
+TEST_CONCURRENCY = 200
+
+
+class FakeCueInterface(cue_pb2_grpc.CueInterfaceServicer):
+
+    async def GetSystemStats(self, request, context):
+        return cue_pb2.CueGetSystemStatsResponse()
+
+
+class FakeJobInterface(job_pb2_grpc.JobInterfaceServicer):
+    """Serves one job, GetFrames waits so that calls overlap and has two
+    pages of one frame"""
+
+    def __init__(self):
+        self.inFlight = 0
+        self.maxInFlight = 0
+        self.requests = []
+        self.framePages = []
+
+    async def GetJobs(self, request, context):
+        self.requests.append(request)
+        return job_pb2.JobGetJobsResponse(jobs=job_pb2.JobSeq(
+            jobs=[job_pb2.Job(id='job-id', name=TEST_JOB_NAME, show=TEST_SHOW_NAME)]))
+
+    async def FindJob(self, request, context):
+        if request.name != TEST_JOB_NAME:
+            await context.abort(grpc.StatusCode.NOT_FOUND, 'no job %s' % request.name)
+        return job_pb2.JobFindJobResponse(job=job_pb2.Job(id='job-id', name=request.name))
+
+    async def GetFrames(self, request, context):
+        self.framePages.append(request.req.page)
+        if request.req.page > 2:
+            return job_pb2.JobGetFramesResponse()
+        self.inFlight += 1
+        self.maxInFlight = max(self.maxInFlight, self.inFlight)
+        try:
+            await asyncio.sleep(0.2)
+        finally:
+            self.inFlight -= 1
+        return job_pb2.JobGetFramesResponse(frames=job_pb2.FrameSeq(
+            frames=[job_pb2.Frame(name='0001-render', layer_name='render', number=1,
+                                  state=job_pb2.DEAD)]))
+
+
+class AioTests(unittest.TestCase):
+    """Runs opencue.aio against an in-process fake cuebot"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.jobInterface = FakeJobInterface()
+        self.server = self.runAsync(self.startCuebot())
+        self.addCleanup(lambda: self.runAsync(self.server.stop(None)))
+        self.addCleanup(lambda: self.runAsync(opencue.aio.Cuebot.close()))
+        self.addCleanup(setattr, opencue.aio.Cuebot, 'Hosts', [])
+
+    async def startCuebot(self):
+        server = grpc.aio.server()
+        cue_pb2_grpc.add_CueInterfaceServicer_to_server(FakeCueInterface(), server)
+        job_pb2_grpc.add_JobInterfaceServicer_to_server(self.jobInterface, server)
+        port = server.add_insecure_port('localhost:0')
+        await server.start()
+        await opencue.aio.Cuebot.setHosts('localhost:%d' % port)
+        return server
+
+    def runAsync(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def testGetJobs(self):
+        jobs = self.runAsync(opencue.aio.api.getJobs(show=[TEST_SHOW_NAME]))
+
+        self.assertEqual(1, len(jobs))
+        self.assertIsInstance(jobs[0], opencue.aio.Job)
+        self.assertIsInstance(jobs[0], opencue.wrappers.job.Job)
+        self.assertEqual(TEST_JOB_NAME, jobs[0].name())
+        self.assertEqual([TEST_SHOW_NAME], list(self.jobInterface.requests[0].r.shows))
+
+    def testNotFound(self):
+        with self.assertRaises(opencue.EntityNotFoundException):
+            self.runAsync(opencue.aio.api.findJob('no-such-job'))
+
+    def testConcurrentQueries(self):
+        async def getAllFrames():
+            job = await opencue.aio.api.findJob(TEST_JOB_NAME)
+            return await asyncio.gather(*[job.getFrames() for _ in range(TEST_CONCURRENCY)])
+
+        results = self.runAsync(getAllFrames())
+
+        self.assertEqual(TEST_CONCURRENCY, len(results))
+        for frames in results:
+            self.assertIsInstance(frames[0], opencue.aio.Frame)
+            self.assertEqual('0001-render', frames[0].name())
+        # The calls overlap on one event loop instead of running one by one.
+        self.assertGreater(self.jobInterface.maxInFlight, TEST_CONCURRENCY // 2)
+
+    def testIterFrames(self):
+        async def iterAllFrames():
+            job = await opencue.aio.api.findJob(TEST_JOB_NAME)
+            return [frame async for frame in job.iterFrames(limit=1)]
+
+        frames = self.runAsync(iterAllFrames())
+
+        self.assertEqual(2, len(frames))
+        self.assertIsInstance(frames[0], opencue.aio.Frame)
+        self.assertEqual([1, 2, 3], self.jobInterface.framePages)
+
+    def testDataOnlyWrappers(self):
+        depend = opencue.aio.wrappers.Depend()
+
+        with self.assertRaises(opencue.CueException):
+            depend.satisfy()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -217,6 +217,36 @@ class JobTests(unittest.TestCase):
             job_pb2.JobGetJobRequest(id=arbitraryId), timeout=mock.ANY)
         self.assertEqual(arbitraryId, job.id())
 
+    @mock.patch('opencue.cuebot.Cuebot.getStub')
+    def testGetJobsByIds(self, getStubMock):
+        ids = ['00000000-0000-0000-0000-000000000001', '00000000-0000-0000-0000-000000000002']
+        stubMock = mock.Mock()
+        stubMock.GetJobs.return_value = job_pb2.JobGetJobsResponse(
+            jobs=job_pb2.JobSeq(jobs=[job_pb2.Job(id=ids[1]), job_pb2.Job(id=ids[0])]))
+        getStubMock.return_value = stubMock
+
+        jobs = opencue.api.getJobsByIds(ids)
+
+        stubMock.GetJobs.assert_called_once_with(
+            job_pb2.JobGetJobsRequest(
+                r=job_pb2.JobSearchCriteria(ids=ids, include_finished=True)), timeout=mock.ANY)
+        self.assertEqual(ids, [job.id() for job in jobs])
+
+    @mock.patch('opencue.cuebot.Cuebot.getStub')
+    def testGetJobsByIdsMissing(self, getStubMock):
+        ids = ['00000000-0000-0000-0000-000000000001', '00000000-0000-0000-0000-000000000002']
+        stubMock = mock.Mock()
+        stubMock.GetJobs.return_value = job_pb2.JobGetJobsResponse(
+            jobs=job_pb2.JobSeq(jobs=[job_pb2.Job(id=ids[1])]))
+        getStubMock.return_value = stubMock
+
+        with self.assertRaises(opencue.exception.BatchException) as context:
+            opencue.api.getJobsByIds(ids)
+
+        self.assertIsNone(context.exception.results[0])
+        self.assertEqual(ids[1], context.exception.results[1].id())
+        self.assertIsInstance(context.exception.errors[0], opencue.EntityNotFoundException)
+
     @mock.patch('opencue.cuebot.Cuebot.getStub')
     def testGetJobNames(self, getStubMock):
         stubMock = mock.Mock()
@@ -484,6 +514,21 @@ class HostTests(unittest.TestCase):
         self.assertEqual(1, len(hosts))
         self.assertEqual(TEST_HOST_NAME, hosts[0].name())
 
+    @mock.patch('opencue.cuebot.Cuebot.getStub')
+    def testGetHostsByIds(self, getStubMock):
+        ids = ['00000000-0000-0000-0000-000000000001', '00000000-0000-0000-0000-000000000002']
+        stubMock = mock.Mock()
+        stubMock.GetHosts.return_value = host_pb2.HostGetHostsResponse(
+            hosts=host_pb2.HostSeq(hosts=[host_pb2.Host(id=ids[1]), host_pb2.Host(id=ids[0])]))
+        getStubMock.return_value = stubMock
+
+        hosts = opencue.api.getHostsByIds(ids)
+
+        stubMock.GetHosts.assert_called_once_with(
+            host_pb2.HostGetHostsRequest(r=host_pb2.HostSearchCriteria(ids=ids)),
+            timeout=mock.ANY)
+        self.assertEqual(ids, [host.id() for host in hosts])
+
     @mock.patch('opencue.cuebot.Cuebot.getStub')
     def testFindHost(self, getStubMock):
         stubMock = mock.Mock()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+import mock
+import unittest
+
+import opencue
+from opencue.compiled_proto import show_pb2
+
+
+TEST_SHOW_NAME = 'pipe'
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TtlCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def testExpiry(self):
+        cache = opencue.cache.TtlCache({'show': 10}, clock=self.clock)
+        cache.put('show', 'pipe', 'value')
+
+        self.assertEqual((True, 'value'), cache.get('show', 'pipe'))
+        self.clock.now += 10
+        self.assertEqual((False, None), cache.get('show', 'pipe'))
+        self.assertEqual({'hits': 1, 'misses': 1, 'evictions': 0, 'size': 0},
+                         cache.getStats())
+
+    def testUncachedKind(self):
+        cache = opencue.cache.TtlCache({'show': 10}, clock=self.clock)
+        cache.put('host', 'host1', 'value')
+
+        self.assertEqual((False, None), cache.get('host', 'host1'))
+
+    def testLruEviction(self):
+        cache = opencue.cache.TtlCache({'show': 10}, maxEntries=2, clock=self.clock)
+        cache.put('show', 'a', 1)
+        cache.put('show', 'b', 2)
+        cache.get('show', 'a')
+        cache.put('show', 'c', 3)
+
+        self.assertEqual((True, 1), cache.get('show', 'a'))
+        self.assertEqual((False, None), cache.get('show', 'b'))
+        self.assertEqual((True, 3), cache.get('show', 'c'))
+        self.assertEqual(1, cache.getStats()['evictions'])
+
+    def testInvalidateKind(self):
+        cache = opencue.cache.TtlCache({'show': 10, 'limit': 10}, clock=self.clock)
+        cache.put('show', 'pipe', 1)
+        cache.put('limit', 'maya', 2)
+
+        cache.invalidate('show')
+
+        self.assertEqual((False, None), cache.get('show', 'pipe'))
+        self.assertEqual((True, 2), cache.get('limit', 'maya'))
+
+
+@mock.patch('opencue.cache.TtlCache')
+@mock.patch('opencue.cuebot.Cuebot.getConfig')
+class EnableTests(unittest.TestCase):
+
+    def setUp(self):
+        self.addCleanup(opencue.cache.disable)
+
+    def testDefaultTtls(self, getConfigMock, ttlCacheMock):
+        getConfigMock.return_value = {'cache.ttl': {'host': 0}}
+
+        opencue.cache.enable()
+
+        ttls = dict(opencue.cache.DEFAULT_TTLS, host=0)
+        ttlCacheMock.assert_called_once_with(ttls, opencue.cache.DEFAULT_MAX_ENTRIES)
+
+    def testConfiguredTtlsOverToolTtls(self, getConfigMock, ttlCacheMock):
+        getConfigMock.return_value = {'cache.ttl': {'layer': 5, 'show': 60}}
+
+        opencue.cache.enable(ttls={'layer': 30})
+
+        ttlCacheMock.assert_called_once_with({'layer': 5, 'show': 60},
+                                             opencue.cache.DEFAULT_MAX_ENTRIES)
+
+
+@mock.patch('opencue.cuebot.Cuebot.getStub')
+class CachedApiTests(unittest.TestCase):
+
+    def setUp(self):
+        opencue.cache.enable(ttls={'show': 300})
+        self.addCleanup(opencue.cache.disable)
+
+    def testFindShowCached(self, getStubMock):
+        stubMock = mock.Mock()
+        stubMock.FindShow.return_value = show_pb2.ShowFindShowResponse(
+            show=show_pb2.Show(name=TEST_SHOW_NAME))
+        getStubMock.return_value = stubMock
+
+        first = opencue.api.findShow(TEST_SHOW_NAME)
+        second = opencue.api.findShow(TEST_SHOW_NAME)
+
+        self.assertEqual(1, stubMock.FindShow.call_count)
+        self.assertIs(first, second)
+        self.assertEqual(1, opencue.cache.getStats()['hits'])
+
+    def testGetShowsReturnsCopy(self, getStubMock):
+        stubMock = mock.Mock()
+        stubMock.GetShows.return_value = show_pb2.ShowGetShowsResponse(
+            shows=show_pb2.ShowSeq(shows=[show_pb2.Show(name=TEST_SHOW_NAME)]))
+        getStubMock.return_value = stubMock
+
+        opencue.api.getShows().pop()
+
+        self.assertEqual(1, len(opencue.api.getShows()))
+        self.assertEqual(1, stubMock.GetShows.call_count)
+
+    def testMutationInvalidates(self, getStubMock):
+        stubMock = mock.Mock()
+        stubMock.FindShow.return_value = show_pb2.ShowFindShowResponse(
+            show=show_pb2.Show(name=TEST_SHOW_NAME))
+        stubMock.SetActive.return_value = show_pb2.ShowSetActiveResponse()
+        getStubMock.return_value = stubMock
+
+        show = opencue.api.findShow(TEST_SHOW_NAME)
+        show.setActive(False)
+        opencue.api.findShow(TEST_SHOW_NAME)
+
+        self.assertEqual(2, stubMock.FindShow.call_count)
+
+    def testDisabled(self, getStubMock):
+        opencue.cache.disable()
+        stubMock = mock.Mock()
+        stubMock.FindShow.return_value = show_pb2.ShowFindShowResponse(
+            show=show_pb2.Show(name=TEST_SHOW_NAME))
+        getStubMock.return_value = stubMock
+
+        opencue.api.findShow(TEST_SHOW_NAME)
+        opencue.api.findShow(TEST_SHOW_NAME)
+
+        self.assertEqual(2, stubMock.FindShow.call_count)
+        self.assertIsNone(opencue.cache.getStats())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+from concurrent import futures
+import unittest
+
+import mock
+
+import grpc
+
+from opencue.channelpool import ChannelPool
+from opencue.compiled_proto import cue_pb2
+from opencue.compiled_proto import cue_pb2_grpc
+from opencue.cuebot import Cuebot
+import opencue.cuebot
+
+
+class FakeCueInterface(cue_pb2_grpc.CueInterfaceServicer):
+
+    def __init__(self):
+        self.calls = 0
+
+    def GetSystemStats(self, request, context):
+        self.calls += 1
+        return cue_pb2.CueGetSystemStatsResponse()
+
+
+class ChannelPoolTests(unittest.TestCase):
+    """Runs the pool against in-process fake cuebots"""
+
+    def setUp(self):
+        self.cuebots = [self.startCuebot() for _ in range(2)]
+        self.pool = ChannelPool([target for target, _, _ in self.cuebots],
+                                Cuebot.openChannel, Cuebot.checkChannel)
+        self.addCleanup(self.pool.close)
+
+    def startCuebot(self, port=0):
+        servicer = FakeCueInterface()
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+        cue_pb2_grpc.add_CueInterfaceServicer_to_server(servicer, server)
+        port = server.add_insecure_port('127.0.0.1:%d' % port)
+        server.start()
+        self.addCleanup(server.stop, None)
+        return '127.0.0.1:%d' % port, server, servicer
+
+    def getSystemStats(self):
+        return cue_pb2_grpc.CueInterfaceStub(self.pool).GetSystemStats(
+            cue_pb2.CueGetSystemStatsRequest(), timeout=5)
+
+    def testSpreadsCalls(self):
+        for _ in range(10):
+            self.getSystemStats()
+
+        self.assertEqual([5, 5], [servicer.calls for _, _, servicer in self.cuebots])
+
+    def testFailover(self):
+        self.assertEqual(2, self.pool.checkHealth())
+        deadTarget, deadServer, _ = self.cuebots[0]
+        deadServer.stop(None).wait()
+        servicer = self.cuebots[1][2]
+        calls = servicer.calls
+
+        for _ in range(4):
+            self.getSystemStats()
+
+        self.assertEqual(calls + 4, servicer.calls)
+        self.assertEqual([self.cuebots[1][0]], self.pool.healthyTargets())
+
+        # The health check reconnects once the cuebot is back.
+        self.startCuebot(int(deadTarget.split(':')[1]))
+        self.assertEqual(2, self.pool.checkHealth())
+
+    def testCheckUntilHealthy(self):
+        self.assertTrue(self.pool.checkUntilHealthy())
+        self.assertEqual([1, 0], [servicer.calls for _, _, servicer in self.cuebots])
+
+        self.cuebots[0][1].stop(None).wait()
+
+        self.assertTrue(self.pool.checkUntilHealthy())
+        self.assertEqual(1, self.cuebots[1][2].calls)
+        self.assertEqual([self.cuebots[1][0]], self.pool.healthyTargets())
+
+        self.cuebots[1][1].stop(None).wait()
+
+        self.assertFalse(self.pool.checkUntilHealthy())
+
+    def testAllUnavailable(self):
+        for _, server, _ in self.cuebots:
+            server.stop(None).wait()
+
+        with self.assertRaises(grpc.RpcError) as context:
+            self.getSystemStats()
+        self.assertEqual(grpc.StatusCode.UNAVAILABLE, context.exception.code())
+        self.assertEqual(0, self.pool.checkHealth())
+
+
+@mock.patch('grpc.insecure_channel')
+class OpenChannelTests(unittest.TestCase):
+
+    def getOptions(self, insecureChannelMock):
+        Cuebot.openChannel('cuebot:8443')
+        return dict(insecureChannelMock.call_args[1]['options'])
+
+    def testKeepaliveOffByDefault(self, insecureChannelMock):
+        self.assertNotIn('grpc.keepalive_time_ms', self.getOptions(insecureChannelMock))
+
+    def testKeepalive(self, insecureChannelMock):
+        with mock.patch.dict(opencue.cuebot.config, {'cuebot.keepalive_time_ms': 300000}):
+            options = self.getOptions(insecureChannelMock)
+
+        self.assertEqual(300000, options['grpc.keepalive_time_ms'])
+        self.assertEqual(10000, options['grpc.keepalive_timeout_ms'])
+
+
+if __name__ == '__main__':
+    unittest.main()
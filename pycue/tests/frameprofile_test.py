@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+import array
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+import opencue
+from opencue.compiled_proto import job_pb2
+from opencue.wrappers.frame import Frame
+from opencue.wrappers.job import Job
+
+
+def buildProfile(samples, dropped=0, version=1):
+    """Builds a profile in the layout rqd writes"""
+    data = [opencue.frameprofile.HEADER.pack(
+        opencue.frameprofile.MAGIC, version, len(samples), dropped)]
+    for index, (_, typecode) in enumerate(opencue.frameprofile.COLUMNS[1]):
+        data.append(array.array(typecode, [sample[index] for sample in samples]).tobytes())
+    return b''.join(data)
+
+
+class FrameProfileTests(unittest.TestCase):
+
+    def testParseProfile(self):
+        profile = opencue.frameprofile.parseProfile(buildProfile(
+            [(100.0, 2048, 0.5, 0, 0, 4), (110.0, 4096, 1.5, 8192, 1024, 8)], dropped=3))
+
+        self.assertEqual(2, len(profile))
+        self.assertEqual(3, profile.dropped)
+        self.assertEqual(4096, profile.peakRss())
+        self.assertEqual(10.0, profile.duration())
+        self.assertEqual([2048, 4096], list(profile.column('rss')))
+        self.assertEqual({'time': 110.0, 'rss': 4096, 'pcpu': 1.5, 'read_bytes': 8192,
+                          'write_bytes': 1024, 'threads': 8}, profile.samples()[1])
+
+    def testParseEmptyProfile(self):
+        profile = opencue.frameprofile.parseProfile(buildProfile([]))
+
+        self.assertEqual(0, len(profile))
+        self.assertEqual(0, profile.peakRss())
+        self.assertEqual(0.0, profile.duration())
+
+    def testParseInvalidProfile(self):
+        self.assertRaises(ValueError, opencue.frameprofile.parseProfile, b'RQPF')
+        self.assertRaises(ValueError, opencue.frameprofile.parseProfile,
+                          b'XXXX' + buildProfile([])[4:])
+        self.assertRaises(ValueError, opencue.frameprofile.parseProfile,
+                          buildProfile([], version=99))
+        self.assertRaises(ValueError, opencue.frameprofile.parseProfile,
+                          buildProfile([(100.0, 2048, 0.5, 0, 0, 4)])[:-1])
+
+    @mock.patch('opencue.cuebot.Cuebot.getStub')
+    def testReadProfile(self, getStubMock):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        job = Job(job_pb2.Job(name='pipe-dev.cue-testuser_job', log_dir=directory))
+        frame = Frame(job_pb2.Frame(name='0001-layer'))
+        path = opencue.frameprofile.profilePath(job, frame)
+        with open(path, 'wb') as profileFile:
+            profileFile.write(buildProfile([(100.0, 2048, 0.5, 0, 0, 4)]))
+
+        profile = opencue.frameprofile.readProfile(path)
+
+        self.assertEqual(os.path.join(directory, 'pipe-dev.cue-testuser_job.0001-layer.rqprof'),
+                         path)
+        self.assertEqual(2048, profile.peakRss())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,6 +19,7 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 import mock
+import time
 import unittest
 
 import opencue
@@ -82,5 +83,50 @@ class JobSearchTests(unittest.TestCase):
         self.assertIsNone(opencue.search.raiseIfNotList('user', ['iamnotalist']))
 
 
+class FrameSearchTests(unittest.TestCase):
+
+    def testIterPages(self):
+        requested = []
+
+        def getPage(criteria):
+            requested.append((criteria.page, criteria.limit, criteria.change_date))
+            return [job_pb2.Frame(number=number) for number in
+                    range((criteria.page - 1) * 2, min(criteria.page * 2, 5))]
+
+        pages = list(opencue.search.FrameSearch.iterPages(getPage, limit=2, change_date=100))
+
+        self.assertEqual([[0, 1], [2, 3], [4]],
+                         [[frame.number for frame in page] for page in pages])
+        self.assertEqual([(1, 2, 100), (2, 2, 100), (3, 2, 100)], requested)
+
+    def testIterPagesLimit(self):
+        criteria = []
+
+        def getPage(pageCriteria):
+            criteria.append(pageCriteria)
+            return []
+
+        self.assertEqual([], list(opencue.search.FrameSearch.iterPages(getPage, limit=5000)))
+        self.assertEqual(opencue.search.FrameSearch.maxLimit, criteria[0].limit)
+
+    def testIterPagesPrefetches(self):
+        fetched = []
+
+        def getPage(criteria):
+            fetched.append(criteria.page)
+            return [job_pb2.Frame(number=criteria.page)] * 2
+
+        pages = opencue.search.FrameSearch.iterPages(getPage, limit=2)
+        next(pages)
+        # The second page is requested while the first one is in use.
+        for _ in range(100):
+            if len(fetched) == 2:
+                break
+            time.sleep(0.01)
+        pages.close()
+
+        self.assertEqual([1, 2], fetched)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -21,6 +21,7 @@ from __future__ import absolute_import
 from builtins import range
 import grpc
 import mock
+import time
 import unittest
 import uuid
 
@@ -120,7 +121,7 @@ class ProxyTests(unittest.TestCase):
         stubMock.GetGroup.assert_has_calls([
             mock.call(job_pb2.GroupGetGroupRequest(id=ids[0])),
             mock.call(job_pb2.GroupGetGroupRequest(id=ids[1])),
-        ])
+        ], any_order=True)
         self.assertEqual(ids, [proxy.group.id for proxy in proxyList])
 
     @mock.patch('opencue.cuebot.Cuebot.getStub')
@@ -138,10 +139,59 @@ class ProxyTests(unittest.TestCase):
         stubMock.GetGroup.assert_has_calls([
             mock.call(job_pb2.GroupGetGroupRequest(id=ids[0])),
             mock.call(job_pb2.GroupGetGroupRequest(id=ids[1])),
-        ])
+        ], any_order=True)
         self.assertEqual(ids, [proxy.group.id for proxy in proxyList])
 
 
+@mock.patch('opencue.cuebot.Cuebot.getStub')
+class BatchTests(unittest.TestCase):
+    """batch calls a function on many items at once"""
+
+    def testBatchKeepsOrder(self, getStubMock):
+        del getStubMock
+        inFlight = []
+        maxInFlight = []
+
+        def slowDouble(value):
+            inFlight.append(value)
+            maxInFlight.append(len(inFlight))
+            time.sleep(0.05 if value % 2 else 0.01)
+            inFlight.remove(value)
+            return value * 2
+
+        results = opencue.util.batch(slowDouble, range(20), parallelism=10)
+
+        self.assertEqual([value * 2 for value in range(20)], results)
+        self.assertGreater(max(maxInFlight), 1)
+        self.assertLessEqual(max(maxInFlight), 10)
+
+    def testBatchCollectsErrors(self, getStubMock):
+        del getStubMock
+        error = grpc.RpcError()
+        error.code = lambda: grpc.StatusCode.NOT_FOUND
+        error.details = lambda: 'no such job'
+        calls = []
+
+        def killJob(name):
+            calls.append(name)
+            if name == 'missing':
+                raise error
+            return name
+
+        with self.assertRaises(opencue.exception.BatchException) as context:
+            opencue.util.batch(killJob, ['a', 'missing', 'b'])
+
+        self.assertEqual(['a', None, 'b'], context.exception.results)
+        self.assertEqual([1], list(context.exception.errors))
+        self.assertIsInstance(context.exception.errors[1],
+                              opencue.exception.EntityNotFoundException)
+        self.assertEqual(['a', 'b', 'missing'], sorted(calls))
+
+    def testBatchEmpty(self, getStubMock):
+        self.assertEqual([], opencue.util.batch(lambda item: item, []))
+        getStubMock.assert_not_called()
+
+
 class IdTests(unittest.TestCase):
     """id() takes an entity and returns the unique id"""
 
@@ -48,6 +48,20 @@ class HostTests(unittest.TestCase):
             host_pb2.HostLockRequest(host=host.data),
             timeout=mock.ANY)
 
+    def testLockMany(self, getStubMock):
+        stubMock = mock.Mock()
+        stubMock.Lock.return_value = host_pb2.HostLockResponse()
+        getStubMock.return_value = stubMock
+
+        hosts = [opencue.wrappers.host.Host(host_pb2.Host(name='%s%d' % (TEST_HOST_NAME, i)))
+                 for i in range(3)]
+        opencue.wrappers.host.Host.lockMany(hosts)
+
+        stubMock.Lock.assert_has_calls(
+            [mock.call(host_pb2.HostLockRequest(host=host.data), timeout=mock.ANY)
+             for host in hosts], any_order=True)
+        self.assertEqual(3, stubMock.Lock.call_count)
+
     def testUnlock(self, getStubMock):
         stubMock = mock.Mock()
         stubMock.Unlock.return_value = host_pb2.HostUnlockResponse()
@@ -46,6 +46,20 @@ class JobTests(unittest.TestCase):
         stubMock.Kill.assert_called_with(
             job_pb2.JobKillRequest(job=job.data), timeout=mock.ANY)
 
+    def testKillMany(self, getStubMock):
+        stubMock = mock.Mock()
+        stubMock.Kill.return_value = job_pb2.JobKillResponse()
+        getStubMock.return_value = stubMock
+
+        jobs = [opencue.wrappers.job.Job(job_pb2.Job(name='%s%d' % (TEST_JOB_NAME, i)))
+                for i in range(3)]
+        opencue.wrappers.job.Job.killMany(jobs)
+
+        stubMock.Kill.assert_has_calls(
+            [mock.call(job_pb2.JobKillRequest(job=job.data), timeout=mock.ANY) for job in jobs],
+            any_order=True)
+        self.assertEqual(3, stubMock.Kill.call_count)
+
     def testPause(self, getStubMock):
         stubMock = mock.Mock()
         stubMock.Pause.return_value = job_pb2.JobPauseResponse()
@@ -230,6 +244,25 @@ class JobTests(unittest.TestCase):
         self.assertTrue(frames[0].name(), frameNames[0])
         self.assertTrue(frames[1].name(), frameNames[1])
 
+    def testIterFrames(self, getStubMock):
+        stubMock = mock.Mock()
+        stubMock.GetFrames.side_effect = [
+            job_pb2.JobGetFramesResponse(frames=job_pb2.FrameSeq(
+                frames=[job_pb2.Frame(name='%04d' % number) for number in range(1000)])),
+            job_pb2.JobGetFramesResponse(frames=job_pb2.FrameSeq(
+                frames=[job_pb2.Frame(name='1000')])),
+        ]
+        getStubMock.return_value = stubMock
+
+        job = opencue.wrappers.job.Job(job_pb2.Job(name=TEST_JOB_NAME))
+        frames = list(job.iterFrames(range='1-2000'))
+
+        self.assertEqual(1001, len(frames))
+        self.assertEqual('1000', frames[-1].data.name)
+        criteria = opencue.search.FrameSearch.criteriaFromOptions(range='1-2000', page=2)
+        stubMock.GetFrames.assert_called_with(
+            job_pb2.JobGetFramesRequest(job=job.data, req=criteria), timeout=mock.ANY)
+
     def testGetUpdatedFrames(self, getStubMock):
         stubMock = mock.Mock()
         stubMock.GetUpdatedFrames.return_value = job_pb2.JobGetUpdatedFramesResponse(
@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Measures how fast one rqd accepts frames and how its overhead grows with running frames.
+
+A real RqCore serves LaunchFrame on a local port and reports to a fake cuebot.
+Switching users and permissions is mocked out, so frames run as the current
+user and no root access is needed. For each concurrency level, that many
+LaunchFrame calls are made at once for a short sleep command. While those
+frames run, the rss update cost, status report size and thread count are
+sampled. Usage, from the rqd directory:
+
+    python -m benchmarks.launch --concurrency 1 8 32 64 --json
+
+With --warm, frames are started by warm launchers, see rqd.rqlauncher.
+"""
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+from concurrent import futures
+import argparse
+import getpass
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+import grpc
+import mock
+
+import rqd.compiled_proto.report_pb2
+import rqd.compiled_proto.report_pb2_grpc
+import rqd.compiled_proto.rqd_pb2
+import rqd.compiled_proto.rqd_pb2_grpc
+import rqd.rqconstants
+import rqd.rqcore
+import rqd.rqnetwork
+import rqd.rqutil
+
+
+class FakeCuebot(rqd.compiled_proto.report_pb2_grpc.RqdReportInterfaceServicer):
+    """Counts the reports rqd sends and wakes up waiters on frame completions"""
+
+    def __init__(self):
+        self.lock = threading.Condition()
+        self.calls = {}
+        self.bytes = {}
+        self.completed = 0
+
+    def __record(self, method, request):
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            self.bytes[method] = self.bytes.get(method, 0) + request.ByteSize()
+            if method == 'ReportRunningFrameCompletion':
+                self.completed += 1
+                self.lock.notify_all()
+
+    def ReportRqdStartup(self, request, context):
+        self.__record('ReportRqdStartup', request)
+        return rqd.compiled_proto.report_pb2.RqdReportRqdStartupResponse()
+
+    def ReportRunningFrameCompletion(self, request, context):
+        self.__record('ReportRunningFrameCompletion', request)
+        return rqd.compiled_proto.report_pb2.RqdReportRunningFrameCompletionResponse()
+
+    def ReportStatus(self, request, context):
+        self.__record('ReportStatus', request)
+        return rqd.compiled_proto.report_pb2.RqdReportStatusResponse()
+
+    def waitForCompletions(self, count, timeout):
+        """Waits until count frames have completed, returns False on timeout"""
+        deadline = time.time() + timeout
+        with self.lock:
+            while self.completed < count:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self.lock.wait(remaining)
+        return True
+
+
+def freePort():
+    sock = socket.socket()
+    try:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+    finally:
+        sock.close()
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * pct / 100.0))]
+
+
+class LaunchBenchmark(object):
+    """A RqCore serving LaunchFrame locally, reporting to a FakeCuebot"""
+
+    def __init__(self, maxConcurrency, logDir, warm=False):
+        self.logDir = logDir
+        self.cuebot = FakeCuebot()
+        self.cuebotServer = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+        rqd.compiled_proto.report_pb2_grpc.add_RqdReportInterfaceServicer_to_server(
+            self.cuebot, self.cuebotServer)
+        cuebotPort = self.cuebotServer.add_insecure_port('localhost:0')
+        rqdPort = freePort()
+
+        self.patches = [
+            mock.patch.object(rqd.rqconstants, 'CUEBOT_HOSTNAME', new='localhost'),
+            mock.patch.object(rqd.rqconstants, 'CUEBOT_GRPC_PORT', new=cuebotPort),
+            mock.patch.object(rqd.rqconstants, 'RQD_GRPC_PORT', new=rqdPort),
+            mock.patch.object(rqd.rqconstants, 'RQD_GRPC_RETRY_CONNECTION', new=False),
+            mock.patch.object(rqd.rqconstants, 'RQD_DIRECT_LAUNCH', new=True),
+            mock.patch.object(rqd.rqconstants, 'RQD_WARM_LAUNCHER', new=warm),
+            # Launchers are new interpreters that import rqd from this tree.
+            mock.patch.dict(os.environ, {'PYTHONPATH': os.path.dirname(
+                os.path.dirname(os.path.abspath(rqd.rqcore.__file__)))}),
+            mock.patch.object(rqd.rqconstants, 'RQD_CREATE_USER_IF_NOT_EXISTS', new=False),
+            mock.patch.object(rqd.rqconstants, 'RQD_USE_CGROUPS', new=False),
+            mock.patch.object(rqd.rqconstants, 'RQD_ADMISSION_CONTROL', new=False),
+            mock.patch.object(rqd.rqconstants, 'RQD_SPOOL_PATH', new=''),
+            mock.patch('rqd.rqutil.permissionsHigh'),
+            mock.patch('rqd.rqutil.permissionsLow'),
+            mock.patch('rqd.rqutil.permissionsUser'),
+            # Frames are forked as the current user, which needs no user switch.
+            mock.patch('os.initgroups'),
+            mock.patch('os.setgid'),
+            mock.patch('os.setuid'),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+        self.cuebotServer.start()
+        self.rqCore = rqd.rqcore.RqCore(optNimbyoff=True)
+        self.rqCore.cores.total_cores = maxConcurrency * 100
+        self.rqCore.cores.idle_cores = maxConcurrency * 100
+        self.rqCore.scheduler.start()
+        self.grpcServer = rqd.rqnetwork.GrpcServer(self.rqCore)
+        self.grpcServer.serve()
+        self.channel = grpc.insecure_channel('localhost:%d' % rqdPort)
+        self.stub = rqd.compiled_proto.rqd_pb2_grpc.RqdInterfaceStub(self.channel)
+        self.launched = 0
+
+    def close(self):
+        self.channel.close()
+        self.grpcServer.shutdown()
+        if self.rqCore.launchers is not None:
+            self.rqCore.launchers.close()
+        self.rqCore.scheduler.stop()
+        self.cuebotServer.stop(0)
+        for patch in reversed(self.patches):
+            patch.stop()
+
+    def __launch(self, holdSeconds):
+        self.launched += 1
+        runFrame = rqd.compiled_proto.rqd_pb2.RunFrame(
+            job_id='bench-job-id', job_name='bench-job',
+            frame_id='frame-%06d' % self.launched,
+            frame_name='%04d-bench' % self.launched, layer_id='bench-layer-id',
+            command='sleep %s' % holdSeconds, user_name=getpass.getuser(),
+            log_dir=self.logDir, num_cores=100, ignore_nimby=True)
+        start = time.time()
+        try:
+            self.stub.LaunchFrame(
+                rqd.compiled_proto.rqd_pb2.RqdStaticLaunchFrameRequest(run_frame=runFrame),
+                timeout=30)
+            return time.time() - start, True
+        except grpc.RpcError:
+            return time.time() - start, False
+
+    def measure(self, concurrency, holdSeconds):
+        """Launches concurrency frames at once and samples rqd while they run"""
+        self.rqCore.launchPrep.launchLatency = rqd.rqutil.LatencyTracker()
+        completedBefore = self.cuebot.completed
+        threadsBefore = threading.active_count()
+
+        pool = futures.ThreadPoolExecutor(max_workers=concurrency)
+        start = time.time()
+        results = list(pool.map(lambda _: self.__launch(holdSeconds), range(concurrency)))
+        acceptSeconds = time.time() - start
+        pool.shutdown()
+
+        # Give the frames time to start before sampling.
+        launchLatency = self.rqCore.launchPrep.launchLatency
+        deadline = time.time() + holdSeconds
+        while launchLatency.count < concurrency and time.time() < deadline:
+            time.sleep(0.01)
+
+        frames = dict((frameId, self.rqCore.getFrame(frameId))
+                      for frameId in self.rqCore.getFrameKeys())
+        rssStart = time.time()
+        self.rqCore.machine.rssUpdate(frames)
+        rssUpdateSeconds = time.time() - rssStart
+        reportBytes = self.rqCore.reportStatus().ByteSize()
+        threads = threading.active_count()
+
+        accepted = sum(1 for _, ok in results if ok)
+        completed = self.cuebot.waitForCompletions(completedBefore + accepted,
+                                                   holdSeconds + 60)
+        rpcSeconds = [seconds for seconds, _ in results]
+        launchStats = launchLatency.summary()
+        return {
+            'concurrency': concurrency,
+            'accepted': accepted,
+            'rejected': concurrency - accepted,
+            'all_completed': completed,
+            'launches_per_sec': accepted / acceptSeconds if acceptSeconds else 0.0,
+            'rpc_p50_ms': percentile(rpcSeconds, 50) * 1000,
+            'rpc_p99_ms': percentile(rpcSeconds, 99) * 1000,
+            'launch_p50_ms': launchStats['p50_ms'],
+            'launch_p99_ms': launchStats['p99_ms'],
+            'launch_max_ms': launchStats['max_ms'],
+            'running_frames': len(frames),
+            'rss_update_ms': rssUpdateSeconds * 1000,
+            'report_bytes': reportBytes,
+            'threads': threads,
+            'threads_added': threads - threadsBefore,
+        }
+
+
+def run(concurrencyLevels, holdSeconds, warm=False):
+    logDir = tempfile.mkdtemp(prefix='rqd-bench-logs-')
+    benchmark = LaunchBenchmark(max(concurrencyLevels), logDir, warm)
+    try:
+        results = [benchmark.measure(concurrency, holdSeconds)
+                   for concurrency in concurrencyLevels]
+        reports = {
+            'calls': dict(benchmark.cuebot.calls),
+            'bytes': dict(benchmark.cuebot.bytes),
+        }
+    finally:
+        benchmark.close()
+        shutil.rmtree(logDir)
+    return {'levels': results, 'reports': reports}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--hold', type=float, default=2.0,
+                        help='seconds each frame runs for')
+    parser.add_argument('--warm', action='store_true', help='launch through warm launchers')
+    parser.add_argument('--json', action='store_true', help='print results as json')
+    args = parser.parse_args()
+
+    results = run(args.concurrency, args.hold, args.warm)
+    if args.json:
+        print(json.dumps(results, indent=2, sort_keys=True))
+        return
+    print('%6s %8s %10s %11s %11s %11s %12s %8s' % (
+        'conc', 'accepted', 'launch/s', 'rpc p99', 'launch p50', 'launch p99', 'rss update',
+        'threads'))
+    for result in results['levels']:
+        print('%6d %8d %10.1f %9.2fms %9.2fms %9.2fms %10.2fms %8d' % (
+            result['concurrency'], result['accepted'], result['launches_per_sec'],
+            result['rpc_p99_ms'], result['launch_p50_ms'], result['launch_p99_ms'],
+            result['rss_update_ms'], result['threads']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Measures status report calls and bytes per minute received by a fake cuebot.
+
+A simulated host pings at the usual random interval with a handful of frames
+whose memory drifts slowly and which occasionally finish. Time is simulated,
+so an hour of reporting takes a few seconds. Usage, from the rqd directory:
+
+    python -m benchmarks.reportstream --minutes 60 --frames 16
+"""
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+from concurrent import futures
+import argparse
+import json
+import random
+import threading
+
+import grpc
+import mock
+
+import rqd.compiled_proto.report_pb2
+import rqd.compiled_proto.report_pb2_grpc
+import rqd.rqconstants
+import rqd.rqreport
+
+
+class CountingReportServicer(rqd.compiled_proto.report_pb2_grpc.RqdReportInterfaceServicer):
+    """A fake cuebot that counts the status reports it receives"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.bytes = 0
+
+    def ReportStatus(self, request, context):
+        with self.lock:
+            self.calls += 1
+            self.bytes += request.ByteSize()
+        return rqd.compiled_proto.report_pb2.RqdReportStatusResponse()
+
+
+def simulatedReports(minutes, numFrames, seed):
+    """Yields (time, HostReport) pairs for the given simulated duration"""
+    rand = random.Random(seed)
+    report = rqd.compiled_proto.report_pb2.HostReport(
+        host=rqd.compiled_proto.report_pb2.RenderHost(
+            name='bench-host', total_mem=256 * 1024 * 1024, free_mem=128 * 1024 * 1024,
+            load=400, tags=['rqdv-bench', 'linux'], attributes={'swapout': '0'}),
+        core_info=rqd.compiled_proto.report_pb2.CoreDetail(total_cores=6400, idle_cores=0))
+    nextFrameId = [0]
+
+    def addFrame():
+        nextFrameId[0] += 1
+        report.frames.add(
+            job_name='bench-job', frame_id='frame-%05d' % nextFrameId[0],
+            frame_name='%04d-render' % nextFrameId[0], num_cores=400,
+            rss=8 * 1024 * 1024, max_rss=8 * 1024 * 1024, attributes={'pcpu': '3.9'})
+
+    for _ in range(numFrames):
+        addFrame()
+
+    now = 0
+    while now < minutes * 60:
+        now += rand.randint(rqd.rqconstants.RQD_MIN_PING_INTERVAL_SEC,
+                            rqd.rqconstants.RQD_MAX_PING_INTERVAL_SEC)
+        report.host.free_mem += rand.randint(-4096, 4096)
+        report.host.attributes['swapout'] = str(rand.randint(0, 3))
+        for frame in report.frames:
+            frame.rss += rand.randint(-2048, 8192)
+            frame.max_rss = max(frame.max_rss, frame.rss)
+            frame.attributes['pcpu'] = '%.2f' % rand.uniform(3.5, 4.0)
+        # Roughly one frame finishes every ten minutes.
+        if report.frames and rand.random() < 0.03:
+            del report.frames[0]
+            addFrame()
+        yield now, report
+
+
+def measure(minutes, numFrames, skipUnchanged, seed):
+    servicer = CountingReportServicer()
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    rqd.compiled_proto.report_pb2_grpc.add_RqdReportInterfaceServicer_to_server(servicer, server)
+    port = server.add_insecure_port('localhost:0')
+    server.start()
+    channel = grpc.insecure_channel('localhost:%d' % port)
+    try:
+        with mock.patch.object(rqd.rqconstants, 'RQD_REPORT_SKIP_UNCHANGED', new=skipUnchanged):
+            reportFilter = rqd.rqreport.ReportFilter()
+            stub = rqd.compiled_proto.report_pb2_grpc.RqdReportInterfaceStub(channel)
+            for now, report in simulatedReports(minutes, numFrames, seed):
+                if not skipUnchanged:
+                    # The previous behavior built a new stub for every report.
+                    stub = rqd.compiled_proto.report_pb2_grpc.RqdReportInterfaceStub(channel)
+                if not reportFilter.shouldSend(report, now):
+                    continue
+                stub.ReportStatus(
+                    rqd.compiled_proto.report_pb2.RqdReportStatusRequest(host_report=report))
+                reportFilter.acknowledge(report, now)
+    finally:
+        channel.close()
+        server.stop(0)
+    return {
+        'skip_unchanged': skipUnchanged,
+        'calls_per_minute': servicer.calls / minutes,
+        'bytes_per_minute': servicer.bytes / minutes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--minutes', type=int, default=60)
+    parser.add_argument('--frames', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='print results as json')
+    args = parser.parse_args()
+
+    results = [measure(args.minutes, args.frames, skipUnchanged, args.seed)
+               for skipUnchanged in (False, True)]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print('%16s %14s %14s' % ('skip unchanged', 'calls/min', 'bytes/min'))
+    for result in results:
+        print('%16s %14.2f %14.0f' % (
+            result['skip_unchanged'], result['calls_per_minute'], result['bytes_per_minute']))
+
+
+if __name__ == '__main__':
+    main()
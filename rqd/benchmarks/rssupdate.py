@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Measures the cost of one rss sampling pass against the number of pids on the host.
+
+A fake proc tree is written to a temporary directory so the numbers do not
+depend on what happens to be running. Usage, from the rqd directory:
+
+    python -m benchmarks.rssupdate --pids 1000 5000 20000 --frames 32
+"""
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import rqd.rqproc
+
+
+STAT_FORMAT = ('%d (render) S 1 %d %d 0 -1 4210688 317 0 1 0 31 13 0 0 20 0 1 0 17385159 '
+               '4460544 154 18446744073709551615 4194304 4204692 140725890735264 0 0 0 0 '
+               '16781318 0 0 0 0 17 4 0 0 0 0 0 6303248 6304296 23932928 140725890743234 '
+               '140725890743420 140725890743420 140725890744298 0')
+
+
+def createProcTree(path, numPids, numFrames):
+    """Writes numPids stat files, every 4th pid belonging to one of the frames.
+    Returns the list of frame session ids."""
+    sessions = [1000 + i for i in range(numFrames)]
+    for i in range(numPids):
+        pid = 1000 + i
+        if pid in sessions:
+            session = pid
+        elif i % 4 == 0 and sessions:
+            session = sessions[i % len(sessions)]
+        else:
+            session = 1
+        os.makedirs(os.path.join(path, str(pid)))
+        with open(os.path.join(path, str(pid), 'stat'), 'w') as statFile:
+            statFile.write(STAT_FORMAT % (pid, session, session))
+    return sessions
+
+
+def fullScan(path, sessions):
+    """The previous sampling algorithm: parse every pid then loop over all of
+    them once per frame."""
+    pids = {}
+    for pid in os.listdir(path):
+        if pid.isdigit():
+            with open(os.path.join(path, pid, 'stat'), 'r') as statFile:
+                statFields = statFile.read().split()
+            pids[pid] = {'session': statFields[5], 'rss': statFields[23]}
+    for session in sessions:
+        session = str(session)
+        for data in pids.values():
+            if data['session'] == session:
+                int(data['rss'])
+
+
+def timeIt(func, passes):
+    start = time.time()
+    for _ in range(passes):
+        func()
+    return (time.time() - start) / passes
+
+
+def run(pidCounts, numFrames, passes):
+    results = []
+    for numPids in pidCounts:
+        path = tempfile.mkdtemp(prefix='rqd-proc-')
+        try:
+            sessions = createProcTree(path, numPids, numFrames)
+            index = rqd.rqproc.ProcessIndex(path)
+            start = time.time()
+            index.update(sessions)
+            firstPass = time.time() - start
+            results.append({
+                'pids': numPids,
+                'frames': numFrames,
+                'full_scan_sec': timeIt(lambda: fullScan(path, sessions), passes),
+                'index_first_pass_sec': firstPass,
+                'index_steady_pass_sec': timeIt(lambda: index.update(sessions), passes),
+            })
+        finally:
+            shutil.rmtree(path)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pids', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--frames', type=int, default=32)
+    parser.add_argument('--passes', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='print results as json')
+    args = parser.parse_args()
+
+    results = run(args.pids, args.frames, args.passes)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print('%8s %8s %14s %14s %14s' % ('pids', 'frames', 'full scan', 'index first', 'index steady'))
+    for result in results:
+        print('%8d %8d %13.2fms %13.2fms %13.2fms' % (
+            result['pids'], result['frames'], result['full_scan_sec'] * 1000,
+            result['index_first_pass_sec'] * 1000, result['index_steady_pass_sec'] * 1000))
+
+
+if __name__ == '__main__':
+    main()
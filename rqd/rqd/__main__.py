@@ -56,6 +56,7 @@ import sys
 
 import rqd.rqconstants
 import rqd.rqcore
+import rqd.rqspool
 import rqd.rqutil
 
 
@@ -123,6 +124,15 @@ def main():
         if o in ["--nimbyoff"]:
             optNimbyOff = True
 
+    # Still root, so the facts and spool directories can be created for the daemon user
+    if platform.system() == 'Linux':
+        rqd.rqconstants.FACTS.persist(rqd.rqconstants.RQD_UID, rqd.rqconstants.RQD_GID)
+        if rqd.rqconstants.RQD_SPOOL_PATH:
+            rqd.rqspool.prepareDirectory(rqd.rqconstants.RQD_SPOOL_PATH,
+                                         rqd.rqconstants.RQD_UID, rqd.rqconstants.RQD_GID)
+    else:
+        rqd.rqconstants.FACTS.persist()
+
     rqd.rqutil.permissionsLow()
 
     logging.warning('RQD Starting Up')
@@ -0,0 +1,271 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Per-frame cgroup v2 accounting and containment.
+
+Every frame gets its own cgroup below PATH_CGROUP_ROOT/RQD_CGROUP_NAME. All
+processes forked by the frame stay in that cgroup, even ones that call
+setsid(), so memory and cpu usage can be read from a handful of files instead
+of walking /proc.
+"""
+
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from builtins import object
+from builtins import range
+import errno
+import logging as log
+import os
+import re
+import signal
+import time
+
+import rqd.rqconstants
+
+
+CPU_MAX_PERIOD = 100000
+CGROUP_NAME_RE = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+def _readFile(path):
+    with open(path, 'r') as fp:
+        return fp.read()
+
+
+def _writeFile(path, value):
+    with open(path, 'w') as fp:
+        fp.write(value)
+
+
+def _readKeyedFile(path):
+    """Reads a flat keyed cgroup file like cpu.stat or memory.stat"""
+    values = {}
+    for line in _readFile(path).splitlines():
+        fields = line.split()
+        if len(fields) == 2:
+            values[fields[0]] = int(fields[1])
+    return values
+
+
+def parsePressure(data):
+    """Parses the contents of a pressure stall file, see
+    Documentation/accounting/psi.rst in the kernel sources.
+    @rtype:  dict
+    @return: {'some': {'avg10': float, ..., 'total': int}, 'full': {...}}"""
+    pressure = {}
+    for line in data.splitlines():
+        fields = line.split()
+        if not fields:
+            continue
+        values = {}
+        for field in fields[1:]:
+            key, value = field.split('=')
+            values[key] = int(value) if key == 'total' else float(value)
+        pressure[fields[0]] = values
+    return pressure
+
+
+class FrameCgroup(object):
+    """The cgroup of a single running frame."""
+
+    def __init__(self, path):
+        """
+        @type  path: str
+        @param path: The cgroup directory of the frame
+        """
+        self.path = path
+        self.__lastUsage = None
+        self.__lastTime = None
+
+    def __file(self, name):
+        return os.path.join(self.path, name)
+
+    def openProcs(self):
+        """Opens the cgroup's process list for attachSelf. The kernel checks
+        moves against the credentials of the opener, so a child that already
+        runs as the frame's user can still move itself in with it.
+        @rtype:  int
+        @return: The file descriptor, to be closed by the caller"""
+        return os.open(self.__file('cgroup.procs'), os.O_WRONLY)
+
+    @staticmethod
+    def attachSelf(fd):
+        """Moves the calling process into the cgroup opened with openProcs.
+        Runs in the forked child before exec, so only low level os calls are
+        used."""
+        os.write(fd, b'0')
+
+    def addProcess(self, pid):
+        """Moves the given pid into the cgroup"""
+        _writeFile(self.__file('cgroup.procs'), str(pid))
+
+    def getPids(self):
+        """Returns the pids currently in the cgroup"""
+        try:
+            return [int(pid) for pid in _readFile(self.__file('cgroup.procs')).split()]
+        except (IOError, OSError):
+            return []
+
+    def setMemoryLimit(self, memoryKb):
+        """Sets the hard memory limit, memory.max, of the cgroup
+        @type  memoryKb: int
+        @param memoryKb: The limit in kB"""
+        _writeFile(self.__file('memory.max'), str(int(memoryKb) * 1024))
+
+    def setCpuLimit(self, cpus):
+        """Limits the cgroup to the given number of cpus worth of time per period
+        @type  cpus: float
+        @param cpus: The number of logical cpus, may be fractional"""
+        quota = max(int(cpus * CPU_MAX_PERIOD), 1000)
+        _writeFile(self.__file('cpu.max'), '%d %d' % (quota, CPU_MAX_PERIOD))
+
+    def getMemoryCurrent(self):
+        """Returns memory.current in kB, this includes the page cache"""
+        return int(_readFile(self.__file('memory.current'))) // 1024
+
+    def getMemoryPeak(self):
+        """Returns memory.peak in kB or None if the kernel does not provide it"""
+        try:
+            return int(_readFile(self.__file('memory.peak'))) // 1024
+        except (IOError, OSError):
+            return None
+
+    def getRss(self):
+        """Returns the resident memory of the frame in kB, anonymous memory
+        plus mapped files, which excludes unmapped page cache"""
+        stat = _readKeyedFile(self.__file('memory.stat'))
+        return (stat.get('anon', 0) + stat.get('file_mapped', 0)) // 1024
+
+    def getCpuStat(self):
+        """Returns the values of cpu.stat, times are in microseconds"""
+        return _readKeyedFile(self.__file('cpu.stat'))
+
+    def getMemoryPressure(self):
+        """Returns the parsed memory.pressure of the cgroup"""
+        try:
+            return parsePressure(_readFile(self.__file('memory.pressure')))
+        except (IOError, OSError):
+            return {}
+
+    def getOomKills(self):
+        """Returns the number of processes killed by the OOM killer due to
+        the memory limit of this cgroup"""
+        try:
+            return _readKeyedFile(self.__file('memory.events')).get('oom_kill', 0)
+        except (IOError, OSError):
+            return 0
+
+    def getPcpu(self, now=None):
+        """Returns the percentage of one cpu used since the last call, or
+        since the cgroup was created on the first call."""
+        now = now or time.time()
+        usage = self.getCpuStat().get('usage_usec', 0)
+        if self.__lastUsage is None:
+            self.__lastUsage, self.__lastTime = 0, self.__createTime()
+        elapsed = now - self.__lastTime
+        pcpu = 0.0
+        if elapsed > 0:
+            pcpu = (usage - self.__lastUsage) / (elapsed * 10000.0)
+        self.__lastUsage, self.__lastTime = usage, now
+        return pcpu
+
+    def __createTime(self):
+        try:
+            return os.stat(self.path).st_ctime
+        except OSError:
+            return time.time()
+
+    def killAll(self):
+        """Kills every process remaining in the cgroup"""
+        if os.path.exists(self.__file('cgroup.kill')):
+            _writeFile(self.__file('cgroup.kill'), '1')
+            return
+        for pid in self.getPids():
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+    def remove(self, retries=5):
+        """Kills anything left in the cgroup and removes it"""
+        for attempt in range(retries):
+            if self.getPids():
+                self.killAll()
+            try:
+                os.rmdir(self.path)
+                return True
+            except OSError as e:
+                if e.errno == errno.ENOENT:
+                    return True
+                if e.errno != errno.EBUSY:
+                    log.warning('Unable to remove cgroup %s: %s' % (self.path, e))
+                    return False
+            time.sleep(0.1 * (attempt + 1))
+        log.warning('Unable to remove busy cgroup %s' % self.path)
+        return False
+
+
+class CgroupManager(object):
+    """Creates and removes the cgroups of the frames launched by rqd"""
+
+    def __init__(self, root=None, name=None):
+        """
+        @type  root: str
+        @param root: The cgroup2 mount point, defaults to PATH_CGROUP_ROOT
+        @type  name: str
+        @param name: The parent cgroup of all frames, defaults to RQD_CGROUP_NAME
+        """
+        self.root = root or rqd.rqconstants.PATH_CGROUP_ROOT
+        self.path = os.path.join(self.root, name or rqd.rqconstants.RQD_CGROUP_NAME)
+
+    def isAvailable(self):
+        """Returns True if a cgroup v2 hierarchy with the cpu and memory
+        controllers is mounted at the root"""
+        try:
+            controllers = _readFile(os.path.join(self.root, 'cgroup.controllers')).split()
+        except (IOError, OSError):
+            return False
+        return 'cpu' in controllers and 'memory' in controllers
+
+    def setup(self):
+        """Creates the parent cgroup and delegates the controllers to it"""
+        if not os.path.isdir(self.path):
+            os.mkdir(self.path)
+        for path in (self.root, self.path):
+            try:
+                _writeFile(os.path.join(path, 'cgroup.subtree_control'), '+cpu +memory')
+            except (IOError, OSError) as e:
+                log.warning('Unable to enable cgroup controllers in %s: %s' % (path, e))
+
+    def createFrameCgroup(self, frameId):
+        """Creates the cgroup for the given frame
+        @type  frameId: str
+        @param frameId: The frame's unique Id
+        @rtype:  FrameCgroup
+        @return: The new cgroup"""
+        path = os.path.join(self.path, 'frame-%s' % CGROUP_NAME_RE.sub('_', frameId))
+        try:
+            os.mkdir(path)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+            # Left behind by a previous rqd, it must not contain any processes.
+            FrameCgroup(path).remove()
+            os.mkdir(path)
+        return FrameCgroup(path)
@@ -36,6 +36,8 @@ import traceback
 if platform.system() == 'Linux':
     import pwd
 
+import rqd.rqfacts
+
 # NOTE: Some of these values can be overridden by CONFIG_FILE; see below.
 
 VERSION = 'dev'
@@ -51,24 +53,61 @@ DEFAULT_FACILITY = 'cloud'
 # GRPC VALUES
 RQD_GRPC_MAX_WORKERS = 10
 RQD_GRPC_PORT = 8444
+RQD_METRICS_PORT = 0  # Port metrics are served on in the Prometheus text format, 0 to disable
+RQD_METRICS_BIND = '0.0.0.0'  # Address the metrics endpoint listens on
 RQD_GRPC_SLEEP_SEC = 60 * 60 * 24
 RQD_GRPC_CONNECTION_ATTEMPT_SLEEP_SEC = 15
 RQD_GRPC_RETRY_CONNECTION = True
 CUEBOT_GRPC_PORT = 8443
+# The cuebot's grpc server rejects keepalive pings sent more often than every
+# 5 minutes, and pings without calls in flight, by default.
+RQD_GRPC_KEEPALIVE_TIME_MS = 5 * 60 * 1000
+RQD_GRPC_KEEPALIVE_TIMEOUT_MS = 20 * 1000
+RQD_GRPC_RECONNECT_BACKOFF_INITIAL_SEC = 1
+RQD_GRPC_RECONNECT_BACKOFF_MAX_SEC = 60
 
 # RQD behavior:
 RSS_UPDATE_INTERVAL = 10
+RSS_FULL_RESCAN_INTERVAL = 30  # every Nth rss update re-reads the stat file of every pid
 RQD_MIN_PING_INTERVAL_SEC = 5
 RQD_MAX_PING_INTERVAL_SEC = 30
+RQD_SCHEDULER_WORKERS = 4  # threads for blocking work handed off by the scheduler, e.g. frame completion
+RQD_REPORT_COALESCE_SEC = 1  # frame completions within this window share one expedited status report
+RQD_REPORT_SKIP_UNCHANGED = False  # Do not send status reports that match the last acknowledged one
+RQD_REPORT_HEARTBEAT_SEC = 60  # Longest time between status reports when skipping unchanged ones
+RQD_REPORT_MEMORY_QUANTUM_KB = 65536  # Memory changes smaller than this do not count as a change
+RQD_HOST_STATS_MIN_INTERVAL_SEC = 1  # meminfo and statvfs are read at most this often
+RQD_SPOOL_MAX_BYTES = 64 * 1024 * 1024  # The completion report spool is compacted past this size
+RQD_SPOOL_MAX_REPORTS = 10000  # The oldest undelivered completion reports are dropped past this
+RQD_SPOOL_REPLAY_BATCH = 50  # Undelivered completion reports sent concurrently per batch
+RQD_SPOOL_RETRY_SEC = 10  # Wait before replaying the spool again while the cuebot is unreachable
+RQD_SPOOL_MAX_ATTEMPTS = 10  # Completion reports failing for other reasons are dropped after this
 MAX_LOG_FILES = 15
+RQD_LOG_COMPRESS = ''  # 'gzip' or 'zstd' compresses rotated frame logs in the background
+RQD_LOG_PIPE = False  # Frame output goes through rqd and is written to the rqlog in batches
+RQD_LOG_BUFFER_BYTES = 64 * 1024  # Frame output is written once this much is buffered
+RQD_LOG_FLUSH_SEC = 2  # or at least this often, so the log can be followed
+RQD_LOG_TIMESTAMP_LINES = False  # Prefix each line of frame output with the time rqd read it
+RQD_LOG_MAX_BYTES = 0  # Frame output past this size is dropped, 0 for no limit
+RQD_LOG_DRAIN_SEC = 10  # Wait for the frame's output to end after it exits
 CORE_VALUE = 100
 LAUNCH_FRAME_USER_GID = 20
 RQD_RETRY_STARTUP_CONNECT_DELAY = 30
 RQD_RETRY_CRITICAL_REPORT_DELAY = 30
 RQD_USE_IP_AS_HOSTNAME = True
 RQD_CREATE_USER_IF_NOT_EXISTS = True
+RQD_LAUNCH_PREP_WORKERS = 8  # Frame launches checking log directories and users at once
+RQD_LAUNCH_CACHE_SEC = 300  # Log directory and user checks are reused for this long
+RQD_DIRECT_LAUNCH = False  # Fork frames as their user instead of through nice, time, taskset and su
+DESKTOP_NICENESS = 10  # Niceness of frames on desktops, as set by /bin/nice
+RQD_WARM_LAUNCHER = False  # Start frames from a long running launcher per user, as RQD_DIRECT_LAUNCH
+RQD_WARM_LAUNCHER_USERS = 8  # Launchers kept for idle users, the least recently used exit first
+RQD_WARM_LAUNCHER_IDLE_SEC = 600  # Launchers without running frames exit after this long
 
 KILL_SIGNAL = 9
+RQD_KILL_TERM_SIGNAL = 15  # Sent first when RQD_KILL_GRACE_SEC is set
+RQD_KILL_GRACE_SEC = 0  # Seconds killed frames get to exit before KILL_SIGNAL, 0 to kill right away
+RQD_KILL_WAIT_SEC = 1  # Seconds killAllFrame waits for frames to exit before signalling the rest again
 if platform.system() == 'Linux':
     RQD_UID = pwd.getpwnam("daemon")[2]
     RQD_GID = pwd.getpwnam("daemon")[3]
@@ -79,14 +118,50 @@ else:
 # ptree reporting is not actually used, and could be slow
 ENABLE_PTREE = False
 
+# Report the storage, network and NFS io of frames from /proc/<pid>/io in their attributes
+RQD_IO_ACCOUNTING = True
+
+# Local copies of frame inputs shared by the frames of a job, see rqstaging.py
+RQD_STAGING = False
+RQD_STAGING_PATH = ''  # Defaults to rqd-staging in the mcp temp directory
+RQD_STAGING_MIN_FREE_MB = 20480  # Copies are evicted while the filesystem has less free space
+RQD_STAGING_MAX_MB = 0  # Copies are evicted while they take more space, 0 for no limit
+RQD_STAGING_SCAN_SEC = 60  # Seconds between eviction passes
+
+# Keep a time series of each frame's resources and write it next to its rqlog, see rqprofile.py
+RQD_FRAME_PROFILE = False
+RQD_FRAME_PROFILE_SAMPLES = 4096  # Samples kept per frame, the oldest are dropped once full
+
+# Run each frame in its own cgroup v2 group, see rqcgroup.py
+RQD_USE_CGROUPS = False
+RQD_CGROUP_NAME = 'rqd'
+RQD_CGROUP_ENFORCE_MEMORY = False   # Set memory.max to the frame's CUE_MEMORY reservation
+RQD_CGROUP_ENFORCE_CORES = False    # Set cpu.max to the frame's reserved cores
+
 # Nimby behavior:
 CHECK_INTERVAL_LOCKED = 60  # = seconds to wait before checking if the user has become idle
 MINIMUM_IDLE = 900          # seconds of idle time required before nimby unlocks
+CHECK_INTERVAL_UNLOCKED = 5 # seconds between memory checks while nimby is unlocked
+NIMBY_RESCAN_INTERVAL = 60  # seconds between scans for new input devices where inotify is missing
 MINIMUM_MEM = 524288        # If available memory drops below this amount, lock nimby (need to take into account cache)
 MINIMUM_SWAP = 1048576
 MAXIMUM_LOAD = 75           # If (machine load * 100 / cores) goes over this amount, don't unlock nimby
                             # 1.5 would mean a max load of 1.5 per core
 
+# Host health, see rqhealth.py. Pressure limits are the percent of time
+# stalled over the last 10 seconds from /proc/pressure, 0 to ignore.
+RQD_HEALTH_SAMPLE_SEC = 5         # seconds between samples of /proc/pressure, meminfo and vmstat
+RQD_HEALTH_WINDOW_SEC = 60        # seconds of samples kept for averages and rates
+RQD_ADMISSION_CONTROL = False     # Refuse frames while the host is under pressure
+RQD_ADMIT_MAX_CPU_PRESSURE = 0
+RQD_ADMIT_MAX_MEMORY_PRESSURE = 10.0
+RQD_ADMIT_MAX_IO_PRESSURE = 0
+RQD_ADMIT_MIN_HEADROOM_KB = 524288  # MemAvailable that must remain after the frame's CUE_MEMORY
+RQD_OOM_GUARD = False             # Kill the largest, newest frame before the OOM killer does
+RQD_OOM_GUARD_MEMORY_PRESSURE = 40.0
+RQD_OOM_GUARD_MIN_AVAILABLE_KB = 262144
+RQD_OOM_GUARD_GRACE_SEC = 30      # seconds between two frames killed by the guard
+
 EXITSTATUS_FOR_FAILED_LAUNCH = 256
 EXITSTATUS_FOR_NIMBY_KILL = 286
 
@@ -96,14 +171,24 @@ PATH_INIT_TARGET = '/lib/systemd/system/default.target' # rhel7
 PATH_LOADAVG = "/proc/loadavg"
 PATH_STAT = "/proc/stat"
 PATH_MEMINFO = "/proc/meminfo"
+PATH_PROC = "/proc"
+PATH_CGROUP_ROOT = "/sys/fs/cgroup"
+PATH_NUMA_NODES = "/sys/devices/system/node"
+PATH_INPUT_DEVICES = "/dev/input"
+PATH_PRESSURE = "/proc/pressure"
+PATH_VMSTAT = "/proc/vmstat"
 
 if platform.system() == 'Linux':
     SYS_HERTZ = os.sysconf('SC_CLK_TCK')
 
 if platform.system() == 'Windows':
     CONFIG_FILE = os.path.expandvars('$LOCALAPPDATA/OpenCue/rqd.conf')
+    RQD_SPOOL_PATH = os.path.expandvars('$LOCALAPPDATA/OpenCue/rqd-completion.spool')
+    RQD_FACTS_PATH = os.path.expandvars('$LOCALAPPDATA/OpenCue/rqd-facts.json')
 else:
     CONFIG_FILE = '/etc/opencue/rqd.conf'
+    RQD_SPOOL_PATH = '/var/lib/rqd/completion.spool'
+    RQD_FACTS_PATH = '/var/lib/rqd/facts.json'
 
 if '-c' in sys.argv:
     CONFIG_FILE = sys.argv[sys.argv.index('-c') + 1]
@@ -117,30 +202,65 @@ ALLOW_GPU = False
 ALLOW_PLAYBLAST = False
 LOAD_MODIFIER = 0 # amount to add/subtract from load
 
-if subprocess.getoutput('/bin/su --help').find('session-command') != -1:
-    SU_ARGUEMENT = '--session-command'
-else:
-    SU_ARGUEMENT = '-c'
-
-SP_OS = FACILITY = ''
-proc = None
-# Try to read facility and os from studio environment
-if os.path.isfile('/usr/local/stdenv/.cshrc'):
-    proc = subprocess.Popen(
-        "csh -c 'unsetenv SP_PATH ; setenv CONSOLE 1 ; setenv HOME / ;"
-        " source /usr/local/stdenv/.cshrc ; echo $SP_OS $FACILITY'",
-        shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-elif os.path.isfile('/etc/csh.cshrc'):
-    # For maa on centos
-    proc = subprocess.Popen("csh -c 'source /etc/csh.cshrc ; echo $SP_OS $FACILITY'",
-                            shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-# If we have a popen process and it has successfully been run,
-# get os and facility from result.
-if proc:
-    out, err = proc.communicate()
-    if proc.returncode == 0:
-        SP_OS, FACILITY = out.split()[-2:]
+SU_PATH = '/bin/su'
+STDENV_CSHRC = '/usr/local/stdenv/.cshrc'
+SYSTEM_CSHRC = '/etc/csh.cshrc'
+
+
+def __probeSuArgument():
+    """Returns the su option that runs a command without a new session"""
+    if subprocess.getoutput('%s --help' % SU_PATH).find('session-command') != -1:
+        return '--session-command'
+    return '-c'
+
+
+def __probeStudioEnvironment():
+    """Returns [SP_OS, FACILITY] read from the studio csh environment"""
+    proc = None
+    # Try to read facility and os from studio environment
+    if os.path.isfile(STDENV_CSHRC):
+        proc = subprocess.Popen(
+            "csh -c 'unsetenv SP_PATH ; setenv CONSOLE 1 ; setenv HOME / ;"
+            " source %s ; echo $SP_OS $FACILITY'" % STDENV_CSHRC,
+            shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    elif os.path.isfile(SYSTEM_CSHRC):
+        # For maa on centos
+        proc = subprocess.Popen("csh -c 'source %s ; echo $SP_OS $FACILITY'" % SYSTEM_CSHRC,
+                                shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    # If we have a popen process and it has successfully been run,
+    # get os and facility from result.
+    if proc:
+        out, err = proc.communicate()
+        if proc.returncode == 0:
+            return [value.decode() if isinstance(value, bytes) else value
+                    for value in out.split()[-2:]]
+    return ['', '']
+
+
+def __configuredFactsPath(default):
+    """Returns RQD_FACTS_PATH from CONFIG_FILE, which is needed before the
+    rest of the config is read"""
+    try:
+        if os.path.isfile(CONFIG_FILE):
+            import configparser
+            config = configparser.RawConfigParser()
+            config.read(CONFIG_FILE)
+            if config.has_option("Override", "RQD_FACTS_PATH"):
+                return config.get("Override", "RQD_FACTS_PATH")
+    except Exception as e:
+        logging.warning("Failed to read RQD_FACTS_PATH from config file %s due to %s"
+                        % (CONFIG_FILE, e))
+    return default
+
+
+# The probes are slow, their results are kept until the next boot, see rqfacts.py
+# They are only written to RQD_FACTS_PATH once rqd starts, see __main__.py
+RQD_FACTS_PATH = __configuredFactsPath(RQD_FACTS_PATH)
+FACTS = rqd.rqfacts.FactsCache(RQD_FACTS_PATH)
+SU_ARGUEMENT = FACTS.get('su_argument', __probeSuArgument, dependsOn=(SU_PATH,))
+SP_OS, FACILITY = FACTS.get('studio_environment', __probeStudioEnvironment,
+                            dependsOn=(STDENV_CSHRC, SYSTEM_CSHRC))
 
 if not 3 <= len(SP_OS) <= 10 or not re.match('^[A-Za-z0-9]*$', SP_OS):
     if SP_OS:
@@ -186,6 +306,60 @@ try:
             DEFAULT_FACILITY = config.get(__section, "DEFAULT_FACILITY")
         if config.has_option(__section, "LAUNCH_FRAME_USER_GID"):
             LAUNCH_FRAME_USER_GID = config.getint(__section, "LAUNCH_FRAME_USER_GID")
+        if config.has_option(__section, "RQD_USE_CGROUPS"):
+            RQD_USE_CGROUPS = config.getboolean(__section, "RQD_USE_CGROUPS")
+        if config.has_option(__section, "RQD_CGROUP_ENFORCE_MEMORY"):
+            RQD_CGROUP_ENFORCE_MEMORY = config.getboolean(__section, "RQD_CGROUP_ENFORCE_MEMORY")
+        if config.has_option(__section, "RQD_CGROUP_ENFORCE_CORES"):
+            RQD_CGROUP_ENFORCE_CORES = config.getboolean(__section, "RQD_CGROUP_ENFORCE_CORES")
+        if config.has_option(__section, "RQD_DIRECT_LAUNCH"):
+            RQD_DIRECT_LAUNCH = config.getboolean(__section, "RQD_DIRECT_LAUNCH")
+        if config.has_option(__section, "RQD_WARM_LAUNCHER"):
+            RQD_WARM_LAUNCHER = config.getboolean(__section, "RQD_WARM_LAUNCHER")
+        if config.has_option(__section, "RQD_WARM_LAUNCHER_USERS"):
+            RQD_WARM_LAUNCHER_USERS = config.getint(__section, "RQD_WARM_LAUNCHER_USERS")
+        if config.has_option(__section, "RQD_WARM_LAUNCHER_IDLE_SEC"):
+            RQD_WARM_LAUNCHER_IDLE_SEC = config.getint(__section, "RQD_WARM_LAUNCHER_IDLE_SEC")
+        if config.has_option(__section, "RQD_ADMISSION_CONTROL"):
+            RQD_ADMISSION_CONTROL = config.getboolean(__section, "RQD_ADMISSION_CONTROL")
+        if config.has_option(__section, "RQD_ADMIT_MAX_MEMORY_PRESSURE"):
+            RQD_ADMIT_MAX_MEMORY_PRESSURE = config.getfloat(
+                __section, "RQD_ADMIT_MAX_MEMORY_PRESSURE")
+        if config.has_option(__section, "RQD_OOM_GUARD"):
+            RQD_OOM_GUARD = config.getboolean(__section, "RQD_OOM_GUARD")
+        if config.has_option(__section, "RQD_KILL_GRACE_SEC"):
+            RQD_KILL_GRACE_SEC = config.getfloat(__section, "RQD_KILL_GRACE_SEC")
+        if config.has_option(__section, "RQD_METRICS_PORT"):
+            RQD_METRICS_PORT = config.getint(__section, "RQD_METRICS_PORT")
+        if config.has_option(__section, "RQD_METRICS_BIND"):
+            RQD_METRICS_BIND = config.get(__section, "RQD_METRICS_BIND")
+        if config.has_option(__section, "RQD_IO_ACCOUNTING"):
+            RQD_IO_ACCOUNTING = config.getboolean(__section, "RQD_IO_ACCOUNTING")
+        if config.has_option(__section, "RQD_STAGING"):
+            RQD_STAGING = config.getboolean(__section, "RQD_STAGING")
+        if config.has_option(__section, "RQD_STAGING_PATH"):
+            RQD_STAGING_PATH = config.get(__section, "RQD_STAGING_PATH")
+        if config.has_option(__section, "RQD_STAGING_MIN_FREE_MB"):
+            RQD_STAGING_MIN_FREE_MB = config.getint(__section, "RQD_STAGING_MIN_FREE_MB")
+        if config.has_option(__section, "RQD_STAGING_MAX_MB"):
+            RQD_STAGING_MAX_MB = config.getint(__section, "RQD_STAGING_MAX_MB")
+        if config.has_option(__section, "RQD_FRAME_PROFILE"):
+            RQD_FRAME_PROFILE = config.getboolean(__section, "RQD_FRAME_PROFILE")
+        if config.has_option(__section, "RQD_FRAME_PROFILE_SAMPLES"):
+            RQD_FRAME_PROFILE_SAMPLES = config.getint(__section, "RQD_FRAME_PROFILE_SAMPLES")
+        if config.has_option(__section, "RQD_LOG_PIPE"):
+            RQD_LOG_PIPE = config.getboolean(__section, "RQD_LOG_PIPE")
+        if config.has_option(__section, "RQD_LOG_TIMESTAMP_LINES"):
+            RQD_LOG_TIMESTAMP_LINES = config.getboolean(__section, "RQD_LOG_TIMESTAMP_LINES")
+        if config.has_option(__section, "RQD_LOG_MAX_BYTES"):
+            RQD_LOG_MAX_BYTES = config.getint(__section, "RQD_LOG_MAX_BYTES")
+        if config.has_option(__section, "RQD_LOG_COMPRESS"):
+            RQD_LOG_COMPRESS = config.get(__section, "RQD_LOG_COMPRESS")
+        if config.has_option(__section, "RQD_SPOOL_PATH"):
+            RQD_SPOOL_PATH = config.get(__section, "RQD_SPOOL_PATH")
+        if config.has_option(__section, "RQD_REPORT_SKIP_UNCHANGED"):
+            RQD_REPORT_SKIP_UNCHANGED = config.getboolean(__section, "RQD_REPORT_SKIP_UNCHANGED")
+        if config.has_option(__section, "RQD_REPORT_HEARTBEAT_SEC"):
+            RQD_REPORT_HEARTBEAT_SEC = config.getint(__section, "RQD_REPORT_HEARTBEAT_SEC")
 except Exception as e:
     logging.warning("Failed to read values from config file %s due to %s at %s" % (CONFIG_FILE, e, traceback.extract_tb(sys.exc_info()[2])))
-
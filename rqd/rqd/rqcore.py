@@ -36,13 +36,27 @@ import threading
 import time
 import traceback
 
+if platform.system() == 'Linux':
+    import pwd
+
 import rqd.compiled_proto.host_pb2
 import rqd.compiled_proto.report_pb2
+import rqd.rqcgroup
 import rqd.rqconstants
 import rqd.rqexceptions
+import rqd.rqkill
+import rqd.rqlaunch
+import rqd.rqlauncher
+import rqd.rqlogging
 import rqd.rqmachine
+import rqd.rqmetrics
 import rqd.rqnetwork
 import rqd.rqnimby
+import rqd.rqprofile
+import rqd.rqscheduler
+import rqd.rqspool
+import rqd.rqstaging
+import rqd.rqtopology
 import rqd.rqutil
 
 
@@ -68,6 +82,20 @@ class FrameAttendantThread(threading.Thread):
         self.frameInfo = frameInfo
         self._tempLocations = []
         self.rqlog = None
+        self.stagingDir = None
+        self.requestTime = time.time()
+        self.__tempStatFile = None
+        self.__launchTime = 0
+        self.__logWriter = None
+        self.__waitingForChild = False
+        self.__finished = threading.Event()
+
+    def isAlive(self):
+        """Returns True until the frame has finished and been cleaned up. On
+           linux the thread itself exits once the frame is launched and the
+           frame's exit is handled by the scheduler.
+        @rtype:  bool"""
+        return not self.__finished.is_set()
 
     def __createEnvVariables(self):
         """Define the environmental variables for the frame"""
@@ -93,6 +121,8 @@ class FrameAttendantThread(threading.Thread):
         self.frameEnv["CUE3"] = "True"
         self.frameEnv["CUE_GPU_MEMORY"] = str(self.rqCore.machine.getGpuMemory())
         self.frameEnv["SP_NOMYCSHRC"] = "1"
+        if self.stagingDir:
+            self.frameEnv[rqd.rqstaging.ENV_STAGING_DIR] = self.stagingDir
 
         for key in self.runFrame.environment:
             self.frameEnv[key] = self.runFrame.environment[key]
@@ -214,7 +244,24 @@ class FrameAttendantThread(threading.Thread):
         if self.rqCore.nimby.locked and not self.runFrame.ignore_nimby:
             report.exit_status = rqd.rqconstants.EXITSTATUS_FOR_NIMBY_KILL
 
-        self.rqCore.network.reportRunningFrameCompletion(report)
+        self.rqCore.sendFrameCompleteReport(report)
+
+    def __writeProfile(self):
+        """Writes the frame's resource samples next to its rqlog, as the
+        user the log was written as"""
+        profile = self.frameInfo.profile
+        if profile is None or not len(profile):
+            return
+        path = rqd.rqprofile.getProfilePath(self.runFrame.log_dir_file)
+        if self.runFrame.HasField("uid"):
+            rqd.rqutil.permissionsUser(self.runFrame.uid, self.runFrame.gid)
+        try:
+            profile.write(path)
+        except (IOError, OSError) as e:
+            log.warning("Unable to write resource profile %s: %s" % (path, e))
+        finally:
+            if self.runFrame.HasField("uid"):
+                rqd.rqutil.permissionsLow()
 
     def __cleanup(self):
         """Cleans up temporary files"""
@@ -237,6 +284,45 @@ class FrameAttendantThread(threading.Thread):
             log.warning("Unable to close file: %s due to %s at %s" % (
                 self.runFrame.log_file, e, traceback.extract_tb(sys.exc_info()[2])))
 
+    def __createCgroup(self):
+        """Creates the frame's cgroup and applies the configured limits.
+        Must be called with high permissions.
+        @rtype:  rqd.rqcgroup.FrameCgroup
+        @return: The new cgroup or None if it could not be created"""
+        runFrame = self.runFrame
+        try:
+            cgroup = self.rqCore.cgroups.createFrameCgroup(runFrame.frame_id)
+            if rqd.rqconstants.RQD_CGROUP_ENFORCE_MEMORY and 'CUE_MEMORY' in runFrame.environment:
+                cgroup.setMemoryLimit(int(runFrame.environment['CUE_MEMORY']))
+            if rqd.rqconstants.RQD_CGROUP_ENFORCE_CORES:
+                if 'CPU_LIST' in runFrame.attributes:
+                    cgroup.setCpuLimit(len(runFrame.attributes['CPU_LIST'].split(',')))
+                else:
+                    cgroup.setCpuLimit(runFrame.num_cores / 100.0)
+            return cgroup
+        except Exception as e:
+            log.warning("Unable to create cgroup for frame %s, using /proc accounting: %s" % (
+                runFrame.frame_id, e))
+            return None
+
+    def __removeCgroup(self):
+        """Records any cgroup OOM kill and removes the frame's cgroup,
+        killing processes the frame left behind"""
+        cgroup = self.frameInfo.cgroup
+        if cgroup is None:
+            return
+        self.frameInfo.cgroup = None
+        rqd.rqutil.permissionsHigh()
+        try:
+            if cgroup.getOomKills() and not self.frameInfo.killMessage:
+                self.frameInfo.killMessage = "OOM killed, exceeded memory limit of %s kB" % (
+                    self.runFrame.environment.get('CUE_MEMORY'))
+            cgroup.remove()
+        except Exception as e:
+            log.warning("Unable to remove cgroup %s: %s" % (cgroup.path, e))
+        finally:
+            rqd.rqutil.permissionsLow()
+
     def runLinux(self):
         """The steps required to handle a frame under linux"""
         frameInfo = self.frameInfo
@@ -245,68 +331,242 @@ class FrameAttendantThread(threading.Thread):
         self.__createEnvVariables()
         self.__writeHeader()
         if rqd.rqconstants.RQD_CREATE_USER_IF_NOT_EXISTS:
+            self.rqCore.launchPrep.prepareUser(runFrame.user_name)
+
+        launchers = self.rqCore.launchers
+        tempStatFile = None
+        if rqd.rqconstants.RQD_DIRECT_LAUNCH or launchers is not None:
+            # The frame is forked as its user, see __childSetup and rqd.rqlauncher
+            user = pwd.getpwnam(runFrame.user_name)
+            tempCommand = [user.pw_shell or '/bin/sh', '-c', runFrame.command]
+        else:
+            tempStatFile = "%srqd-stat-%s-%s" % (self.rqCore.machine.getTempPath(),
+                                                 frameInfo.frameId,
+                                                 time.time())
+            self._tempLocations.append(tempStatFile)
+            tempCommand = []
+            if self.rqCore.machine.isDesktop():
+                tempCommand += ["/bin/nice"]
+            tempCommand += ["/usr/bin/time", "-p", "-o", tempStatFile]
+
+            if 'CPU_LIST' in runFrame.attributes:
+                tempCommand += ['taskset', '-c', runFrame.attributes['CPU_LIST']]
+
+        # A warm launch only needs root to start the user's launcher, which
+        # the pool does itself, so the lock is not held while waiting on it.
+        if launchers is None:
             rqd.rqutil.permissionsHigh()
-            rqd.rqutil.checkAndCreateUser(runFrame.user_name)
-            rqd.rqutil.permissionsLow()
-
-        tempStatFile = "%srqd-stat-%s-%s" % (self.rqCore.machine.getTempPath(),
-                                             frameInfo.frameId,
-                                             time.time())
-        self._tempLocations.append(tempStatFile)
-        tempCommand = []
-        if self.rqCore.machine.isDesktop():
-            tempCommand += ["/bin/nice"]
-        tempCommand += ["/usr/bin/time", "-p", "-o", tempStatFile]
-
-        if 'CPU_LIST' in runFrame.attributes:
-            tempCommand += ['taskset', '-c', runFrame.attributes['CPU_LIST']]
-
-        rqd.rqutil.permissionsHigh()
         try:
-            tempCommand += ["/bin/su", runFrame.user_name, rqd.rqconstants.SU_ARGUEMENT,
-                            '"' + self._createCommandFile(runFrame.command) + '"']
+            if tempStatFile is not None:
+                tempCommand += ["/bin/su", runFrame.user_name, rqd.rqconstants.SU_ARGUEMENT,
+                                '"' + self._createCommandFile(runFrame.command) + '"']
+
+            cgroup = None
+            cgroupFd = None
+            if self.rqCore.cgroups is not None:
+                cgroup = self.__createCgroup()
+            if cgroup is not None and launchers is None:
+                cgroupFd = self.__openCgroup(cgroup)
+
+            output = self.rqlog
+            if rqd.rqconstants.RQD_LOG_PIPE:
+                self.rqlog.flush()
+                self.__logWriter = rqd.rqlogging.FrameLogWriter(
+                    getattr(self.rqlog, 'buffer', self.rqlog), self.rqCore.scheduler)
+                output = self.__logWriter.writeFd
 
-            # Actual cwd is set by /shots/SHOW/home/perl/etc/qwrap.cuerun
-            frameInfo.forkedCommand = subprocess.Popen(tempCommand,
-                                                       env=self.frameEnv,
-                                                       cwd=self.rqCore.machine.getTempPath(),
-                                                       stdin=subprocess.PIPE,
-                                                       stdout=self.rqlog,
-                                                       stderr=self.rqlog,
-                                                       close_fds=True,
-                                                       preexec_fn=os.setsid)
+            try:
+                if launchers is not None:
+                    frameInfo.forkedCommand = self.__launchWarm(tempCommand, output)
+                else:
+                    # Actual cwd is set by /shots/SHOW/home/perl/etc/qwrap.cuerun
+                    userArgs = {}
+                    if rqd.rqconstants.RQD_DIRECT_LAUNCH:
+                        userArgs = self.__frameUserArgs()
+                    frameInfo.forkedCommand = subprocess.Popen(
+                        tempCommand,
+                        env=self.frameEnv,
+                        cwd=self.rqCore.machine.getTempPath(),
+                        stdin=subprocess.PIPE,
+                        stdout=output,
+                        stderr=output,
+                        close_fds=True,
+                        start_new_session=True,
+                        preexec_fn=self.__childSetup(cgroupFd),
+                        **userArgs)
+                if cgroup is not None:
+                    self.__addToCgroup(cgroup, frameInfo.forkedCommand.pid)
+            except Exception:
+                if cgroup is not None:
+                    cgroup.remove()
+                if self.__logWriter is not None:
+                    self.__logWriter.abort()
+                    self.__logWriter = None
+                raise
+            finally:
+                if cgroupFd is not None:
+                    os.close(cgroupFd)
         finally:
-            rqd.rqutil.permissionsLow()
-
-        frameInfo.pid = frameInfo.forkedCommand.pid
+            if launchers is None:
+                rqd.rqutil.permissionsLow()
 
-        if not self.rqCore.updateRssThread.isAlive():
-            self.rqCore.updateRssThread = threading.Timer(rqd.rqconstants.RSS_UPDATE_INTERVAL,
-                                                           self.rqCore.updateRss)
-            self.rqCore.updateRssThread.start()
+        if self.__logWriter is not None:
+            self.__logWriter.start()
 
-        returncode = frameInfo.forkedCommand.wait()
+        self.__launchTime = time.time()
+        self.__recordLaunch()
+        if rqd.rqconstants.RQD_FRAME_PROFILE:
+            frameInfo.profile = rqd.rqprofile.FrameProfile()
+        frameInfo.pid = frameInfo.forkedCommand.pid
+        # Only start cgroup accounting once the frame has been moved into it.
+        frameInfo.cgroup = cgroup
 
-        # Find exitStatus and exitSignal
-        if returncode < 0:
-            # Exited with a signal
-            frameInfo.exitStatus = 1
-            frameInfo.exitSignal = -returncode
+        self.__tempStatFile = tempStatFile
+        if launchers is not None:
+            frameInfo.forkedCommand.watch(self.__onChildExit)
         else:
-            frameInfo.exitStatus = returncode
-            frameInfo.exitSignal = 0
+            self.rqCore.scheduler.watchChild(frameInfo.pid, self.__onChildExit)
+        self.__waitingForChild = True
+
+    def __launchWarm(self, command, output):
+        """Starts the frame through its user's warm launcher, see rqd.rqlauncher
+        @type  command: list
+        @param command: The frame's command
+        @type  output: file or int
+        @param output: Where the frame's output is written
+        @rtype:  rqd.rqlauncher.LaunchedProcess
+        @return: The started frame"""
+        niceness = rqd.rqconstants.DESKTOP_NICENESS if self.rqCore.machine.isDesktop() else 0
+        cpus = None
+        if 'CPU_LIST' in self.runFrame.attributes:
+            cpus = rqd.rqtopology.parseCpuList(self.runFrame.attributes['CPU_LIST'])
+        if not isinstance(output, int):
+            output = output.fileno()
+        return self.rqCore.launchers.launch(self.runFrame.user_name, command, self.frameEnv,
+                                            self.rqCore.machine.getTempPath(), output,
+                                            niceness, cpus)
+
+    def __frameUserArgs(self):
+        """Returns the Popen arguments that run the frame as its user for
+        RQD_DIRECT_LAUNCH. The user and groups are looked up here, since the
+        forked child of the threaded rqd must not make NSS calls.
+        @rtype:  dict
+        @return: The user, group and extra_groups for subprocess.Popen"""
+        user = pwd.getpwnam(self.runFrame.user_name)
+        return {'user': user.pw_uid,
+                'group': user.pw_gid,
+                'extra_groups': os.getgrouplist(user.pw_name, user.pw_gid)}
+
+    @staticmethod
+    def __openCgroup(cgroup):
+        """Opens the cgroup for the frame's process to move itself into, or
+        returns None if it can not be opened"""
+        try:
+            return cgroup.openProcs()
+        except (IOError, OSError) as e:
+            log.warning('Unable to open cgroup %s: %s' % (cgroup.path, e))
+            return None
 
+    @staticmethod
+    def __addToCgroup(cgroup, pid):
+        """Moves the frame into its cgroup from rqd, in case the frame's
+        process could not do it itself before exec"""
+        if pid in cgroup.getPids():
+            return
         try:
-            statFile  = open(tempStatFile,"r")
-            frameInfo.realtime = statFile.readline().split()[1]
-            frameInfo.utime = statFile.readline().split()[1]
-            frameInfo.stime = statFile.readline().split()[1]
-            statFile.close()
-        except Exception:
-            pass # This happens when frames are killed
+            cgroup.addProcess(pid)
+        except (IOError, OSError) as e:
+            log.warning('Unable to move frame process %d into cgroup %s: %s'
+                        % (pid, cgroup.path, e))
+
+    def __childSetup(self, cgroupFd):
+        """Returns the function run in the frame's process before it execs,
+        after Popen has started a new session and switched to the frame's
+        user. Only system calls are made there. With RQD_DIRECT_LAUNCH it also
+        does the work of nice and taskset.
+        @type  cgroupFd: int
+        @param cgroupFd: The frame's cgroup opened with openProcs, or None
+        @rtype:  callable
+        @return: The preexec_fn for subprocess.Popen"""
+        direct = rqd.rqconstants.RQD_DIRECT_LAUNCH
+        niceness = 0
+        cpus = None
+        if direct:
+            niceness = rqd.rqconstants.DESKTOP_NICENESS if self.rqCore.machine.isDesktop() else 0
+            if 'CPU_LIST' in self.runFrame.attributes:
+                cpus = rqd.rqtopology.parseCpuList(self.runFrame.attributes['CPU_LIST'])
 
-        self.__writeFooter()
-        self.__cleanup()
+        def childSetup():
+            if cgroupFd is not None:
+                try:
+                    rqd.rqcgroup.FrameCgroup.attachSelf(cgroupFd)
+                except OSError:
+                    # Older kernels check the child's own credentials, rqd
+                    # moves the frame in once Popen returns.
+                    pass
+            if niceness:
+                os.nice(niceness)
+            if cpus:
+                os.sched_setaffinity(0, cpus)
+        return childSetup
+
+    def __onChildExit(self, pid, status, rusage):
+        """Called on the scheduler once the frame's process has been reaped,
+           the cleanup does file io and rpcs so it is handed to a worker."""
+        self.rqCore.scheduler.runInWorker(self.__completeLinux, status, rusage)
+
+    def __completeLinux(self, status, rusage):
+        """The steps required after a frame exits under linux
+        @type  status: int
+        @param status: The wait status of the frame's process, None if unknown
+        @type  rusage: resource.struct_rusage
+        @param rusage: The resource usage of the frame's process"""
+        frameInfo = self.frameInfo
+        try:
+            if status is None:
+                returncode = 1
+            else:
+                returncode = rqd.rqscheduler.exitCode(status)
+            frameInfo.forkedCommand.returncode = returncode
+
+            # Find exitStatus and exitSignal
+            if returncode < 0:
+                # Exited with a signal
+                frameInfo.exitStatus = 1
+                frameInfo.exitSignal = -returncode
+            else:
+                frameInfo.exitStatus = returncode
+                frameInfo.exitSignal = 0
+
+            self.__removeCgroup()
+
+            if self.__tempStatFile is None:
+                frameInfo.realtime = '%.2f' % (time.time() - self.__launchTime)
+                if rusage is not None:
+                    frameInfo.utime = '%.2f' % rusage.ru_utime
+                    frameInfo.stime = '%.2f' % rusage.ru_stime
+                    # ru_maxrss is in kilobytes on linux, as is maxRss
+                    frameInfo.maxRss = max(frameInfo.maxRss, rusage.ru_maxrss)
+            else:
+                try:
+                    statFile  = open(self.__tempStatFile,"r")
+                    frameInfo.realtime = statFile.readline().split()[1]
+                    frameInfo.utime = statFile.readline().split()[1]
+                    frameInfo.stime = statFile.readline().split()[1]
+                    statFile.close()
+                except Exception:
+                    pass # This happens when frames are killed
+
+            if self.__logWriter is not None:
+                self.__logWriter.close()
+            self.__writeFooter()
+            self.__writeProfile()
+            self.__cleanup()
+        except Exception:
+            log.critical("Failed to complete frame: For %s due to: \n%s" % (
+                self.runFrame.frame_id, ''.join(traceback.format_exception(*sys.exc_info()))))
+        finally:
+            self.__finish()
 
     def runWindows(self):
         """The steps required to handle a frame under windows"""
@@ -329,11 +589,7 @@ class FrameAttendantThread(threading.Thread):
                 traceback.format_exception(*sys.exc_info())))
 
         frameInfo.pid = frameInfo.forkedCommand.pid
-
-        if not self.rqCore.updateRssThread.isAlive():
-            self.rqCore.updateRssThread = threading.Timer(rqd.rqconstants.RSS_UPDATE_INTERVAL,
-                                                          self.rqCore.updateRss)
-            self.rqCore.updateRssThread.start()
+        self.__recordLaunch()
 
         frameInfo.forkedCommand.wait()
 
@@ -372,11 +628,7 @@ class FrameAttendantThread(threading.Thread):
             rqd.rqutil.permissionsLow()
 
         frameInfo.pid = frameInfo.forkedCommand.pid
-
-        if not self.rqCore.updateRssThread.isAlive():
-            self.rqCore.updateRssThread = threading.Timer(rqd.rqconstants.RSS_UPDATE_INTERVAL,
-                                                          self.rqCore.updateRss)
-            self.rqCore.updateRssThread.start()
+        self.__recordLaunch()
 
         frameInfo.forkedCommand.wait()
 
@@ -406,6 +658,76 @@ class FrameAttendantThread(threading.Thread):
         """The steps required to handle a frame under an unknown OS"""
         pass
 
+    def __prepareLog(self):
+        """Checks the log directory and opens the frame's log, as the frame's
+           user if it has one. Bounded by the launch prep slots."""
+        runFrame = self.runFrame
+        launchPrep = self.rqCore.launchPrep
+        waitStart = time.time()
+        with launchPrep.slots:
+            prepStart = time.time()
+            launchPrep.waitLatency.record(prepStart - waitStart)
+
+            # Change to frame user if needed:
+            uid = None
+            if runFrame.HasField("uid"):
+                # Do everything as launching user:
+                runFrame.gid = rqd.rqconstants.LAUNCH_FRAME_USER_GID
+                uid = runFrame.uid
+                rqd.rqutil.permissionsUser(runFrame.uid, runFrame.gid)
+
+            try:
+                #
+                # Setup proc to allow launching of frame
+                #
+
+                launchPrep.prepareLogDir(runFrame.log_dir, uid)
+
+                try:
+                    # Rotate any old logs to a max of MAX_LOG_FILES:
+                    rqd.rqlogging.rotateLog(runFrame.log_dir_file,
+                                            rqd.rqconstants.MAX_LOG_FILES,
+                                            rqd.rqconstants.RQD_LOG_COMPRESS,
+                                            self.rqCore.scheduler.runInWorker,
+                                            uid, runFrame.gid if uid is not None else None)
+                except Exception as e:
+                    err = "Unable to rotate previous log file due to %s" % e
+                    raise RuntimeError(err)
+                try:
+                    self.rqlog = open(runFrame.log_dir_file, "w", 1)
+                    self.waitForFile(runFrame.log_dir_file)
+                except Exception as e:
+                    launchPrep.forgetLogDir(runFrame.log_dir, uid)
+                    err = "Unable to write to %s due to %s" % (runFrame.log_dir_file, e)
+                    raise RuntimeError(err)
+                try:
+                    os.chmod(runFrame.log_dir_file, 0o666)
+                except Exception as e:
+                    err = "Failed to chmod log file! %s due to %s" % (runFrame.log_dir_file, e)
+                    log.warning(err)
+
+            finally:
+                rqd.rqutil.permissionsLow()
+
+            staging = self.rqCore.machine.staging
+            if staging is not None:
+                # Only root may add to the staging root, the directory is
+                # handed over to the frame's user.
+                rqd.rqutil.permissionsHigh()
+                try:
+                    self.stagingDir = staging.prepareJob(
+                        runFrame.job_name, uid, runFrame.gid if uid is not None else None)
+                except Exception as e:
+                    log.warning("Unable to create the staging directory of %s due to %s"
+                                % (runFrame.job_name, e))
+                finally:
+                    rqd.rqutil.permissionsLow()
+            launchPrep.prepLatency.record(time.time() - prepStart)
+
+    def __recordLaunch(self, ok=True):
+        """Records the time from the launch request to the frame's process"""
+        self.rqCore.launchPrep.launchLatency.record(time.time() - self.requestTime, ok)
+
     def run(self):
         """Thread initialization"""
         log.info("Monitor frame started for frameId=%s", self.frameId)
@@ -423,63 +745,7 @@ class FrameAttendantThread(threading.Thread):
 
             try:  # Exception block for all exceptions
 
-                # Change to frame user if needed:
-                if runFrame.HasField("uid"):
-                    # Do everything as launching user:
-                    runFrame.gid = rqd.rqconstants.LAUNCH_FRAME_USER_GID
-                    rqd.rqutil.permissionsUser(runFrame.uid, runFrame.gid)
-
-                try:
-                    #
-                    # Setup proc to allow launching of frame
-                    #
-
-                    if not os.access(runFrame.log_dir, os.F_OK):
-                        # Attempting mkdir for missing logdir
-                        msg = "No Error"
-                        try:
-                            os.makedirs(runFrame.log_dir)
-                            os.chmod(runFrame.log_dir, 0o777)
-                        except Exception as e:
-                            # This is expected to fail when called in abq
-                            # But the directory should now be visible
-                            msg = e
-
-                        if not os.access(runFrame.log_dir, os.F_OK):
-                            err = "Unable to see log directory: %s, mkdir failed with: %s" % (
-                                runFrame.log_dir, msg)
-                            raise RuntimeError(err)
-
-                    if not os.access(runFrame.log_dir, os.W_OK):
-                        err = "Unable to write to log directory %s" % runFrame.log_dir
-                        raise RuntimeError(err)
-
-                    try:
-                        # Rotate any old logs to a max of MAX_LOG_FILES:
-                        if os.path.isfile(runFrame.log_dir_file):
-                            rotateCount = 1
-                            while (os.path.isfile("%s.%s" % (runFrame.log_dir_file, rotateCount))
-                                   and rotateCount < rqd.rqconstants.MAX_LOG_FILES):
-                                rotateCount += 1
-                            os.rename(runFrame.log_dir_file,
-                                      "%s.%s" % (runFrame.log_dir_file, rotateCount))
-                    except Exception as e:
-                        err = "Unable to rotate previous log file due to %s" % e
-                        raise RuntimeError(err)
-                    try:
-                        self.rqlog = open(runFrame.log_dir_file, "w", 1)
-                        self.waitForFile(runFrame.log_dir_file)
-                    except Exception as e:
-                        err = "Unable to write to %s due to %s" % (runFrame.log_dir_file, e)
-                        raise RuntimeError(err)
-                    try:
-                        os.chmod(runFrame.log_dir_file, 0o666)
-                    except Exception as e:
-                        err = "Failed to chmod log file! %s due to %s" % (runFrame.log_dir_file, e)
-                        log.warning(err)
-
-                finally:
-                    rqd.rqutil.permissionsLow()
+                self.__prepareLog()
 
                 # Store frame in cache and register servant
                 self.rqCore.storeFrame(runFrame.frame_id, self.frameInfo)
@@ -494,6 +760,7 @@ class FrameAttendantThread(threading.Thread):
                     self.runUnknown()
 
             except Exception as e:
+                self.__recordLaunch(ok=False)
                 log.critical("Failed launchFrame: For %s due to: \n%s" % (
                     runFrame.frame_id,
                     ''.join(traceback.format_exception(*sys.exc_info()))))
@@ -502,18 +769,25 @@ class FrameAttendantThread(threading.Thread):
                 # Delay keeps the cuebot from spamming failing booking requests
                 time.sleep(10)
         finally:
-            self.rqCore.releaseCores(self.runFrame.num_cores, runFrame.attributes.get('CPU_LIST'))
+            # Once a linux frame is running its exit is handled by __completeLinux
+            if not self.__waitingForChild:
+                self.__finish()
+
+    def __finish(self):
+        """Releases the frame's resources and reports its completion"""
+        try:
+            self.rqCore.releaseCores(self.runFrame.num_cores,
+                                     self.runFrame.attributes.get('CPU_LIST'))
 
             self.rqCore.deleteFrame(self.runFrame.frame_id)
 
             self.__sendFrameCompleteReport()
-            time_till_next = (self.rqCore.intervalStartTime + self.rqCore.intervalSleepTime) - time.time()
-            if time_till_next > (2 * rqd.rqconstants.RQD_MIN_PING_INTERVAL_SEC):
-                self.rqCore.onIntervalThread.cancel()
-                self.rqCore.onInterval(rqd.rqconstants.RQD_MIN_PING_INTERVAL_SEC)
+            self.rqCore.expediteStatusReport()
 
             log.info("Monitor frame ended for frameId=%s",
                      self.runFrame.frame_id)
+        finally:
+            self.__finished.set()
 
 
 class RqCore(object):
@@ -542,10 +816,44 @@ class RqCore(object):
 
         self.network = rqd.rqnetwork.Network(self)
         self.__threadLock = threading.Lock()
+
+        self.cgroups = None
+        if rqd.rqconstants.RQD_USE_CGROUPS and platform.system() == 'Linux':
+            self.__setupCgroups()
         self.__cache = {}
 
-        self.updateRssThread = None
-        self.onIntervalThread = None
+        self.scheduler = rqd.rqscheduler.Scheduler()
+        self.launchers = None
+        if rqd.rqconstants.RQD_WARM_LAUNCHER and platform.system() == 'Linux':
+            if self.cgroups is not None:
+                log.warning('RQD_WARM_LAUNCHER is ignored while frames are launched into cgroups')
+            else:
+                self.launchers = rqd.rqlauncher.LauncherPool(
+                    self.scheduler, maxUsers=rqd.rqconstants.RQD_WARM_LAUNCHER_USERS,
+                    idleSec=rqd.rqconstants.RQD_WARM_LAUNCHER_IDLE_SEC,
+                    runAsRoot=rqd.rqutil.runAsRoot)
+        self.launchPrep = rqd.rqlaunch.LaunchPrep()
+        self.killManager = rqd.rqkill.KillManager(self)
+        self.metrics = rqd.rqmetrics.Registry()
+        self.rpcLatency = self.metrics.histogram(
+            'rqd_grpc_request_duration_seconds', 'Duration of rqd gRPC servicer calls',
+            ('method',))
+        self.rpcErrors = self.metrics.counter(
+            'rqd_grpc_request_errors_total', 'rqd gRPC servicer calls that raised', ('method',))
+        self.rssUpdateLatency = self.metrics.histogram(
+            'rqd_rss_update_duration_seconds', 'Duration of updating the memory and cpu '
+            'usage of running frames')
+        self.metrics.addCollector(self.collectMetrics)
+        self.metricsServer = None
+        self.updateRssTask = None
+        self.onIntervalTask = None
+        self.__intervalReport = None
+        self.completionSpool = rqd.rqspool.ReportSpool(rqd.rqconstants.RQD_SPOOL_PATH or None,
+                                                       uid=rqd.rqconstants.RQD_UID)
+        self.spoolReplayTask = None
+        self.stagingScanTask = None
+        self.__spoolReplaying = False
+        self.__lastOomGuardKill = 0
         self.intervalStartTime = None
         self.intervalSleepTime = rqd.rqconstants.RQD_MIN_PING_INTERVAL_SEC
 
@@ -556,6 +864,22 @@ class RqCore(object):
         signal.signal(signal.SIGINT, self.handleExit)
         signal.signal(signal.SIGTERM, self.handleExit)
 
+    def __setupCgroups(self):
+        """Prepares the parent cgroup that frames are launched into"""
+        cgroups = rqd.rqcgroup.CgroupManager()
+        if not cgroups.isAvailable():
+            log.warning('RQD_USE_CGROUPS is set but no cgroup v2 hierarchy with the cpu and '
+                        'memory controllers is mounted at %s' % cgroups.root)
+            return
+        rqd.rqutil.permissionsHigh()
+        try:
+            cgroups.setup()
+            self.cgroups = cgroups
+        except Exception as e:
+            log.warning('Unable to set up cgroup %s: %s' % (cgroups.path, e))
+        finally:
+            rqd.rqutil.permissionsLow()
+
     def start(self):
         """Called by main to start the rqd service"""
         if self.machine.isDesktop():
@@ -571,24 +895,82 @@ class RqCore(object):
         elif rqd.rqconstants.OVERRIDE_NIMBY:
             log.warning('Nimby startup has been triggered by OVERRIDE_NIMBY')
             self.nimbyOn()
+        if platform.system() == 'Linux':
+            self.machine.health.start(self.scheduler, self.onMemoryPressure)
+        self.scheduler.start()
+        if self.machine.staging is not None:
+            self.startStaging()
+        if rqd.rqconstants.RQD_METRICS_PORT:
+            self.startMetrics()
         self.network.start_grpc()
 
+    def startMetrics(self):
+        """Serves self.metrics on RQD_METRICS_PORT"""
+        try:
+            server = rqd.rqmetrics.MetricsServer(self.metrics)
+            server.start()
+            self.metricsServer = server
+        except (IOError, OSError) as e:
+            log.warning('Unable to serve metrics on port %s: %s'
+                        % (rqd.rqconstants.RQD_METRICS_PORT, e))
+
+    def startStaging(self):
+        """Creates the staging root, which only root may add job directories
+           to, and starts scanning it"""
+        root = self.machine.staging.root
+        rqd.rqutil.permissionsHigh()
+        try:
+            if not os.path.isdir(root):
+                os.makedirs(root)
+            os.chmod(root, 0o755)
+        except OSError as e:
+            log.warning('Unable to create the staging directory %s: %s' % (root, e))
+            return
+        finally:
+            rqd.rqutil.permissionsLow()
+        self.stagingScanTask = self.scheduler.callLater(
+            rqd.rqconstants.RQD_STAGING_SCAN_SEC, self.scheduler.runInWorker, self.scanStaging)
+
+    def scanStaging(self):
+        """Evicts staged copies while space is short and removes the staging
+           directories of jobs without frames on the host, runs on a scheduler
+           worker"""
+        try:
+            runningJobs = set()
+            for frameId in self.getFrameKeys():
+                runningFrame = self.getRunningFrame(frameId)
+                if runningFrame is not None:
+                    runningJobs.add(runningFrame.runFrame.job_name)
+            rqd.rqutil.permissionsHigh()
+            try:
+                self.machine.staging.scan(runningJobs)
+            finally:
+                rqd.rqutil.permissionsLow()
+        except Exception as e:
+            log.warning('Unable to scan the staging directory: %s' % e)
+        finally:
+            self.stagingScanTask = self.scheduler.callLater(
+                rqd.rqconstants.RQD_STAGING_SCAN_SEC, self.scheduler.runInWorker,
+                self.scanStaging)
+
     def grpcConnected(self):
         """After gRPC connects to the cuebot, this function is called"""
         self.network.reportRqdStartup(self.machine.getBootReport())
 
-        self.updateRssThread = threading.Timer(rqd.rqconstants.RSS_UPDATE_INTERVAL, self.updateRss)
-        self.updateRssThread.start()
+        self.updateRssTask = self.scheduler.callLater(rqd.rqconstants.RSS_UPDATE_INTERVAL,
+                                                      self.scheduler.runInWorker, self.updateRss)
 
-        self.onIntervalThread = threading.Timer(self.intervalSleepTime, self.onInterval)
+        self.onIntervalTask = self.scheduler.callLater(self.intervalSleepTime, self.onInterval)
         self.intervalStartTime = time.time()
-        self.onIntervalThread.start()
+
+        if len(self.completionSpool):
+            self.scheduleSpoolReplay(0)
 
         log.warning('RQD Started')
 
     def onInterval(self, sleepTime=None):
 
-        """This is called by self.grpcConnected as a timer thread to execute
+        """This is called by self.grpcConnected on the scheduler to execute
            every interval"""
         if sleepTime is None:
             self.intervalSleepTime = random.randint(
@@ -597,12 +979,19 @@ class RqCore(object):
         else:
             self.intervalSleepTime = sleepTime
         try:
-            self.onIntervalThread = threading.Timer(self.intervalSleepTime, self.onInterval)
+            self.onIntervalTask = self.scheduler.callLater(self.intervalSleepTime, self.onInterval)
             self.intervalStartTime = time.time()
-            self.onIntervalThread.start()
         except Exception as e:
             log.critical('Unable to schedule a ping due to {0} at {1}'.format(e, traceback.extract_tb(sys.exc_info()[2])))
 
+        if self.__intervalReport is not None and not self.__intervalReport.done():
+            log.warning('The previous status report is still being sent, skipping this one')
+            return
+        self.__intervalReport = self.scheduler.runInWorker(self.__sendIntervalReport)
+
+    def __sendIntervalReport(self):
+        """Shuts down if requested and sends the status report, runs on a
+           scheduler worker since both can block"""
         try:
             if self.__whenIdle and not self.__cache:
                 if not self.machine.isUserLoggedIn():
@@ -618,14 +1007,109 @@ class RqCore(object):
         except Exception as e:
             log.critical('Unable to send status report due to {0} at {1}'.format(e, traceback.extract_tb(sys.exc_info()[2])))
 
+    def expediteStatusReport(self):
+        """Brings the next status report forward after a frame completes.
+           Completions within RQD_REPORT_COALESCE_SEC share one report."""
+        self.scheduler.callSoon(self.__expediteStatusReport)
+
+    def __expediteStatusReport(self):
+        if self.intervalStartTime is None:
+            # Not connected to the cuebot yet
+            return
+        timeTillNext = (self.intervalStartTime + self.intervalSleepTime) - time.time()
+        if timeTillNext <= rqd.rqconstants.RQD_REPORT_COALESCE_SEC:
+            # A report is already about to be sent and will include this change.
+            return
+        if self.onIntervalTask is not None:
+            self.onIntervalTask.cancel()
+        self.intervalStartTime = time.time()
+        self.intervalSleepTime = rqd.rqconstants.RQD_REPORT_COALESCE_SEC
+        self.onIntervalTask = self.scheduler.callLater(rqd.rqconstants.RQD_REPORT_COALESCE_SEC,
+                                                       self.onInterval,
+                                                       rqd.rqconstants.RQD_MIN_PING_INTERVAL_SEC)
+
+    def sendFrameCompleteReport(self, report):
+        """Sends a frame completion report to the cuebot. Reports that can not
+           be delivered are spooled and replayed in batches.
+        @type  report: rqd.compiled_proto.report_pb2.FrameCompleteReport
+        @param report: The report to send"""
+        if len(self.completionSpool):
+            # Queue behind the reports already waiting, the cuebot is likely still away.
+            self.completionSpool.append(report)
+            self.scheduleSpoolReplay(0)
+            return
+        try:
+            self.network.reportRunningFrameCompletion(report)
+        except Exception as e:
+            log.warning('Unable to send the completion report for frame %s, spooling it: %s'
+                        % (report.frame.frame_id, e))
+            self.completionSpool.append(report)
+            self.scheduleSpoolReplay(rqd.rqconstants.RQD_SPOOL_RETRY_SEC)
+
+    def scheduleSpoolReplay(self, delay):
+        """Replays the spooled completion reports after delay seconds"""
+        self.scheduler.callSoon(self.__scheduleSpoolReplay, delay)
+
+    def __scheduleSpoolReplay(self, delay):
+        if self.__spoolReplaying:
+            # The running replay reschedules itself while reports remain.
+            return
+        if self.spoolReplayTask is not None and self.spoolReplayTask.isPending():
+            return
+        self.spoolReplayTask = self.scheduler.callLater(delay, self.__startSpoolReplay)
+
+    def __startSpoolReplay(self):
+        self.__spoolReplaying = True
+        self.scheduler.runInWorker(self.__replaySpool)
+
+    def __replaySpool(self):
+        """Sends one batch of spooled reports, runs on a scheduler worker"""
+        delay = None
+        try:
+            batch = self.completionSpool.getBatch(rqd.rqconstants.RQD_SPOOL_REPLAY_BATCH)
+            if batch:
+                delivered, failures = self.network.reportRunningFrameCompletions(batch)
+                self.completionSpool.markDelivered(delivered)
+                unreachable = [frameId for frameId, code in failures.items()
+                               if code in rqd.rqnetwork.UNREACHABLE_CODES]
+                rejected = [frameId for frameId, code in failures.items()
+                            if code in rqd.rqnetwork.REJECTED_CODES]
+                failed = [frameId for frameId in failures
+                          if frameId not in unreachable and frameId not in rejected]
+                self.completionSpool.drop(rejected, 'rejected by the cuebot')
+                self.completionSpool.markFailed(failed)
+                # Only wait while the cuebot is away, or when nothing in the
+                # batch went through so that failing reports aren't resent in
+                # a tight loop.
+                if unreachable or len(failed) == len(batch):
+                    delay = rqd.rqconstants.RQD_SPOOL_RETRY_SEC
+                log.info('Replayed %d of %d spooled completion reports, %d remaining'
+                         % (len(delivered), len(batch), len(self.completionSpool)))
+        except Exception as e:
+            log.warning('Unable to replay spooled completion reports: %s' % e)
+            delay = rqd.rqconstants.RQD_SPOOL_RETRY_SEC
+        finally:
+            self.scheduler.callSoon(self.__finishSpoolReplay, delay)
+
+    def __finishSpoolReplay(self, delay):
+        self.__spoolReplaying = False
+        if delay is None and len(self.completionSpool):
+            delay = 0
+        if delay is not None:
+            self.__scheduleSpoolReplay(delay)
+
     def updateRss(self):
-        """Triggers and schedules the updating of rss information"""
-        if self.__cache:
-            try:
+        """Triggers and schedules the updating of rss information, runs on a
+           scheduler worker since it walks /proc"""
+        try:
+            if self.__cache:
+                start = time.time()
                 self.machine.rssUpdate(self.__cache)
-            finally:
-                self.updateRssThread = threading.Timer(rqd.rqconstants.RSS_UPDATE_INTERVAL, self.updateRss)
-                self.updateRssThread.start()
+                self.rssUpdateLatency.observe(time.time() - start)
+        finally:
+            self.updateRssTask = self.scheduler.callLater(rqd.rqconstants.RSS_UPDATE_INTERVAL,
+                                                          self.scheduler.runInWorker,
+                                                          self.updateRss)
 
     def getFrame(self, frameId):
         """Gets a frame from the cache based on frameId
@@ -665,9 +1149,10 @@ class RqCore(object):
                 del self.__cache[frameId]
         finally:
             self.__threadLock.release()
+        self.killManager.frameExited(frameId)
 
     def killAllFrame(self, reason):
-        """Will execute .kill() on every frame in cache until no frames remain
+        """Kills every frame in cache until no frames remain
         @type  reason: string
         @param reason: Reason for requesting all frames to be killed"""
 
@@ -685,12 +1170,27 @@ class RqCore(object):
                 # No frames left to kill
                 return
 
-            for frameKey in frameKeys:
-                try:
-                    self.__cache[frameKey].kill(reason)
-                except KeyError:
-                    pass
-            time.sleep(1)
+            frames = [self.__cache.get(frameKey) for frameKey in frameKeys]
+            self.killManager.killFrames([frame for frame in frames if frame is not None], reason)
+            self.killManager.waitForExit(frameKeys, rqd.rqconstants.RQD_KILL_WAIT_SEC)
+
+    def onMemoryPressure(self):
+        """Called by the health sampler while the host is close to running
+           out of memory. With RQD_OOM_GUARD the frame using the most memory,
+           the newest of equals, is killed, at most one every
+           RQD_OOM_GUARD_GRACE_SEC so the memory it frees is seen first."""
+        if not rqd.rqconstants.RQD_OOM_GUARD:
+            return
+        if time.time() - self.__lastOomGuardKill < rqd.rqconstants.RQD_OOM_GUARD_GRACE_SEC:
+            return
+        frames = [frame for frame in list(self.__cache.values()) if not frame.killMessage]
+        if not frames:
+            return
+        frame = max(frames, key=lambda frame: (frame.rss, frame.runFrame.start_time))
+        log.warning("Host is under memory pressure, killing frame %s using %d kB"
+                    % (frame.frameId, frame.rss))
+        self.__lastOomGuardKill = time.time()
+        frame.kill("Killed by rqd, host memory pressure")
 
     def releaseCores(self, reqRelease, releaseHT=None):
         """The requested number of cores are released
@@ -708,7 +1208,7 @@ class RqCore(object):
                 self.cores.idle_cores += min(maxRelease, reqRelease)
 
             if releaseHT:
-                self.machine.releaseHT(releaseHT)
+                self.machine.releaseHT(releaseHT, reqRelease)
 
         finally:
             self.__threadLock.release()
@@ -727,10 +1227,21 @@ class RqCore(object):
         """Shuts down all rqd systems,
            will call respawn or reboot if requested"""
         self.nimbyOff()
-        if self.onIntervalThread is not None:
-            self.onIntervalThread.cancel()
-        if self.updateRssThread is not None:
-            self.updateRssThread.cancel()
+        if self.onIntervalTask is not None:
+            self.onIntervalTask.cancel()
+        if self.updateRssTask is not None:
+            self.updateRssTask.cancel()
+        if self.spoolReplayTask is not None:
+            self.spoolReplayTask.cancel()
+        if self.stagingScanTask is not None:
+            self.stagingScanTask.cancel()
+        if self.launchers is not None:
+            self.launchers.close()
+        self.completionSpool.close()
+        self.machine.health.stop()
+        if self.metricsServer is not None:
+            self.metricsServer.stop()
+            self.metricsServer = None
         if self.__respawn:
             log.warning("Respawning RQD by request")
             self.respawn_rqd()
@@ -774,6 +1285,17 @@ class RqCore(object):
             log.info(err)
             raise rqd.rqexceptions.CoreReservationFailureException(err)
 
+        if rqd.rqconstants.RQD_ADMISSION_CONTROL:
+            try:
+                memoryKb = int(runFrame.environment.get('CUE_MEMORY', 0))
+            except ValueError:
+                memoryKb = 0
+            reason = self.machine.health.checkAdmission(memoryKb)
+            if reason:
+                err = "Not launching, host is under pressure: %s" % reason
+                log.warning(err)
+                raise rqd.rqexceptions.CoreReservationFailureException(err)
+
         if runFrame.frame_id in self.__cache:
             err = "Not launching, frame is already running on this proc %s" % runFrame.frame_id
             log.critical(err)
@@ -812,6 +1334,86 @@ class RqCore(object):
         runningFrame.frameAttendantThread = FrameAttendantThread(self, runFrame, runningFrame)
         runningFrame.frameAttendantThread.start()
 
+    def getLaunchStats(self):
+        """Returns the latency percentiles of frame launches and the setup
+           cache counters, see rqd.rqlaunch.LaunchPrep.getStats"""
+        return self.launchPrep.getStats()
+
+    def getKillStats(self):
+        """Returns how long killed frames took to exit, see
+           rqd.rqkill.KillManager.getStats"""
+        return self.killManager.getStats()
+
+    def collectMetrics(self):
+        """Returns the figures rqd keeps elsewhere for self.metrics
+        @rtype:  list
+        @return: rqd.rqmetrics.MetricFamily objects"""
+        families = []
+        cores = rqd.rqmetrics.MetricFamily('rqd_cores', 'gauge',
+                                           'Cores of the host by reservation state')
+        for state in ('total', 'idle', 'locked', 'booked'):
+            cores.add(getattr(self.cores, '%s_cores' % state) / rqd.rqconstants.CORE_VALUE,
+                      {'state': state})
+        families.append(cores)
+        families.append(rqd.rqmetrics.MetricFamily(
+            'rqd_running_frames', 'gauge', 'Frames running on the host').add(len(self.__cache)))
+        families.append(rqd.rqmetrics.MetricFamily(
+            'rqd_nimby_active', 'gauge', '1 while nimby watches for input').add(
+                int(bool(self.nimby.active))))
+        families.append(rqd.rqmetrics.MetricFamily(
+            'rqd_nimby_locked', 'gauge', '1 while nimby has locked the host').add(
+                int(bool(self.nimby.locked))))
+        families.append(rqd.rqmetrics.MetricFamily(
+            'rqd_threads', 'gauge', 'Live threads in rqd').add(threading.active_count()))
+        families.append(rqd.rqmetrics.MetricFamily(
+            'rqd_rss_update_pids', 'gauge', 'Processes read by the last rss update').add(
+                self.machine.rssPids))
+
+        launchLatency = self.launchPrep.launchLatency
+        families.append(rqd.rqmetrics.MetricFamily(
+            'rqd_launch_duration_seconds', 'summary',
+            'Time from a launchFrame request until the frame was started').addTracker(
+                launchLatency))
+        families.append(rqd.rqmetrics.MetricFamily(
+            'rqd_launch_failures_total', 'counter', 'Frames that failed to start').add(
+                launchLatency.errors))
+        families.append(rqd.rqmetrics.MetricFamily(
+            'rqd_kill_exit_duration_seconds', 'summary',
+            'Time from killing a frame until it exited').addTracker(self.killManager.latency))
+
+        reportLatency = rqd.rqmetrics.MetricFamily(
+            'rqd_report_duration_seconds', 'summary', 'Duration of reports sent to the cuebot')
+        reportFailures = rqd.rqmetrics.MetricFamily(
+            'rqd_report_failures_total', 'counter', 'Reports the cuebot did not receive')
+        for method, tracker in sorted(self.network.getReportLatencies().items()):
+            reportLatency.addTracker(tracker, {'method': method})
+            reportFailures.add(tracker.errors, {'method': method})
+        families.extend([reportLatency, reportFailures])
+
+        if self.launchers is not None:
+            launcherStats = self.launchers.getStats()
+            families.append(rqd.rqmetrics.MetricFamily(
+                'rqd_warm_launchers', 'gauge', 'Warm launcher processes running').add(
+                    launcherStats['launchers']))
+            families.append(rqd.rqmetrics.MetricFamily(
+                'rqd_warm_launcher_spawns_total', 'counter',
+                'Warm launcher processes started').add(launcherStats['spawned']))
+
+        if self.machine.staging is not None:
+            stagingStats = self.machine.staging.getStats()
+            families.append(rqd.rqmetrics.MetricFamily(
+                'rqd_staging_lookups_total', 'counter',
+                'Files frames looked up in the staging cache').add(
+                    stagingStats['hits'], {'result': 'hit'}).add(
+                        stagingStats['misses'], {'result': 'miss'}))
+            families.append(rqd.rqmetrics.MetricFamily(
+                'rqd_staging_bytes', 'gauge', 'Bytes held by the staging cache').add(
+                    stagingStats['bytes']))
+            families.append(rqd.rqmetrics.MetricFamily(
+                'rqd_staging_evictions_total', 'counter',
+                'Staged copies evicted to free space').add(stagingStats['evicted']))
+        return families
+
     def getRunningFrame(self, frameId):
         try:
             return self.__cache[frameId]
@@ -17,7 +17,9 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import division
 
+import functools
 import logging as log
+import time
 
 import grpc
 
@@ -25,23 +27,44 @@ import rqd.compiled_proto.rqd_pb2
 import rqd.compiled_proto.rqd_pb2_grpc
 
 
+def recordCall(method):
+    """Records the duration of a servicer call, and whether it raised, in the
+    rqCore metrics"""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, request, context):
+        start = time.time()
+        try:
+            return method(self, request, context)
+        except Exception:
+            self.rqCore.rpcErrors.labels(name).inc()
+            raise
+        finally:
+            self.rqCore.rpcLatency.labels(name).observe(time.time() - start)
+    return wrapper
+
+
 class RqdInterfaceServicer(rqd.compiled_proto.rqd_pb2_grpc.RqdInterfaceServicer):
     """Service interface for RqdStatic gRPC definition"""
 
     def __init__(self, rqCore):
         self.rqCore = rqCore
 
+    @recordCall
     def LaunchFrame(self, request, context):
         """RPC call that launches the given frame"""
         log.info("Request received: launchFrame")
         self.rqCore.launchFrame(request.run_frame)
         return rqd.compiled_proto.rqd_pb2.RqdStaticLaunchFrameResponse()
 
+    @recordCall
     def ReportStatus(self, request, context):
         """RPC call that returns reportStatus"""
         log.info("Request received: reportStatus")
         return rqd.compiled_proto.rqd_pb2.RqdStaticReportStatusResponse(host_report=self.rqCore.reportStatus())
 
+    @recordCall
     def GetRunningFrameStatus(self, request, context):
         """RPC call to return the frame info for the given frame id"""
         log.info("Request received: getRunningFrameStatus")
@@ -55,6 +78,7 @@ class RqdInterfaceServicer(rqd.compiled_proto.rqd_pb2_grpc.RqdInterfaceServicer)
             context.set_code(grpc.StatusCode.NOT_FOUND)
             return rqd.compiled_proto.rqd_pb2.RqdStaticGetRunningFrameStatusResponse()
 
+    @recordCall
     def KillRunningFrame(self, request, context):
         """RPC call that kills the running frame with the given id"""
         log.info("Request received: killRunningFrame")
@@ -63,12 +87,14 @@ class RqdInterfaceServicer(rqd.compiled_proto.rqd_pb2_grpc.RqdInterfaceServicer)
             frame.kill(message=request.message)
         return rqd.compiled_proto.rqd_pb2.RqdStaticKillRunningFrameResponse()
 
+    @recordCall
     def ShutdownRqdNow(self, request, context):
         """RPC call that kills all running frames and shuts down rqd"""
         log.info("Request received: shutdownRqdNow")
         self.rqCore.shutdownRqdNow()
         return rqd.compiled_proto.rqd_pb2.RqdStaticShutdownNowResponse()
 
+    @recordCall
     def ShutdownRqdIdle(self, request, context):
         """RPC call that locks all cores and shuts down rqd when it is idle.
            unlockAll will abort the request."""
@@ -76,12 +102,14 @@ class RqdInterfaceServicer(rqd.compiled_proto.rqd_pb2_grpc.RqdInterfaceServicer)
         self.rqCore.shutdownRqdIdle()
         return rqd.compiled_proto.rqd_pb2.RqdStaticShutdownIdleResponse()
 
+    @recordCall
     def RestartRqdNow(self, request, context):
         """RPC call that kills all running frames and restarts rqd"""
         log.info("Request received: restartRqdNow")
         self.rqCore.restartRqdNow()
         return rqd.compiled_proto.rqd_pb2.RqdStaticRestartNowResponse()
 
+    @recordCall
     def RestartRqdIdle(self, request, context):
         """RPC call that that locks all cores and restarts rqd when idle.
            unlockAll will abort the request."""
@@ -89,12 +117,14 @@ class RqdInterfaceServicer(rqd.compiled_proto.rqd_pb2_grpc.RqdInterfaceServicer)
         self.rqCore.restartRqdIdle()
         return rqd.compiled_proto.rqd_pb2.RqdStaticRestartIdleResponse()
 
+    @recordCall
     def RebootNow(self, request, context):
         """RPC call that kills all running frames and reboots the host."""
         log.info("Request received: rebootNow")
         self.rqCore.rebootNow()
         return rqd.compiled_proto.rqd_pb2.RqdStaticRebootNowResponse()
 
+    @recordCall
     def RebootIdle(self, request, context):
         """RPC call that that locks all cores and reboots the host when idle.
            unlockAll will abort the request."""
@@ -102,36 +132,42 @@ class RqdInterfaceServicer(rqd.compiled_proto.rqd_pb2_grpc.RqdInterfaceServicer)
         self.rqCore.rebootIdle()
         return rqd.compiled_proto.rqd_pb2.RqdStaticRebootIdleResponse()
 
+    @recordCall
     def NimbyOn(self, request, context):
         """RPC call that activates nimby"""
         log.info("Request received: nimbyOn")
         self.rqCore.nimbyOn()
         return rqd.compiled_proto.rqd_pb2.RqdStaticNimbyOnResponse()
 
+    @recordCall
     def NimbyOff(self, request, context):
         """RPC call that deactivates nimby"""
         log.info("Request received: nimbyOff")
         self.rqCore.nimbyOff()
         return rqd.compiled_proto.rqd_pb2.RqdStaticNimbyOffResponse()
 
+    @recordCall
     def Lock(self, request, context):
         """RPC call that locks a specific number of cores"""
         log.info("Request received: lock %d" % request.cores)
         self.rqCore.lock(request.cores)
         return rqd.compiled_proto.rqd_pb2.RqdStaticLockResponse()
 
+    @recordCall
     def LockAll(self, request, context):
         """RPC call that locks all cores"""
         log.info("Request received: lockAll")
         self.rqCore.lockAll()
         return rqd.compiled_proto.rqd_pb2.RqdStaticLockAllResponse()
 
+    @recordCall
     def Unlock(self, request, context):
         """RPC call that unlocks a specific number of cores"""
         log.info("Request received: unlock %d" % request.cores)
         self.rqCore.unlock(request.cores)
         return rqd.compiled_proto.rqd_pb2.RqdStaticUnlockResponse()
 
+    @recordCall
     def UnlockAll(self, request, context):
         """RPC call that unlocks all cores"""
         log.info("Request received: unlockAll")
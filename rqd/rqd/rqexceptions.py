@@ -29,3 +29,6 @@ class DuplicateFrameViolationException(Exception):
 
 class InvalidUserException(Exception):
     pass
+
+class CuebotUnavailableException(Exception):
+    pass
@@ -0,0 +1,179 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Cache of static machine facts that are slow to find out.
+
+rqd probes su, sources the studio csh environment and parses cpuinfo when it
+starts. The results only change with the hardware or the system, so they are
+kept in a small json file and reused while the boot time, kernel release and
+cpu count are unchanged. A fact can also depend on files, such as the
+cshrc it was read from, and is probed again when one of them changes.
+
+Facts are only kept in memory until persist() is called, so importing rqd
+never writes to disk.
+
+This module is imported by rqconstants and must not import other rqd modules.
+"""
+
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from builtins import object
+import json
+import logging as log
+import os
+import platform
+import tempfile
+import threading
+
+
+FACTS_VERSION = 1
+PATH_STAT = '/proc/stat'
+
+
+def getBootTime(pathStat=PATH_STAT):
+    """Returns the epoch the system booted at, 0 if unknown"""
+    try:
+        with open(pathStat) as statFile:
+            for line in statFile:
+                if line.startswith('btime'):
+                    return int(line.split()[1])
+    except (IOError, OSError, ValueError):
+        pass
+    return 0
+
+
+def getSystemKey(pathStat=PATH_STAT):
+    """Returns what the cached facts are valid for"""
+    return {
+        'version': FACTS_VERSION,
+        'boot_time': getBootTime(pathStat),
+        'kernel': platform.release(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def _fileStamp(path):
+    try:
+        fileStat = os.stat(path)
+        return [fileStat.st_mtime, fileStat.st_size]
+    except OSError:
+        return None
+
+
+class FactsCache(object):
+    """Facts kept in a json file, valid for one boot of one system."""
+
+    def __init__(self, path, systemKey=None):
+        """
+        @type  path: str
+        @param path: The cache file, None to keep facts in memory only
+        @type  systemKey: dict
+        @param systemKey: What the facts are valid for, defaults to getSystemKey()
+        """
+        self.path = path
+        self.systemKey = systemKey if systemKey is not None else getSystemKey()
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.RLock()
+        self.__persistent = False
+        self.__owner = None
+        self.__facts = self.__load()
+
+    def __load(self):
+        if not self.path:
+            return {}
+        try:
+            with open(self.path) as factsFile:
+                data = json.load(factsFile)
+        except (IOError, OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get('key') != self.systemKey:
+            log.info('Machine facts in %s are stale, probing again' % self.path)
+            return {}
+        return data.get('facts', {})
+
+    def __save(self):
+        if not self.path or not self.__persistent:
+            return
+        tempPath = None
+        try:
+            directory = os.path.dirname(self.path) or os.curdir
+            if not os.path.isdir(directory):
+                os.makedirs(directory, mode=0o700)
+                if self.__owner is not None:
+                    os.chown(directory, *self.__owner)
+            fd, tempPath = tempfile.mkstemp(
+                prefix='.%s.' % os.path.basename(self.path), suffix='.tmp', dir=directory)
+            with os.fdopen(fd, 'w') as factsFile:
+                json.dump({'key': self.systemKey, 'facts': self.__facts}, factsFile,
+                          sort_keys=True)
+            os.rename(tempPath, self.path)
+            tempPath = None
+        except (IOError, OSError) as e:
+            log.debug('Unable to save machine facts to %s: %s' % (self.path, e))
+        finally:
+            if tempPath is not None:
+                try:
+                    os.unlink(tempPath)
+                except OSError:
+                    pass
+
+    def persist(self, uid=None, gid=None):
+        """Saves the facts probed so far, and from then on every new one. A
+        missing directory of the cache file is created with mode 0700 and
+        given to uid and gid, so the caller must be allowed to do both.
+        @type  uid: int
+        @param uid: The owner of a created directory, None to keep the caller
+        @type  gid: int
+        @param gid: The group of a created directory"""
+        with self.__lock:
+            self.__persistent = True
+            self.__owner = (uid, gid) if uid is not None else None
+            self.__save()
+
+    def get(self, name, factory, dependsOn=()):
+        """Returns a cached fact, calling factory() and saving the result when
+        it is missing or one of the files it depends on changed. The result
+        must be json serializable, tuples come back as lists.
+        @type  name: str
+        @param name: The fact
+        @type  factory: callable
+        @param factory: Finds out the fact
+        @type  dependsOn: tuple
+        @param dependsOn: Files the fact is read from"""
+        stamps = [_fileStamp(path) for path in dependsOn]
+        with self.__lock:
+            entry = self.__facts.get(name)
+            if entry is not None and entry.get('depends') == stamps:
+                self.hits += 1
+                return entry['value']
+            self.misses += 1
+            value = factory()
+            self.__facts[name] = {'value': value, 'depends': stamps}
+            self.__save()
+            return value
+
+    def invalidate(self, name=None):
+        """Forgets one fact, or all of them"""
+        with self.__lock:
+            if name is None:
+                self.__facts.clear()
+            else:
+                self.__facts.pop(name, None)
+            self.__save()
@@ -0,0 +1,225 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Host health sampling from pressure stall information, meminfo and vmstat.
+
+One sampler reads /proc/pressure/{cpu,memory,io}, /proc/meminfo and
+/proc/vmstat every RQD_HEALTH_SAMPLE_SEC on the rqd scheduler and keeps
+RQD_HEALTH_WINDOW_SEC of samples. rqd uses them to refuse frames while the
+host is under pressure and to kill a frame before the kernel OOM killer
+takes down the host.
+"""
+
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from builtins import object
+import collections
+import os
+import threading
+import time
+
+import rqd.rqconstants
+
+
+PRESSURE_RESOURCES = ('cpu', 'memory', 'io')
+MEMINFO_FIELDS = ('MemTotal', 'MemAvailable', 'SwapFree')
+VMSTAT_FIELDS = ('pgpgout', 'pswpout', 'pgmajfault')
+
+
+def readPressure(path):
+    """Parses a /proc/pressure file
+    @type  path: str
+    @param path: The pressure file
+    @rtype:  dict
+    @return: {'some': {'avg10': float, 'avg60': float, 'avg300': float,
+              'total': int}, 'full': {...}}, empty if the kernel has no PSI"""
+    pressure = {}
+    try:
+        with open(path) as pressureFile:
+            for line in pressureFile:
+                fields = line.split()
+                if not fields:
+                    continue
+                values = {}
+                for field in fields[1:]:
+                    key, _, value = field.partition('=')
+                    values[key] = int(value) if key == 'total' else float(value)
+                pressure[fields[0]] = values
+    except (IOError, OSError, ValueError):
+        return {}
+    return pressure
+
+
+def readFields(path, fields):
+    """Reads the named integer fields of a /proc file of "name value" lines,
+    such as /proc/meminfo or /proc/vmstat
+    @rtype:  dict
+    @return: {name: int}, missing fields are left out"""
+    values = {}
+    try:
+        with open(path) as procFile:
+            for line in procFile:
+                parts = line.split()
+                if len(parts) >= 2:
+                    name = parts[0].rstrip(':')
+                    if name in fields:
+                        values[name] = int(parts[1])
+    except (IOError, OSError, ValueError):
+        return {}
+    return values
+
+
+class HostHealth(object):
+    """Samples the host's pressure and memory and keeps a rolling window."""
+
+    def __init__(self, interval=None, window=None):
+        """
+        @type  interval: float
+        @param interval: Seconds between samples, defaults to RQD_HEALTH_SAMPLE_SEC
+        @type  window: float
+        @param window: Seconds of samples kept, defaults to RQD_HEALTH_WINDOW_SEC
+        """
+        self.interval = interval or rqd.rqconstants.RQD_HEALTH_SAMPLE_SEC
+        window = window or rqd.rqconstants.RQD_HEALTH_WINDOW_SEC
+        self.__samples = collections.deque(maxlen=max(int(window // self.interval), 2))
+        self.__lock = threading.Lock()
+        self.__scheduler = None
+        self.__onPressure = None
+        self.__sampleTask = None
+
+    def sample(self):
+        """Reads pressure, meminfo and vmstat once and adds them to the window
+        @rtype:  dict
+        @return: The sample, keyed like 'memory_full', 'MemAvailable', 'pgpgout'"""
+        current = {'time': time.time()}
+        for resource in PRESSURE_RESOURCES:
+            pressure = readPressure(os.path.join(rqd.rqconstants.PATH_PRESSURE, resource))
+            for kind in ('some', 'full'):
+                if kind in pressure:
+                    current['%s_%s' % (resource, kind)] = pressure[kind].get('avg10', 0.0)
+        current.update(readFields(rqd.rqconstants.PATH_MEMINFO, MEMINFO_FIELDS))
+        current.update(readFields(rqd.rqconstants.PATH_VMSTAT, VMSTAT_FIELDS))
+        with self.__lock:
+            self.__samples.append(current)
+        return current
+
+    def start(self, scheduler, onPressure=None):
+        """Samples every interval seconds on the scheduler's workers
+        @type  scheduler: rqd.rqscheduler.Scheduler
+        @param scheduler: The scheduler to sample on
+        @type  onPressure: callable
+        @param onPressure: Called after a sample while isUnderMemoryPressure()"""
+        self.__scheduler = scheduler
+        self.__onPressure = onPressure
+        self.__scheduleSample()
+
+    def stop(self):
+        """Stops sampling"""
+        if self.__sampleTask is not None:
+            self.__sampleTask.cancel()
+            self.__sampleTask = None
+        self.__scheduler = None
+
+    def __scheduleSample(self):
+        self.__sampleTask = self.__scheduler.callLater(
+            self.interval, self.__scheduler.runInWorker, self.__sampleLater)
+
+    def __sampleLater(self):
+        if self.__scheduler is None:
+            return
+        try:
+            self.sample()
+            if self.__onPressure is not None and self.isUnderMemoryPressure():
+                self.__onPressure()
+        finally:
+            if self.__scheduler is not None:
+                self.__scheduleSample()
+
+    def getLatest(self):
+        """Returns the latest sample, taking one if there is none or it is
+        older than two intervals"""
+        with self.__lock:
+            latest = self.__samples[-1] if self.__samples else None
+        if latest is None or time.time() - latest['time'] > 2 * self.interval:
+            latest = self.sample()
+        return latest
+
+    def getAverage(self, key):
+        """Returns the average of a sample value over the window"""
+        with self.__lock:
+            values = [sample[key] for sample in self.__samples if key in sample]
+        if not values:
+            return 0.0
+        return sum(values) / len(values)
+
+    def getRate(self, key, recent=False):
+        """Returns the per second rate of a vmstat counter over the window,
+        or between the last two samples if recent is True"""
+        with self.__lock:
+            samples = [sample for sample in self.__samples if key in sample]
+        if len(samples) < 2:
+            return 0.0
+        first = samples[-2] if recent else samples[0]
+        last = samples[-1]
+        elapsed = last['time'] - first['time']
+        if elapsed <= 0:
+            return 0.0
+        return max(last[key] - first[key], 0) / elapsed
+
+    def getAttributes(self):
+        """Returns the figures reported in RenderHost.attributes"""
+        with self.__lock:
+            latest = self.__samples[-1] if self.__samples else {}
+        attributes = {'swapout': str(int(self.getRate('pgpgout', recent=True)))}
+        for resource in PRESSURE_RESOURCES:
+            for kind in ('some', 'full'):
+                key = '%s_%s' % (resource, kind)
+                if key in latest:
+                    attributes['psi%s%s' % (resource.capitalize(), kind.capitalize())] = \
+                        '%.2f' % latest[key]
+        if 'MemAvailable' in latest:
+            attributes['memAvailable'] = str(latest['MemAvailable'])
+        return attributes
+
+    def checkAdmission(self, memoryKb=0):
+        """Returns why a frame should not be launched now, or None
+        @type  memoryKb: int
+        @param memoryKb: The memory the frame reserves
+        @rtype:  str"""
+        latest = self.getLatest()
+        limits = (('cpu_some', rqd.rqconstants.RQD_ADMIT_MAX_CPU_PRESSURE),
+                  ('memory_full', rqd.rqconstants.RQD_ADMIT_MAX_MEMORY_PRESSURE),
+                  ('io_full', rqd.rqconstants.RQD_ADMIT_MAX_IO_PRESSURE))
+        for key, limit in limits:
+            if limit and latest.get(key, 0.0) > limit:
+                return '%s pressure %.2f is over %s' % (key.replace('_', ' '), latest[key], limit)
+        if 'MemAvailable' in latest:
+            headroom = latest['MemAvailable'] - memoryKb
+            if headroom < rqd.rqconstants.RQD_ADMIT_MIN_HEADROOM_KB:
+                return 'only %d kB of memory would remain available' % headroom
+        return None
+
+    def isUnderMemoryPressure(self):
+        """Returns True when the host is close to running out of memory"""
+        with self.__lock:
+            latest = self.__samples[-1] if self.__samples else {}
+        if latest.get('memory_full', 0.0) >= rqd.rqconstants.RQD_OOM_GUARD_MEMORY_PRESSURE:
+            return True
+        return latest.get('MemAvailable', float('inf')) < \
+            rqd.rqconstants.RQD_OOM_GUARD_MIN_AVAILABLE_KB
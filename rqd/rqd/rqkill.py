@@ -0,0 +1,161 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Killing of running frames.
+
+Frames are signalled in batches, every process group of a batch under a single
+switch to root. With RQD_KILL_GRACE_SEC set a frame is sent
+RQD_KILL_TERM_SIGNAL first so the renderer can write a checkpoint, and
+KILL_SIGNAL once the grace period has passed. Waiting for frames to exit is
+woken by the frames leaving the rqd frame cache instead of polling.
+"""
+
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from builtins import object
+import logging as log
+import os
+import platform
+import subprocess
+import threading
+import time
+
+import rqd.rqconstants
+import rqd.rqutil
+
+
+class KillManager(object):
+    """Signals frames, escalates to KILL_SIGNAL and tracks how long frames
+    take to exit once killed."""
+
+    def __init__(self, rqCore, grace=None):
+        """
+        @type  rqCore: rqd.rqcore.RqCore
+        @param rqCore: Main RQD Object
+        @type  grace: float
+        @param grace: Seconds between the first signal and KILL_SIGNAL,
+                      defaults to RQD_KILL_GRACE_SEC, 0 to kill right away
+        """
+        self.rqCore = rqCore
+        self.grace = rqd.rqconstants.RQD_KILL_GRACE_SEC if grace is None else grace
+        self.latency = rqd.rqutil.LatencyTracker()
+        self.__exited = threading.Condition()
+        # frameId: [time of the first signal, True once KILL_SIGNAL was sent]
+        self.__killing = {}
+
+    def killFrames(self, frames, message=""):
+        """Kills frames, frames that are not ready to be signalled are handed
+        to RunningFrame.kill
+        @type  frames: list
+        @param frames: rqd.rqnetwork.RunningFrame objects
+        @type  message: str
+        @param message: The reason, kept on each frame as its killMessage"""
+        ready = []
+        for frame in frames:
+            if (frame.frameAttendantThread is not None and frame.pid is not None
+                    and frame.frameAttendantThread.isAlive()):
+                ready.append(frame)
+            else:
+                frame.kill(message)
+        self.signalFrames(ready, message)
+
+    def signalFrames(self, frames, message=""):
+        """Sends the first signal to frames that have not been signalled yet,
+        and KILL_SIGNAL to frames signalled more than grace seconds ago
+        @type  frames: list
+        @param frames: rqd.rqnetwork.RunningFrame objects with a pid"""
+        term, kill = [], []
+        now = time.time()
+        with self.__exited:
+            for frame in frames:
+                if not frame.killMessage and message:
+                    frame.killMessage = message
+                state = self.__killing.get(frame.frameId)
+                if state is None:
+                    self.__killing[frame.frameId] = [now, not self.grace]
+                    (term if self.grace else kill).append(frame)
+                elif state[1] or now - state[0] >= self.grace:
+                    state[1] = True
+                    kill.append(frame)
+        if term:
+            self.__signal(term, rqd.rqconstants.RQD_KILL_TERM_SIGNAL)
+            scheduler = self.rqCore.scheduler
+            scheduler.callLater(self.grace, scheduler.runInWorker, self.escalate, term)
+        if kill:
+            self.__signal(kill, rqd.rqconstants.KILL_SIGNAL)
+
+    def escalate(self, frames):
+        """Sends KILL_SIGNAL to the frames that are still running"""
+        with self.__exited:
+            frames = [frame for frame in frames if frame.frameId in self.__killing]
+            for frame in frames:
+                self.__killing[frame.frameId][1] = True
+        if frames:
+            log.warning("Frames still running %s seconds after being signalled: %s"
+                        % (self.grace, ",".join(frame.frameId for frame in frames)))
+            self.__signal(frames, rqd.rqconstants.KILL_SIGNAL)
+
+    @staticmethod
+    def __signal(frames, signalNum):
+        """Signals the process group of each frame with one switch to root"""
+        rqd.rqutil.permissionsHigh()
+        try:
+            for frame in frames:
+                try:
+                    if platform.system() == "Windows":
+                        subprocess.Popen('taskkill /F /T /PID %i' % frame.pid, shell=True)
+                    else:
+                        os.killpg(frame.pid, signalNum)
+                except OSError as e:
+                    log.warning("kill() tried to kill a non-existant pid for: %s "
+                                "Error: %s" % (frame.frameId, e))
+                except Exception as e:
+                    log.warning("kill() encountered an unknown error: %s" % e)
+        finally:
+            rqd.rqutil.permissionsLow()
+
+    def frameExited(self, frameId):
+        """Called when a frame leaves the frame cache, wakes up waitForExit"""
+        with self.__exited:
+            state = self.__killing.pop(frameId, None)
+            self.__exited.notify_all()
+        if state is not None:
+            seconds = time.time() - state[0]
+            self.latency.record(seconds)
+            log.info("Frame %s exited %.2f seconds after being killed" % (frameId, seconds))
+
+    def waitForExit(self, frameIds, timeout):
+        """Waits until none of the frames are running or timeout seconds pass
+        @type  frameIds: list
+        @param frameIds: The frames to wait for
+        @rtype:  bool
+        @return: True if all the frames exited"""
+        deadline = time.time() + timeout
+        with self.__exited:
+            while True:
+                running = set(frameIds) & set(self.rqCore.getFrameKeys())
+                remaining = deadline - time.time()
+                if not running or remaining <= 0:
+                    return not running
+                self.__exited.wait(remaining)
+
+    def getStats(self):
+        """Returns the kill to exit latency of killed frames in milliseconds,
+        see rqd.rqutil.LatencyTracker.summary"""
+        return self.latency.summary()
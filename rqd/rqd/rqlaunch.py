@@ -0,0 +1,122 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Filesystem and user setup done before a frame is launched.
+
+A busy host is often booked many frames of the same job at once, all with the
+same user and log directory. The results of checking the log directory and
+the user are cached for RQD_LAUNCH_CACHE_SEC so only the first of those
+launches pays for the round trips to the file server, and at most
+RQD_LAUNCH_PREP_WORKERS launches prepare at the same time.
+"""
+
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from builtins import object
+import os
+import threading
+
+import rqd.rqconstants
+import rqd.rqutil
+
+
+def prepareLogDir(logDir):
+    """Creates the log directory if it is missing and checks it can be written
+    with the current effective user.
+    @type  logDir: str
+    @param logDir: The frame's log directory"""
+    if not os.access(logDir, os.F_OK):
+        # Attempting mkdir for missing logdir
+        msg = "No Error"
+        try:
+            os.makedirs(logDir)
+            os.chmod(logDir, 0o777)
+        except Exception as e:
+            # This is expected to fail when called in abq
+            # But the directory should now be visible
+            msg = e
+
+        if not os.access(logDir, os.F_OK):
+            err = "Unable to see log directory: %s, mkdir failed with: %s" % (logDir, msg)
+            raise RuntimeError(err)
+
+    if not os.access(logDir, os.W_OK):
+        err = "Unable to write to log directory %s" % logDir
+        raise RuntimeError(err)
+    return True
+
+
+def prepareUser(userName):
+    """Creates the user if it does not exist on this host
+    @type  userName: str
+    @param userName: The frame's user"""
+    rqd.rqutil.permissionsHigh()
+    try:
+        rqd.rqutil.checkAndCreateUser(userName)
+    finally:
+        rqd.rqutil.permissionsLow()
+    return True
+
+
+class LaunchPrep(object):
+    """Bounds and caches the setup of frame launches, and measures how long
+    launches take."""
+
+    def __init__(self, workers=None, ttl=None):
+        """
+        @type  workers: int
+        @param workers: Launches preparing at once, defaults to RQD_LAUNCH_PREP_WORKERS
+        @type  ttl: float
+        @param ttl: Seconds setup results are reused, defaults to RQD_LAUNCH_CACHE_SEC
+        """
+        ttl = ttl or rqd.rqconstants.RQD_LAUNCH_CACHE_SEC
+        self.slots = threading.BoundedSemaphore(
+            workers or rqd.rqconstants.RQD_LAUNCH_PREP_WORKERS)
+        self.logDirs = rqd.rqutil.TtlCache(ttl)
+        self.users = rqd.rqutil.TtlCache(ttl)
+        self.waitLatency = rqd.rqutil.LatencyTracker()
+        self.prepLatency = rqd.rqutil.LatencyTracker()
+        self.launchLatency = rqd.rqutil.LatencyTracker()
+
+    def prepareLogDir(self, logDir, uid=None):
+        """Checks the log directory once per uid within the cache ttl"""
+        self.logDirs.get((logDir, uid), lambda: prepareLogDir(logDir))
+
+    def forgetLogDir(self, logDir, uid=None):
+        """Checks the log directory again on the next launch, for instance
+        after a log in it could not be opened"""
+        self.logDirs.invalidate((logDir, uid))
+
+    def prepareUser(self, userName):
+        """Creates the user once within the cache ttl"""
+        self.users.get(userName, lambda: prepareUser(userName))
+
+    def getStats(self):
+        """Returns launch latencies in milliseconds and cache counters
+        @rtype:  dict
+        @return: {'launch': {...}, 'wait': {...}, 'prep': {...},
+                  'log_dirs': {...}, 'users': {...}}, see
+                  rqd.rqutil.LatencyTracker.summary and TtlCache.stats"""
+        return {
+            'launch': self.launchLatency.summary(),
+            'wait': self.waitLatency.summary(),
+            'prep': self.prepLatency.summary(),
+            'log_dirs': self.logDirs.stats(),
+            'users': self.users.stats(),
+        }
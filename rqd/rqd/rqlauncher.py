@@ -0,0 +1,536 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Warm launcher processes that start frames for rqd.
+
+Launching a frame from rqd forks the whole rqd process and switches to the
+frame's user, which looks up the user's groups, often over the network.
+With RQD_WARM_LAUNCHER, rqd instead keeps one small launcher process per
+recent user, started once as that user. A launch sends the command, its
+environment and the frame's log descriptor to the user's launcher, which
+forks and execs the frame and reports back its pid, and later its exit
+status and resource usage.
+
+The launcher is a fresh interpreter rather than a fork of rqd, so it holds
+none of rqd's threads or locks. Frames started by a launcher are its
+children, not rqd's, so they are watched with LaunchedProcess.watch rather
+than rqd.rqscheduler.Scheduler.watchChild. If a launcher dies, its frames keep
+running and are watched with rqd.rqscheduler.Scheduler.watchProcess until
+they exit, without their exit status.
+
+This module is run in launcher processes and must not import other rqd modules.
+"""
+
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from builtins import object
+import argparse
+import array
+import collections
+import fcntl
+import itertools
+import json
+import logging as log
+import os
+import pwd
+import select
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+
+MAX_MESSAGE = 1 << 20
+EXIT_LAUNCH_FAILED = 127
+PATH_PROC = '/proc'
+
+Rusage = collections.namedtuple('Rusage', ('ru_utime', 'ru_stime', 'ru_maxrss'))
+
+
+def sendMessage(sock, message, fds=()):
+    """Sends one json message, and optionally file descriptors, over a
+    SOCK_SEQPACKET socket"""
+    ancillary = []
+    if fds:
+        ancillary = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', fds))]
+    sock.sendmsg([json.dumps(message).encode('utf-8')], ancillary)
+
+
+def recvMessage(sock):
+    """Receives one message sent by sendMessage
+    @rtype:  tuple
+    @return: (message or None once the peer has closed, list of received fds)"""
+    fds = array.array('i')
+    data, ancillary, _, _ = sock.recvmsg(MAX_MESSAGE, socket.CMSG_SPACE(4 * fds.itemsize))
+    for level, kind, cdata in ancillary:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(cdata[:len(cdata) - len(cdata) % fds.itemsize])
+    if not data:
+        return None, list(fds)
+    return json.loads(data.decode('utf-8')), list(fds)
+
+
+def getParentAndSession(pid):
+    """Returns the parent pid and session id of a process, None once it has
+    been reaped
+    @rtype:  tuple
+    @return: (parent pid, session id) or None"""
+    try:
+        with open(os.path.join(PATH_PROC, str(pid), 'stat')) as statFile:
+            # The fields after the command, which is in parentheses, start
+            # with the state, parent, process group and session.
+            fields = statFile.read().rsplit(')', 1)[1].split()
+        return int(fields[1]), int(fields[3])
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+
+
+def execFrame(request, outputFd, readyFd):
+    """Runs in the forked frame process, never returns. readyFd is closed
+    once the process leads its own session."""
+    try:
+        os.setsid()
+        os.close(readyFd)
+        if request.get('nice'):
+            os.nice(request['nice'])
+        if request.get('cpus'):
+            os.sched_setaffinity(0, request['cpus'])
+        os.chdir(request['cwd'])
+        nullFd = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(nullFd, 0)
+        os.dup2(outputFd, 1)
+        os.dup2(outputFd, 2)
+        os.closerange(3, os.sysconf('SC_OPEN_MAX'))
+        os.execvpe(request['argv'][0], request['argv'], request['env'])
+    except BaseException as e:
+        try:
+            os.write(2, ('Unable to launch frame: %s\n' % e).encode('utf-8'))
+        finally:
+            os._exit(EXIT_LAUNCH_FAILED)
+
+
+class LauncherServer(object):
+    """The loop of a launcher process. Starts a frame for every request and
+    reports the exit of every frame it started."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.running = set()
+        # Frames rqd has not yet checked are left unreaped, so their pids
+        # can not be reused until rqd claims or kills them.
+        self.unclaimed = set()
+
+    def serve(self):
+        """Serves requests until rqd closes its end of the socket"""
+        wakeupRead, wakeupWrite = os.pipe()
+        for fd in (wakeupRead, wakeupWrite):
+            fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+        signal.set_wakeup_fd(wakeupWrite)
+        signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+        try:
+            while True:
+                readable, _, _ = select.select([self.sock, wakeupRead], [], [])
+                if wakeupRead in readable:
+                    try:
+                        while os.read(wakeupRead, 4096):
+                            pass
+                    except OSError:
+                        pass
+                    self.reap()
+                if self.sock in readable:
+                    request, fds = recvMessage(self.sock)
+                    if request is None:
+                        return
+                    if 'claim' in request:
+                        self.unclaimed.discard(request['claim'])
+                        self.reap()
+                    elif 'kill' in request:
+                        self.kill(request['kill'])
+                        self.reap()
+                    else:
+                        self.launch(request, fds)
+        except (IOError, OSError) as e:
+            # rqd has gone away, its frames carry on without the launcher.
+            print('rqd launcher exiting: %s' % e, file=sys.stderr)
+
+    def launch(self, request, fds):
+        """Forks and execs one frame, replying once the frame leads its own
+        session so rqd can check it"""
+        readyRead, readyWrite = os.pipe()
+        try:
+            pid = os.fork()
+        except OSError as e:
+            for fd in fds + [readyRead, readyWrite]:
+                os.close(fd)
+            sendMessage(self.sock, {'id': request['id'], 'error': str(e)})
+            return
+        if pid == 0:
+            os.close(readyRead)
+            execFrame(request, fds[0], readyWrite)
+        os.close(readyWrite)
+        for fd in fds:
+            os.close(fd)
+        try:
+            # Returns at end of file, once the frame has closed its end.
+            os.read(readyRead, 1)
+        finally:
+            os.close(readyRead)
+        self.running.add(pid)
+        self.unclaimed.add(pid)
+        sendMessage(self.sock, {'id': request['id'], 'pid': pid})
+
+    def kill(self, pid):
+        """Kills a frame rqd is not tracking"""
+        if pid in self.running:
+            self.unclaimed.discard(pid)
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+    def reap(self):
+        """Reports the claimed frames that have exited"""
+        for pid in list(self.running - self.unclaimed):
+            try:
+                pid, status, rusage = os.wait4(pid, os.WNOHANG)
+            except ChildProcessError:
+                self.running.discard(pid)
+                continue
+            if not pid:
+                continue
+            self.running.discard(pid)
+            sendMessage(self.sock, {'exited': pid, 'status': status,
+                                    'utime': rusage.ru_utime, 'stime': rusage.ru_stime,
+                                    'maxrss': rusage.ru_maxrss})
+
+
+def _call(func, *args, **kwargs):
+    return func(*args, **kwargs)
+
+
+def getUserArgs(user):
+    """Returns the subprocess.Popen arguments that start a launcher as its
+    user, nothing when rqd already runs as the user. The groups are looked up
+    here, since the forked child of the threaded rqd must not make NSS calls.
+    @type  user: pwd.struct_passwd
+    @param user: The user frames are launched as
+    @rtype:  dict
+    @return: The user, group and extra_groups for subprocess.Popen"""
+    if os.getuid() == user.pw_uid:
+        return {}
+    return {'user': user.pw_uid,
+            'group': user.pw_gid,
+            'extra_groups': os.getgrouplist(user.pw_name, user.pw_gid)}
+
+
+class LaunchedProcess(object):
+    """A frame started by a launcher, in place of the subprocess.Popen of a
+    frame started by rqd itself"""
+
+    def __init__(self, launcher, pid):
+        self.launcher = launcher
+        self.pid = pid
+        self.returncode = None
+
+    def watch(self, callback):
+        """Calls callback(pid, status, rusage) on the scheduler once the frame
+        has exited. status and rusage are None if the launcher went away
+        before the frame exited."""
+        self.launcher.watch(self.pid, callback)
+
+
+class Launcher(object):
+    """A launcher process running as one user, seen from rqd. Thread safe."""
+
+    def __init__(self, userName, scheduler, timeout=30, runAsRoot=None):
+        """Starts the launcher
+        @type  userName: str
+        @param userName: The user frames are launched as
+        @type  scheduler: rqd.rqscheduler.Scheduler
+        @param scheduler: The loop the launcher's replies are read on
+        @type  timeout: float
+        @param timeout: Seconds to wait for the launcher to start a frame
+        @type  runAsRoot: callable
+        @param runAsRoot: Called as runAsRoot(func, *args, **kwargs) to start
+                          the launcher process as root, which it needs unless
+                          rqd runs as the user. None calls func directly
+        """
+        self.userName = userName
+        self.scheduler = scheduler
+        self.timeout = timeout
+        self.lastUsed = time.time()
+        self.closed = False
+        self.__lock = threading.Lock()
+        self.__ids = itertools.count()
+        # request id: (event, reply)
+        self.__pending = {}
+        # pid: callback
+        self.__watchers = {}
+        # pid: (status, rusage) of frames that exited before they were watched
+        self.__exits = {}
+        self.__running = set()
+
+        user = pwd.getpwnam(userName)
+        self.__sock, childSock = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            self.process = (runAsRoot or _call)(
+                subprocess.Popen,
+                [sys.executable, '-m', 'rqd.rqlauncher', str(childSock.fileno())],
+                cwd='/', stdin=subprocess.DEVNULL, close_fds=True, start_new_session=True,
+                pass_fds=(childSock.fileno(),), **getUserArgs(user))
+        except Exception:
+            self.__sock.close()
+            raise
+        finally:
+            childSock.close()
+        scheduler.addReader(self.__sock, self.__onReadable)
+        scheduler.watchChild(self.process.pid, self.__onLauncherExit)
+
+    def isIdle(self):
+        """Returns True if none of the launcher's frames are running"""
+        with self.__lock:
+            return not self.__running and not self.__pending
+
+    def launch(self, argv, env, cwd, outputFd, niceness=0, cpus=None):
+        """Starts a frame and waits for its pid
+        @type  argv: list
+        @param argv: The command, the first item is looked up in env's PATH
+        @type  env: dict
+        @param env: The frame's environment
+        @type  cwd: str
+        @param cwd: The frame's working directory
+        @type  outputFd: int
+        @param outputFd: Where the frame's stdout and stderr are written
+        @type  niceness: int
+        @param niceness: Added to the frame's niceness
+        @type  cpus: list
+        @param cpus: The cpus the frame may run on, None for all
+        @rtype:  LaunchedProcess
+        @return: The started frame"""
+        event = threading.Event()
+        reply = {}
+        with self.__lock:
+            if self.closed:
+                raise RuntimeError('The launcher of %s has exited' % self.userName)
+            requestId = next(self.__ids)
+            self.__pending[requestId] = (event, reply)
+        try:
+            sendMessage(self.__sock, {'id': requestId, 'argv': argv, 'env': env, 'cwd': cwd,
+                                      'nice': niceness, 'cpus': list(cpus or ())},
+                        [outputFd])
+            if not event.wait(self.timeout):
+                raise RuntimeError('The launcher of %s did not reply within %ss'
+                                   % (self.userName, self.timeout))
+        finally:
+            with self.__lock:
+                self.__pending.pop(requestId, None)
+        if 'pid' not in reply:
+            raise RuntimeError('The launcher of %s failed to start the frame: %s'
+                               % (self.userName, reply.get('error', 'the launcher exited')))
+        self.lastUsed = time.time()
+        return LaunchedProcess(self, reply['pid'])
+
+    def watch(self, pid, callback):
+        """See LaunchedProcess.watch"""
+        with self.__lock:
+            if pid not in self.__exits:
+                self.__watchers[pid] = callback
+                return
+            status, rusage = self.__exits.pop(pid)
+        self.scheduler.callSoon(callback, pid, status, rusage)
+
+    def __onReadable(self, sock):
+        try:
+            message, fds = recvMessage(sock)
+        except (IOError, OSError):
+            message, fds = None, []
+        for fd in fds:
+            os.close(fd)
+        if message is None:
+            self.__onClosed()
+        elif 'exited' in message:
+            with self.__lock:
+                known = message['exited'] in self.__running
+            # The launcher runs as the frame's user, only its own frames count.
+            if known:
+                self.__onFrameExit(message['exited'], message['status'],
+                                   Rusage(message['utime'], message['stime'], message['maxrss']))
+        else:
+            self.__onReply(message)
+
+    def __onReply(self, message):
+        """Hands a launch reply to the waiting launch. A reported pid is only
+        accepted for a session leader the launcher started, since rqd later
+        signals its process group as root."""
+        pid = message.get('pid')
+        if pid is not None and not self.__isOwnFrame(pid):
+            log.warning('The launcher of %s reported pid %s, which is not a frame it started'
+                        % (self.userName, pid))
+            message = {'id': message['id'],
+                       'error': 'reported pid %s, which is not a frame it started' % pid}
+            pid = None
+        with self.__lock:
+            event, reply = self.__pending.get(message['id'], (None, None))
+            if event is not None:
+                reply.update(message)
+                if pid is not None:
+                    self.__running.add(pid)
+                event.set()
+        if pid is None:
+            return
+        if event is None:
+            # The launch timed out, rqd does not track the frame.
+            log.warning('Killing frame %s of %s, it started after its launch timed out'
+                        % (pid, self.userName))
+        try:
+            sendMessage(self.__sock, {'claim' if event is not None else 'kill': pid})
+        except (IOError, OSError):
+            pass
+
+    def __isOwnFrame(self, pid):
+        """The launcher leaves the frame unreaped until it is claimed, so its
+        pid can not have been reused"""
+        parentAndSession = getParentAndSession(pid)
+        return parentAndSession == (self.process.pid, pid)
+
+    def __onFrameExit(self, pid, status, rusage):
+        self.lastUsed = time.time()
+        with self.__lock:
+            self.__running.discard(pid)
+            callback = self.__watchers.pop(pid, None)
+            if callback is None:
+                self.__exits[pid] = (status, rusage)
+                return
+        callback(pid, status, rusage)
+
+    def __onClosed(self):
+        """The launcher has exited, its frames are watched until they exit
+        but their exit status can no longer be seen"""
+        self.scheduler.removeReader(self.__sock)
+        with self.__lock:
+            self.closed = True
+            running = list(self.__running)
+            for event, _ in self.__pending.values():
+                event.set()
+        self.__sock.close()
+        if running:
+            log.warning('The launcher of %s exited while %d frames were running, '
+                        'watching them until they exit' % (self.userName, len(running)))
+        for pid in running:
+            self.scheduler.watchProcess(pid, self.__onOrphanExit)
+
+    def __onOrphanExit(self, pid):
+        self.__onFrameExit(pid, None, None)
+
+    def __onLauncherExit(self, pid, status, rusage):
+        if status:
+            log.warning('The launcher of %s exited with status %s' % (self.userName, status))
+
+    def close(self):
+        """Asks the launcher to exit, frames still running are not affected"""
+        try:
+            self.__sock.shutdown(socket.SHUT_RDWR)
+        except (IOError, OSError):
+            pass
+
+
+class LauncherPool(object):
+    """The launchers of the most recently used users. Thread safe."""
+
+    def __init__(self, scheduler, maxUsers=8, idleSec=600, timeout=30, runAsRoot=None):
+        """
+        @type  scheduler: rqd.rqscheduler.Scheduler
+        @param scheduler: The loop launcher replies are read on
+        @type  maxUsers: int
+        @param maxUsers: Launchers kept for idle users, the least recently used exit first
+        @type  idleSec: float
+        @param idleSec: Launchers without running frames exit after this long
+        @type  timeout: float
+        @param timeout: Seconds to wait for a launcher to start a frame
+        @type  runAsRoot: callable
+        @param runAsRoot: Starts launcher processes as root, see Launcher
+        """
+        self.scheduler = scheduler
+        self.runAsRoot = runAsRoot
+        self.maxUsers = maxUsers
+        self.idleSec = idleSec
+        self.timeout = timeout
+        self.spawned = 0
+        self.launched = 0
+        self.__lock = threading.Lock()
+        self.__launchers = collections.OrderedDict()
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__launchers)
+
+    def launch(self, userName, argv, env, cwd, outputFd, niceness=0, cpus=None):
+        """Starts a frame through the user's launcher, starting the launcher
+        first if the user has none. Only starting a launcher runs as root.
+        @rtype:  LaunchedProcess
+        @return: The started frame, see Launcher.launch for the arguments"""
+        with self.__lock:
+            launcher = self.__launchers.pop(userName, None)
+            if launcher is None or launcher.closed:
+                launcher = Launcher(userName, self.scheduler, self.timeout, self.runAsRoot)
+                self.spawned += 1
+            launcher.lastUsed = time.time()
+            self.__launchers[userName] = launcher
+            self.__expire()
+        process = launcher.launch(argv, env, cwd, outputFd, niceness, cpus)
+        self.launched += 1
+        return process
+
+    def __expire(self):
+        """Closes launchers unused for idleSec and the least recently used
+        ones beyond maxUsers, if their frames have finished"""
+        now = time.time()
+        excess = len(self.__launchers) - self.maxUsers
+        for userName, launcher in list(self.__launchers.items()):
+            if launcher.closed:
+                del self.__launchers[userName]
+                excess -= 1
+            elif (excess > 0 or now - launcher.lastUsed > self.idleSec) and launcher.isIdle():
+                launcher.close()
+                del self.__launchers[userName]
+                excess -= 1
+
+    def getStats(self):
+        """Returns the running launchers, launchers started and frames launched"""
+        return {'launchers': len(self), 'spawned': self.spawned, 'launched': self.launched}
+
+    def close(self):
+        """Asks every launcher to exit"""
+        with self.__lock:
+            for launcher in self.__launchers.values():
+                launcher.close()
+            self.__launchers.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Starts frames for rqd, see rqd.rqlauncher.')
+    parser.add_argument('fd', type=int, help='the socket connected to rqd')
+    args = parser.parse_args()
+    LauncherServer(socket.socket(fileno=args.fd)).serve()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
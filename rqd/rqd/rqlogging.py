@@ -0,0 +1,327 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Frame log rotation and the optional buffered frame log pipeline.
+
+With RQD_LOG_PIPE set a frame writes its output into a pipe instead of the
+rqlog. rqd reads the pipe on its scheduler loop and writes the output to the
+rqlog in batches of up to RQD_LOG_BUFFER_BYTES, at least every
+RQD_LOG_FLUSH_SEC so the log can still be followed while the frame runs.
+"""
+
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from builtins import object
+import errno
+import gzip
+import logging as log
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+import rqd.rqconstants
+import rqd.rqutil
+
+
+COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+
+
+def rotateLog(path, maxFiles, compression=None, runAsync=None, uid=None, gid=None):
+    """Moves an existing log aside to the first free path.N, with N at most
+    maxFiles. The log directory is listed once instead of probing each N.
+    @type  path: str
+    @param path: The log file
+    @type  maxFiles: int
+    @param maxFiles: The highest rotation number, reused once all are taken
+    @type  compression: str
+    @param compression: 'gzip' or 'zstd' to compress the rotated log
+    @type  runAsync: callable
+    @param runAsync: Called as runAsync(func, *args) to compress in the
+                     background, compresses inline if None
+    @type  uid: int
+    @param uid: The user to compress in the background as, rqd's own user if
+                None. Inline compression runs as the caller
+    @type  gid: int
+    @param gid: The group to compress in the background as
+    @rtype:  str
+    @return: The rotated log or None if there was no log"""
+    directory, name = os.path.split(path)
+    try:
+        entries = os.listdir(directory or '.')
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            return None
+        raise
+    if name not in entries:
+        return None
+
+    pattern = re.compile(r'^%s\.(\d+)(\.gz|\.zst)?$' % re.escape(name))
+    taken = set()
+    for entry in entries:
+        match = pattern.match(entry)
+        if match:
+            taken.add(int(match.group(1)))
+    rotateCount = 1
+    while rotateCount in taken and rotateCount < maxFiles:
+        rotateCount += 1
+
+    rotated = '%s.%s' % (path, rotateCount)
+    os.rename(path, rotated)
+    if compression:
+        if runAsync is None:
+            compressLog(rotated, compression)
+        else:
+            if uid is None:
+                uid, gid = rqd.rqconstants.RQD_UID, rqd.rqconstants.RQD_GID
+            runAsync(compressLog, rotated, compression, uid, gid)
+    return rotated
+
+
+def compressLog(path, compression, uid=None, gid=None):
+    """Replaces a log with a compressed copy. Only opening the files and
+    renaming them runs as uid, so the permissions lock is not held while a
+    large log is compressed.
+    @type  path: str
+    @param path: The log file
+    @type  compression: str
+    @param compression: 'gzip' or 'zstd'
+    @type  uid: int
+    @param uid: The user to open and rename the files as, the log's owner.
+                If None the current effective user is kept
+    @type  gid: int
+    @param gid: The group to open and rename the files as"""
+    if compression not in COMPRESSION_EXTENSIONS:
+        log.warning('Unknown log compression %s, leaving %s uncompressed' % (compression, path))
+        return
+    if compression == 'zstd' and zstandard is None:
+        log.warning('zstandard is not installed, leaving %s uncompressed' % path)
+        return
+    target = path + COMPRESSION_EXTENSIONS[compression]
+    try:
+        source, dest, tempTarget = __asUser(uid, gid, __openFiles, path, target)
+    except (IOError, OSError) as e:
+        log.warning('Unable to compress %s: %s' % (path, e))
+        return
+    try:
+        with source, dest:
+            if compression == 'gzip':
+                with gzip.GzipFile(fileobj=dest, mode='wb') as compressed:
+                    shutil.copyfileobj(source, compressed)
+            else:
+                zstandard.ZstdCompressor().copy_stream(source, dest)
+        __asUser(uid, gid, __replace, path, tempTarget, target)
+    except (IOError, OSError) as e:
+        log.warning('Unable to compress %s: %s' % (path, e))
+        try:
+            __asUser(uid, gid, os.remove, tempTarget)
+        except OSError:
+            pass
+
+
+def __asUser(uid, gid, func, *args):
+    """Returns func(*args) run as uid and gid, or as the current effective
+    user if uid is None"""
+    if uid is None:
+        return func(*args)
+    rqd.rqutil.permissionsUser(uid, gid)
+    try:
+        return func(*args)
+    finally:
+        rqd.rqutil.permissionsLow()
+
+
+def __openFiles(path, target):
+    """Opens the log and a new temporary file next to the compressed target
+    @rtype:  tuple
+    @return: (source file, temporary file, temporary path)"""
+    source = open(path, 'rb')
+    try:
+        fd, tempTarget = tempfile.mkstemp(prefix='.%s.' % os.path.basename(target),
+                                          suffix='.tmp', dir=os.path.dirname(path) or os.curdir)
+        os.fchmod(fd, os.fstat(source.fileno()).st_mode & 0o777)
+    except (IOError, OSError):
+        source.close()
+        raise
+    return source, os.fdopen(fd, 'wb'), tempTarget
+
+
+def __replace(path, tempTarget, target):
+    os.rename(tempTarget, target)
+    os.remove(path)
+
+
+class FrameLogWriter(object):
+    """Copies a frame's output from a pipe into its log in batches."""
+
+    def __init__(self, logFile, scheduler, timestamps=None, maxBytes=None,
+                 bufferBytes=None, flushSec=None):
+        """
+        @type  logFile: file
+        @param logFile: The log, opened for binary writing
+        @type  scheduler: rqd.rqscheduler.Scheduler
+        @param scheduler: The loop the pipe is read on
+        @type  timestamps: bool
+        @param timestamps: Prefix each line with the time it was read,
+                           defaults to RQD_LOG_TIMESTAMP_LINES
+        @type  maxBytes: int
+        @param maxBytes: Output past this many bytes is dropped, defaults to
+                         RQD_LOG_MAX_BYTES, 0 for no limit
+        """
+        self.logFile = logFile
+        self.scheduler = scheduler
+        self.timestamps = (rqd.rqconstants.RQD_LOG_TIMESTAMP_LINES
+                           if timestamps is None else timestamps)
+        self.maxBytes = rqd.rqconstants.RQD_LOG_MAX_BYTES if maxBytes is None else maxBytes
+        self.bufferBytes = bufferBytes or rqd.rqconstants.RQD_LOG_BUFFER_BYTES
+        self.flushSec = flushSec or rqd.rqconstants.RQD_LOG_FLUSH_SEC
+        self.readFd, self.writeFd = os.pipe()
+        os.set_blocking(self.readFd, False)
+
+        self.bytesRead = 0
+        self.bytesAccepted = 0
+        self.bytesWritten = 0
+        self.writes = 0
+        self.truncated = False
+        self.__atLineStart = True
+        self.__lock = threading.Lock()
+        self.__writeLock = threading.Lock()
+        self.__pending = []
+        self.__pendingBytes = 0
+        self.__flushTask = None
+        self.__eof = threading.Event()
+
+    def start(self):
+        """Starts reading the pipe, call once the frame has been launched with
+        writeFd as its stdout and stderr"""
+        os.close(self.writeFd)
+        self.writeFd = None
+        self.scheduler.addReader(self.readFd, self.__onReadable)
+
+    def abort(self):
+        """Closes the pipe when the frame could not be launched"""
+        for fd in (self.readFd, self.writeFd):
+            if fd is not None:
+                os.close(fd)
+        self.readFd = self.writeFd = None
+        self.__eof.set()
+
+    def __onReadable(self, fd):
+        try:
+            data = os.read(fd, self.bufferBytes)
+        except (IOError, OSError) as e:
+            if e.errno in (errno.EAGAIN, errno.EINTR):
+                return
+            log.warning('Unable to read frame output: %s' % e)
+            data = b''
+        if not data:
+            self.__stopReading()
+            return
+        self.bytesRead += len(data)
+        data = self.__limit(self.__stamp(data))
+        if not data:
+            return
+        with self.__lock:
+            self.__pending.append(data)
+            self.__pendingBytes += len(data)
+            full = self.__pendingBytes >= self.bufferBytes
+        if full:
+            self.scheduler.runInWorker(self.flush)
+        elif self.__flushTask is None or not self.__flushTask.isPending():
+            self.__flushTask = self.scheduler.callLater(self.flushSec, self.scheduler.runInWorker,
+                                                        self.flush)
+
+    def __stopReading(self):
+        """Stops reading at the end of the output, runs on the loop"""
+        if self.readFd is not None:
+            self.scheduler.removeReader(self.readFd)
+            os.close(self.readFd)
+            self.readFd = None
+        self.__eof.set()
+
+    def __stamp(self, data):
+        """Prefixes the lines that start in data with the current time"""
+        if not self.timestamps:
+            return data
+        prefix = time.strftime('[%H:%M:%S] ').encode('ascii')
+        lines = data.split(b'\n')
+        stamped = []
+        for number, line in enumerate(lines):
+            last = number == len(lines) - 1
+            if last and not line:
+                break
+            if self.__atLineStart:
+                stamped.append(prefix)
+            stamped.append(line)
+            if not last:
+                stamped.append(b'\n')
+            self.__atLineStart = not last
+        return b''.join(stamped)
+
+    def __limit(self, data):
+        """Drops output past maxBytes, leaving a note in the log"""
+        if self.truncated:
+            return b''
+        if self.maxBytes and self.bytesAccepted + len(data) > self.maxBytes:
+            self.truncated = True
+            data = data[:self.maxBytes - self.bytesAccepted] + (
+                b'\n[rqd] Log output truncated at %d bytes\n' % self.maxBytes)
+        self.bytesAccepted += len(data)
+        return data
+
+    def flush(self):
+        """Writes the pending output to the log"""
+        with self.__writeLock:
+            with self.__lock:
+                chunks, self.__pending = self.__pending, []
+                self.__pendingBytes = 0
+            if not chunks:
+                return
+            data = b''.join(chunks)
+            try:
+                self.logFile.write(data)
+                self.logFile.flush()
+                self.writes += 1
+            except (IOError, OSError, ValueError) as e:
+                log.warning('Unable to write frame output: %s' % e)
+            self.bytesWritten += len(data)
+
+    def close(self, timeout=None):
+        """Waits for the end of the frame's output and writes what is left.
+        Processes left behind by the frame can hold the pipe open, reading
+        stops after timeout seconds regardless.
+        @type  timeout: float
+        @param timeout: Defaults to RQD_LOG_DRAIN_SEC"""
+        if timeout is None:
+            timeout = rqd.rqconstants.RQD_LOG_DRAIN_SEC
+        if not self.__eof.wait(timeout):
+            log.warning('Frame output is still open after %s seconds, closing the log'
+                        % timeout)
+            self.scheduler.callSoon(self.__stopReading)
+            self.__eof.wait(timeout)
+        if self.__flushTask is not None:
+            self.__flushTask.cancel()
+        self.flush()
@@ -41,9 +41,13 @@ import tempfile
 import time
 import traceback
 
+try:
+    import pynvml
+except ImportError:
+    pynvml = None
+
 if platform.system() in ('Linux', 'Darwin'):
     import resource
-    import yaml
 elif platform.system() == "win32":
     import win32process
     import win32api
@@ -52,12 +56,22 @@ import rqd.compiled_proto.host_pb2
 import rqd.compiled_proto.report_pb2
 import rqd.rqconstants
 import rqd.rqexceptions
-import rqd.rqswap
+import rqd.rqhealth
+import rqd.rqproc
+import rqd.rqstaging
+import rqd.rqtopology
 import rqd.rqutil
 
 
 KILOBYTE = 1024
 
+# Frame attributes reporting the totals and per second rates of /proc/<pid>/io counters
+IO_ATTRIBUTES = (('read_bytes', 'ioReadBytes'), ('write_bytes', 'ioWriteBytes'),
+                 ('rchar', 'ioReadChars'), ('wchar', 'ioWriteChars'),
+                 ('syscr', 'ioReadSyscalls'), ('syscw', 'ioWriteSyscalls'))
+IO_RATE_ATTRIBUTES = (('read_bytes', 'ioReadBytesPerSec'), ('write_bytes', 'ioWriteBytesPerSec'),
+                      ('rchar', 'ioReadCharsPerSec'), ('wchar', 'ioWriteCharsPerSec'))
+
 
 class Machine(object):
     """Gathers information about the machine and resources"""
@@ -70,12 +84,22 @@ class Machine(object):
         """
         self.__rqCore = rqCore
         self.__coreInfo = coreInfo
-        self.__tasksets = set()
+        self.__cpuTopology = None
+        self.__coreAllocator = None
 
-        if platform.system() == 'Linux':
-            self.__vmstat = rqd.rqswap.VmStat()
+        self.health = rqd.rqhealth.HostHealth()
+        self.facts = rqd.rqconstants.FACTS
+
+        self.staging = None
+        if rqd.rqconstants.RQD_STAGING:
+            self.staging = rqd.rqstaging.StagingCache(
+                rqd.rqconstants.RQD_STAGING_PATH or
+                os.path.join(self.getTempPath(), 'rqd-staging'),
+                minFreeKb=rqd.rqconstants.RQD_STAGING_MIN_FREE_MB * 1024,
+                maxBytes=rqd.rqconstants.RQD_STAGING_MAX_MB * 1024 * 1024)
 
         self.state = rqd.compiled_proto.host_pb2.UP
+        self.__statsTime = 0
 
         self.__renderHost = rqd.compiled_proto.report_pb2.RenderHost()
         self.__initMachineTags()
@@ -87,7 +111,8 @@ class Machine(object):
         self.__hostReport = rqd.compiled_proto.report_pb2.HostReport()
         self.__hostReport.core_info.CopyFrom(self.__coreInfo)
 
-        self.__pidHistory = {}
+        self.__procIndex = rqd.rqproc.ProcessIndex()
+        self.rssPids = 0
 
         self.setupHT()
 
@@ -181,102 +206,163 @@ class Machine(object):
         if platform.system() != 'Linux':
             return
 
-        pids = {}
-        for pid in os.listdir("/proc"):
-            if pid.isdigit():
-                try:
-                    with open("/proc/%s/stat" % pid, "r") as statFile:
-                        statFields = statFile.read().split()
-
-                    # See "man proc"
-                    pids[pid] = {
-                        "session": statFields[5],
-                        "vsize": statFields[22],
-                        "rss": statFields[23],
-                        # These are needed to compute the cpu used
-                        "utime": statFields[13],
-                        "stime": statFields[14],
-                        "cutime": statFields[15],
-                        "cstime": statFields[16],
-                        # The time in jiffies the process started
-                        # after system boot.
-                        "start_time": statFields[21],
-                    }
-
-                except Exception as e:
-                    log.exception('failed to read stat file for pid %s' % pid)
-
         try:
             now = int(time.time())
-            pidData = {"time": now}
             bootTime = self.getBootTime()
 
-            values = list(frames.values())
-
-            for frame in values:
-                if frame.pid > 0:
-                    session = str(frame.pid)
-                    rss = 0
-                    vsize = 0
-                    pcpu = 0
-                    if rqd.rqconstants.ENABLE_PTREE:
-                        ptree = []
-                    for pid, data in pids.items():
-                        if data["session"] == session:
-                            try:
-                                rss += int(data["rss"])
-                                vsize += int(data["vsize"])
-
-                                # jiffies used by this process, last two means that dead children are counted
-                                totalTime = int(data["utime"]) + \
-                                            int(data["stime"]) + \
-                                            int(data["cutime"]) + \
-                                            int(data["cstime"])
-
-                                # Seconds of process life, boot time is already in seconds
-                                seconds = now - bootTime - \
-                                          float(data["start_time"]) / rqd.rqconstants.SYS_HERTZ
-                                if seconds:
-                                    if pid in self.__pidHistory:
-                                        # Percent cpu using decaying average, 50% from 10 seconds ago, 50% from last 10 seconds:
-                                        oldTotalTime, oldSeconds, oldPidPcpu = self.__pidHistory[pid]
-                                        #checking if already updated data
-                                        if seconds != oldSeconds:
-                                            pidPcpu = (totalTime - oldTotalTime) / float(seconds - oldSeconds)
-                                            pcpu += (oldPidPcpu + pidPcpu) / 2 # %cpu
-                                            pidData[pid] = totalTime, seconds, pidPcpu
-                                    else:
-                                        pidPcpu = totalTime / seconds
-                                        pcpu += pidPcpu
-                                        pidData[pid] = totalTime, seconds, pidPcpu
-
-                                if rqd.rqconstants.ENABLE_PTREE:
-                                    ptree.append({"pid": pid, "seconds": seconds, "total_time": totalTime})
-                            except Exception as e:
-                                log.warning('Failure with pid rss update due to: %s at %s' % \
-                                            (e, traceback.extract_tb(sys.exc_info()[2])))
-
-                    rss = (rss * resource.getpagesize()) // 1024
-                    vsize = int(vsize/1024)
-
-                    frame.rss = rss
-                    frame.maxRss = max(rss, frame.maxRss)
-
-                    frame.vsize = vsize
-                    frame.maxVsize = max(vsize, frame.maxVsize)
-
-                    frame.runFrame.attributes["pcpu"] = str(pcpu)
-
-                    if rqd.rqconstants.ENABLE_PTREE:
-                        frame.runFrame.attributes["ptree"] = str(yaml.load("list: %s" % ptree,
-                                                                           Loader=yaml.SafeLoader))
-
-            # Store the current data for the next check
-            self.__pidHistory = pidData
+            # (frame, pids, pcpu, threads) of each frame that was sampled
+            samples = []
+
+            # The session id of every process in a frame is the frame's pid.
+            sessions = {}
+            for frame in list(frames.values()):
+                if frame.cgroup is not None:
+                    sample = self.__cgroupUpdate(frame)
+                    if sample is not None:
+                        samples.append((frame,) + sample)
+                elif frame.pid is not None and frame.pid > 0:
+                    sessions[frame.pid] = frame
+
+            procs = self.__procIndex.update(sessions)
+            self.rssPids = sum(len(procs.get(session, ())) for session in sessions)
+
+            for session, frame in sessions.items():
+                rss = 0
+                vsize = 0
+                pcpu = 0
+                threads = 0
+                if rqd.rqconstants.ENABLE_PTREE:
+                    ptree = []
+                for stat in procs.get(session, ()):
+                    try:
+                        rss += stat.rss
+                        vsize += stat.vsize
+                        threads += stat.numThreads
+
+                        # Seconds of process life, boot time is already in seconds
+                        seconds = now - bootTime - \
+                                  float(stat.startTime) / rqd.rqconstants.SYS_HERTZ
+                        if seconds:
+                            if stat.lastSeconds is not None:
+                                # Percent cpu using decaying average, 50% from 10 seconds ago, 50% from last 10 seconds:
+                                #checking if already updated data
+                                if seconds != stat.lastSeconds:
+                                    pidPcpu = (stat.totalTime - stat.lastTotalTime) / \
+                                              float(seconds - stat.lastSeconds)
+                                    pcpu += (stat.lastPcpu + pidPcpu) / 2 # %cpu
+                                    stat.lastTotalTime, stat.lastSeconds, stat.lastPcpu = \
+                                        stat.totalTime, seconds, pidPcpu
+                            else:
+                                pidPcpu = stat.totalTime / seconds
+                                pcpu += pidPcpu
+                                stat.lastTotalTime, stat.lastSeconds, stat.lastPcpu = \
+                                    stat.totalTime, seconds, pidPcpu
+
+                        if rqd.rqconstants.ENABLE_PTREE:
+                            ptree.append({"pid": str(stat.pid), "seconds": seconds,
+                                          "total_time": stat.totalTime})
+                    except Exception as e:
+                        log.warning('Failure with pid rss update due to: %s at %s' % \
+                                    (e, traceback.extract_tb(sys.exc_info()[2])))
+
+                rss = (rss * resource.getpagesize()) // 1024
+                vsize = int(vsize/1024)
+
+                frame.rss = rss
+                frame.maxRss = max(rss, frame.maxRss)
+
+                frame.vsize = vsize
+                frame.maxVsize = max(vsize, frame.maxVsize)
+
+                frame.runFrame.attributes["pcpu"] = str(pcpu)
+
+                if rqd.rqconstants.ENABLE_PTREE:
+                    frame.runFrame.attributes["ptree"] = str({"list": ptree})
+
+                samples.append((frame, [stat.pid for stat in procs.get(session, ())],
+                                pcpu, threads))
+
+            if rqd.rqconstants.RQD_IO_ACCOUNTING and samples:
+                self.__ioUpdate(samples, now)
+
+            for frame, _, pcpu, threads in samples:
+                if frame.profile is not None:
+                    io = frame.io.totals if frame.io is not None else {}
+                    frame.profile.record(now, frame.rss, pcpu, io.get('read_bytes', 0),
+                                         io.get('write_bytes', 0), threads)
 
         except Exception as e:
             log.exception('Failure with rss update due to: {0}'.format(e))
 
+    @staticmethod
+    def __ioUpdate(samples, now):
+        """Updates the io counters and rates of the frames from /proc/<pid>/io,
+        which is only readable as root for processes of other users. Only
+        the processes of the frames are read, under one switch to root.
+        @type  samples: list
+        @param samples: (frame, pids, ...) of each frame"""
+        sums = []
+        rqd.rqutil.permissionsHigh()
+        try:
+            for sample in samples:
+                counters = dict.fromkeys(rqd.rqproc.IO_COUNTERS, 0)
+                for pid in sample[1]:
+                    pidCounters = rqd.rqproc.readIo(pid)
+                    if pidCounters is not None:
+                        for name in rqd.rqproc.IO_COUNTERS:
+                            counters[name] += pidCounters.get(name, 0)
+                sums.append(counters)
+        finally:
+            rqd.rqutil.permissionsLow()
+
+        for sample, counters in zip(samples, sums):
+            frame = sample[0]
+            if frame.io is None:
+                frame.io = rqd.rqproc.IoAccount()
+            frame.io.update(counters, now)
+            attributes = frame.runFrame.attributes
+            for name, attribute in IO_ATTRIBUTES:
+                attributes[attribute] = str(frame.io.totals[name])
+            for name, attribute in IO_RATE_ATTRIBUTES:
+                attributes[attribute] = str(int(frame.io.rates[name]))
+
+    def __cgroupUpdate(self, frame):
+        """Updates the memory and cpu usage of a frame from its cgroup
+        @rtype:  tuple
+        @return: (pids, pcpu, threads) of the frame, None if the cgroup is gone"""
+        try:
+            cgroup = frame.cgroup
+            frame.rss = cgroup.getRss()
+            frame.maxRss = max(frame.rss, frame.maxRss)
+
+            # Only the processes of the frame itself need to be read for vsize.
+            vsize = 0
+            threads = 0
+            pids = cgroup.getPids()
+            for pid in pids:
+                stat = rqd.rqproc.readStat(pid)
+                if stat is not None:
+                    vsize += stat.vsize
+                    threads += stat.numThreads
+            frame.vsize = vsize // 1024
+            frame.maxVsize = max(frame.vsize, frame.maxVsize)
+
+            pcpu = cgroup.getPcpu()
+            frame.runFrame.attributes["pcpu"] = str(pcpu)
+            frame.runFrame.attributes["cgroupMemoryCurrent"] = str(cgroup.getMemoryCurrent())
+            memoryPeak = cgroup.getMemoryPeak()
+            if memoryPeak is not None:
+                frame.runFrame.attributes["cgroupMemoryPeak"] = str(memoryPeak)
+            pressure = cgroup.getMemoryPressure()
+            if 'full' in pressure:
+                frame.runFrame.attributes["cgroupMemoryPressure"] = \
+                    str(pressure['full'].get('avg10', 0.0))
+            return pids, pcpu, threads
+        except (IOError, OSError) as e:
+            # The cgroup is removed as soon as the frame exits.
+            log.debug('Unable to read cgroup of frame %s: %s' % (frame.frameId, e))
+            return None
+
     def getLoadAvg(self):
         """Returns average number of processes waiting to be served
            for the last 1 minute multiplied by 100."""
@@ -321,30 +407,44 @@ class Machine(object):
             if self.gpuResults['updated'] > time.time() - 60:
                 return self.gpuResults
             try:
-                # /shots/spi/home/bin/spinux1/cudaInfo
-                # /shots/spi/home/bin/rhel7/cudaInfo
-                cudaInfo = subprocess.getoutput('/usr/local/spi/rqd3/cudaInfo')
-                if 'There is no device supporting CUDA' in cudaInfo:
+                # The total, or the lack of a CUDA device, is cached until the next boot
+                total = self.facts.get('gpu_memory_total', lambda: self.__queryGpu()[0])
+                if not total:
                     self.gpuNotSupported = True
                 else:
-                    results = cudaInfo.splitlines()[-1].split()
-                    #  TotalMem 1023 Mb  FreeMem 968 Mb
-                    # The int(math.ceil(int(x) / 32.0) * 32) rounds up to the next multiple of 32
-                    self.gpuResults['total'] = int(math.ceil(int(results[1]) / 32.0) * 32) * KILOBYTE
-                    self.gpuResults['free'] = int(results[4]) * KILOBYTE
+                    self.gpuResults['total'] = total
+                    self.gpuResults['free'] = self.__queryGpu()[1]
                     self.gpuResults['updated'] = time.time()
             except Exception as e:
                 log.warning('Failed to get FreeMem from cudaInfo due to: %s at %s' % \
                             (e, traceback.extract_tb(sys.exc_info()[2])))
         return self.gpuResults
 
-    def __getSwapout(self):
-        if platform.system() == "Linux":
+    def __queryGpu(self):
+        """Returns the total and free gpu memory in kb, (0, 0) if there is no
+        CUDA device. Uses NVML where pynvml is installed, cudaInfo otherwise."""
+        if pynvml is not None:
             try:
-                return str(int(self.__vmstat.getRecentPgoutRate()))
-            except:
-                return str(0)
-        return str(0)
+                if not getattr(self, 'nvmlInitialized', False):
+                    pynvml.nvmlInit()
+                    self.nvmlInitialized = True
+                if not pynvml.nvmlDeviceGetCount():
+                    return 0, 0
+                info = pynvml.nvmlDeviceGetMemoryInfo(pynvml.nvmlDeviceGetHandleByIndex(0))
+                return (int(math.ceil(info.total / KILOBYTE / KILOBYTE / 32.0) * 32) * KILOBYTE,
+                        info.free // KILOBYTE)
+            except pynvml.NVMLError as e:
+                log.debug('NVML is not usable, falling back to cudaInfo: %s' % e)
+        # /shots/spi/home/bin/spinux1/cudaInfo
+        # /shots/spi/home/bin/rhel7/cudaInfo
+        cudaInfo = subprocess.getoutput('/usr/local/spi/rqd3/cudaInfo')
+        if 'There is no device supporting CUDA' in cudaInfo:
+            return 0, 0
+        results = cudaInfo.splitlines()[-1].split()
+        #  TotalMem 1023 Mb  FreeMem 968 Mb
+        # The int(math.ceil(int(x) / 32.0) * 32) rounds up to the next multiple of 32
+        return (int(math.ceil(int(results[1]) / 32.0) * 32) * KILOBYTE,
+                int(results[4]) * KILOBYTE)
 
     @rqd.rqutil.Memoize
     def getTimezone(self):
@@ -403,6 +503,51 @@ class Machine(object):
         self.__initMachineStats(pathCpuInfo=pathCpuInfo)
         return self.__renderHost, self.__coreInfo
 
+    def __readCpuinfo(self, pathCpuInfo):
+        """Parses the processor blocks of a cpuinfo file
+        @rtype:  dict
+        @return: {'num_procs': int, 'total_cores': int,
+                  'hyperthreading_multiplier': int,
+                  'processors': [(processor, physical id, core id)]}"""
+        __numProcs = __totalCores = 0
+        hyperthreadingMultiplier = 1
+        with open(pathCpuInfo, "r") as cpuinfoFile:
+            singleCore = {}
+            procsFound = []
+            processors = []
+            for line in cpuinfoFile:
+                lineList = line.strip().replace("\t","").split(": ")
+                # A normal entry added to the singleCore dictionary
+                if len(lineList) >= 2:
+                    singleCore[lineList[0]] = lineList[1]
+                # The end of a processor block
+                elif lineList == ['']:
+                    # Check for hyper-threading
+                    hyperthreadingMultiplier = (int(singleCore.get('siblings', '1'))
+                                                // int(singleCore.get('cpu cores', '1')))
+
+                    __totalCores += rqd.rqconstants.CORE_VALUE
+                    processors.append((singleCore.get('processor', len(processors)),
+                                       singleCore.get('physical id'),
+                                       singleCore.get('core id')))
+                    if "core id" in singleCore \
+                       and "physical id" in singleCore \
+                       and not singleCore["physical id"] in procsFound:
+                        procsFound.append(singleCore["physical id"])
+                        __numProcs += 1
+                    elif "core id" not in singleCore:
+                        __numProcs += 1
+                    singleCore = {}
+                # An entry without data
+                elif len(lineList) == 1:
+                    singleCore[lineList[0]] = ""
+        return {
+            'num_procs': __numProcs,
+            'total_cores': __totalCores,
+            'hyperthreading_multiplier': hyperthreadingMultiplier,
+            'processors': processors,
+        }
+
     def __initMachineStats(self, pathCpuInfo=None):
         """Updates static machine information during initialization"""
         self.__renderHost.name = self.getHostname()
@@ -418,33 +563,22 @@ class Machine(object):
             mcpStat = os.statvfs(self.getTempPath())
             self.__renderHost.total_mcp = mcpStat.f_blocks * mcpStat.f_frsize // KILOBYTE
 
-            # Reads static information from /proc/cpuinfo
-            with open(pathCpuInfo or rqd.rqconstants.PATH_CPUINFO, "r") as cpuinfoFile:
-                singleCore = {}
-                procsFound = []
-                for line in cpuinfoFile:
-                    lineList = line.strip().replace("\t","").split(": ")
-                    # A normal entry added to the singleCore dictionary
-                    if len(lineList) >= 2:
-                        singleCore[lineList[0]] = lineList[1]
-                    # The end of a processor block
-                    elif lineList == ['']:
-                        # Check for hyper-threading
-                        hyperthreadingMultiplier = (int(singleCore.get('siblings', '1'))
-                                                    // int(singleCore.get('cpu cores', '1')))
-
-                        __totalCores += rqd.rqconstants.CORE_VALUE
-                        if "core id" in singleCore \
-                           and "physical id" in singleCore \
-                           and not singleCore["physical id"] in procsFound:
-                            procsFound.append(singleCore["physical id"])
-                            __numProcs += 1
-                        elif "core id" not in singleCore:
-                            __numProcs += 1
-                        singleCore = {}
-                    # An entry without data
-                    elif len(lineList) == 1:
-                        singleCore[lineList[0]] = ""
+            # Reads static information from /proc/cpuinfo, cached until the next boot
+            if pathCpuInfo is None:
+                cpuinfo = self.facts.get('cpuinfo', lambda: self.__readCpuinfo(
+                    rqd.rqconstants.PATH_CPUINFO))
+            else:
+                cpuinfo = self.__readCpuinfo(pathCpuInfo)
+            __numProcs = cpuinfo['num_procs']
+            __totalCores = cpuinfo['total_cores']
+            hyperthreadingMultiplier = cpuinfo['hyperthreading_multiplier']
+            processors = cpuinfo['processors']
+
+            self.__cpuTopology = rqd.rqtopology.CpuTopology.fromCpuinfo(processors)
+            if pathCpuInfo is None:
+                numaNodes = rqd.rqtopology.readNumaNodes()
+                if len(numaNodes) > 1:
+                    self.__cpuTopology.applyNumaNodes(numaNodes)
         else:
             hyperthreadingMultiplier = 1
 
@@ -569,7 +703,9 @@ class Machine(object):
             self.__renderHost.free_swap = freeSwapMem
             self.__renderHost.free_mem = freeMem + cachedMem
             self.__renderHost.attributes['freeGpu'] = str(self.getGpuMemory())
-            self.__renderHost.attributes['swapout'] = self.__getSwapout()
+            self.__renderHost.attributes.update(self.health.getAttributes())
+            if self.staging is not None:
+                self.__renderHost.attributes.update(self.staging.getAttributes())
 
         elif platform.system() == 'Darwin':
             self.updateMacMemory()
@@ -583,13 +719,24 @@ class Machine(object):
 
         # Updates dynamic information
         self.__renderHost.load = self.getLoadAvg()
+        self.__updateHostState()
+        self.__statsTime = time.time()
+
+    def __updateHostState(self):
+        """Updates the fields that rqd itself changes"""
         self.__renderHost.nimby_enabled = self.__rqCore.nimby.active
         self.__renderHost.nimby_locked = self.__rqCore.nimby.locked
         self.__renderHost.state = self.state
 
     def getHostInfo(self):
-        """Updates and returns the renderHost struct"""
-        self.updateMachineStats()
+        """Updates and returns the renderHost struct. Machine stats are read at
+        most every RQD_HOST_STATS_MIN_INTERVAL_SEC, so a burst of frame
+        completion reports does not re-read them for every report."""
+        sinceUpdate = time.time() - self.__statsTime
+        if 0 <= sinceUpdate < rqd.rqconstants.RQD_HOST_STATS_MIN_INTERVAL_SEC:
+            self.__updateHostState()
+        else:
+            self.updateMachineStats()
         return self.__renderHost
 
     def getHostReport(self):
@@ -621,11 +768,20 @@ class Machine(object):
         """ Setup rqd for hyper-threading """
 
         if self.__enabledHT():
-            self.__tasksets = set(range(self.__coreInfo.total_cores // 100))
+            numCores = self.__coreInfo.total_cores // rqd.rqconstants.CORE_VALUE
+            topology = self.__cpuTopology
+            if topology is None or topology.getCoreCount() != numCores:
+                # Cores were overridden or could not be read from /proc/cpuinfo,
+                # assume the usual numbering of the hyper-threads instead.
+                topology = rqd.rqtopology.CpuTopology.fromCoreCount(
+                    numCores, int(self.__renderHost.attributes['hyperthreadingMultiplier']))
+            self.__coreAllocator = rqd.rqtopology.CoreAllocator(topology)
 
     def reserveHT(self, reservedCores):
         """ Reserve cores for use by taskset
         taskset -c 0,1,8,9 COMMAND
+        Cores are taken from a single node where possible, a fractional
+        request shares its last core with other fractional requests.
         Not thread save, use with locking.
         @type   reservedCores: int
         @param  reservedCores: The total physical cores reserved by the frame.
@@ -633,42 +789,50 @@ class Machine(object):
         @return: The cpu-list for taskset -c
         """
 
-        if not self.__enabledHT():
-            return None
-
-        if reservedCores % 100:
-            log.debug('Taskset: Can not reserveHT with fractional cores')
+        if not self.__enabledHT() or self.__coreAllocator is None:
             return None
 
-        log.debug('Taskset: Requesting reserve of %d' % (reservedCores // 100))
+        log.debug('Taskset: Requesting reserve of %.2f' % (reservedCores / 100))
 
-        if len(self.__tasksets) < reservedCores // 100:
+        try:
+            cores = self.__coreAllocator.reserve(reservedCores)
+        except rqd.rqexceptions.CoreReservationFailureException:
             err = 'Not launching, insufficient hyperthreading cores to reserve based on reservedCores'
             log.critical(err)
             raise rqd.rqexceptions.CoreReservationFailureException(err)
 
-        tasksets = []
-        for x in range(reservedCores // 100):
-            core = self.__tasksets.pop()
-            tasksets.append(str(core))
-            tasksets.append(str(core + self.__coreInfo.total_cores // 100))
+        tasksets = ','.join(
+            str(cpu) for cpu in self.__coreAllocator.topology.getCpus(cores))
 
-        log.debug('Taskset: Reserving cores - %s' % ','.join(tasksets))
+        log.debug('Taskset: Reserving cores - %s, fragmentation %s'
+                  % (tasksets, self.__coreAllocator.getFragmentation()))
 
-        return ','.join(tasksets)
+        return tasksets
 
-    def releaseHT(self, reservedHT):
+    def releaseHT(self, reservedHT, reservedCores=None):
         """ Release cores used by taskset
         Format: 0,1,8,9
         Not thread safe, use with locking.
         @type:  string
         @param: The cpu-list used for taskset to release. ex: '0,8,1,9'
+        @type   reservedCores: int
+        @param  reservedCores: The total physical cores reserved by the frame,
+                               whole cores if None.
         """
 
-        if not self.__enabledHT():
+        if not self.__enabledHT() or self.__coreAllocator is None:
             return None
 
         log.debug('Taskset: Releasing cores - %s' % reservedHT)
-        for core in reservedHT.split(','):
-            if int(core) < self.__coreInfo.total_cores // 100:
-                self.__tasksets.add(int(core))
+        cores = self.__coreAllocator.topology.getCores(
+            [int(cpu) for cpu in reservedHT.split(',')])
+        self.__coreAllocator.release(cores, reservedCores)
+
+    def getCoreFragmentation(self):
+        """Returns how scattered the free cores of each node are
+        @rtype:  dict
+        @return: See rqd.rqtopology.CoreAllocator.getFragmentation, empty
+                 when cores are not reserved with taskset"""
+        if self.__coreAllocator is None:
+            return {}
+        return self.__coreAllocator.getFragmentation()
@@ -0,0 +1,329 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Metrics of the rqd hot paths in the Prometheus text format.
+
+Counters and histograms are updated in place under a lock of their own and
+only formatted when scraped. Figures rqd already keeps, such as the cores,
+nimby state and rqd.rqutil.LatencyTracker windows, are read by collectors
+at scrape time. The HTTP endpoint is off unless RQD_METRICS_PORT is set.
+"""
+
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from builtins import object
+import bisect
+import logging as log
+import math
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+import rqd.rqconstants
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SUMMARY_QUANTILES = (0.5, 0.99)
+
+
+def formatValue(value):
+    """Formats a sample value the way Prometheus parses it"""
+    value = float(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def formatLabels(labels):
+    """Formats a label dict as {name="value",...}"""
+    if not labels:
+        return ''
+    pairs = []
+    for name, value in sorted(labels.items()):
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        pairs.append('%s="%s"' % (name, value))
+    return '{%s}' % ','.join(pairs)
+
+
+class MetricFamily(object):
+    """The samples of one metric name, as produced at scrape time."""
+
+    def __init__(self, name, metricType, helpText):
+        """
+        @type  name: str
+        @param name: The metric name
+        @type  metricType: str
+        @param metricType: counter, gauge, histogram or summary
+        @type  helpText: str
+        @param helpText: What the metric counts"""
+        self.name = name
+        self.type = metricType
+        self.help = helpText
+        self.samples = []
+
+    def add(self, value, labels=None, suffix=''):
+        """Adds a sample, suffix is appended to the name, e.g. _count"""
+        self.samples.append((self.name + suffix, labels or {}, value))
+        return self
+
+    def addTracker(self, tracker, labels=None):
+        """Adds a rqd.rqutil.LatencyTracker as summary samples in seconds"""
+        labels = labels or {}
+        for quantile in SUMMARY_QUANTILES:
+            quantileLabels = dict(labels, quantile=formatValue(quantile))
+            self.add(tracker.percentile(quantile * 100), quantileLabels)
+        self.add(tracker.totalSeconds, labels, '_sum')
+        self.add(tracker.count, labels, '_count')
+        return self
+
+    def render(self):
+        """Returns the family in the text exposition format"""
+        lines = ['# HELP %s %s' % (self.name, self.help.replace('\\', '\\\\').replace('\n', '\\n')),
+                 '# TYPE %s %s' % (self.name, self.type)]
+        for name, labels, value in self.samples:
+            lines.append('%s%s %s' % (name, formatLabels(labels), formatValue(value)))
+        return '\n'.join(lines)
+
+
+class _Metric(object):
+    """A metric with a child per combination of label values."""
+
+    metricType = None
+
+    def __init__(self, name, helpText, labelNames=()):
+        self.name = name
+        self.help = helpText
+        self.labelNames = tuple(labelNames)
+        self._lock = threading.Lock()
+        self._children = {}
+        if not self.labelNames:
+            self._children[()] = self._newChild()
+
+    def _newChild(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Returns the child for the given label values"""
+        if len(values) != len(self.labelNames):
+            raise ValueError('%s expects labels %s' % (self.name, self.labelNames))
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._newChild())
+        return child
+
+    def collect(self):
+        """Returns the MetricFamily of the current values"""
+        family = MetricFamily(self.name, self.metricType, self.help)
+        with self._lock:
+            children = sorted(self._children.items())
+        for values, child in children:
+            child.addSamples(family, dict(zip(self.labelNames, values)))
+        return family
+
+
+class _CounterChild(object):
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        """Adds amount to the counter"""
+        with self.__lock:
+            self.value += amount
+
+    def addSamples(self, family, labels):
+        family.add(self.value, labels)
+
+
+class Counter(_Metric):
+    """A count that only goes up."""
+
+    metricType = 'counter'
+
+    def _newChild(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        """Adds amount to a counter without labels"""
+        self.labels().inc(amount)
+
+
+class _HistogramChild(object):
+
+    def __init__(self, buckets):
+        self.__lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Counts value in the first bucket it fits in"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self.__lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def addSamples(self, family, labels):
+        with self.__lock:
+            counts = list(self.counts)
+            total = self.sum
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            family.add(cumulative, dict(labels, le=formatValue(bound)), '_bucket')
+        family.add(total, labels, '_sum')
+        family.add(cumulative, labels, '_count')
+
+
+class Histogram(_Metric):
+    """Counts observations, such as durations in seconds, in fixed buckets."""
+
+    metricType = 'histogram'
+
+    def __init__(self, name, helpText, labelNames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super(Histogram, self).__init__(name, helpText, labelNames)
+
+    def _newChild(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        """Observes a value of a histogram without labels"""
+        self.labels().observe(value)
+
+
+class Registry(object):
+    """Holds the metrics and collectors that are rendered when scraped."""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__metrics = []
+        self.__collectors = []
+
+    def counter(self, name, helpText, labelNames=()):
+        """Creates and registers a Counter"""
+        return self.register(Counter(name, helpText, labelNames))
+
+    def histogram(self, name, helpText, labelNames=(), buckets=DEFAULT_BUCKETS):
+        """Creates and registers a Histogram"""
+        return self.register(Histogram(name, helpText, labelNames, buckets))
+
+    def register(self, metric):
+        """Adds a metric to the output"""
+        with self.__lock:
+            self.__metrics.append(metric)
+        return metric
+
+    def addCollector(self, collector):
+        """Adds a callable returning a list of MetricFamily, called on each scrape"""
+        with self.__lock:
+            self.__collectors.append(collector)
+
+    def collect(self):
+        """Returns the MetricFamily of every metric and collector"""
+        with self.__lock:
+            metrics = list(self.__metrics)
+            collectors = list(self.__collectors)
+        families = [metric.collect() for metric in metrics]
+        for collector in collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                log.warning('Unable to collect metrics from %s: %s' % (collector, e))
+        return families
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format"""
+        return ''.join(family.render() + '\n' for family in self.collect())
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class MetricsServer(object):
+    """Serves a Registry on /metrics from a daemon thread."""
+
+    def __init__(self, registry, port=None, bind=None):
+        """
+        @type  registry: Registry
+        @param registry: The metrics served
+        @type  port: int
+        @param port: The port, defaults to RQD_METRICS_PORT, 0 picks a free one
+        @type  bind: str
+        @param bind: The address, defaults to RQD_METRICS_BIND
+        """
+        self.registry = registry
+        self.port = rqd.rqconstants.RQD_METRICS_PORT if port is None else port
+        self.bind = rqd.rqconstants.RQD_METRICS_BIND if bind is None else bind
+        self.__server = None
+        self.__thread = None
+
+    def start(self):
+        """Starts serving, returns the port listened on"""
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            """Answers scrapes of /metrics"""
+
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                log.debug('Metrics request from %s: %s' % (self.client_address[0],
+                                                           format % args))
+
+        self.__server = _ThreadingHTTPServer((self.bind, self.port), Handler)
+        self.port = self.__server.server_address[1]
+        self.__thread = threading.Thread(target=self.__server.serve_forever,
+                                         name='rqdMetrics')
+        self.__thread.daemon = True
+        self.__thread.start()
+        log.info('Serving metrics on %s:%d' % (self.bind, self.port))
+        return self.port
+
+    def stop(self):
+        """Stops serving"""
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+            self.__thread = None
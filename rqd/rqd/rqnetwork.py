@@ -29,7 +29,9 @@ import atexit
 import logging as log
 import os
 import platform
+import random
 import subprocess
+import threading
 import time
 
 import grpc
@@ -39,8 +41,18 @@ import rqd.compiled_proto.report_pb2_grpc
 import rqd.compiled_proto.rqd_pb2_grpc
 import rqd.rqconstants
 import rqd.rqdservicers
+import rqd.rqexceptions
+import rqd.rqreport
 import rqd.rqutil
 
+# Calls that failed because the cuebot could not be reached in time
+UNREACHABLE_CODES = (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED)
+# Calls the cuebot refused, sending them again gets the same answer
+REJECTED_CODES = (grpc.StatusCode.INVALID_ARGUMENT, grpc.StatusCode.NOT_FOUND,
+                  grpc.StatusCode.ALREADY_EXISTS, grpc.StatusCode.PERMISSION_DENIED,
+                  grpc.StatusCode.FAILED_PRECONDITION, grpc.StatusCode.OUT_OF_RANGE,
+                  grpc.StatusCode.UNIMPLEMENTED)
+
 
 class RunningFrame(object):
 
@@ -53,6 +65,9 @@ class RunningFrame(object):
         self.killMessage = ""
 
         self.pid = None
+        self.cgroup = None
+        self.profile = None
+        self.io = None
         self.exitStatus = None
         self.frameAttendantThread = None
         self.exitSignal = 0
@@ -100,22 +115,7 @@ class RunningFrame(object):
             log.warning("Kill requested before pid is available for: %s"
                         % self.frameId)
         elif self.frameAttendantThread.isAlive():
-            try:
-                if not self.killMessage and message:
-                    self.killMessage = message
-                rqd.rqutil.permissionsHigh()
-                try:
-                    if platform.system() == "Windows":
-                        subprocess.Popen('taskkill /F /T /PID %i' % self.pid, shell=True)
-                    else:
-                        os.killpg(self.pid, rqd.rqconstants.KILL_SIGNAL)
-                finally:
-                    rqd.rqutil.permissionsLow()
-            except OSError as e:
-                log.warning("kill() tried to kill a non-existant pid for: %s "
-                            "Error: %s" % (self.frameId, e))
-            except Exception as e:
-                log.warning("kill() encountered an unknown error: %s" % e)
+            self.rqCore.killManager.signalFrames([self], message)
         else:
             log.warning("Kill requested after frameAttendantThread has exited "
                         "for: %s" % self.frameId)
@@ -178,13 +178,139 @@ class GrpcServer(object):
             self.server.stop(0)
 
 
+class ChannelPool(object):
+    """Keeps a persistent channel open to each cuebot and hands out the
+    channel of a healthy one, failing over between them. Channels are watched
+    through their connectivity state, and when no cuebot is reachable callers
+    fail fast with CuebotUnavailableException until a backoff expires."""
+
+    UNHEALTHY_STATES = (grpc.ChannelConnectivity.TRANSIENT_FAILURE,
+                        grpc.ChannelConnectivity.SHUTDOWN)
+
+    def __init__(self, targets=None):
+        """
+        @type  targets: list
+        @param targets: host:port of the cuebots, defaults to CUEBOT_HOSTNAME
+                        in random order
+        """
+        # TODO(bcipriano) Add support for the facility nameserver or drop this concept? (Issue #152)
+        if targets is None:
+            targets = ['%s:%s' % (hostname, rqd.rqconstants.CUEBOT_GRPC_PORT)
+                       for hostname in rqd.rqconstants.CUEBOT_HOSTNAME.split()]
+            shuffle(targets)
+        self.targets = targets
+        self.__lock = threading.Lock()
+        self.__channels = {}
+        self.__states = {}
+        self.__failed = set()
+        self.__current = 0
+        self.__failures = 0
+        self.__retryAt = 0
+        atexit.register(self.close)
+
+    @staticmethod
+    def __options():
+        return [
+            ('grpc.keepalive_time_ms', rqd.rqconstants.RQD_GRPC_KEEPALIVE_TIME_MS),
+            ('grpc.keepalive_timeout_ms', rqd.rqconstants.RQD_GRPC_KEEPALIVE_TIMEOUT_MS),
+            ('grpc.keepalive_permit_without_calls', 0),
+            ('grpc.initial_reconnect_backoff_ms',
+             int(rqd.rqconstants.RQD_GRPC_RECONNECT_BACKOFF_INITIAL_SEC * 1000)),
+            ('grpc.max_reconnect_backoff_ms',
+             int(rqd.rqconstants.RQD_GRPC_RECONNECT_BACKOFF_MAX_SEC * 1000)),
+        ]
+
+    def __open(self, target):
+        channel = grpc.insecure_channel(target, options=self.__options())
+        self.__channels[target] = channel
+        channel.subscribe(lambda state: self.__onStateChange(target, channel, state),
+                          try_to_connect=True)
+        return channel
+
+    def __onStateChange(self, target, channel, state):
+        # Notifications are delivered asynchronously and may be stale, so a
+        # failed call is only forgiven by a later successful one.
+        with self.__lock:
+            if self.__channels.get(target) is channel:
+                self.__states[target] = state
+
+    def __isHealthy(self, target):
+        return target not in self.__failed and self.__states.get(target) not in self.UNHEALTHY_STATES
+
+    def getChannel(self):
+        """Returns a channel to a healthy cuebot
+        @rtype:  tuple
+        @return: (target, grpc.Channel)
+        @raise CuebotUnavailableException: No cuebot is reachable right now"""
+        with self.__lock:
+            now = time.time()
+            if now < self.__retryAt:
+                raise rqd.rqexceptions.CuebotUnavailableException(
+                    'Reconnecting to the cuebot, retrying in %.1fs' % (self.__retryAt - now))
+            for offset in range(len(self.targets)):
+                index = (self.__current + offset) % len(self.targets)
+                target = self.targets[index]
+                channel = self.__channels.get(target) or self.__open(target)
+                if self.__isHealthy(target):
+                    if index != self.__current:
+                        log.warning('Failing over to cuebot %s' % target)
+                        self.__current = index
+                    return target, channel
+            # Every cuebot is failing, give grpc time to reconnect in the background.
+            self.__failures += 1
+            backoff = min(rqd.rqconstants.RQD_GRPC_RECONNECT_BACKOFF_INITIAL_SEC
+                          * 2 ** (self.__failures - 1),
+                          rqd.rqconstants.RQD_GRPC_RECONNECT_BACKOFF_MAX_SEC)
+            self.__retryAt = now + backoff * random.uniform(0.8, 1.2)
+            self.__failed.clear()
+            raise rqd.rqexceptions.CuebotUnavailableException(
+                'Unable to reach any cuebot of %s' % ', '.join(self.targets))
+
+    def reportSuccess(self, target):
+        """Records a call to target that succeeded"""
+        with self.__lock:
+            self.__failed.discard(target)
+            self.__failures = 0
+            self.__retryAt = 0
+
+    def reportFailure(self, target, code):
+        """Records a call to target that failed, the next call goes to
+        another cuebot if the failure means this one is unreachable
+        @type  code: grpc.StatusCode
+        @param code: The status of the failed call"""
+        if code not in UNREACHABLE_CODES:
+            return
+        with self.__lock:
+            self.__failed.add(target)
+
+    def getStates(self):
+        """Returns the connectivity state of every open channel
+        @rtype:  dict
+        @return: {target: grpc.ChannelConnectivity}"""
+        with self.__lock:
+            return dict(self.__states)
+
+    def close(self):
+        """Closes every channel"""
+        with self.__lock:
+            channels, self.__channels = self.__channels, {}
+            self.__states = {}
+            self.__failed.clear()
+        for channel in channels.values():
+            channel.close()
+
+
 class Network(object):
     """Handles gRPC communication"""
     def __init__(self, rqCore):
         """Network class initialization"""
         self.rqCore = rqCore
         self.grpcServer = None
-        self.channel = None
+        self.channelPool = None
+        self.reportFilter = rqd.rqreport.ReportFilter()
+        self.__reportStubs = {}
+        self.__statsLock = threading.Lock()
+        self.__reportStats = {}
 
     def start_grpc(self):
         self.grpcServer = GrpcServer(self.rqCore)
@@ -195,40 +321,129 @@ class Network(object):
         del self.grpcServer
 
     def closeChannel(self):
-        self.channel.close()
-        del self.channel
-        self.channel = None
-
-    def __getChannel(self):
-        # TODO(bcipriano) Add support for the facility nameserver or drop this concept? (Issue #152)
-        if self.channel is None:
-            cuebots = rqd.rqconstants.CUEBOT_HOSTNAME.split()
-            shuffle(cuebots)
-            for cuebotHostname in cuebots:
-                self.channel = grpc.insecure_channel('%s:%s' % (cuebotHostname,
-                                                                rqd.rqconstants.CUEBOT_GRPC_PORT))
-            atexit.register(self.closeChannel)
+        self.__reportStubs = {}
+        if self.channelPool is not None:
+            self.channelPool.close()
+            self.channelPool = None
 
     def __getReportStub(self):
-        self.__getChannel()
-        return rqd.compiled_proto.report_pb2_grpc.RqdReportInterfaceStub(self.channel)
+        """Returns the target and report stub of a healthy cuebot, stubs live
+        as long as their channel"""
+        if self.channelPool is None:
+            self.channelPool = ChannelPool()
+        target, channel = self.channelPool.getChannel()
+        stub = self.__reportStubs.get(target)
+        if stub is None or stub[0] is not channel:
+            stub = (channel, rqd.compiled_proto.report_pb2_grpc.RqdReportInterfaceStub(channel))
+            self.__reportStubs[target] = stub
+        return target, stub[1]
+
+    def __callReport(self, method, request):
+        """Calls method on the report interface, recording its latency and size"""
+        target, stub = self.__getReportStub()
+        start = time.time()
+        try:
+            response = getattr(stub, method)(request, timeout=rqd.rqconstants.RQD_TIMEOUT)
+        except grpc.RpcError as e:
+            self.__recordReport(method, request, time.time() - start, ok=False)
+            self.channelPool.reportFailure(target, e.code())
+            raise
+        self.__recordReport(method, request, time.time() - start)
+        self.channelPool.reportSuccess(target)
+        return response
+
+    def __recordReport(self, method, request, seconds, ok=True):
+        with self.__statsLock:
+            stats = self.__reportStats.get(method)
+            if stats is None:
+                stats = self.__reportStats[method] = {
+                    'bytes': 0, 'latency': rqd.rqutil.LatencyTracker()}
+            if ok:
+                stats['bytes'] += request.ByteSize()
+        stats['latency'].record(seconds, ok)
+
+    def getReportStats(self):
+        """Returns the calls, request bytes and latency of each report rpc
+        @rtype:  dict
+        @return: {method name: {'calls': int, 'errors': int, 'bytes': int,
+                                'avg_ms': float, 'p50_ms': float, 'p99_ms': float,
+                                'max_ms': float}}"""
+        with self.__statsLock:
+            allStats = list(self.__reportStats.items())
+        result = {}
+        for method, stats in allStats:
+            summary = stats['latency'].summary()
+            summary['calls'] = summary.pop('count')
+            summary['bytes'] = stats['bytes']
+            result[method] = summary
+        return result
+
+    def getReportLatencies(self):
+        """Returns the rqd.rqutil.LatencyTracker of each report rpc
+        @rtype:  dict
+        @return: {method name: LatencyTracker}"""
+        with self.__statsLock:
+            return dict((method, stats['latency'])
+                        for method, stats in self.__reportStats.items())
 
     def reportRqdStartup(self, report):
         """Wraps the ability to send a startup report to rqd via grpc"""
-        stub = self.__getReportStub()
         request = rqd.compiled_proto.report_pb2.RqdReportRqdStartupRequest(boot_report=report)
-        stub.ReportRqdStartup(request, timeout=rqd.rqconstants.RQD_TIMEOUT)
+        self.__callReport('ReportRqdStartup', request)
+        self.reportFilter.reset()
 
     def reportStatus(self, report):
-        """Wraps the ability to send a status report to the cuebot via grpc"""
-        stub = self.__getReportStub()
+        """Wraps the ability to send a status report to the cuebot via grpc
+        @rtype:  bool
+        @return: False if the report was skipped because nothing changed"""
+        if not self.reportFilter.shouldSend(report):
+            return False
         request = rqd.compiled_proto.report_pb2.RqdReportStatusRequest(host_report=report)
-        stub.ReportStatus(request, timeout=rqd.rqconstants.RQD_TIMEOUT)
+        try:
+            self.__callReport('ReportStatus', request)
+        except (grpc.RpcError, rqd.rqexceptions.CuebotUnavailableException):
+            self.reportFilter.reset()
+            raise
+        self.reportFilter.acknowledge(report)
+        return True
 
     def reportRunningFrameCompletion(self, report):
         """Wraps the ability to send a running frame completion report
            to the cuebot via grpc"""
-        stub = self.__getReportStub()
         request = rqd.compiled_proto.report_pb2.RqdReportRunningFrameCompletionRequest(
             frame_complete_report=report)
-        stub.ReportRunningFrameCompletion(request, timeout=rqd.rqconstants.RQD_TIMEOUT)
+        self.__callReport('ReportRunningFrameCompletion', request)
+
+    def reportRunningFrameCompletions(self, reports):
+        """Sends a batch of running frame completion reports over one channel,
+           with all the calls in flight at once
+        @type  reports: list
+        @param reports: List of FrameCompleteReport
+        @rtype:  tuple
+        @return: (frame ids of the reports the cuebot received,
+                  {frame id: grpc.StatusCode} of the ones that failed)"""
+        method = 'ReportRunningFrameCompletion'
+        target, stub = self.__getReportStub()
+        calls = []
+        for report in reports:
+            request = rqd.compiled_proto.report_pb2.RqdReportRunningFrameCompletionRequest(
+                frame_complete_report=report)
+            calls.append((report, request, time.time(), getattr(stub, method).future(
+                request, timeout=rqd.rqconstants.RQD_TIMEOUT)))
+        delivered = []
+        failures = {}
+        for report, request, start, call in calls:
+            try:
+                call.result()
+            except grpc.RpcError as e:
+                self.__recordReport(method, request, time.time() - start, ok=False)
+                self.channelPool.reportFailure(target, e.code())
+                log.warning('Failed to send the completion report for frame %s: %s'
+                            % (report.frame.frame_id, e.code()))
+                failures[report.frame.frame_id] = e.code()
+                continue
+            self.__recordReport(method, request, time.time() - start)
+            delivered.append(report.frame.frame_id)
+        if delivered:
+            self.channelPool.reportSuccess(target)
+        return delivered, failures
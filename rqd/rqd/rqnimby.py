@@ -13,46 +13,232 @@
 #  limitations under the License.
 
 
-"""Nimby allows a desktop to be used as a render host when not used."""
+"""Nimby allows a desktop to be used as a render host when not used.
+
+The input devices are opened once and watched on rqd's scheduler loop. Devices
+plugged in later are picked up through inotify on /dev/input, or by rescanning
+it every NIMBY_RESCAN_INTERVAL seconds where inotify is not available.
+"""
 
 
 from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import division
 
+from builtins import object
+import errno
 import os
-import select
+import struct
 import time
 import signal
 import threading
 import logging as log
 
+try:
+    import ctypes
+    import ctypes.util
+    _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    _libc.inotify_init1
+except (ImportError, OSError, AttributeError):
+    _libc = None
+
 import rqd.rqconstants
 import rqd.rqutil
 
 
-class Nimby(threading.Thread):
+IN_ATTRIB = 0x4
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_CLOEXEC = 0o2000000
+IN_EVENT = struct.Struct('iIII')
+
+
+def isInputDevice(name):
+    """Returns True for the devices in /dev/input that nimby watches"""
+    return name.startswith("event") or name.startswith("mice")
+
+
+class InputWatcher(object):
+    """Keeps the input devices open and calls onInput on the scheduler loop
+    whenever one of them has events."""
+
+    def __init__(self, scheduler, onInput, path=None):
+        """
+        @type  scheduler: rqd.rqscheduler.Scheduler
+        @param scheduler: The loop the devices are watched on
+        @type  onInput: callable
+        @param onInput: Called without arguments on input
+        @type  path: str
+        @param path: The input device directory, defaults to PATH_INPUT_DEVICES
+        """
+        self.scheduler = scheduler
+        self.onInput = onInput
+        self.path = path or rqd.rqconstants.PATH_INPUT_DEVICES
+        self.__lock = threading.Lock()
+        self.__devices = {}
+        self.__inotifyFd = None
+        self.__rescanTask = None
+
+    def start(self):
+        """Opens the devices and starts watching for new ones"""
+        self.__inotifyFd = self.__startInotify()
+        if self.__inotifyFd is None:
+            self.__scheduleRescan()
+        self.rescan()
+
+    def __startInotify(self):
+        if _libc is None:
+            return None
+        fd = _libc.inotify_init1(os.O_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            log.warning('Unable to start inotify: %s' % os.strerror(ctypes.get_errno()))
+            return None
+        mask = IN_CREATE | IN_DELETE | IN_ATTRIB | IN_MOVED_TO | IN_MOVED_FROM
+        if _libc.inotify_add_watch(fd, self.path.encode(), mask) < 0:
+            log.warning('Unable to watch %s for new input devices: %s'
+                        % (self.path, os.strerror(ctypes.get_errno())))
+            os.close(fd)
+            return None
+        self.scheduler.addReader(fd, self.__onInotify)
+        return fd
+
+    def __scheduleRescan(self):
+        self.__rescanTask = self.scheduler.callLater(
+            rqd.rqconstants.NIMBY_RESCAN_INTERVAL, self.scheduler.runInWorker, self.__rescanLater)
+
+    def __rescanLater(self):
+        if self.__rescanTask is None:
+            return
+        self.rescan()
+        self.__scheduleRescan()
+
+    def __onInotify(self, fd):
+        """Reads inotify events on the loop, a rescan is started in a worker
+        when an input device was added or removed"""
+        try:
+            data = os.read(fd, 4096)
+        except (IOError, OSError) as e:
+            if e.errno not in (errno.EAGAIN, errno.EINTR):
+                log.warning('Unable to read inotify events: %s' % e)
+            return
+        changed = False
+        offset = 0
+        while offset + IN_EVENT.size <= len(data):
+            _, mask, _, length = IN_EVENT.unpack_from(data, offset)
+            start = offset + IN_EVENT.size
+            name = data[start:start + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset = start + length
+            if mask & IN_Q_OVERFLOW or isInputDevice(name):
+                changed = True
+        if changed:
+            self.scheduler.runInWorker(self.rescan)
+
+    def rescan(self):
+        """Opens new input devices and closes the ones that are gone"""
+        try:
+            names = set(name for name in os.listdir(self.path) if isInputDevice(name))
+        except OSError as e:
+            log.warning('Unable to list input devices in %s: %s' % (self.path, e))
+            return
+        with self.__lock:
+            gone = set(self.__devices) - names
+            new = names - set(self.__devices)
+        for name in gone:
+            self.__closeDevice(name)
+        if not new:
+            return
+        rqd.rqutil.permissionsHigh()
+        try:
+            for name in sorted(new):
+                self.__openDevice(name)
+        finally:
+            rqd.rqutil.permissionsLow()
+
+    def __openDevice(self, name):
+        devicePath = os.path.join(self.path, name)
+        try:
+            fd = os.open(devicePath, os.O_RDONLY | os.O_NONBLOCK)
+        except OSError as e:
+            # Bad device found
+            log.debug("Failed to open %s, %s" % (devicePath, e))
+            return
+        log.debug("Found device: %s" % name)
+        with self.__lock:
+            self.__devices[name] = fd
+        self.scheduler.addReader(fd, lambda readyFd: self.__onReadable(name, readyFd))
+
+    def __closeDevice(self, name):
+        with self.__lock:
+            fd = self.__devices.pop(name, None)
+        if fd is not None:
+            log.debug("Closing device: %s" % name)
+            self.__release(fd)
+
+    def __release(self, fd):
+        """Stops watching fd and closes it on the loop, so that the fd is not
+        reused while the loop still watches it"""
+        if self.scheduler.isLoopThread():
+            self.scheduler.removeReader(fd)
+            os.close(fd)
+        else:
+            self.scheduler.callSoon(self.__release, fd)
+
+    def __onReadable(self, name, fd):
+        try:
+            os.read(fd, 4096)
+        except (IOError, OSError) as e:
+            if e.errno in (errno.EAGAIN, errno.EINTR):
+                return
+            # The device was unplugged
+            log.debug("Input device %s is gone: %s" % (name, e))
+            self.__closeDevice(name)
+            return
+        self.onInput()
+
+    def getDevices(self):
+        """Returns the names of the open devices"""
+        with self.__lock:
+            return sorted(self.__devices)
+
+    def close(self):
+        """Closes the devices and stops watching for new ones"""
+        if self.__rescanTask is not None:
+            self.__rescanTask.cancel()
+            self.__rescanTask = None
+        for name in self.getDevices():
+            self.__closeDevice(name)
+        if self.__inotifyFd is not None:
+            self.__release(self.__inotifyFd)
+            self.__inotifyFd = None
+
+
+class Nimby(object):
     """Nimby == Not In My Back Yard.
        If enabled, nimby will lock and kill all frames running on the host if
        keyboard or mouse activity is detected. If sufficient idle time has
        passed, defined in the Constants class, nimby will then unlock the host
-       and make it available for rendering."""
+       and make it available for rendering.
+
+       Input is watched on the rqCore scheduler loop, the lock and unlock
+       checks run on its worker pool."""
 
     def __init__(self, rqCore):
         """Nimby initialization
         @type    rqCore: RqCore
         @param   rqCore: Main RQD Object"""
-        threading.Thread.__init__(self)
-
         self.rqCore = rqCore
 
         self.locked = False
         self.active = False
+        self.lastActivity = None
 
-        self.fileObjList = []
-        self.results = [[]]
-
-        self.thread = None
+        self.watcher = None
+        self.__stateLock = threading.RLock()
+        self.__checkTask = None
+        self.__lockPending = False
 
         signal.signal(signal.SIGINT, self.signalHandler)
 
@@ -62,116 +248,101 @@ class Nimby(threading.Thread):
 
     def lockNimby(self):
         """Activates the nimby lock, calls lockNimby() in rqcore"""
-        if self.active and not self.locked:
-            self.locked = True
-            log.info("Locked nimby")
-            self.rqCore.onNimbyLock()
+        with self.__stateLock:
+            if self.active and not self.locked:
+                self.locked = True
+                log.info("Locked nimby")
+                self.rqCore.onNimbyLock()
 
     def unlockNimby(self, asOf=None):
         """Deactivates the nimby lock, calls unlockNimby() in rqcore
         @param asOf: Time when idle state began, if known."""
-        if self.locked:
-            self.locked = False
-            log.info("Unlocked nimby")
-            self.rqCore.onNimbyUnlock(asOf=asOf)
+        with self.__stateLock:
+            if self.locked:
+                self.locked = False
+                log.info("Unlocked nimby")
+                self.rqCore.onNimbyUnlock(asOf=asOf)
 
-    def _openEvents(self):
-        """Opens the /dev/input/event* files so nimby can monitor them"""
-        self._closeEvents()
+    def getIdleTime(self):
+        """Returns the seconds since the last input, or since nimby started"""
+        if self.lastActivity is None:
+            return 0
+        return max(time.time() - self.lastActivity, 0)
 
-        rqd.rqutil.permissionsHigh()
-        try:
-            for device in os.listdir("/dev/input/"):
-                if device.startswith("event") or device.startswith("mice"):
-                    log.debug("Found device: %s" % device)
-                    try:
-                        self.fileObjList.append(open("/dev/input/%s" % device, "rb"))
-                    except IOError as e:
-                        # Bad device found
-                        log.debug("IOError: Failed to open %s, %s" % ("/dev/input/%s" % device, e))
-        finally:
-            rqd.rqutil.permissionsLow()
+    def __scheduleCheck(self, delay, check):
+        """Runs check in a worker after delay seconds, replacing the pending check"""
+        if self.__checkTask is not None:
+            self.__checkTask.cancel()
+        scheduler = self.rqCore.scheduler
+        self.__checkTask = scheduler.callLater(delay, scheduler.runInWorker, check)
+
+    def onInput(self):
+        """Nimby State: any, called on the loop when a device has input"""
+        self.lastActivity = time.time()
+        if self.active and not self.locked and not self.__lockPending:
+            self.__lockPending = True
+            self.rqCore.scheduler.runInWorker(self.__lockForInput)
+
+    def __lockForInput(self):
+        self.__lockPending = False
+        self.lockAndWaitForIdle()
 
-    def _closeEvents(self):
-        """Closes the /dev/input/event* files"""
-        log.debug("_closeEvents")
-        if self.fileObjList:
-            for fileObj in self.fileObjList:
-                try:
-                    fileObj.close()
-                except:
-                    pass
-            self.fileObjList = []
-
-    def lockedInUse(self):
+    def lockAndWaitForIdle(self):
         """Nimby State: Machine is in use, host is locked,
                         waiting for sufficient idle time"""
-        log.debug("lockedInUse")
-        self._openEvents()
-        try:
-            self.results = select.select(self.fileObjList, [], [], 5)
-        except:
-            pass
-        if self.active and self.results[0] == []:
-            self.lockedIdle()
-        elif self.active:
-            self._closeEvents()
-            self.thread = threading.Timer(rqd.rqconstants.CHECK_INTERVAL_LOCKED,
-                                          self.lockedInUse)
-            self.thread.start()
-
-    def lockedIdle(self):
-        """Nimby State: Machine is idle,
-                        waiting for sufficient idle time to unlock"""
-        self._openEvents()
-        waitStartTime = time.time()
-        try:
-            self.results = select.select(self.fileObjList, [], [],
-                                         rqd.rqconstants.MINIMUM_IDLE)
-        except:
-            pass
-        if self.active and self.results[0] == [] and \
-           self.rqCore.machine.isNimbySafeToUnlock():
-            self._closeEvents()
-            self.unlockNimby(asOf=waitStartTime)
-            self.unlockedIdle()
-        elif self.active:
-            self._closeEvents()
-            self.thread = threading.Timer(rqd.rqconstants.CHECK_INTERVAL_LOCKED,
-                                          self.lockedInUse)
-            self.thread.start()
-
-    def unlockedIdle(self):
+        with self.__stateLock:
+            if not self.active:
+                return
+            self.lockNimby()
+            self.__scheduleCheck(rqd.rqconstants.MINIMUM_IDLE - self.getIdleTime(),
+                                 self.checkIdle)
+
+    def checkIdle(self):
+        """Nimby State: Host is locked, unlocks it once the user has been idle
+                        for MINIMUM_IDLE and resources allow it"""
+        with self.__stateLock:
+            if not self.active or not self.locked:
+                return
+            idleTime = self.getIdleTime()
+            if idleTime < rqd.rqconstants.MINIMUM_IDLE:
+                self.__scheduleCheck(rqd.rqconstants.MINIMUM_IDLE - idleTime, self.checkIdle)
+            elif not self.rqCore.machine.isNimbySafeToUnlock():
+                self.__scheduleCheck(rqd.rqconstants.CHECK_INTERVAL_LOCKED, self.checkIdle)
+            else:
+                self.unlockNimby(asOf=self.lastActivity)
+                self.__scheduleCheck(rqd.rqconstants.CHECK_INTERVAL_UNLOCKED,
+                                     self.checkResources)
+
+    def checkResources(self):
         """Nimby State: Machine is idle, host is unlocked,
-                        waiting for user activity"""
-        while self.active and \
-              self.results[0] == [] and \
-              self.rqCore.machine.isNimbySafeToRunJobs():
-            try:
-                self._openEvents()
-                self.results = select.select(self.fileObjList, [], [], 5)
-            except:
-                pass
+                        locks it if memory runs low"""
+        with self.__stateLock:
+            if not self.active or self.locked:
+                return
             if not self.rqCore.machine.isNimbySafeToRunJobs():
                 log.warning("memory threshold has been exceeded, locking nimby")
-                self.active = True
-
-        if self.active:
-            self._closeEvents()
-            self.lockNimby()
-            self.thread = threading.Timer(rqd.rqconstants.CHECK_INTERVAL_LOCKED,
-                                          self.lockedInUse)
-            self.thread.start()
+                self.lockAndWaitForIdle()
+            else:
+                self.__scheduleCheck(rqd.rqconstants.CHECK_INTERVAL_UNLOCKED,
+                                     self.checkResources)
 
     def run(self):
-        """Starts the Nimby thread"""
-        self.active = True
-        self.unlockedIdle()
+        """Starts watching the input devices, the host starts unlocked"""
+        with self.__stateLock:
+            self.active = True
+            self.lastActivity = time.time()
+            self.watcher = InputWatcher(self.rqCore.scheduler, self.onInput)
+            self.watcher.start()
+            self.__scheduleCheck(rqd.rqconstants.CHECK_INTERVAL_UNLOCKED, self.checkResources)
 
     def stop(self):
-        """Stops the Nimby thread"""
-        if self.thread:
-            self.thread.cancel()
-        self.active = False
-        self._closeEvents()
-        self.unlockNimby()
+        """Stops watching the input devices and unlocks the host"""
+        with self.__stateLock:
+            if self.__checkTask is not None:
+                self.__checkTask.cancel()
+                self.__checkTask = None
+            self.active = False
+            if self.watcher is not None:
+                self.watcher.close()
+                self.watcher = None
+            self.unlockNimby()
@@ -0,0 +1,249 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Incremental index of the processes running on the host, keyed by session id.
+"""
+
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from builtins import object
+import logging as log
+import os
+
+import rqd.rqconstants
+
+
+class ProcStat(object):
+    """Integer fields parsed from a single /proc/<pid>/stat file."""
+
+    __slots__ = ('pid', 'session', 'startTime', 'totalTime', 'vsize', 'rss', 'numThreads',
+                 'lastTotalTime', 'lastSeconds', 'lastPcpu')
+
+    def __init__(self, pid, session, startTime, totalTime, vsize, rss, numThreads):
+        self.pid = pid
+        self.session = session
+        # The time in jiffies the process started after system boot.
+        self.startTime = startTime
+        # Jiffies used by this process, including its waited-for dead children.
+        self.totalTime = totalTime
+        self.vsize = vsize
+        self.rss = rss
+        self.numThreads = numThreads
+
+        # Values from the previous sample, used for the decaying %cpu average.
+        self.lastTotalTime = None
+        self.lastSeconds = None
+        self.lastPcpu = None
+
+
+def parseStat(pid, data):
+    """Parses the contents of /proc/<pid>/stat, see "man proc".
+    @type  pid: int
+    @param pid: The process id the data was read for
+    @type  data: str
+    @param data: The contents of the stat file
+    @rtype:  ProcStat
+    @return: The parsed integer fields"""
+    # The command name may itself contain spaces and parentheses, so all
+    # field offsets are taken from the last closing parenthesis.
+    fields = data[data.rfind(')') + 2:].split()
+    return ProcStat(pid,
+                    session=int(fields[3]),
+                    startTime=int(fields[19]),
+                    totalTime=int(fields[11]) + int(fields[12]) + int(fields[13]) + int(fields[14]),
+                    vsize=int(fields[20]),
+                    rss=int(fields[21]),
+                    numThreads=int(fields[17]))
+
+
+def readStat(pid, procPath=None):
+    """Reads and parses /proc/<pid>/stat
+    @type  pid: int
+    @param pid: The process id to read
+    @type  procPath: str
+    @param procPath: Location of the proc filesystem, defaults to PATH_PROC
+    @rtype:  ProcStat
+    @return: The parsed stat file or None if the process has exited"""
+    path = os.path.join(procPath or rqd.rqconstants.PATH_PROC, str(pid), 'stat')
+    try:
+        with open(path, 'r') as statFile:
+            return parseStat(pid, statFile.read())
+    except (IOError, OSError):
+        return None
+    except (IndexError, ValueError):
+        log.warning('failed to parse stat file for pid %s', pid)
+        return None
+
+
+# Counters of /proc/<pid>/io: all bytes read and written, including network
+# and NFS io, read and write syscalls, and bytes fetched from or sent to storage.
+IO_COUNTERS = ('rchar', 'wchar', 'syscr', 'syscw', 'read_bytes', 'write_bytes')
+
+
+def readIo(pid, procPath=None):
+    """Reads /proc/<pid>/io, which needs the permissions to trace the process
+    @type  pid: int
+    @param pid: The process id to read
+    @type  procPath: str
+    @param procPath: Location of the proc filesystem, defaults to PATH_PROC
+    @rtype:  dict
+    @return: The counters by name, such as read_bytes, or None if the
+             process has exited or cannot be read"""
+    path = os.path.join(procPath or rqd.rqconstants.PATH_PROC, str(pid), 'io')
+    counters = {}
+    try:
+        with open(path, 'r') as ioFile:
+            for line in ioFile:
+                name, _, value = line.partition(':')
+                counters[name] = int(value)
+    except (IOError, OSError, ValueError):
+        return None
+    return counters
+
+
+class ProcessIndex(object):
+    """Keeps every pid on the host indexed by its session id between rss
+    updates. Only pids that are new since the previous update, or that belong
+    to a session of interest, have their stat file read again."""
+
+    def __init__(self, procPath=None):
+        """
+        @type  procPath: str
+        @param procPath: Location of the proc filesystem, defaults to PATH_PROC
+        """
+        self.__procPath = procPath or rqd.rqconstants.PATH_PROC
+        self.__pids = {}
+        self.__sessions = {}
+        self.__updates = 0
+
+    def __len__(self):
+        return len(self.__pids)
+
+    def __add(self, stat):
+        self.__pids[stat.pid] = stat
+        self.__sessions.setdefault(stat.session, set()).add(stat.pid)
+
+    def __remove(self, pid):
+        stat = self.__pids.pop(pid, None)
+        if stat is not None:
+            members = self.__sessions.get(stat.session)
+            if members is not None:
+                members.discard(pid)
+                if not members:
+                    del self.__sessions[stat.session]
+
+    def __refresh(self, pid):
+        """Re-reads the stat file of a known pid, keeping its cpu history."""
+        old = self.__pids[pid]
+        stat = readStat(pid, self.__procPath)
+        if stat is None:
+            self.__remove(pid)
+            return None
+        if stat.startTime == old.startTime:
+            stat.lastTotalTime = old.lastTotalTime
+            stat.lastSeconds = old.lastSeconds
+            stat.lastPcpu = old.lastPcpu
+        if stat.session != old.session or stat.startTime != old.startTime:
+            # Either the pid was reused or the process called setsid().
+            self.__remove(pid)
+            self.__add(stat)
+        else:
+            self.__pids[pid] = stat
+        return stat
+
+    def update(self, sessions):
+        """Brings the index up to date and returns the processes belonging to
+        the requested sessions.
+        @type  sessions: iterable of int
+        @param sessions: The session ids to return current samples for,
+                         normally the pids of the running frames
+        @rtype:  dict
+        @return: A dict of session id to a list of ProcStat"""
+        sessions = set(sessions)
+        self.__updates += 1
+
+        current = set(int(name) for name in os.listdir(self.__procPath) if name.isdigit())
+
+        for pid in set(self.__pids) - current:
+            self.__remove(pid)
+
+        fresh = set()
+        if self.__updates % rqd.rqconstants.RSS_FULL_RESCAN_INTERVAL == 0:
+            # Bound the time a stale entry for a reused pid can survive.
+            for pid in list(self.__pids):
+                if self.__refresh(pid) is not None:
+                    fresh.add(pid)
+
+        for pid in current - set(self.__pids):
+            stat = readStat(pid, self.__procPath)
+            if stat is not None:
+                self.__add(stat)
+                fresh.add(pid)
+
+        # A session leader may have been indexed between fork and setsid(), so
+        # re-read any leader that is not yet indexed under its own session.
+        for session in sessions:
+            if session in self.__pids and session not in fresh \
+                    and self.__pids[session].session != session:
+                self.__refresh(session)
+                fresh.add(session)
+
+        results = {}
+        for session in sessions:
+            samples = []
+            for pid in list(self.__sessions.get(session, ())):
+                stat = self.__pids[pid] if pid in fresh else self.__refresh(pid)
+                if stat is not None and stat.session == session:
+                    samples.append(stat)
+            results[session] = samples
+        return results
+
+
+class IoAccount(object):
+    """The io of a group of processes, such as the processes of a frame.
+
+    /proc/<pid>/io only covers live processes, plus the children they have
+    reaped. The totals grow by how much the sum over the live processes grew
+    between samples, so io is not lost when a reaped child disappears."""
+
+    __slots__ = ('totals', 'rates', 'lastCounters', 'lastTime')
+
+    def __init__(self):
+        self.totals = dict.fromkeys(IO_COUNTERS, 0)
+        self.rates = dict.fromkeys(IO_COUNTERS, 0.0)
+        self.lastCounters = None
+        self.lastTime = None
+
+    def update(self, counters, now):
+        """Adds a sample
+        @type  counters: dict
+        @param counters: The IO_COUNTERS summed over the live processes
+        @type  now: float
+        @param now: The time of the sample"""
+        elapsed = now - self.lastTime if self.lastTime is not None else 0
+        for name in IO_COUNTERS:
+            value = counters.get(name, 0)
+            if self.lastCounters is None:
+                delta = value
+            else:
+                delta = max(value - self.lastCounters.get(name, 0), 0)
+            self.totals[name] += delta
+            self.rates[name] = delta / elapsed if elapsed > 0 else 0.0
+        self.lastCounters = counters
+        self.lastTime = now
@@ -0,0 +1,121 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Resource time series of a running frame.
+
+Every rss update adds a sample of the frame's rss, cpu, io bytes and threads
+to a fixed size ring buffer kept in arrays. When the frame completes the
+samples are written next to its rqlog as a small binary file, which is read
+by opencue.frameprofile.
+
+File layout, little endian:
+  header   '<4sHII'   magic 'RQPF', version, sample count, samples dropped
+  columns  each column of COLUMNS in order, sample count values of its type
+"""
+
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from builtins import object
+from builtins import range
+import array
+import os
+import struct
+import sys
+import threading
+
+import rqd.rqconstants
+
+
+MAGIC = b'RQPF'
+VERSION = 1
+HEADER = struct.Struct('<4sHII')
+# Column name and array typecode, the typecodes have the same size everywhere.
+COLUMNS = (
+    ('time', 'd'),          # Seconds since the epoch
+    ('rss', 'q'),           # kB
+    ('pcpu', 'f'),          # Same units as the pcpu attribute of the frame
+    ('read_bytes', 'q'),    # Bytes the frame's processes read from storage
+    ('write_bytes', 'q'),   # Bytes the frame's processes wrote to storage
+    ('threads', 'i'),
+)
+SUFFIX = '.rqprof'
+
+
+def getProfilePath(logFile):
+    """Returns where the profile of the frame logging to logFile is written"""
+    return os.path.splitext(logFile)[0] + SUFFIX
+
+
+class FrameProfile(object):
+    """Ring buffer of resource samples of one frame. Thread safe."""
+
+    def __init__(self, capacity=None):
+        """
+        @type  capacity: int
+        @param capacity: Samples kept, the oldest are overwritten once full,
+                         defaults to RQD_FRAME_PROFILE_SAMPLES
+        """
+        self.capacity = capacity or rqd.rqconstants.RQD_FRAME_PROFILE_SAMPLES
+        self.__lock = threading.Lock()
+        self.__columns = [array.array(typecode, [0] * self.capacity) for _, typecode in COLUMNS]
+        self.__total = 0
+
+    def __len__(self):
+        return min(self.__total, self.capacity)
+
+    def record(self, timestamp, rss, pcpu, readBytes, writeBytes, threads):
+        """Adds a sample, overwriting the oldest one when the buffer is full"""
+        with self.__lock:
+            index = self.__total % self.capacity
+            for column, value in zip(self.__columns,
+                                     (timestamp, rss, pcpu, readBytes, writeBytes, threads)):
+                column[index] = value
+            self.__total += 1
+
+    def getSamples(self):
+        """Returns the samples, oldest first
+        @rtype:  list
+        @return: Tuples of the values of COLUMNS"""
+        with self.__lock:
+            order = self.__order()
+            return [tuple(column[index] for column in self.__columns) for index in order]
+
+    def __order(self):
+        if self.__total <= self.capacity:
+            return range(self.__total)
+        start = self.__total % self.capacity
+        return list(range(start, self.capacity)) + list(range(start))
+
+    def toBytes(self):
+        """Returns the samples in the file layout, oldest first"""
+        with self.__lock:
+            count = len(self)
+            data = [HEADER.pack(MAGIC, VERSION, count, self.__total - count)]
+            start = self.__total % self.capacity if self.__total > self.capacity else 0
+            for column in self.__columns:
+                ordered = column[start:count] + column[:start]
+                if sys.byteorder == 'big':
+                    ordered.byteswap()
+                data.append(ordered.tobytes())
+        return b''.join(data)
+
+    def write(self, path):
+        """Writes the samples to path"""
+        with open(path, 'wb') as profileFile:
+            profileFile.write(self.toBytes())
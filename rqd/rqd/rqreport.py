@@ -0,0 +1,129 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Decides which status reports are worth sending to the cuebot.
+
+The cuebot treats every HostReport as the complete state of the host, so
+reports can not be trimmed down to the fields that changed. What can be
+avoided is sending a report that carries no new information, as long as the
+cuebot still hears from the host often enough to consider it alive.
+"""
+
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from builtins import object
+import threading
+import time
+
+import rqd.compiled_proto.report_pb2
+import rqd.rqconstants
+
+
+# Readings that change on every sample, they are compared after rounding.
+VOLATILE_HOST_MEMORY_FIELDS = ('free_mem', 'free_swap', 'free_mcp')
+VOLATILE_FRAME_MEMORY_FIELDS = ('rss', 'max_rss', 'vsize', 'max_vsize')
+VOLATILE_HOST_ATTRIBUTES = ('swapout', 'memAvailable', 'psiCpuSome', 'psiCpuFull',
+                            'psiMemorySome', 'psiMemoryFull', 'psiIoSome', 'psiIoFull',
+                            'stagingHits', 'stagingMisses', 'stagingBytes')
+VOLATILE_FRAME_ATTRIBUTES = ('pcpu', 'cgroupMemoryCurrent', 'cgroupMemoryPeak',
+                             'cgroupMemoryPressure', 'ioReadBytes', 'ioWriteBytes',
+                             'ioReadChars', 'ioWriteChars', 'ioReadSyscalls', 'ioWriteSyscalls',
+                             'ioReadBytesPerSec', 'ioWriteBytesPerSec', 'ioReadCharsPerSec',
+                             'ioWriteCharsPerSec')
+LOAD_QUANTUM = 100
+
+
+def _quantize(value, quantum):
+    return (value // quantum) * quantum
+
+
+def fingerprint(report):
+    """Returns a comparable summary of a HostReport. Two reports with the same
+    fingerprint differ only by amounts too small for the cuebot to act on.
+    @type  report: rqd.compiled_proto.report_pb2.HostReport
+    @param report: The report to summarize
+    @rtype:  bytes
+    @return: The serialized, normalized report"""
+    quantum = rqd.rqconstants.RQD_REPORT_MEMORY_QUANTUM_KB
+    normalized = rqd.compiled_proto.report_pb2.HostReport()
+    normalized.CopyFrom(report)
+
+    host = normalized.host
+    for field in VOLATILE_HOST_MEMORY_FIELDS:
+        setattr(host, field, _quantize(getattr(host, field), quantum))
+    host.load = _quantize(host.load, LOAD_QUANTUM)
+    for key in VOLATILE_HOST_ATTRIBUTES:
+        host.attributes.pop(key, None)
+    if 'freeGpu' in host.attributes:
+        host.attributes['freeGpu'] = str(_quantize(int(host.attributes['freeGpu']), quantum))
+
+    for frame in normalized.frames:
+        for field in VOLATILE_FRAME_MEMORY_FIELDS:
+            setattr(frame, field, _quantize(getattr(frame, field), quantum))
+        for key in VOLATILE_FRAME_ATTRIBUTES:
+            frame.attributes.pop(key, None)
+
+    # Frame order follows the frame cache, which is not meaningful.
+    frames = sorted(normalized.frames, key=lambda frame: frame.frame_id)
+    del normalized.frames[:]
+    normalized.frames.extend(frames)
+
+    return normalized.SerializeToString(deterministic=True)
+
+
+class ReportFilter(object):
+    """Skips status reports that match the last one the cuebot acknowledged,
+    up to RQD_REPORT_HEARTBEAT_SEC between reports."""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__lastFingerprint = None
+        self.__lastSent = 0
+        self.skipped = 0
+
+    def shouldSend(self, report, now=None):
+        """Returns True if the report has to be sent
+        @type  report: rqd.compiled_proto.report_pb2.HostReport
+        @param report: The report about to be sent"""
+        if not rqd.rqconstants.RQD_REPORT_SKIP_UNCHANGED:
+            return True
+        now = now or time.time()
+        with self.__lock:
+            if (self.__lastFingerprint is not None
+                    and now - self.__lastSent < rqd.rqconstants.RQD_REPORT_HEARTBEAT_SEC
+                    and fingerprint(report) == self.__lastFingerprint):
+                self.skipped += 1
+                return False
+        return True
+
+    def acknowledge(self, report, now=None):
+        """Records a report the cuebot has received
+        @type  report: rqd.compiled_proto.report_pb2.HostReport
+        @param report: The report that was sent"""
+        if not rqd.rqconstants.RQD_REPORT_SKIP_UNCHANGED:
+            return
+        value = fingerprint(report)
+        with self.__lock:
+            self.__lastFingerprint = value
+            self.__lastSent = now or time.time()
+
+    def reset(self):
+        """Forces the next report to be sent"""
+        with self.__lock:
+            self.__lastFingerprint = None
@@ -0,0 +1,308 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Single threaded event loop used by rqd for its periodic tasks, file
+descriptor readiness and reaping of frame processes.
+"""
+
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from builtins import object
+from concurrent import futures
+import heapq
+import itertools
+import logging as log
+import os
+import selectors
+import socket
+import threading
+import time
+
+import rqd.rqconstants
+
+
+def exitCode(status):
+    """Converts a wait status into a subprocess style return code, negative
+    when the process was killed by a signal.
+    @type  status: int
+    @param status: The status returned by os.waitpid or os.wait4
+    @rtype:  int
+    @return: The return code"""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def processExists(pid):
+    """Returns whether the process pid is running, zombies that have not been
+    reaped yet count as exited
+    @type  pid: int
+    @param pid: Any process
+    @rtype:  bool"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists but belongs to another user.
+        pass
+    try:
+        with open(os.path.join(rqd.rqconstants.PATH_PROC, str(pid), 'stat')) as statFile:
+            # The state follows the command, which is in parentheses.
+            return statFile.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except (IOError, OSError, IndexError):
+        return True
+
+
+class ScheduledCall(object):
+    """A function call scheduled on the Scheduler, can be cancelled. when is
+    in time.monotonic() seconds, so clock changes do not move it."""
+
+    __slots__ = ('when', 'func', 'args', 'cancelled', 'done')
+
+    def __init__(self, when, func, args):
+        self.when = when
+        self.func = func
+        self.args = args
+        self.cancelled = False
+        self.done = False
+
+    def cancel(self):
+        """Prevents the call from running if it has not run yet"""
+        self.cancelled = True
+
+    def isPending(self):
+        """Returns True if the call has neither run nor been cancelled"""
+        return not self.cancelled and not self.done
+
+
+class Scheduler(threading.Thread):
+    """Runs timers, fd callbacks and child exit callbacks on one thread.
+
+    Callbacks must not block for long since they delay everything else on the
+    loop, blocking work can be handed to runInWorker()."""
+
+    def __init__(self, workers=None):
+        """
+        @type  workers: int
+        @param workers: Size of the pool used by runInWorker, defaults to
+                        RQD_SCHEDULER_WORKERS
+        """
+        threading.Thread.__init__(self, name='RqdScheduler')
+        self.daemon = True
+
+        self.__lock = threading.Lock()
+        self.__timers = []
+        self.__counter = itertools.count()
+        self.__stopped = False
+        self.__loopThread = None
+
+        self.__selector = selectors.DefaultSelector()
+        self.__wakeupRead, self.__wakeupWrite = socket.socketpair()
+        self.__wakeupRead.setblocking(False)
+        self.__wakeupWrite.setblocking(False)
+        self.__selector.register(self.__wakeupRead, selectors.EVENT_READ, self.__drainWakeup)
+
+        self.__workers = futures.ThreadPoolExecutor(
+            max_workers=workers or rqd.rqconstants.RQD_SCHEDULER_WORKERS)
+
+    def __wakeup(self):
+        try:
+            self.__wakeupWrite.send(b'\0')
+        except (IOError, OSError):
+            # The socket buffer is full so a wakeup is already pending.
+            pass
+
+    def __drainWakeup(self, sock):
+        try:
+            while sock.recv(4096):
+                pass
+        except (IOError, OSError):
+            pass
+
+    def isLoopThread(self):
+        """Returns True if called from the scheduler's own thread"""
+        return threading.current_thread() is self.__loopThread
+
+    def callLater(self, delay, func, *args):
+        """Schedules func(*args) to run on the loop after delay seconds
+        @type  delay: float
+        @param delay: Seconds to wait
+        @rtype:  ScheduledCall
+        @return: A handle that can be used to cancel the call"""
+        call = ScheduledCall(time.monotonic() + max(delay, 0), func, args)
+        with self.__lock:
+            heapq.heappush(self.__timers, (call.when, next(self.__counter), call))
+        if not self.isLoopThread():
+            self.__wakeup()
+        return call
+
+    def callSoon(self, func, *args):
+        """Schedules func(*args) to run on the loop as soon as possible"""
+        return self.callLater(0, func, *args)
+
+    def runInWorker(self, func, *args):
+        """Runs a blocking func(*args) on the worker pool
+        @rtype:  concurrent.futures.Future
+        @return: The future of the call"""
+        return self.__workers.submit(self.__invoke, func, *args)
+
+    def addReader(self, fileobj, callback):
+        """Calls callback(fileobj) on the loop whenever fileobj is readable
+        @type  fileobj: int or object with a fileno() method
+        @param fileobj: The file descriptor to watch"""
+        if self.isLoopThread():
+            self.__selector.register(fileobj, selectors.EVENT_READ, callback)
+        else:
+            self.callSoon(self.__selector.register, fileobj, selectors.EVENT_READ, callback)
+
+    def removeReader(self, fileobj):
+        """Stops watching fileobj"""
+        if self.isLoopThread():
+            self.__unregister(fileobj)
+        else:
+            self.callSoon(self.__unregister, fileobj)
+
+    def __unregister(self, fileobj):
+        try:
+            self.__selector.unregister(fileobj)
+        except (KeyError, ValueError):
+            pass
+
+    def watchChild(self, pid, callback):
+        """Reaps the child process pid when it exits and then calls
+        callback(pid, status, rusage) on the loop. status and rusage are None
+        if the child was already reaped elsewhere.
+
+        Uses a pidfd where the platform supports one, otherwise a short lived
+        thread blocks in wait for the child.
+        @type  pid: int
+        @param pid: A child process of rqd"""
+        pidfd = None
+        if hasattr(os, 'pidfd_open'):
+            try:
+                pidfd = os.pidfd_open(pid)
+            except OSError as e:
+                log.debug('pidfd_open failed for pid %s: %s' % (pid, e))
+        if pidfd is None:
+            waiter = threading.Thread(target=self.__waitChild, args=(pid, callback),
+                                      name='RqdChildWaiter-%d' % pid)
+            waiter.daemon = True
+            waiter.start()
+            return
+        self.addReader(pidfd, lambda fd: self.__reapChild(pid, fd, callback))
+
+    def watchProcess(self, pid, callback, pollSec=1.0):
+        """Calls callback(pid) on the loop once the process pid has exited.
+        Unlike watchChild, the process need not be a child of rqd and is not
+        reaped.
+
+        Uses a pidfd where the platform supports one, otherwise checks
+        whether the process exists every pollSec seconds.
+        @type  pid: int
+        @param pid: Any process
+        @type  pollSec: float
+        @param pollSec: Seconds between checks without a pidfd"""
+        pidfd = None
+        if hasattr(os, 'pidfd_open'):
+            try:
+                pidfd = os.pidfd_open(pid)
+            except ProcessLookupError:
+                self.callSoon(callback, pid)
+                return
+            except OSError as e:
+                log.debug('pidfd_open failed for pid %s: %s' % (pid, e))
+        if pidfd is None:
+            self.callSoon(self.__pollProcess, pid, callback, pollSec)
+            return
+        self.addReader(pidfd, lambda fd: self.__onProcessExit(pid, fd, callback))
+
+    def __onProcessExit(self, pid, pidfd, callback):
+        self.__unregister(pidfd)
+        os.close(pidfd)
+        self.__invoke(callback, pid)
+
+    def __pollProcess(self, pid, callback, pollSec):
+        if not processExists(pid):
+            callback(pid)
+            return
+        self.callLater(pollSec, self.__pollProcess, pid, callback, pollSec)
+
+    def __waitForChild(self, pid):
+        try:
+            if hasattr(os, 'wait4'):
+                _, status, rusage = os.wait4(pid, 0)
+                return status, rusage
+            _, status = os.waitpid(pid, 0)
+            return status, None
+        except ChildProcessError:
+            log.warning('Child process %s was reaped elsewhere' % pid)
+            return None, None
+
+    def __reapChild(self, pid, pidfd, callback):
+        self.__unregister(pidfd)
+        os.close(pidfd)
+        status, rusage = self.__waitForChild(pid)
+        self.__invoke(callback, pid, status, rusage)
+
+    def __waitChild(self, pid, callback):
+        status, rusage = self.__waitForChild(pid)
+        self.callSoon(callback, pid, status, rusage)
+
+    def __invoke(self, func, *args):
+        try:
+            return func(*args)
+        except Exception as e:
+            log.exception('Scheduled call %s failed: %s' % (func, e))
+
+    def __nextTimeout(self):
+        with self.__lock:
+            while self.__timers and self.__timers[0][2].cancelled:
+                heapq.heappop(self.__timers)
+            if not self.__timers:
+                return None
+            return max(self.__timers[0][0] - time.monotonic(), 0)
+
+    def __popDueCalls(self):
+        now = time.monotonic()
+        due = []
+        with self.__lock:
+            while self.__timers and self.__timers[0][0] <= now:
+                call = heapq.heappop(self.__timers)[2]
+                if not call.cancelled:
+                    due.append(call)
+        return due
+
+    def run(self):
+        """Runs the loop until stop() is called"""
+        self.__loopThread = threading.current_thread()
+        while not self.__stopped:
+            for key, _ in self.__selector.select(self.__nextTimeout()):
+                self.__invoke(key.data, key.fileobj)
+            for call in self.__popDueCalls():
+                if not call.cancelled:
+                    call.done = True
+                    self.__invoke(call.func, *call.args)
+        self.__selector.close()
+
+    def stop(self):
+        """Stops the loop and the worker pool"""
+        self.__stopped = True
+        self.__wakeup()
+        self.__workers.shutdown(wait=False)
@@ -0,0 +1,310 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+On-disk spool of frame completion reports that could not be delivered.
+
+The spool is an append-only file of length prefixed records. A report record
+holds a serialized FrameCompleteReport, a delivered record holds the frame id
+of a report the cuebot has received. Replaying the file on startup gives the
+reports still pending, the latest one per frame. The file is truncated once
+nothing is pending and rewritten when it grows past RQD_SPOOL_MAX_BYTES.
+
+The spool is replayed to the cuebot, so it is kept in a directory only rqd's
+user can write to. rqd creates the directory with prepareDirectory while it
+still runs as root, and refuses a directory or file owned by anyone else.
+"""
+
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from builtins import object
+import collections
+import logging as log
+import os
+import stat
+import struct
+import tempfile
+import threading
+
+import rqd.compiled_proto.report_pb2
+import rqd.rqconstants
+
+
+HEADER = struct.Struct('>IB')
+RECORD_REPORT = 1
+RECORD_DELIVERED = 2
+
+
+def prepareDirectory(path, uid=None, gid=None):
+    """Creates the directory of a spool file with mode 0700, must be called
+    as a user allowed to create it and give it to uid
+    @type  path: str
+    @param path: The spool file
+    @type  uid: int
+    @param uid: The user the spool is written as, None to keep the caller
+    @type  gid: int
+    @param gid: The group of the directory"""
+    directory = os.path.dirname(path)
+    if not directory or os.path.isdir(directory):
+        return
+    try:
+        os.makedirs(directory, mode=0o700)
+        if uid is not None:
+            os.chown(directory, uid, gid if gid is not None else -1)
+    except OSError as e:
+        log.warning('Unable to create the completion report spool directory %s: %s'
+                    % (directory, e))
+
+
+def _checkOwner(path, pathStat, uid, isDir):
+    """Raises IOError unless path is a directory or regular file, as isDir
+    says, owned by uid and not writable by other users"""
+    if isDir and not stat.S_ISDIR(pathStat.st_mode):
+        raise IOError('%s is not a directory' % path)
+    if not isDir and not stat.S_ISREG(pathStat.st_mode):
+        raise IOError('%s is not a regular file' % path)
+    if uid is not None and pathStat.st_uid != uid:
+        raise IOError('%s is owned by uid %d instead of %d' % (path, pathStat.st_uid, uid))
+    if pathStat.st_mode & 0o022:
+        raise IOError('%s is writable by other users' % path)
+
+
+class ReportSpool(object):
+    """Pending FrameCompleteReports keyed by frame id, backed by a file."""
+
+    def __init__(self, path=None, maxBytes=None, maxReports=None, maxAttempts=None, uid=None):
+        """
+        @type  path: str
+        @param path: The spool file, read on first use. If None the spool is
+                     only kept in memory
+        @type  maxBytes: int
+        @param maxBytes: Size the file is compacted at, defaults to RQD_SPOOL_MAX_BYTES
+        @type  maxReports: int
+        @param maxReports: Oldest reports are dropped beyond this many, defaults to
+                           RQD_SPOOL_MAX_REPORTS
+        @type  maxAttempts: int
+        @param maxAttempts: Reports are dropped after failing this many times for
+                            another reason than the cuebot being unreachable,
+                            defaults to RQD_SPOOL_MAX_ATTEMPTS
+        @type  uid: int
+        @param uid: The user the directory and file must belong to, defaults
+                    to the effective user
+        """
+        self.path = path
+        self.uid = uid if uid is not None else getattr(os, 'geteuid', lambda: None)()
+        self.maxBytes = maxBytes or rqd.rqconstants.RQD_SPOOL_MAX_BYTES
+        self.maxReports = maxReports or rqd.rqconstants.RQD_SPOOL_MAX_REPORTS
+        self.maxAttempts = maxAttempts or rqd.rqconstants.RQD_SPOOL_MAX_ATTEMPTS
+        self.dropped = 0
+        self.__attempts = {}
+        self.__lock = threading.Lock()
+        self.__pending = collections.OrderedDict()
+        self.__file = None
+        self.__size = 0
+        self.__opened = path is None
+
+    def __open(self):
+        """Loads and opens the spool file on first use, must hold the lock"""
+        if self.__opened:
+            return
+        self.__opened = True
+        try:
+            directory = os.path.dirname(self.path) or os.curdir
+            if not os.path.isdir(directory):
+                os.makedirs(directory, mode=0o700)
+            _checkOwner(directory, os.lstat(directory), self.uid, True)
+            fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT
+                         | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+            self.__file = os.fdopen(fd, 'a+b')
+            _checkOwner(self.path, os.fstat(fd), self.uid, False)
+            self.__file.seek(0)
+            data = self.__file.read()
+            validSize = self.__load(data)
+            if validSize != len(data):
+                log.warning('Discarding a partial record at the end of %s' % self.path)
+                self.__file.truncate(validSize)
+            self.__size = validSize
+        except (IOError, OSError) as e:
+            log.warning('Unable to open completion report spool %s, keeping it in memory: %s'
+                        % (self.path, e))
+            if self.__file is not None:
+                self.__file.close()
+            self.__file = None
+            self.__pending.clear()
+        if self.__pending:
+            log.warning('Found %d undelivered frame completion reports in %s'
+                        % (len(self.__pending), self.path))
+
+    def __load(self, data):
+        """Replays the records of the spool file, returns their valid size"""
+        offset = 0
+        while offset + HEADER.size <= len(data):
+            length, recordType = HEADER.unpack_from(data, offset)
+            end = offset + HEADER.size + length
+            if end > len(data):
+                break
+            payload = data[offset + HEADER.size:end]
+            if recordType == RECORD_REPORT:
+                report = rqd.compiled_proto.report_pb2.FrameCompleteReport()
+                report.ParseFromString(payload)
+                self.__pending.pop(report.frame.frame_id, None)
+                self.__pending[report.frame.frame_id] = report
+            elif recordType == RECORD_DELIVERED:
+                self.__pending.pop(payload.decode('utf-8'), None)
+            offset = end
+        return offset
+
+    def __write(self, recordType, payload):
+        if self.__file is None:
+            return
+        try:
+            self.__file.write(HEADER.pack(len(payload), recordType) + payload)
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+            self.__size += HEADER.size + len(payload)
+        except (IOError, OSError) as e:
+            log.warning('Unable to write to completion report spool %s: %s' % (self.path, e))
+
+    def __rewrite(self):
+        """Replaces the file with one holding only the pending reports"""
+        if self.__file is None:
+            return
+        tempPath = None
+        try:
+            size = 0
+            fd, tempPath = tempfile.mkstemp(prefix='.%s.' % os.path.basename(self.path),
+                                            suffix='.tmp',
+                                            dir=os.path.dirname(self.path) or os.curdir)
+            with os.fdopen(fd, 'wb') as fp:
+                for report in self.__pending.values():
+                    payload = report.SerializeToString()
+                    fp.write(HEADER.pack(len(payload), RECORD_REPORT) + payload)
+                    size += HEADER.size + len(payload)
+                fp.flush()
+                os.fsync(fp.fileno())
+            self.__file.close()
+            os.rename(tempPath, self.path)
+            tempPath = None
+            self.__file = open(self.path, 'ab')
+            self.__size = size
+        except (IOError, OSError) as e:
+            log.warning('Unable to compact completion report spool %s: %s' % (self.path, e))
+            if tempPath is not None:
+                try:
+                    os.remove(tempPath)
+                except OSError:
+                    pass
+
+    def append(self, report):
+        """Adds a report, replacing any pending report for the same frame
+        @type  report: rqd.compiled_proto.report_pb2.FrameCompleteReport
+        @param report: The undelivered report"""
+        with self.__lock:
+            self.__open()
+            frameId = report.frame.frame_id
+            self.__attempts.pop(frameId, None)
+            self.__pending.pop(frameId, None)
+            self.__pending[frameId] = report
+            while len(self.__pending) > self.maxReports:
+                droppedId, _ = self.__pending.popitem(last=False)
+                self.dropped += 1
+                log.warning('Completion report spool is full, dropping the report for frame %s'
+                            % droppedId)
+            self.__write(RECORD_REPORT, report.SerializeToString())
+            if self.__size > self.maxBytes:
+                self.__rewrite()
+
+    def markDelivered(self, frameIds):
+        """Removes the reports of the given frames once the cuebot has them
+        @type  frameIds: list
+        @param frameIds: The frame ids of the delivered reports"""
+        with self.__lock:
+            self.__open()
+            for frameId in frameIds:
+                self.__attempts.pop(frameId, None)
+                if self.__pending.pop(frameId, None) is not None:
+                    self.__write(RECORD_DELIVERED, frameId.encode('utf-8'))
+            if not self.__pending and self.__size:
+                self.__rewrite()
+
+    def drop(self, frameIds, reason):
+        """Removes the reports of the given frames without delivering them
+        @type  frameIds: list
+        @param frameIds: The frame ids of the reports
+        @type  reason: str
+        @param reason: Why the reports are dropped, for the log"""
+        with self.__lock:
+            self.__open()
+            self.__drop(frameIds, reason)
+
+    def __drop(self, frameIds, reason):
+        for frameId in frameIds:
+            self.__attempts.pop(frameId, None)
+            if self.__pending.pop(frameId, None) is not None:
+                self.dropped += 1
+                log.error('Dropping the completion report for frame %s: %s' % (frameId, reason))
+                self.__write(RECORD_DELIVERED, frameId.encode('utf-8'))
+        if not self.__pending and self.__size:
+            self.__rewrite()
+
+    def markFailed(self, frameIds):
+        """Moves the reports of the given frames behind the other pending ones
+        after a failed attempt, dropping those that failed maxAttempts times
+        @type  frameIds: list
+        @param frameIds: The frame ids of the reports that failed"""
+        with self.__lock:
+            self.__open()
+            exhausted = []
+            for frameId in frameIds:
+                report = self.__pending.pop(frameId, None)
+                if report is None:
+                    continue
+                self.__pending[frameId] = report
+                self.__attempts[frameId] = self.__attempts.get(frameId, 0) + 1
+                if self.__attempts[frameId] >= self.maxAttempts:
+                    exhausted.append(frameId)
+            self.__drop(exhausted, 'failed %d times' % self.maxAttempts)
+
+    def getBatch(self, size):
+        """Returns up to size of the oldest pending reports
+        @rtype:  list
+        @return: List of FrameCompleteReport"""
+        with self.__lock:
+            self.__open()
+            batch = []
+            for report in self.__pending.values():
+                if len(batch) >= size:
+                    break
+                batch.append(report)
+            return batch
+
+    def getFileSize(self):
+        """Returns the size of the spool file in bytes"""
+        return self.__size
+
+    def __len__(self):
+        with self.__lock:
+            self.__open()
+            return len(self.__pending)
+
+    def close(self):
+        """Closes the spool file"""
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
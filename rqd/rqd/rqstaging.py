@@ -0,0 +1,337 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+Local disk cache of shared frame inputs, such as textures and caches.
+
+rqd gives every job a directory under the staging root, owned by the job's
+user, and passes it to frames in CUE_STAGING_DIR. Frames copy inputs
+into it with stage(), or the rqd-stage command, which prints the local copy
+of each path:
+
+    tex=$(rqd-stage /shows/pipe/tex/wood.tx)
+
+A copy is found by the source path, size and modification time, so a
+changed source is copied again and an unchanged one is never read twice.
+rqd evicts the least recently used copies while the filesystem has less
+than the configured free space, and removes a job's directory once it is
+empty and none of its frames run on the host. Only root may add entries to
+the staging root, and rqd never follows a symlink in a job directory, since
+it cleans them up as root.
+
+This module is run in frame processes and must not import other rqd modules.
+"""
+
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from builtins import object
+import argparse
+import errno
+import hashlib
+import logging as log
+import os
+import shutil
+import stat
+import sys
+import threading
+import time
+
+
+ENV_STAGING_DIR = 'CUE_STAGING_DIR'
+HITS_FILE = '.hits'
+MISSES_FILE = '.misses'
+TEMP_PREFIX = '.tmp-'
+# Unfinished copies older than this are left over from killed frames.
+TEMP_MAX_AGE_SEC = 3600
+_OPEN_DIR_FLAGS = os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) | getattr(os, 'O_NOFOLLOW', 0)
+
+
+def _count(cacheDir, name):
+    """Counts a lookup by appending one byte, which is atomic between frames"""
+    try:
+        with open(os.path.join(cacheDir, name), 'ab') as countFile:
+            countFile.write(b'.')
+    except (IOError, OSError):
+        pass
+
+
+def _lstatRegular(path):
+    """Returns the lstat of path if it is a regular file, None otherwise"""
+    try:
+        pathStat = os.lstat(path)
+    except OSError:
+        return None
+    return pathStat if stat.S_ISREG(pathStat.st_mode) else None
+
+
+def _removeBelow(root, parts):
+    """Removes the file at root/parts[0]/.../parts[-1], opening each directory
+    with O_NOFOLLOW so a directory swapped for a symlink is not followed"""
+    if os.unlink not in os.supports_dir_fd:
+        os.remove(os.path.join(root, *parts))
+        return
+    fd = os.open(root, _OPEN_DIR_FLAGS)
+    try:
+        for part in parts[:-1]:
+            nextFd = os.open(part, _OPEN_DIR_FLAGS, dir_fd=fd)
+            os.close(fd)
+            fd = nextFd
+        os.unlink(parts[-1], dir_fd=fd)
+    finally:
+        os.close(fd)
+
+
+def getKey(source):
+    """Returns the cache key of a file and its size
+    @rtype:  tuple
+    @return: (hex digest, size in bytes)"""
+    sourceStat = os.stat(source)
+    identity = '%s\0%d\0%d' % (os.path.realpath(source), sourceStat.st_size,
+                               int(sourceStat.st_mtime * 1e9))
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest(), sourceStat.st_size
+
+
+def stage(source, cacheDir=None):
+    """Returns the local copy of source, copying it on first use. The source
+    is returned when there is no staging directory or the copy fails.
+    @type  source: str
+    @param source: The file to stage
+    @type  cacheDir: str
+    @param cacheDir: The job's staging directory, defaults to CUE_STAGING_DIR
+    @rtype:  str
+    @return: The path to read instead of source"""
+    cacheDir = cacheDir or os.environ.get(ENV_STAGING_DIR)
+    if not cacheDir or not os.path.isfile(source):
+        return source
+    key, _ = getKey(source)
+    target = os.path.join(cacheDir, key[:2], key + os.path.splitext(source)[1])
+    try:
+        # Marks the copy as recently used for eviction.
+        os.utime(target, None)
+        _count(cacheDir, HITS_FILE)
+        return target
+    except OSError:
+        pass
+
+    _count(cacheDir, MISSES_FILE)
+    tempPath = os.path.join(cacheDir, key[:2], '%s%s.%d' % (TEMP_PREFIX, key, os.getpid()))
+    try:
+        if not os.path.isdir(os.path.dirname(target)):
+            try:
+                os.makedirs(os.path.dirname(target))
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+        shutil.copyfile(source, tempPath)
+        # Frames staging the same file at once each copy it, the last rename wins.
+        os.rename(tempPath, target)
+        return target
+    except (IOError, OSError) as e:
+        log.warning('Unable to stage %s, reading it in place: %s' % (source, e))
+        try:
+            os.remove(tempPath)
+        except OSError:
+            pass
+        return source
+
+
+class StagingCache(object):
+    """The staging root of the host, with one directory per job. Thread safe."""
+
+    def __init__(self, root, minFreeKb=0, maxBytes=0):
+        """
+        @type  root: str
+        @param root: The directory the job directories are kept in
+        @type  minFreeKb: int
+        @param minFreeKb: Copies are evicted while the filesystem has less free space
+        @type  maxBytes: int
+        @param maxBytes: Copies are evicted while they take more space, 0 for no limit
+        """
+        self.root = root
+        self.minFreeKb = minFreeKb
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self.evicted = 0
+        self.__lock = threading.Lock()
+        # job: (hits, misses) counted in the directories that still exist
+        self.__counts = {}
+
+    def getJobDir(self, jobName):
+        """Returns the staging directory of a job"""
+        return os.path.join(self.root, jobName)
+
+    def prepareJob(self, jobName, uid=None, gid=None):
+        """Creates the staging directory of a job and gives it to the job's
+        user. Must be called as root, anything but a directory in its place is
+        replaced.
+        @type  jobName: str
+        @param jobName: The job
+        @type  uid: int
+        @param uid: The user the frames run as, None to keep root
+        @type  gid: int
+        @param gid: The group the frames run as
+        @rtype:  str
+        @return: The directory"""
+        if not jobName or os.sep in jobName or jobName in (os.curdir, os.pardir):
+            raise ValueError('Invalid job name for a staging directory: %r' % jobName)
+        jobDir = self.getJobDir(jobName)
+        try:
+            jobStat = os.lstat(jobDir)
+        except OSError:
+            jobStat = None
+        if jobStat is not None and not stat.S_ISDIR(jobStat.st_mode):
+            os.unlink(jobDir)
+            jobStat = None
+        if jobStat is None:
+            if not os.path.isdir(self.root):
+                os.makedirs(self.root, 0o755)
+            try:
+                os.mkdir(jobDir, 0o755)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+            if uid is not None:
+                os.chown(jobDir, uid, gid if gid is not None else -1)
+        return jobDir
+
+    def getFreeKb(self):
+        """Returns the free space of the staging filesystem in kB"""
+        fsStat = os.statvfs(self.root)
+        return (fsStat.f_bavail * fsStat.f_frsize) // 1024
+
+    def scan(self, runningJobs=()):
+        """Updates the hit counters, evicts the least recently used copies
+        while space is short and removes unused job directories. Must be
+        called as root, the directories belong to the users of the jobs, so
+        symlinks are skipped and never followed.
+        @type  runningJobs: iterable
+        @param runningJobs: Names of the jobs with frames on the host"""
+        if not os.path.isdir(self.root):
+            return
+        runningJobs = set(runningJobs)
+        now = time.time()
+        copies = []
+        counts = {}
+        for jobName in os.listdir(self.root):
+            jobDir = self.getJobDir(jobName)
+            try:
+                if not stat.S_ISDIR(os.lstat(jobDir).st_mode):
+                    continue
+            except OSError:
+                continue
+            counts[jobName] = (self.__countOf(jobDir, HITS_FILE),
+                               self.__countOf(jobDir, MISSES_FILE))
+            for dirPath, _, fileNames in os.walk(jobDir):
+                parts = [jobName] + os.path.relpath(dirPath, jobDir).split(os.sep)
+                parts = [part for part in parts if part != os.curdir]
+                for fileName in fileNames:
+                    fileStat = _lstatRegular(os.path.join(dirPath, fileName))
+                    if fileStat is None:
+                        continue
+                    if fileName.startswith(TEMP_PREFIX):
+                        if now - fileStat.st_mtime > TEMP_MAX_AGE_SEC:
+                            self.__remove(parts + [fileName])
+                    elif dirPath != jobDir:
+                        copies.append((fileStat.st_mtime, fileStat.st_size, parts + [fileName]))
+
+        size = sum(copy[1] for copy in copies)
+        evicted = 0
+        if copies:
+            copies.sort()
+            freeKb = self.getFreeKb() if self.minFreeKb else 0
+            while copies and ((self.minFreeKb and freeKb < self.minFreeKb)
+                              or (self.maxBytes and size > self.maxBytes)):
+                _, copySize, parts = copies.pop(0)
+                if self.__remove(parts):
+                    size -= copySize
+                    freeKb += copySize // 1024
+                    evicted += 1
+
+        with self.__lock:
+            for jobName, jobCounts in list(counts.items()):
+                if jobName not in runningJobs and not self.__hasCopies(self.getJobDir(jobName)):
+                    if self.__removeJob(jobName):
+                        # Keep counting the lookups of removed directories.
+                        self.hits += jobCounts[0]
+                        self.misses += jobCounts[1]
+                        counts.pop(jobName)
+            self.__counts = counts
+            self.size = size
+            self.evicted += evicted
+
+    @staticmethod
+    def __countOf(jobDir, name):
+        countStat = _lstatRegular(os.path.join(jobDir, name))
+        return countStat.st_size if countStat is not None else 0
+
+    @staticmethod
+    def __hasCopies(jobDir):
+        for dirPath, _, fileNames in os.walk(jobDir):
+            if dirPath != jobDir and fileNames:
+                return True
+        return False
+
+    def __remove(self, parts):
+        try:
+            _removeBelow(self.root, parts)
+            return True
+        except OSError as e:
+            log.warning('Unable to remove staged file %s: %s'
+                        % (os.path.join(self.root, *parts), e))
+            return False
+
+    def __removeJob(self, jobName):
+        # rmtree does not follow symlinks below the directory, and refuses
+        # to remove a directory that was replaced by one.
+        jobDir = self.getJobDir(jobName)
+        try:
+            shutil.rmtree(jobDir)
+            return True
+        except OSError as e:
+            log.warning('Unable to remove staging directory %s: %s' % (jobDir, e))
+            return False
+
+    def getStats(self):
+        """Returns the lookups, hits, misses, bytes held and evicted copies"""
+        with self.__lock:
+            hits = self.hits + sum(count[0] for count in self.__counts.values())
+            misses = self.misses + sum(count[1] for count in self.__counts.values())
+            return {'hits': hits, 'misses': misses, 'bytes': self.size,
+                    'evicted': self.evicted}
+
+    def getAttributes(self):
+        """Returns the figures reported in RenderHost.attributes"""
+        stats = self.getStats()
+        return {'stagingHits': str(stats['hits']), 'stagingMisses': str(stats['misses']),
+                'stagingBytes': str(stats['bytes'])}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Prints the local copy of each file, staging it first if needed.')
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--dir', help='the staging directory, defaults to $%s' % ENV_STAGING_DIR)
+    args = parser.parse_args()
+    for path in args.paths:
+        print(stage(path, args.dir))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,313 @@
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+"""
+CPU topology and the allocation of physical cores to frames.
+
+The topology groups the logical cpus listed in /proc/cpuinfo into physical
+cores and the cores into nodes, a node being a NUMA node where the kernel
+exposes them and a socket otherwise. The allocator keeps a bitmap of free
+cores per node and places each frame on as few nodes, and as contiguous a
+run of cores, as it can.
+"""
+
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+
+from builtins import object
+from builtins import range
+import logging as log
+import os
+import re
+
+import rqd.rqconstants
+import rqd.rqexceptions
+
+
+def parseCpuList(cpuList):
+    """Parses a kernel cpu list such as 0-3,8-11
+    @type  cpuList: str
+    @param cpuList: The cpu list
+    @rtype:  list
+    @return: The cpu ids"""
+    cpus = []
+    for part in cpuList.strip().split(','):
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def readNumaNodes(path=None):
+    """Returns the cpus of each NUMA node exposed in sysfs
+    @rtype:  dict
+    @return: {node id: [cpu ids]}, empty if the kernel exposes no nodes"""
+    path = path or rqd.rqconstants.PATH_NUMA_NODES
+    nodes = {}
+    try:
+        for name in os.listdir(path):
+            match = re.match(r'^node(\d+)$', name)
+            if not match:
+                continue
+            with open(os.path.join(path, name, 'cpulist')) as cpuListFile:
+                nodes[int(match.group(1))] = parseCpuList(cpuListFile.read())
+    except (IOError, OSError):
+        return {}
+    return nodes
+
+
+class CpuTopology(object):
+    """Physical cores, the logical cpus of each core and the node each core is on."""
+
+    def __init__(self, cores):
+        """
+        @type  cores: list
+        @param cores: (node id, [logical cpu ids]) for each physical core
+        """
+        self.cores = []
+        self.__coreOfCpu = {}
+        self.__setCores(cores)
+
+    def __setCores(self, cores):
+        self.cores = sorted(cores, key=lambda core: (core[0], core[1][0]))
+        self.__coreOfCpu = {}
+        for index, (_, cpus) in enumerate(self.cores):
+            for cpu in cpus:
+                self.__coreOfCpu[cpu] = index
+
+    @classmethod
+    def fromCpuinfo(cls, processors):
+        """Builds the topology from /proc/cpuinfo processor blocks
+        @type  processors: list
+        @param processors: (processor, physical id, core id) of each block,
+                           the ids are strings and may be None"""
+        cores = {}
+        for processor, physicalId, coreId in processors:
+            cpu = int(processor)
+            if physicalId is None or coreId is None:
+                key = (0, 'cpu%d' % cpu)
+            else:
+                key = (int(physicalId), int(coreId))
+            cores.setdefault(key, []).append(cpu)
+        return cls([(key[0], sorted(cpus)) for key, cpus in cores.items()])
+
+    @classmethod
+    def fromCoreCount(cls, numCores, threadsPerCore=1):
+        """Builds a single node topology where core i runs on cpus
+        i, i + numCores, ..."""
+        return cls([(0, [core + thread * numCores for thread in range(threadsPerCore)])
+                    for core in range(numCores)])
+
+    def applyNumaNodes(self, nodes):
+        """Moves each core to the NUMA node of its first cpu
+        @type  nodes: dict
+        @param nodes: {node id: [cpu ids]}, as returned by readNumaNodes"""
+        nodeOfCpu = {}
+        for node, cpus in nodes.items():
+            for cpu in cpus:
+                nodeOfCpu[cpu] = node
+        self.__setCores([(nodeOfCpu.get(cpus[0], node), cpus) for node, cpus in self.cores])
+
+    def getCoreCount(self):
+        return len(self.cores)
+
+    def getNodes(self):
+        """Returns {node id: [core indexes]} in core order"""
+        nodes = {}
+        for index, (node, _) in enumerate(self.cores):
+            nodes.setdefault(node, []).append(index)
+        return nodes
+
+    def getCpus(self, coreIndexes):
+        """Returns the logical cpus of the given cores, core by core"""
+        cpus = []
+        for index in coreIndexes:
+            cpus.extend(self.cores[index][1])
+        return cpus
+
+    def getCores(self, cpus):
+        """Returns the distinct cores of the given logical cpus, in order"""
+        cores = []
+        for cpu in cpus:
+            index = self.__coreOfCpu.get(cpu)
+            if index is not None and index not in cores:
+                cores.append(index)
+        return cores
+
+
+class CoreAllocator(object):
+    """Allocates physical cores to frames. Whole cores are taken from a bitmap
+    of free cores per node. The fraction of a core left over by a request
+    shares a core with other fractions on the same node where one has room.
+    Not thread safe, use with locking."""
+
+    def __init__(self, topology):
+        """
+        @type  topology: CpuTopology
+        @param topology: The cores to allocate
+        """
+        self.topology = topology
+        self.__nodes = topology.getNodes()
+        self.__free = dict((node, (1 << len(cores)) - 1) for node, cores in self.__nodes.items())
+        self.__position = {}
+        for node, cores in self.__nodes.items():
+            for position, index in enumerate(cores):
+                self.__position[index] = (node, position)
+        # Units used on cores shared by fractional requests, 0 < used < CORE_VALUE
+        self.__shared = {}
+
+    @staticmethod
+    def __runs(bitmap, size):
+        """Yields (start, length) of each run of set bits"""
+        start = None
+        for bit in range(size + 1):
+            if bit < size and bitmap >> bit & 1:
+                if start is None:
+                    start = bit
+            elif start is not None:
+                yield start, bit - start
+                start = None
+
+    @staticmethod
+    def __bitCount(bitmap):
+        return bin(bitmap).count('1')
+
+    def __take(self, node, count):
+        """Takes count free cores from a node, the smallest contiguous run that
+        fits if there is one, otherwise the lowest free cores"""
+        cores = self.__nodes[node]
+        bitmap = self.__free[node]
+        runs = [run for run in self.__runs(bitmap, len(cores)) if run[1] >= count]
+        if runs:
+            start = min(runs, key=lambda run: (run[1], run[0]))[0]
+            positions = list(range(start, start + count))
+        else:
+            positions = [bit for bit in range(len(cores)) if bitmap >> bit & 1][:count]
+        for position in positions:
+            bitmap &= ~(1 << position)
+        self.__free[node] = bitmap
+        return [cores[position] for position in positions]
+
+    def __sharedCore(self, node, units):
+        """Returns the fullest shared core on the node with room for units"""
+        candidates = [(used, index) for index, used in self.__shared.items()
+                      if self.__position[index][0] == node
+                      and used + units <= rqd.rqconstants.CORE_VALUE]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda candidate: (candidate[0], -candidate[1]))[1]
+
+    def __placeFraction(self, node, units):
+        """Places the fraction of a core on the node, returns the core used"""
+        index = self.__sharedCore(node, units)
+        if index is None:
+            index = self.__take(node, 1)[0]
+            self.__shared[index] = 0
+        self.__shared[index] += units
+        return index
+
+    def getFreeCores(self, node=None):
+        """Returns the number of whole free cores, on one node or in total"""
+        nodes = [node] if node is not None else self.__free.keys()
+        return sum(self.__bitCount(self.__free[node]) for node in nodes)
+
+    def reserve(self, units):
+        """Reserves cores for a frame
+        @type  units: int
+        @param units: The cores requested, 100 = 1 physical core
+        @rtype:  list
+        @return: The core indexes, the core holding the fraction of a
+                 fractional request is last"""
+        whole, fraction = divmod(units, rqd.rqconstants.CORE_VALUE)
+
+        def fractionFits(node, spare=0):
+            return (self.__sharedCore(node, fraction) is not None
+                    or self.getFreeCores(node) > spare)
+
+        # Best fit, the node with the fewest free cores that holds the whole frame
+        fits = [node for node in sorted(self.__nodes)
+                if self.getFreeCores(node) >= whole
+                and (not fraction or fractionFits(node, spare=whole))]
+        if fits:
+            node = min(fits, key=self.getFreeCores)
+            cores = self.__take(node, whole)
+            if fraction:
+                cores.append(self.__placeFraction(node, fraction))
+            return cores
+
+        # Otherwise spread over as few nodes as possible, largest first
+        sharedRoom = any(self.__sharedCore(node, fraction) is not None for node in self.__nodes)
+        if self.getFreeCores() < whole + (1 if fraction and not sharedRoom else 0):
+            raise rqd.rqexceptions.CoreReservationFailureException(
+                'Not launching, insufficient cores to reserve %d' % units)
+        cores = []
+        nodes = []
+        remaining = whole
+        for node in sorted(self.__nodes, key=lambda node: (-self.getFreeCores(node), node)):
+            count = min(remaining, self.getFreeCores(node))
+            if count:
+                cores.extend(self.__take(node, count))
+                nodes.append(node)
+                remaining -= count
+        if fraction:
+            for node in nodes + sorted(self.__nodes):
+                if fractionFits(node):
+                    cores.append(self.__placeFraction(node, fraction))
+                    break
+        return cores
+
+    def release(self, cores, units=None):
+        """Releases cores reserved for a frame
+        @type  cores: list
+        @param cores: The core indexes returned by reserve
+        @type  units: int
+        @param units: The cores that were requested, whole cores if None"""
+        fraction = units % rqd.rqconstants.CORE_VALUE if units else 0
+        for number, index in enumerate(cores):
+            node, position = self.__position[index]
+            if fraction and number == len(cores) - 1 and index in self.__shared:
+                self.__shared[index] -= fraction
+                if self.__shared[index] > 0:
+                    continue
+                del self.__shared[index]
+            if self.__free[node] >> position & 1:
+                log.warning('Releasing core %d which is not reserved' % index)
+            self.__free[node] |= 1 << position
+
+    def getFragmentation(self):
+        """Describes how scattered the free cores of each node are
+        @rtype:  dict
+        @return: {node id: {'free': int, 'largest_run': int, 'shared': int,
+                            'fragmentation': float}}, fragmentation is 0 when
+                 the free cores are contiguous and approaches 1 as they scatter"""
+        result = {}
+        for node, cores in self.__nodes.items():
+            free = self.getFreeCores(node)
+            largest = max([length for _, length in self.__runs(self.__free[node], len(cores))]
+                          or [0])
+            result[node] = {
+                'free': free,
+                'largest_run': largest,
+                'shared': len([index for index in self.__shared
+                               if self.__position[index][0] == node]),
+                'fragmentation': 1 - largest / free if free else 0.0,
+            }
+        return result
@@ -25,6 +25,7 @@ from __future__ import division
 
 from builtins import str
 from builtins import object
+import collections
 import functools
 import os
 import platform
@@ -32,6 +33,7 @@ import random
 import socket
 import subprocess
 import threading
+import time
 import uuid
 
 import rqd.rqconstants
@@ -70,6 +72,102 @@ class Memoize(object):
         return cache[key]
 
 
+class LatencyTracker(object):
+    """Counts calls and keeps a bounded window of their durations for
+    percentiles. Thread safe."""
+
+    def __init__(self, window=1024):
+        self.__lock = threading.Lock()
+        self.__samples = collections.deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+        self.totalSeconds = 0.0
+        self.maxSeconds = 0.0
+
+    def record(self, seconds, ok=True):
+        """Records one call
+        @type  seconds: float
+        @param seconds: How long the call took
+        @type  ok: bool
+        @param ok: False if the call failed"""
+        with self.__lock:
+            self.count += 1
+            if not ok:
+                self.errors += 1
+            self.totalSeconds += seconds
+            self.maxSeconds = max(self.maxSeconds, seconds)
+            self.__samples.append(seconds)
+
+    def percentile(self, pct):
+        """Returns the given percentile, 0-100, of the recent durations in seconds"""
+        with self.__lock:
+            samples = sorted(self.__samples)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100.0))]
+
+    def summary(self):
+        """Returns the counters and latencies in milliseconds
+        @rtype:  dict"""
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_ms': self.totalSeconds * 1000.0 / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(50) * 1000.0,
+            'p99_ms': self.percentile(99) * 1000.0,
+            'max_ms': self.maxSeconds * 1000.0,
+        }
+
+
+class TtlCache(object):
+    """Remembers values for ttl seconds. Thread safe, concurrent lookups of a
+    missing key share a single call of its factory."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+        self.__values = {}
+        self.__loading = {}
+
+    def get(self, key, factory):
+        """Returns the value of key, calling factory() for it if it is missing
+        or has expired. Exceptions from factory are raised and not cached."""
+        while True:
+            with self.__lock:
+                entry = self.__values.get(key)
+                if entry is not None and entry[0] > time.time():
+                    self.hits += 1
+                    return entry[1]
+                loading = self.__loading.get(key)
+                if loading is None:
+                    loading = self.__loading[key] = threading.Event()
+                    self.misses += 1
+                    break
+            loading.wait()
+
+        try:
+            value = factory()
+            with self.__lock:
+                self.__values[key] = (time.time() + self.ttl, value)
+            return value
+        finally:
+            with self.__lock:
+                del self.__loading[key]
+            loading.set()
+
+    def invalidate(self, key):
+        """Forgets the value of key"""
+        with self.__lock:
+            self.__values.pop(key, None)
+
+    def stats(self):
+        """Returns the hits, misses and number of cached values"""
+        with self.__lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.__values)}
+
+
 def permissionsHigh():
     """Sets the effective gid/uid to processes original values (root)"""
     if platform.system() == "Windows":
@@ -97,6 +195,16 @@ def permissionsLow():
         PERMISSIONS.release()
 
 
+def runAsRoot(func, *args, **kwargs):
+    """Returns func(*args, **kwargs) called with the original (root)
+       permissions, holding the permissions lock only for the call"""
+    permissionsHigh()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        permissionsLow()
+
+
 def permissionsUser(uid, gid):
     """Sets the effective gid/uid to supplied values"""
     if platform.system() == 'Windows':
@@ -44,10 +44,11 @@ setup(
         'Programming Language :: Python :: 2',
         'Programming Language :: Python :: 2.7',
     ],
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks']),
     entry_points={
         'console_scripts': [
-            'rqd=rqd.__main__:main'
+            'rqd=rqd.__main__:main',
+            'rqd-stage=rqd.rqstaging:main',
         ]
     },
     test_suite='tests',
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import mock
+import os
+import unittest
+
+import pyfakefs.fake_filesystem_unittest
+
+import rqd.rqcgroup
+
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+
+MEMORY_STAT = '''anon 104857600
+file 524288000
+kernel_stack 65536
+shmem 0
+file_mapped 20971520
+'''
+
+CPU_STAT = '''usage_usec 30000000
+user_usec 25000000
+system_usec 5000000
+'''
+
+MEMORY_PRESSURE = '''some avg10=1.50 avg60=0.80 avg300=0.20 total=123456
+full avg10=0.75 avg60=0.40 avg300=0.10 total=65432
+'''
+
+
+class CgroupTests(pyfakefs.fake_filesystem_unittest.TestCase):
+    """Runs against a fake cgroup2 tree, the files the kernel would create
+    in a new cgroup are created by the tests."""
+
+    def setUp(self):
+        self.setUpPyfakefs()
+        self.fs.create_file(os.path.join(CGROUP_ROOT, 'cgroup.controllers'),
+                            contents='cpuset cpu io memory pids')
+        self.fs.create_file(os.path.join(CGROUP_ROOT, 'cgroup.subtree_control'))
+        self.manager = rqd.rqcgroup.CgroupManager(CGROUP_ROOT, 'rqd')
+
+    def __createFrameCgroup(self, frameId='frame-id'):
+        self.manager.setup()
+        cgroup = self.manager.createFrameCgroup(frameId)
+        for name, contents in (('cgroup.procs', '1234\n1240\n'),
+                               ('memory.current', '629145600'),
+                               ('memory.peak', '838860800'),
+                               ('memory.stat', MEMORY_STAT),
+                               ('memory.events', 'low 0\nhigh 0\nmax 3\noom 1\noom_kill 1\n'),
+                               ('memory.pressure', MEMORY_PRESSURE),
+                               ('memory.max', 'max'),
+                               ('cpu.stat', CPU_STAT),
+                               ('cpu.max', 'max 100000')):
+            self.fs.create_file(os.path.join(cgroup.path, name), contents=contents)
+        return cgroup
+
+    def test_isAvailable(self):
+        self.assertTrue(self.manager.isAvailable())
+
+    def test_isAvailableWithoutCgroup2(self):
+        self.fs.remove_object(os.path.join(CGROUP_ROOT, 'cgroup.controllers'))
+
+        self.assertFalse(self.manager.isAvailable())
+
+    def test_setup(self):
+        self.manager.setup()
+
+        self.assertTrue(os.path.isdir(os.path.join(CGROUP_ROOT, 'rqd')))
+        with open(os.path.join(CGROUP_ROOT, 'cgroup.subtree_control')) as fp:
+            self.assertEqual('+cpu +memory', fp.read())
+
+    def test_createFrameCgroup(self):
+        self.manager.setup()
+
+        cgroup = self.manager.createFrameCgroup('0a1b-2c3d/../evil')
+
+        self.assertEqual(os.path.join(CGROUP_ROOT, 'rqd', 'frame-0a1b-2c3d_.._evil'), cgroup.path)
+        self.assertTrue(os.path.isdir(cgroup.path))
+
+    def test_limits(self):
+        cgroup = self.__createFrameCgroup()
+
+        cgroup.setMemoryLimit(4194304)
+        cgroup.setCpuLimit(2.5)
+
+        with open(os.path.join(cgroup.path, 'memory.max')) as fp:
+            self.assertEqual(str(4194304 * 1024), fp.read())
+        with open(os.path.join(cgroup.path, 'cpu.max')) as fp:
+            self.assertEqual('250000 100000', fp.read())
+
+    def test_accounting(self):
+        cgroup = self.__createFrameCgroup()
+
+        self.assertEqual([1234, 1240], cgroup.getPids())
+        self.assertEqual(614400, cgroup.getMemoryCurrent())
+        self.assertEqual(819200, cgroup.getMemoryPeak())
+        self.assertEqual(122880, cgroup.getRss())
+        self.assertEqual(30000000, cgroup.getCpuStat()['usage_usec'])
+        self.assertEqual(0.75, cgroup.getMemoryPressure()['full']['avg10'])
+        self.assertEqual(1, cgroup.getOomKills())
+
+    def test_getPcpu(self):
+        cgroup = self.__createFrameCgroup()
+        createTime = os.stat(cgroup.path).st_ctime
+
+        # 30 seconds of cpu time over 20 seconds of wall time is 150%.
+        self.assertAlmostEqual(150.0, cgroup.getPcpu(now=createTime + 20))
+
+        with open(os.path.join(cgroup.path, 'cpu.stat'), 'w') as fp:
+            fp.write('usage_usec 40000000\n')
+        self.assertAlmostEqual(100.0, cgroup.getPcpu(now=createTime + 30))
+
+    def test_missingPeakIsNone(self):
+        cgroup = self.__createFrameCgroup()
+        self.fs.remove_object(os.path.join(cgroup.path, 'memory.peak'))
+
+        self.assertIsNone(cgroup.getMemoryPeak())
+
+    @mock.patch('os.kill')
+    @mock.patch('os.rmdir')
+    def test_removeKillsLeftoverProcesses(self, rmdirMock, killMock):
+        cgroup = self.__createFrameCgroup()
+
+        self.assertTrue(cgroup.remove())
+
+        self.assertEqual(2, killMock.call_count)
+        rmdirMock.assert_called_with(cgroup.path)
+
+    @mock.patch('os.rmdir')
+    def test_removeUsesCgroupKill(self, rmdirMock):
+        cgroup = self.__createFrameCgroup()
+        self.fs.create_file(os.path.join(cgroup.path, 'cgroup.kill'))
+
+        cgroup.remove()
+
+        with open(os.path.join(cgroup.path, 'cgroup.kill')) as fp:
+            self.assertEqual('1', fp.read())
+
+
+class ParsePressureTests(unittest.TestCase):
+
+    def test_parsePressure(self):
+        pressure = rqd.rqcgroup.parsePressure(MEMORY_PRESSURE)
+
+        self.assertEqual(1.5, pressure['some']['avg10'])
+        self.assertEqual(0.1, pressure['full']['avg300'])
+        self.assertEqual(65432, pressure['full']['total'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -20,6 +20,7 @@ from __future__ import division
 from __future__ import absolute_import
 
 from builtins import str
+import grpc
 import mock
 import os.path
 import unittest
@@ -32,20 +33,40 @@ import rqd.compiled_proto.rqd_pb2
 import rqd.rqconstants
 import rqd.rqcore
 import rqd.rqexceptions
+import rqd.rqhealth
+import rqd.rqlaunch
+import rqd.rqlauncher
 import rqd.rqnetwork
 import rqd.rqnimby
+import rqd.rqspool
+import rqd.rqstaging
+import rqd.rqutil
+
+
+def immediateScheduler(status, rusage=None):
+    """A scheduler mock that reaps children with the given wait status and
+    runs worker calls inline"""
+    scheduler = mock.MagicMock()
+    scheduler.watchChild.side_effect = lambda pid, callback: callback(pid, status, rusage)
+    scheduler.runInWorker.side_effect = lambda func, *args: func(*args)
+    return scheduler
 
 
 class RqCoreTests(unittest.TestCase):
 
+    @mock.patch('rqd.rqscheduler.Scheduler', autospec=True)
     @mock.patch('rqd.rqnimby.Nimby', autospec=True)
     @mock.patch('rqd.rqnetwork.Network', autospec=True)
     @mock.patch('rqd.rqmachine.Machine', autospec=True)
-    def setUp(self, machineMock, networkMock, nimbyMock):
+    def setUp(self, machineMock, networkMock, nimbyMock, schedulerMock):
         self.machineMock = machineMock
         self.networkMock = networkMock
         self.nimbyMock = nimbyMock
+        self.schedulerMock = schedulerMock
+        machineMock.return_value.health = mock.MagicMock(spec=rqd.rqhealth.HostHealth)
+        machineMock.return_value.staging = None
         self.rqcore = rqd.rqcore.RqCore()
+        self.rqcore.completionSpool = rqd.rqspool.ReportSpool()
 
     @mock.patch.object(rqd.rqcore.RqCore, 'nimbyOn')
     def test_startServer(self, nimbyOnMock):
@@ -54,6 +75,7 @@ class RqCoreTests(unittest.TestCase):
 
         self.rqcore.start()
 
+        self.schedulerMock.return_value.start.assert_called()
         self.networkMock.return_value.start_grpc.assert_called()
         nimbyOnMock.assert_not_called()
 
@@ -103,6 +125,8 @@ class RqCoreTests(unittest.TestCase):
     def test_startDesktopNimbyOffWithFlag(self, nimbyOnMock, machineMock, networkMock):
         rqd.rqconstants.OVERRIDE_NIMBY = True
         machineMock.return_value.isDesktop.return_value = True
+        machineMock.return_value.health = mock.MagicMock(spec=rqd.rqhealth.HostHealth)
+        machineMock.return_value.staging = None
         rqcore = rqd.rqcore.RqCore(optNimbyoff=True)
 
         rqcore.start()
@@ -110,55 +134,227 @@ class RqCoreTests(unittest.TestCase):
         networkMock.return_value.start_grpc.assert_called()
         nimbyOnMock.assert_not_called()
 
-    @mock.patch('threading.Timer')
-    def test_grpcConnected(self, timerMock):
-        update_rss_thread = mock.MagicMock()
-        interval_thread = mock.MagicMock()
-        timerMock.side_effect = [update_rss_thread, interval_thread]
-
+    def test_grpcConnected(self):
         self.rqcore.grpcConnected()
 
         self.networkMock.return_value.reportRqdStartup.assert_called()
-        update_rss_thread.start.assert_called()
-        interval_thread.start.assert_called()
+        self.schedulerMock.return_value.callLater.assert_has_calls([
+            mock.call(rqd.rqconstants.RSS_UPDATE_INTERVAL,
+                      self.schedulerMock.return_value.runInWorker, self.rqcore.updateRss),
+            mock.call(self.rqcore.intervalSleepTime, self.rqcore.onInterval)])
 
     @mock.patch.object(rqd.rqcore.RqCore, 'sendStatusReport', autospec=True)
-    @mock.patch('threading.Timer')
-    def test_onInterval(self, timerMock, sendStatusReportMock):
+    def test_onInterval(self, sendStatusReportMock):
+        scheduler = self.schedulerMock.return_value
+        scheduler.runInWorker.side_effect = lambda func, *args: func(*args)
+
         self.rqcore.onInterval()
 
-        timerMock.return_value.start.assert_called()
+        scheduler.callLater.assert_called_with(
+            self.rqcore.intervalSleepTime, self.rqcore.onInterval)
+        scheduler.runInWorker.assert_called_once_with(mock.ANY)
         sendStatusReportMock.assert_called_with(self.rqcore)
 
-    @mock.patch('threading.Timer', autospec=True)
-    def test_onIntervalWithSleepTime(self, timerMock):
+    @mock.patch.object(rqd.rqcore.RqCore, 'sendStatusReport', autospec=True)
+    def test_onIntervalSkipsWhileReportInFlight(self, sendStatusReportMock):
+        scheduler = self.schedulerMock.return_value
+        scheduler.runInWorker.return_value.done.return_value = False
+
+        self.rqcore.onInterval()
+        self.rqcore.onInterval()
+
+        scheduler.runInWorker.assert_called_once_with(mock.ANY)
+        self.assertEqual(2, scheduler.callLater.call_count)
+
+    def test_onIntervalWithSleepTime(self):
         sleep_time = 72
 
         self.rqcore.onInterval(sleepTime=sleep_time)
 
-        timerMock.assert_called_with(sleep_time, mock.ANY)
-        timerMock.return_value.start.assert_called()
+        self.schedulerMock.return_value.callLater.assert_called_with(sleep_time, mock.ANY)
+        self.assertEqual(
+            self.schedulerMock.return_value.callLater.return_value, self.rqcore.onIntervalTask)
 
     @mock.patch.object(rqd.rqcore.RqCore, 'shutdownRqdNow')
-    @mock.patch('threading.Timer', new=mock.MagicMock())
     def test_onIntervalShutdown(self, shutdownRqdNowMock):
         self.rqcore.shutdownRqdIdle()
         self.machineMock.return_value.isUserLoggedIn.return_value = False
         shutdownRqdNowMock.reset_mock()
         shutdownRqdNowMock.assert_not_called()
+        self.schedulerMock.return_value.runInWorker.side_effect = \
+            lambda func, *args: func(*args)
 
         self.rqcore.onInterval()
 
         shutdownRqdNowMock.assert_called_with()
 
-    @mock.patch('threading.Timer')
-    def test_updateRss(self, timerMock):
+    @mock.patch('time.time', new=mock.MagicMock(return_value=1000))
+    def test_expediteStatusReportCoalesces(self):
+        scheduler = self.schedulerMock.return_value
+        scheduler.callSoon.side_effect = lambda func, *args: func(*args)
+        self.rqcore.intervalStartTime = 990
+        self.rqcore.intervalSleepTime = 30
+        intervalTask = mock.MagicMock()
+        self.rqcore.onIntervalTask = intervalTask
+
+        self.rqcore.expediteStatusReport()
+        self.rqcore.expediteStatusReport()
+        self.rqcore.expediteStatusReport()
+
+        intervalTask.cancel.assert_called_once_with()
+        scheduler.callLater.assert_called_once_with(
+            rqd.rqconstants.RQD_REPORT_COALESCE_SEC, self.rqcore.onInterval,
+            rqd.rqconstants.RQD_MIN_PING_INTERVAL_SEC)
+
+    def __completeReport(self, frameId):
+        return rqd.compiled_proto.report_pb2.FrameCompleteReport(
+            frame=rqd.compiled_proto.report_pb2.RunningFrameInfo(frame_id=frameId))
+
+    def __runScheduledReplays(self):
+        """Runs scheduler calls inline, except the ones delayed for a retry"""
+        scheduler = self.schedulerMock.return_value
+        scheduler.callSoon.side_effect = lambda func, *args: func(*args)
+        scheduler.runInWorker.side_effect = lambda func, *args: func(*args)
+
+        def callLater(delay, func, *args):
+            if delay == 0:
+                func(*args)
+            return mock.MagicMock()
+        scheduler.callLater.side_effect = callLater
+
+    def test_sendFrameCompleteReport(self):
+        report = self.__completeReport('frame1')
+
+        self.rqcore.sendFrameCompleteReport(report)
+
+        self.networkMock.return_value.reportRunningFrameCompletion.assert_called_with(report)
+        self.assertEqual(0, len(self.rqcore.completionSpool))
+
+    def test_sendFrameCompleteReportSpoolsOnFailure(self):
+        self.networkMock.return_value.reportRunningFrameCompletion.side_effect = \
+            rqd.rqexceptions.CuebotUnavailableException('unavailable')
+        scheduler = self.schedulerMock.return_value
+        scheduler.callSoon.side_effect = lambda func, *args: func(*args)
+        scheduler.callLater.return_value.isPending.return_value = True
+
+        self.rqcore.sendFrameCompleteReport(self.__completeReport('frame1'))
+        self.rqcore.sendFrameCompleteReport(self.__completeReport('frame2'))
+
+        self.assertEqual(2, len(self.rqcore.completionSpool))
+        self.networkMock.return_value.reportRunningFrameCompletion.assert_called_once()
+        self.schedulerMock.return_value.callLater.assert_called_once_with(
+            rqd.rqconstants.RQD_SPOOL_RETRY_SEC, mock.ANY)
+
+    @mock.patch.object(rqd.rqconstants, 'RQD_SPOOL_REPLAY_BATCH', new=2)
+    def test_spoolReplaysInBatches(self):
+        for frameId in ('frame1', 'frame2', 'frame3'):
+            self.rqcore.completionSpool.append(self.__completeReport(frameId))
+        network = self.networkMock.return_value
+        network.reportRunningFrameCompletions.side_effect = \
+            lambda reports: ([report.frame.frame_id for report in reports], {})
+        self.__runScheduledReplays()
+
+        self.rqcore.scheduleSpoolReplay(0)
+
+        self.assertEqual(0, len(self.rqcore.completionSpool))
+        self.assertEqual(2, network.reportRunningFrameCompletions.call_count)
+
+    def test_spoolReplayRetriesWhileUnreachable(self):
+        self.rqcore.completionSpool.append(self.__completeReport('frame1'))
+        self.rqcore.completionSpool.append(self.__completeReport('frame2'))
+        network = self.networkMock.return_value
+        network.reportRunningFrameCompletions.return_value = (
+            ['frame2'], {'frame1': grpc.StatusCode.UNAVAILABLE})
+        self.__runScheduledReplays()
+
+        self.rqcore.scheduleSpoolReplay(0)
+
+        self.assertEqual(['frame1'], [report.frame.frame_id for report in
+                                      self.rqcore.completionSpool.getBatch(10)])
+        self.schedulerMock.return_value.callLater.assert_called_with(
+            rqd.rqconstants.RQD_SPOOL_RETRY_SEC, mock.ANY)
+
+    def test_spoolReplayDropsRejectedReports(self):
+        self.rqcore.completionSpool.append(self.__completeReport('frame1'))
+        self.rqcore.completionSpool.append(self.__completeReport('frame2'))
+        network = self.networkMock.return_value
+        network.reportRunningFrameCompletions.return_value = (
+            ['frame2'], {'frame1': grpc.StatusCode.INVALID_ARGUMENT})
+        self.__runScheduledReplays()
+
+        self.rqcore.scheduleSpoolReplay(0)
+
+        self.assertEqual(0, len(self.rqcore.completionSpool))
+        self.assertEqual(1, self.rqcore.completionSpool.dropped)
+        network.reportRunningFrameCompletions.assert_called_once()
+
+    def test_spoolReplayKeepsGoingPastFailedReports(self):
+        self.rqcore.completionSpool = rqd.rqspool.ReportSpool(maxAttempts=2)
+        self.rqcore.completionSpool.append(self.__completeReport('frame1'))
+        self.rqcore.completionSpool.append(self.__completeReport('frame2'))
+        network = self.networkMock.return_value
+        network.reportRunningFrameCompletions.side_effect = lambda reports: (
+            [r.frame.frame_id for r in reports if r.frame.frame_id != 'frame1'],
+            {'frame1': grpc.StatusCode.INTERNAL})
+        self.__runScheduledReplays()
+
+        self.rqcore.scheduleSpoolReplay(0)
+
+        # frame2 goes through at once, frame1 is retried then dropped.
+        self.assertEqual(0, len(self.rqcore.completionSpool))
+        self.assertEqual(1, self.rqcore.completionSpool.dropped)
+
+    def test_grpcConnectedReplaysSpool(self):
+        self.rqcore.completionSpool.append(self.__completeReport('frame1'))
+
+        self.rqcore.grpcConnected()
+
+        self.schedulerMock.return_value.callSoon.assert_called_with(mock.ANY, 0)
+
+    def test_updateRss(self):
         self.rqcore.storeFrame('frame-id', mock.MagicMock(spec=rqd.rqnetwork.RunningFrame))
 
         self.rqcore.updateRss()
 
         self.machineMock.return_value.rssUpdate.assert_called()
-        timerMock.return_value.start.assert_called()
+        self.schedulerMock.return_value.callLater.assert_called_with(
+            rqd.rqconstants.RSS_UPDATE_INTERVAL, self.schedulerMock.return_value.runInWorker,
+            self.rqcore.updateRss)
+
+    def test_updateRssWithoutFrames(self):
+        self.rqcore.updateRss()
+
+        self.machineMock.return_value.rssUpdate.assert_not_called()
+        self.schedulerMock.return_value.callLater.assert_called_with(
+            rqd.rqconstants.RSS_UPDATE_INTERVAL, self.schedulerMock.return_value.runInWorker,
+            self.rqcore.updateRss)
+
+    def test_collectMetrics(self):
+        self.rqcore.cores.total_cores = 800
+        self.rqcore.cores.idle_cores = 600
+        self.rqcore.cores.booked_cores = 200
+        self.rqcore.storeFrame('frame-id', mock.MagicMock(spec=rqd.rqnetwork.RunningFrame))
+        self.rqcore.nimby.active = True
+        self.rqcore.nimby.locked = False
+        self.machineMock.return_value.rssPids = 12
+        reportLatency = rqd.rqutil.LatencyTracker()
+        reportLatency.record(0.5, ok=False)
+        self.networkMock.return_value.getReportLatencies.return_value = {
+            'ReportStatus': reportLatency}
+        self.rqcore.updateRss()
+
+        text = self.rqcore.metrics.render()
+
+        self.assertIn('rqd_cores{state="idle"} 6\n', text)
+        self.assertIn('rqd_cores{state="booked"} 2\n', text)
+        self.assertIn('rqd_running_frames 1\n', text)
+        self.assertIn('rqd_nimby_active 1\n', text)
+        self.assertIn('rqd_nimby_locked 0\n', text)
+        self.assertIn('rqd_rss_update_pids 12\n', text)
+        self.assertIn('rqd_rss_update_duration_seconds_count 1\n', text)
+        self.assertIn('rqd_report_duration_seconds_count{method="ReportStatus"} 1\n', text)
+        self.assertIn('rqd_report_failures_total{method="ReportStatus"} 1\n', text)
+        self.assertIn('rqd_threads ', text)
 
     def test_getFrame(self):
         frame_id = 'arbitrary-frame-id'
@@ -226,6 +422,25 @@ class RqCoreTests(unittest.TestCase):
         # until its frame cache is cleared by the kill process.
         self.rqcore.killAllFrame('arbitrary reason')
 
+    @mock.patch.object(rqd.rqconstants, 'RQD_OOM_GUARD', new=True)
+    def test_onMemoryPressure(self):
+        frames = []
+        for frameId, rss, startTime in (('small', 100, 3), ('old', 900, 1), ('new', 900, 2)):
+            frame = mock.MagicMock(spec=rqd.rqnetwork.RunningFrame)
+            frame.frameId = frameId
+            frame.killMessage = ''
+            frame.rss = rss
+            frame.runFrame = rqd.compiled_proto.rqd_pb2.RunFrame(start_time=startTime)
+            self.rqcore.storeFrame(frameId, frame)
+            frames.append(frame)
+
+        self.rqcore.onMemoryPressure()
+        self.rqcore.onMemoryPressure()
+
+        frames[2].kill.assert_called_once_with(mock.ANY)
+        frames[0].kill.assert_not_called()
+        frames[1].kill.assert_not_called()
+
     def test_killAllFrameIgnoreNimby(self):
         frameAttendantThread = mock.MagicMock()
         frameAttendantThread.isAlive.return_value = False
@@ -258,14 +473,14 @@ class RqCoreTests(unittest.TestCase):
 
     @mock.patch.object(rqd.rqcore.RqCore, 'nimbyOff')
     def test_shutdown(self, nimbyOffMock):
-        self.rqcore.onIntervalThread = mock.MagicMock()
-        self.rqcore.updateRssThread = mock.MagicMock()
+        self.rqcore.onIntervalTask = mock.MagicMock()
+        self.rqcore.updateRssTask = mock.MagicMock()
 
         self.rqcore.shutdown()
 
         nimbyOffMock.assert_called()
-        self.rqcore.onIntervalThread.cancel.assert_called()
-        self.rqcore.updateRssThread.cancel.assert_called()
+        self.rqcore.onIntervalTask.cancel.assert_called()
+        self.rqcore.updateRssTask.cancel.assert_called()
 
     @mock.patch('rqd.rqnetwork.Network', autospec=True)
     @mock.patch('sys.exit')
@@ -287,6 +502,20 @@ class RqCoreTests(unittest.TestCase):
 
         frameThreadMock.return_value.start.assert_called()
 
+    @mock.patch.object(rqd.rqconstants, 'RQD_ADMISSION_CONTROL', new=True)
+    def test_launchFrameUnderPressure(self):
+        self.machineMock.return_value.state = rqd.compiled_proto.host_pb2.UP
+        self.nimbyMock.return_value.locked = False
+        self.machineMock.return_value.health.checkAdmission.return_value = \
+            'memory full pressure 25.00 is over 10.0'
+        frame = rqd.compiled_proto.rqd_pb2.RunFrame(
+            uid=22, num_cores=10, environment={'CUE_MEMORY': '4194304'})
+
+        with self.assertRaises(rqd.rqexceptions.CoreReservationFailureException):
+            self.rqcore.launchFrame(frame)
+
+        self.machineMock.return_value.health.checkAdmission.assert_called_with(4194304)
+
     def test_launchFrameOnDownHost(self):
         self.machineMock.return_value.state = rqd.compiled_proto.host_pb2.DOWN
         frame = rqd.compiled_proto.rqd_pb2.RunFrame()
@@ -573,15 +802,18 @@ class FrameAttendantThreadTests(pyfakefs.fake_filesystem_unittest.TestCase):
 
         timeMock.return_value = currentTime
         getTempDirMock.return_value = tempDir
-        popenMock.return_value.wait.return_value = returnCode
 
         rqCore = mock.MagicMock()
+        rqCore.launchPrep = rqd.rqlaunch.LaunchPrep()
         rqCore.intervalStartTime = 20
         rqCore.intervalSleepTime = 40
         rqCore.machine.getTempPath.return_value = jobTempPath
         rqCore.machine.isDesktop.return_value = True
         rqCore.machine.getHostInfo.return_value = renderHost
         rqCore.nimby.locked = False
+        rqCore.cgroups = None
+        rqCore.launchers = None
+        rqCore.scheduler = immediateScheduler(returnCode << 8)
 
         runFrame = rqd.compiled_proto.rqd_pb2.RunFrame(
             frame_id=frameId,
@@ -612,6 +844,7 @@ class FrameAttendantThreadTests(pyfakefs.fake_filesystem_unittest.TestCase):
             stdout=mock.ANY,
             stderr=mock.ANY,
             close_fds=mock.ANY,
+            start_new_session=True,
             preexec_fn=mock.ANY)
 
         self.assertTrue(os.path.exists(logDir))
@@ -620,13 +853,209 @@ class FrameAttendantThreadTests(pyfakefs.fake_filesystem_unittest.TestCase):
         self.assertEqual(logFile, kwargs['stdout'].name)
         self.assertEqual(logFile, kwargs['stderr'].name)
 
-        rqCore.network.reportRunningFrameCompletion.assert_called_with(
+        rqCore.scheduler.watchChild.assert_called_with(popenMock.return_value.pid, mock.ANY)
+        self.assertEqual(returnCode, popenMock.return_value.returncode)
+        self.assertFalse(attendantThread.isAlive())
+        rqCore.releaseCores.assert_called()
+        rqCore.deleteFrame.assert_called_with(frameId)
+        rqCore.sendFrameCompleteReport.assert_called_with(
             rqd.compiled_proto.report_pb2.FrameCompleteReport(
                 host=renderHost,
                 frame=rqd.compiled_proto.report_pb2.RunningFrameInfo(
                     job_name=jobName, frame_id=frameId, frame_name=frameName),
                 exit_status=returnCode))
 
+    @mock.patch('platform.system', new=mock.Mock(return_value='Linux'))
+    @mock.patch('tempfile.gettempdir')
+    def test_runLinuxKilledBySignal(self, getTempDirMock, permsUser, timeMock, popenMock):
+        tempDir = '/some/random/temp/dir'
+        self.fs.create_dir(tempDir)
+        timeMock.return_value = 1568070634.3
+        getTempDirMock.return_value = tempDir
+
+        rqCore = mock.MagicMock()
+        rqCore.launchPrep = rqd.rqlaunch.LaunchPrep()
+        rqCore.intervalStartTime = 20
+        rqCore.intervalSleepTime = 40
+        rqCore.machine.getTempPath.return_value = '/job/temp/path/'
+        rqCore.machine.getHostInfo.return_value = rqd.compiled_proto.report_pb2.RenderHost()
+        rqCore.nimby.locked = False
+        rqCore.cgroups = None
+        rqCore.launchers = None
+        # The wait status of a process terminated by SIGKILL.
+        rqCore.scheduler = immediateScheduler(9)
+
+        runFrame = rqd.compiled_proto.rqd_pb2.RunFrame(
+            frame_id='arbitrary-frame-id',
+            uid=928,
+            user_name='my-random-user',
+            log_dir='/path/to/log/dir/')
+        frameInfo = rqd.rqnetwork.RunningFrame(rqCore, runFrame)
+
+        attendantThread = rqd.rqcore.FrameAttendantThread(rqCore, runFrame, frameInfo)
+        attendantThread.start()
+        attendantThread.join()
+
+        self.assertEqual(1, frameInfo.exitStatus)
+        self.assertEqual(9, frameInfo.exitSignal)
+        report = rqCore.sendFrameCompleteReport.call_args[0][0]
+        self.assertEqual(9, report.exit_signal)
+
+    @mock.patch('platform.system', new=mock.Mock(return_value='Linux'))
+    @mock.patch.object(rqd.rqconstants, 'RQD_DIRECT_LAUNCH', new=True)
+    @mock.patch('rqd.rqcore.pwd.getpwnam')
+    def test_runLinuxDirect(self, getpwnamMock, permsUser, timeMock, popenMock):
+        timeMock.return_value = 1568070634.3
+        getpwnamMock.return_value = mock.Mock(
+            pw_name='my-random-user', pw_uid=928, pw_gid=20, pw_shell='/bin/bash')
+
+        rqCore = mock.MagicMock()
+        rqCore.launchPrep = rqd.rqlaunch.LaunchPrep()
+        rqCore.machine.getTempPath.return_value = '/job/temp/path/'
+        rqCore.machine.isDesktop.return_value = True
+        rqCore.machine.getHostInfo.return_value = rqd.compiled_proto.report_pb2.RenderHost()
+        rqCore.nimby.locked = False
+        rqCore.cgroups = None
+        rqCore.launchers = None
+        rqCore.machine.staging = rqd.rqstaging.StagingCache('/staging')
+        rqCore.scheduler = immediateScheduler(
+            0, mock.Mock(ru_utime=12.345, ru_stime=0.5, ru_maxrss=204800))
+
+        runFrame = rqd.compiled_proto.rqd_pb2.RunFrame(
+            frame_id='arbitrary-frame-id',
+            job_name='arbitrary-job-name',
+            command='render -f 1',
+            uid=928,
+            user_name='my-random-user',
+            log_dir='/path/to/log/dir/',
+            attributes={'CPU_LIST': '0,8,1,9'})
+        frameInfo = rqd.rqnetwork.RunningFrame(rqCore, runFrame)
+
+        attendantThread = rqd.rqcore.FrameAttendantThread(rqCore, runFrame, frameInfo)
+        attendantThread.start()
+        attendantThread.join()
+
+        args, kwargs = popenMock.call_args
+        self.assertEqual(['/bin/bash', '-c', 'render -f 1'], args[0])
+        self.assertEqual('/staging/arbitrary-job-name', kwargs['env']['CUE_STAGING_DIR'])
+        self.assertTrue(os.path.isdir('/staging/arbitrary-job-name'))
+        self.assertEqual([], attendantThread._tempLocations)
+        self.assertEqual('12.35', frameInfo.utime)
+        self.assertEqual('0.50', frameInfo.stime)
+        self.assertEqual('0.00', frameInfo.realtime)
+        self.assertEqual(204800, frameInfo.maxRss)
+
+        self.assertEqual(928, kwargs['user'])
+        self.assertEqual(20, kwargs['group'])
+        self.assertIn(20, kwargs['extra_groups'])
+        self.assertTrue(kwargs['start_new_session'])
+        with mock.patch('os.nice') as niceMock, \
+                mock.patch('os.sched_setaffinity') as affinityMock:
+            kwargs['preexec_fn']()
+
+        niceMock.assert_called_with(rqd.rqconstants.DESKTOP_NICENESS)
+        affinityMock.assert_called_with(0, [0, 8, 1, 9])
+
+    @mock.patch('platform.system', new=mock.Mock(return_value='Linux'))
+    @mock.patch('rqd.rqcore.pwd.getpwnam')
+    def test_runLinuxWarm(self, getpwnamMock, permsUser, timeMock, popenMock):
+        timeMock.return_value = 1568070634.3
+        getpwnamMock.return_value = mock.Mock(
+            pw_name='my-random-user', pw_uid=928, pw_gid=20, pw_shell='/bin/bash')
+
+        rqCore = mock.MagicMock()
+        rqCore.launchPrep = rqd.rqlaunch.LaunchPrep()
+        rqCore.machine.getTempPath.return_value = '/job/temp/path/'
+        rqCore.machine.isDesktop.return_value = True
+        rqCore.machine.getHostInfo.return_value = rqd.compiled_proto.report_pb2.RenderHost()
+        rqCore.machine.staging = None
+        rqCore.nimby.locked = False
+        rqCore.cgroups = None
+        rqCore.scheduler = immediateScheduler(0)
+        rqCore.launchers = mock.MagicMock(spec=rqd.rqlauncher.LauncherPool)
+        process = mock.MagicMock(spec=rqd.rqlauncher.LaunchedProcess, pid=4321)
+        process.watch.side_effect = lambda callback: callback(
+            4321, 0, rqd.rqlauncher.Rusage(1.5, 0.25, 2048))
+        rqCore.launchers.launch.return_value = process
+
+        runFrame = rqd.compiled_proto.rqd_pb2.RunFrame(
+            frame_id='arbitrary-frame-id',
+            command='render -f 1',
+            uid=928,
+            user_name='my-random-user',
+            log_dir='/path/to/log/dir/',
+            attributes={'CPU_LIST': '0,8'})
+        frameInfo = rqd.rqnetwork.RunningFrame(rqCore, runFrame)
+
+        attendantThread = rqd.rqcore.FrameAttendantThread(rqCore, runFrame, frameInfo)
+        attendantThread.start()
+        attendantThread.join()
+
+        popenMock.assert_not_called()
+        rqCore.scheduler.watchChild.assert_not_called()
+        args, _ = rqCore.launchers.launch.call_args
+        self.assertEqual('my-random-user', args[0])
+        self.assertEqual(['/bin/bash', '-c', 'render -f 1'], args[1])
+        self.assertEqual('/job/temp/path/', args[3])
+        self.assertIsInstance(args[4], int)
+        self.assertEqual((rqd.rqconstants.DESKTOP_NICENESS, [0, 8]), args[5:])
+        self.assertEqual(4321, frameInfo.pid)
+        self.assertEqual('1.50', frameInfo.utime)
+        self.assertEqual(2048, frameInfo.maxRss)
+        self.assertFalse(attendantThread.isAlive())
+
+    @mock.patch('platform.system', new=mock.Mock(return_value='Linux'))
+    @mock.patch('tempfile.gettempdir')
+    def test_runLinuxWithCgroup(self, getTempDirMock, permsUser, timeMock, popenMock):
+        logDir = '/path/to/log/dir/'
+        tempDir = '/some/random/temp/dir'
+        self.fs.create_dir(tempDir)
+        timeMock.return_value = 1568070634.3
+        getTempDirMock.return_value = tempDir
+        rqd.rqconstants.RQD_CGROUP_ENFORCE_MEMORY = True
+        rqd.rqconstants.RQD_CGROUP_ENFORCE_CORES = True
+
+        rqCore = mock.MagicMock()
+        rqCore.launchPrep = rqd.rqlaunch.LaunchPrep()
+        rqCore.intervalStartTime = 20
+        rqCore.intervalSleepTime = 40
+        rqCore.machine.getTempPath.return_value = '/job/temp/path/'
+        rqCore.machine.getHostInfo.return_value = rqd.compiled_proto.report_pb2.RenderHost()
+        rqCore.nimby.locked = False
+        rqCore.launchers = None
+        rqCore.scheduler = immediateScheduler(0)
+        cgroup = rqCore.cgroups.createFrameCgroup.return_value
+        cgroup.getOomKills.return_value = 1
+        cgroup.getPids.return_value = []
+        self.fs.create_file('/cgroup/cgroup.procs')
+        cgroup.openProcs.side_effect = lambda: os.open('/cgroup/cgroup.procs', os.O_WRONLY)
+
+        runFrame = rqd.compiled_proto.rqd_pb2.RunFrame(
+            frame_id='arbitrary-frame-id',
+            job_name='arbitrary-job-name',
+            frame_name='arbitrary-frame-name',
+            uid=928,
+            user_name='my-random-user',
+            log_dir=logDir,
+            num_cores=150,
+            environment={'CUE_MEMORY': '4194304'})
+        frameInfo = rqd.rqnetwork.RunningFrame(rqCore, runFrame)
+
+        attendantThread = rqd.rqcore.FrameAttendantThread(rqCore, runFrame, frameInfo)
+        attendantThread.start()
+        attendantThread.join()
+
+        rqCore.cgroups.createFrameCgroup.assert_called_with('arbitrary-frame-id')
+        cgroup.setMemoryLimit.assert_called_with(4194304)
+        cgroup.setCpuLimit.assert_called_with(1.5)
+        cgroup.openProcs.assert_called_with()
+        cgroup.addProcess.assert_called_with(popenMock.return_value.pid)
+        cgroup.remove.assert_called()
+        self.assertIsNone(frameInfo.cgroup)
+        self.assertTrue(frameInfo.killMessage.startswith('OOM killed'))
+        rqd.rqconstants.RQD_CGROUP_ENFORCE_MEMORY = False
+        rqd.rqconstants.RQD_CGROUP_ENFORCE_CORES = False
+
     # TODO(bcipriano) Re-enable this test once Windows is supported. The main sticking point here
     #   is that the log directory is always overridden on Windows which makes mocking difficult.
     @mock.patch('platform.system', new=mock.Mock(return_value='Windows'))
@@ -648,12 +1077,15 @@ class FrameAttendantThreadTests(pyfakefs.fake_filesystem_unittest.TestCase):
         popenMock.return_value.returncode = returnCode
 
         rqCore = mock.MagicMock()
+        rqCore.launchPrep = rqd.rqlaunch.LaunchPrep()
         rqCore.intervalStartTime = 20
         rqCore.intervalSleepTime = 40
         rqCore.machine.getTempPath.return_value = jobTempPath
         rqCore.machine.isDesktop.return_value = True
         rqCore.machine.getHostInfo.return_value = renderHost
         rqCore.nimby.locked = False
+        rqCore.cgroups = None
+        rqCore.launchers = None
 
         runFrame = rqd.compiled_proto.rqd_pb2.RunFrame(
             frame_id=frameId,
@@ -678,7 +1110,7 @@ class FrameAttendantThreadTests(pyfakefs.fake_filesystem_unittest.TestCase):
             stderr=mock.ANY)
         # TODO(bcipriano) Verify the log directory was created and used for stdout/stderr.
 
-        rqCore.network.reportRunningFrameCompletion.assert_called_with(
+        rqCore.sendFrameCompleteReport.assert_called_with(
             rqd.compiled_proto.report_pb2.FrameCompleteReport(
                 host=renderHost,
                 frame=rqd.compiled_proto.report_pb2.RunningFrameInfo(
@@ -709,12 +1141,15 @@ class FrameAttendantThreadTests(pyfakefs.fake_filesystem_unittest.TestCase):
         popenMock.return_value.returncode = returnCode
 
         rqCore = mock.MagicMock()
+        rqCore.launchPrep = rqd.rqlaunch.LaunchPrep()
         rqCore.intervalStartTime = 20
         rqCore.intervalSleepTime = 40
         rqCore.machine.getTempPath.return_value = jobTempPath
         rqCore.machine.isDesktop.return_value = True
         rqCore.machine.getHostInfo.return_value = renderHost
         rqCore.nimby.locked = False
+        rqCore.cgroups = None
+        rqCore.launchers = None
 
         runFrame = rqd.compiled_proto.rqd_pb2.RunFrame(
             frame_id=frameId,
@@ -750,7 +1185,7 @@ class FrameAttendantThreadTests(pyfakefs.fake_filesystem_unittest.TestCase):
         self.assertEqual(logFile, kwargs['stdout'].name)
         self.assertEqual(logFile, kwargs['stderr'].name)
 
-        rqCore.network.reportRunningFrameCompletion.assert_called_with(
+        rqCore.sendFrameCompleteReport.assert_called_with(
             rqd.compiled_proto.report_pb2.FrameCompleteReport(
                 host=renderHost,
                 frame=rqd.compiled_proto.report_pb2.RunningFrameInfo(
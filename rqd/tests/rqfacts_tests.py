@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import os
+import unittest
+
+import mock
+import pyfakefs.fake_filesystem_unittest
+
+import rqd.rqfacts
+
+
+FACTS_PATH = '/var/lib/rqd/facts.json'
+CSHRC_PATH = '/etc/csh.cshrc'
+
+
+class FactsCacheTests(pyfakefs.fake_filesystem_unittest.TestCase):
+
+    def setUp(self):
+        self.setUpPyfakefs()
+        self.fs.create_file('/proc/stat', contents='cpu  1 2 3\nbtime 1569882758\n')
+        self.factory = mock.MagicMock(return_value=['linux', 'lax'])
+
+    def test_systemKey(self):
+        key = rqd.rqfacts.getSystemKey()
+
+        self.assertEqual(1569882758, key['boot_time'])
+        self.assertEqual(rqd.rqfacts.FACTS_VERSION, key['version'])
+
+    def newCache(self):
+        facts = rqd.rqfacts.FactsCache(FACTS_PATH)
+        facts.persist()
+        return facts
+
+    def test_factIsReusedAfterRestart(self):
+        self.assertEqual(['linux', 'lax'], self.newCache().get('environment', self.factory))
+
+        facts = rqd.rqfacts.FactsCache(FACTS_PATH)
+
+        self.assertEqual(['linux', 'lax'], facts.get('environment', self.factory))
+        self.factory.assert_called_once_with()
+        self.assertEqual(1, facts.hits)
+
+    def test_factIsProbedAfterReboot(self):
+        self.newCache().get('environment', self.factory)
+        self.fs.remove_object('/proc/stat')
+        self.fs.create_file('/proc/stat', contents='btime 1569990000\n')
+
+        rqd.rqfacts.FactsCache(FACTS_PATH).get('environment', self.factory)
+
+        self.assertEqual(2, self.factory.call_count)
+
+    def test_factIsProbedWhenItsFileChanges(self):
+        self.fs.create_file(CSHRC_PATH, contents='setenv SP_OS linux\n')
+        self.newCache().get('environment', self.factory, dependsOn=(CSHRC_PATH,))
+        with open(CSHRC_PATH, 'a') as cshrc:
+            cshrc.write('setenv FACILITY lax\n')
+
+        rqd.rqfacts.FactsCache(FACTS_PATH).get('environment', self.factory,
+                                               dependsOn=(CSHRC_PATH,))
+
+        self.assertEqual(2, self.factory.call_count)
+
+    def test_corruptFile(self):
+        self.fs.create_file(FACTS_PATH, contents='{not json')
+
+        self.assertEqual(['linux', 'lax'],
+                         rqd.rqfacts.FactsCache(FACTS_PATH).get('environment', self.factory))
+
+    def test_notSavedUntilPersisted(self):
+        facts = rqd.rqfacts.FactsCache(FACTS_PATH)
+        facts.get('environment', self.factory)
+
+        self.assertFalse(os.path.exists('/var/lib/rqd'))
+
+        with mock.patch('os.chown') as chownMock:
+            facts.persist(uid=1, gid=2)
+
+        chownMock.assert_called_once_with('/var/lib/rqd', 1, 2)
+        self.assertEqual(0o700, os.stat('/var/lib/rqd').st_mode & 0o777)
+        self.assertEqual(['facts.json'], os.listdir('/var/lib/rqd'))
+
+    def test_unwritableDirectory(self):
+        self.fs.create_file('/var/lib/rqd')
+
+        facts = self.newCache()
+
+        self.assertEqual(['linux', 'lax'], facts.get('environment', self.factory))
+        self.assertEqual(['linux', 'lax'], facts.get('environment', self.factory))
+        self.factory.assert_called_once_with()
+
+    def test_invalidate(self):
+        facts = self.newCache()
+        facts.get('environment', self.factory)
+
+        facts.invalidate('environment')
+        facts.get('environment', self.factory)
+
+        self.assertEqual(2, self.factory.call_count)
+        self.assertTrue(os.path.exists(FACTS_PATH))
+
+
+if __name__ == '__main__':
+    unittest.main()
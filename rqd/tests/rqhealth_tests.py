@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import unittest
+
+import mock
+import pyfakefs.fake_filesystem_unittest
+
+import rqd.rqconstants
+import rqd.rqhealth
+
+
+PRESSURE = '''some avg10=%.2f avg60=1.00 avg300=0.50 total=123456
+full avg10=%.2f avg60=0.50 avg300=0.25 total=65432
+'''
+MEMINFO = '''MemTotal:       32000000 kB
+MemFree:         1000000 kB
+MemAvailable:    %d kB
+SwapFree:        4000000 kB
+'''
+VMSTAT = '''pgpgin 100
+pgpgout %d
+pswpout 0
+pgmajfault 12
+'''
+
+
+class HostHealthTests(pyfakefs.fake_filesystem_unittest.TestCase):
+
+    def setUp(self):
+        self.setUpPyfakefs()
+        self.health = rqd.rqhealth.HostHealth(interval=5, window=60)
+        self.setProc()
+
+    def setProc(self, memoryFull=0.0, memAvailable=16000000, pgpgout=1000):
+        for resource in rqd.rqhealth.PRESSURE_RESOURCES:
+            full = memoryFull if resource == 'memory' else 0.0
+            self.__write('/proc/pressure/%s' % resource, PRESSURE % (full, full))
+        self.__write(rqd.rqconstants.PATH_MEMINFO, MEMINFO % memAvailable)
+        self.__write(rqd.rqconstants.PATH_VMSTAT, VMSTAT % pgpgout)
+
+    def __write(self, path, contents):
+        if self.fs.exists(path):
+            self.fs.remove_object(path)
+        self.fs.create_file(path, contents=contents)
+
+    def test_readPressure(self):
+        pressure = rqd.rqhealth.readPressure('/proc/pressure/cpu')
+
+        self.assertEqual(0.0, pressure['some']['avg10'])
+        self.assertEqual(123456, pressure['some']['total'])
+        self.assertEqual(0.25, pressure['full']['avg300'])
+
+    def test_noPressureSupport(self):
+        self.fs.remove_object('/proc/pressure')
+
+        sample = self.health.sample()
+
+        self.assertNotIn('memory_full', sample)
+        self.assertEqual(16000000, sample['MemAvailable'])
+
+    def test_sample(self):
+        self.setProc(memoryFull=12.5)
+
+        sample = self.health.sample()
+
+        self.assertEqual(12.5, sample['memory_full'])
+        self.assertEqual(0.0, sample['cpu_some'])
+        self.assertEqual(1000, sample['pgpgout'])
+
+    @mock.patch('time.time')
+    def test_pgoutRate(self, timeMock):
+        timeMock.return_value = 100
+        self.health.sample()
+        timeMock.return_value = 105
+        self.setProc(pgpgout=1500)
+        self.health.sample()
+        timeMock.return_value = 110
+        self.setProc(pgpgout=3500)
+        self.health.sample()
+
+        self.assertEqual(400, self.health.getRate('pgpgout', recent=True))
+        self.assertEqual(250, self.health.getRate('pgpgout'))
+        self.assertEqual('400', self.health.getAttributes()['swapout'])
+
+    def test_attributes(self):
+        self.setProc(memoryFull=3.25)
+        self.health.sample()
+
+        attributes = self.health.getAttributes()
+
+        self.assertEqual('3.25', attributes['psiMemoryFull'])
+        self.assertEqual('0.00', attributes['psiIoSome'])
+        self.assertEqual('16000000', attributes['memAvailable'])
+
+    def test_admission(self):
+        self.health.sample()
+        self.assertIsNone(self.health.checkAdmission(8000000))
+
+        self.assertIn('memory would remain',
+                      self.health.checkAdmission(16000000))
+
+        self.setProc(memoryFull=rqd.rqconstants.RQD_ADMIT_MAX_MEMORY_PRESSURE + 1)
+        self.health.sample()
+        self.assertIn('memory full pressure', self.health.checkAdmission(0))
+
+    def test_memoryPressure(self):
+        self.health.sample()
+        self.assertFalse(self.health.isUnderMemoryPressure())
+
+        self.setProc(memAvailable=1000)
+        self.health.sample()
+        self.assertTrue(self.health.isUnderMemoryPressure())
+
+    def test_sampling(self):
+        scheduler = mock.MagicMock()
+        scheduler.runInWorker.side_effect = lambda func, *args: func(*args)
+        onPressure = mock.MagicMock()
+        self.setProc(memAvailable=1000)
+
+        self.health.start(scheduler, onPressure)
+        delay, runInWorker, sampleLater = scheduler.callLater.call_args[0]
+        runInWorker(sampleLater)
+
+        self.assertEqual(5, delay)
+        onPressure.assert_called_once_with()
+        self.assertEqual(2, scheduler.callLater.call_count)
+
+        self.health.stop()
+        scheduler.callLater.return_value.cancel.assert_called_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
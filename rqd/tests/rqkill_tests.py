@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import threading
+import time
+import unittest
+
+import mock
+
+import rqd.rqconstants
+import rqd.rqkill
+import rqd.rqnetwork
+
+
+def runningFrame(frameId, pid):
+    frame = mock.MagicMock(spec=rqd.rqnetwork.RunningFrame)
+    frame.frameId = frameId
+    frame.pid = pid
+    frame.killMessage = ''
+    frame.frameAttendantThread = mock.MagicMock()
+    frame.frameAttendantThread.isAlive.return_value = True
+    return frame
+
+
+@mock.patch('rqd.rqutil.permissionsLow')
+@mock.patch('rqd.rqutil.permissionsHigh')
+@mock.patch('os.killpg')
+class KillManagerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.rqCore = mock.MagicMock()
+        self.frameKeys = ['frame1', 'frame2']
+        self.rqCore.getFrameKeys.side_effect = lambda: list(self.frameKeys)
+        self.frames = [runningFrame('frame1', 101), runningFrame('frame2', 102)]
+
+    def test_killRightAway(self, killpgMock, permissionsHighMock, permissionsLowMock):
+        killManager = rqd.rqkill.KillManager(self.rqCore, grace=0)
+
+        killManager.killFrames(self.frames, 'NIMBY Triggered')
+
+        killpgMock.assert_has_calls([mock.call(101, rqd.rqconstants.KILL_SIGNAL),
+                                     mock.call(102, rqd.rqconstants.KILL_SIGNAL)])
+        permissionsHighMock.assert_called_once_with()
+        permissionsLowMock.assert_called_once_with()
+        self.assertEqual('NIMBY Triggered', self.frames[0].killMessage)
+        self.rqCore.scheduler.callLater.assert_not_called()
+
+    def test_termThenKill(self, killpgMock, permissionsHighMock, permissionsLowMock):
+        killManager = rqd.rqkill.KillManager(self.rqCore, grace=10)
+
+        killManager.killFrames(self.frames, 'shutdown')
+        killManager.killFrames(self.frames, 'shutdown')
+
+        killpgMock.assert_has_calls([mock.call(101, rqd.rqconstants.RQD_KILL_TERM_SIGNAL),
+                                     mock.call(102, rqd.rqconstants.RQD_KILL_TERM_SIGNAL)])
+        self.assertEqual(2, killpgMock.call_count)
+        self.rqCore.scheduler.callLater.assert_called_once_with(
+            10, self.rqCore.scheduler.runInWorker, killManager.escalate, self.frames)
+
+        killManager.frameExited('frame1')
+        killManager.escalate(self.frames)
+
+        killpgMock.assert_called_with(102, rqd.rqconstants.KILL_SIGNAL)
+        self.assertEqual(3, killpgMock.call_count)
+
+    def test_frameNotReady(self, killpgMock, permissionsHighMock, permissionsLowMock):
+        killManager = rqd.rqkill.KillManager(self.rqCore, grace=0)
+        self.frames[1].pid = None
+
+        killManager.killFrames(self.frames, 'shutdown')
+
+        killpgMock.assert_called_once_with(101, rqd.rqconstants.KILL_SIGNAL)
+        self.frames[1].kill.assert_called_once_with('shutdown')
+
+    def test_waitForExit(self, killpgMock, permissionsHighMock, permissionsLowMock):
+        killManager = rqd.rqkill.KillManager(self.rqCore, grace=0)
+        killManager.killFrames(self.frames)
+
+        def exit():
+            for frameId in list(self.frameKeys):
+                time.sleep(0.05)
+                self.frameKeys.remove(frameId)
+                killManager.frameExited(frameId)
+        exitThread = threading.Thread(target=exit)
+        exitThread.start()
+
+        self.assertTrue(killManager.waitForExit(['frame1', 'frame2'], 5))
+        exitThread.join()
+
+        self.assertEqual(2, killManager.getStats()['count'])
+
+    def test_waitForExitTimesOut(self, killpgMock, permissionsHighMock, permissionsLowMock):
+        killManager = rqd.rqkill.KillManager(self.rqCore, grace=0)
+
+        self.assertFalse(killManager.waitForExit(['frame1'], 0.05))
+
+
+if __name__ == '__main__':
+    unittest.main()
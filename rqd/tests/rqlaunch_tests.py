@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import os
+import threading
+import time
+import unittest
+
+import mock
+import pyfakefs.fake_filesystem_unittest
+
+import rqd.rqlaunch
+import rqd.rqutil
+
+
+LOG_DIR = '/shots/show/logs'
+
+
+class TtlCacheTests(unittest.TestCase):
+
+    def test_valueIsReused(self):
+        cache = rqd.rqutil.TtlCache(60)
+        factory = mock.Mock(return_value='value')
+
+        self.assertEqual('value', cache.get('key', factory))
+        self.assertEqual('value', cache.get('key', factory))
+
+        factory.assert_called_once_with()
+        self.assertEqual({'hits': 1, 'misses': 1, 'size': 1}, cache.stats())
+
+    def test_valueExpires(self):
+        cache = rqd.rqutil.TtlCache(0.01)
+        factory = mock.Mock(return_value='value')
+
+        cache.get('key', factory)
+        time.sleep(0.02)
+        cache.get('key', factory)
+
+        self.assertEqual(2, factory.call_count)
+
+    def test_exceptionIsNotCached(self):
+        cache = rqd.rqutil.TtlCache(60)
+        factory = mock.Mock(side_effect=[RuntimeError('failed'), 'value'])
+
+        with self.assertRaises(RuntimeError):
+            cache.get('key', factory)
+
+        self.assertEqual('value', cache.get('key', factory))
+
+    def test_concurrentLoadsShareOneCall(self):
+        cache = rqd.rqutil.TtlCache(60)
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def factory():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get('key', factory)))
+                   for _ in range(4)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(1, len(calls))
+        self.assertEqual(['value'] * 4, results)
+
+
+class LaunchPrepTests(pyfakefs.fake_filesystem_unittest.TestCase):
+
+    def setUp(self):
+        self.setUpPyfakefs()
+        self.launchPrep = rqd.rqlaunch.LaunchPrep(workers=2, ttl=60)
+
+    def test_logDirIsCreatedOnce(self):
+        with mock.patch('rqd.rqlaunch.prepareLogDir',
+                        side_effect=rqd.rqlaunch.prepareLogDir) as prepareLogDir:
+            self.launchPrep.prepareLogDir(LOG_DIR, 1000)
+            self.launchPrep.prepareLogDir(LOG_DIR, 1000)
+
+        self.assertTrue(os.path.isdir(LOG_DIR))
+        prepareLogDir.assert_called_once_with(LOG_DIR)
+
+    def test_logDirIsCheckedPerUser(self):
+        with mock.patch('rqd.rqlaunch.prepareLogDir') as prepareLogDir:
+            self.launchPrep.prepareLogDir(LOG_DIR, 1000)
+            self.launchPrep.prepareLogDir(LOG_DIR, 1001)
+
+        self.assertEqual(2, prepareLogDir.call_count)
+
+    def test_forgetLogDir(self):
+        with mock.patch('rqd.rqlaunch.prepareLogDir') as prepareLogDir:
+            self.launchPrep.prepareLogDir(LOG_DIR, 1000)
+            self.launchPrep.forgetLogDir(LOG_DIR, 1000)
+            self.launchPrep.prepareLogDir(LOG_DIR, 1000)
+
+        self.assertEqual(2, prepareLogDir.call_count)
+
+    @mock.patch('os.makedirs', side_effect=OSError('Permission denied'))
+    def test_logDirCannotBeCreated(self, makedirs):
+        with self.assertRaises(RuntimeError):
+            self.launchPrep.prepareLogDir(LOG_DIR, 1000)
+        with self.assertRaises(RuntimeError):
+            self.launchPrep.prepareLogDir(LOG_DIR, 1000)
+
+        self.assertEqual(2, makedirs.call_count)
+
+    @mock.patch('rqd.rqutil.permissionsLow')
+    @mock.patch('rqd.rqutil.permissionsHigh')
+    @mock.patch('rqd.rqutil.checkAndCreateUser')
+    def test_userIsCreatedOnce(self, checkAndCreateUser, permissionsHigh, permissionsLow):
+        self.launchPrep.prepareUser('artist')
+        self.launchPrep.prepareUser('artist')
+
+        checkAndCreateUser.assert_called_once_with('artist')
+        permissionsHigh.assert_called_once_with()
+        permissionsLow.assert_called_once_with()
+
+    def test_getStats(self):
+        self.launchPrep.launchLatency.record(0.25)
+
+        stats = self.launchPrep.getStats()
+
+        self.assertEqual({'launch', 'wait', 'prep', 'log_dirs', 'users'}, set(stats))
+        self.assertEqual(0, stats['users']['misses'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import os
+import pwd
+import signal
+import tempfile
+import threading
+import time
+import unittest
+
+import mock
+
+import rqd.rqlauncher
+import rqd.rqscheduler
+
+
+RQD_PATH = os.path.dirname(os.path.dirname(os.path.abspath(rqd.rqlauncher.__file__)))
+
+
+class LauncherPoolTests(unittest.TestCase):
+    """Starts real launchers, every user name maps to the user running the tests"""
+
+    def setUp(self):
+        patches = [
+            mock.patch.dict(os.environ, {'PYTHONPATH': RQD_PATH}),
+            mock.patch('pwd.getpwnam', return_value=pwd.getpwuid(os.getuid())),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.scheduler = rqd.rqscheduler.Scheduler(workers=1)
+        self.scheduler.start()
+        self.addCleanup(self.scheduler.stop)
+        self.pool = rqd.rqlauncher.LauncherPool(self.scheduler, timeout=10)
+        self.addCleanup(self.pool.close)
+        self.output = tempfile.NamedTemporaryFile()
+        self.addCleanup(self.output.close)
+
+    def __launch(self, command, userName='user'):
+        return self.pool.launch(userName, ['/bin/sh', '-c', command],
+                                {'PATH': '/bin:/usr/bin', 'FRAME': '0001'}, '/',
+                                self.output.fileno())
+
+    def __wait(self, process):
+        exits = []
+        exited = threading.Event()
+
+        def onExit(pid, status, rusage):
+            exits.append((pid, status, rusage))
+            exited.set()
+        process.watch(onExit)
+        self.assertTrue(exited.wait(10))
+        return exits[0]
+
+    def __readOutput(self):
+        with open(self.output.name) as outputFile:
+            return outputFile.read()
+
+    def test_launch(self):
+        process = self.__launch('echo frame $FRAME; pwd; exit 3')
+
+        pid, status, rusage = self.__wait(process)
+
+        self.assertEqual(process.pid, pid)
+        self.assertEqual(3, rqd.rqscheduler.exitCode(status))
+        self.assertIsInstance(rusage, rqd.rqlauncher.Rusage)
+        self.assertEqual('frame 0001\n/\n', self.__readOutput())
+
+    def test_launchReusesLauncher(self):
+        for _ in range(3):
+            self.__wait(self.__launch('true'))
+
+        self.assertEqual({'launchers': 1, 'spawned': 1, 'launched': 3}, self.pool.getStats())
+
+    def test_launchMissingCommand(self):
+        process = self.pool.launch('user', ['no-such-command'], {'PATH': '/nonexistent'}, '/',
+                                   self.output.fileno())
+
+        _, status, _ = self.__wait(process)
+
+        self.assertEqual(rqd.rqlauncher.EXIT_LAUNCH_FAILED, rqd.rqscheduler.exitCode(status))
+        self.assertIn('Unable to launch frame', self.__readOutput())
+
+    def test_watchAfterExit(self):
+        process = self.__launch('true')
+        time.sleep(0.5)
+
+        _, status, _ = self.__wait(process)
+
+        self.assertEqual(0, status)
+
+    def test_launcherExit(self):
+        process = self.__launch('sleep 30')
+        exits = []
+        exited = threading.Event()
+
+        def onExit(pid, status, rusage):
+            exits.append((pid, status, rusage))
+            exited.set()
+        process.watch(onExit)
+        process.launcher.process.kill()
+
+        # The frame outlives its launcher and is only reported once it exits.
+        self.assertFalse(exited.wait(1))
+        self.assertTrue(process.launcher.closed)
+        os.killpg(process.pid, signal.SIGKILL)
+        self.assertTrue(exited.wait(10))
+        pid, status, rusage = exits[0]
+
+        self.assertEqual(process.pid, pid)
+        self.assertIsNone(status)
+        self.assertIsNone(rusage)
+
+    def test_launchRefusesPidOfOtherProcess(self):
+        with mock.patch('rqd.rqlauncher.getParentAndSession', return_value=(1, 1)):
+            self.assertRaises(RuntimeError, self.__launch, 'true')
+
+    def test_lateReplyKillsFrame(self):
+        self.pool.timeout = 0
+        checked = []
+
+        def getParentAndSession(pid):
+            checked.append(pid)
+            return rqd.rqlauncher.getParentAndSession.original(pid)
+        getParentAndSession.original = rqd.rqlauncher.getParentAndSession
+
+        with mock.patch('rqd.rqlauncher.getParentAndSession', getParentAndSession):
+            self.assertRaises(RuntimeError, self.__launch, 'sleep 30')
+            deadline = time.time() + 10
+            while time.time() < deadline and (
+                    not checked or rqd.rqscheduler.processExists(checked[0])):
+                time.sleep(0.05)
+
+        self.assertEqual(1, len(checked))
+        self.assertFalse(rqd.rqscheduler.processExists(checked[0]))
+
+    def test_idleLaunchersExit(self):
+        self.pool.maxUsers = 1
+        first = self.__launch('true')
+        self.__wait(first)
+
+        self.__wait(self.__launch('true', userName='other'))
+        first.launcher.process.wait(10)
+
+        self.assertEqual(1, len(self.pool))
+        self.assertEqual(2, self.pool.getStats()['spawned'])
+
+
+class GetParentAndSessionTests(unittest.TestCase):
+
+    def test_running(self):
+        self.assertEqual((os.getppid(), os.getsid(0)),
+                         rqd.rqlauncher.getParentAndSession(os.getpid()))
+
+    def test_missing(self):
+        self.assertIsNone(rqd.rqlauncher.getParentAndSession(-1))
+
+
+class GetUserArgsTests(unittest.TestCase):
+
+    def test_sameUser(self):
+        self.assertEqual({}, rqd.rqlauncher.getUserArgs(pwd.getpwuid(os.getuid())))
+
+    @mock.patch('os.getgrouplist', return_value=[20, 30])
+    @mock.patch('os.getuid', return_value=0)
+    def test_otherUser(self, getuidMock, getgrouplistMock):
+        user = pwd.struct_passwd(('frame', 'x', 928, 20, '', '/home/frame', '/bin/sh'))
+
+        self.assertEqual({'user': 928, 'group': 20, 'extra_groups': [20, 30]},
+                         rqd.rqlauncher.getUserArgs(user))
+        getgrouplistMock.assert_called_once_with('frame', 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
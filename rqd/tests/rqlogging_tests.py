@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+from builtins import range
+import gzip
+import io
+import mock
+import os
+import re
+import shutil
+import subprocess
+import time
+import unittest
+
+import pyfakefs.fake_filesystem_unittest
+
+import rqd.rqconstants
+import rqd.rqlogging
+import rqd.rqscheduler
+
+
+TIMEOUT = 5
+LOG_PATH = '/shots/show/logs/job.0001-render.rqlog'
+
+
+class RotateLogTests(pyfakefs.fake_filesystem_unittest.TestCase):
+
+    def setUp(self):
+        self.setUpPyfakefs()
+
+    def test_noLog(self):
+        self.assertIsNone(rqd.rqlogging.rotateLog(LOG_PATH, 15))
+
+    def test_firstFreeSlot(self):
+        self.fs.create_file(LOG_PATH, contents='current')
+        self.fs.create_file(LOG_PATH + '.1')
+        self.fs.create_file(LOG_PATH + '.2.gz')
+
+        rotated = rqd.rqlogging.rotateLog(LOG_PATH, 15)
+
+        self.assertEqual(LOG_PATH + '.3', rotated)
+        self.assertFalse(os.path.exists(LOG_PATH))
+        with open(rotated) as rotatedFile:
+            self.assertEqual('current', rotatedFile.read())
+
+    def test_lastSlotIsReused(self):
+        self.fs.create_file(LOG_PATH, contents='current')
+        for rotateCount in range(1, 4):
+            self.fs.create_file('%s.%d' % (LOG_PATH, rotateCount))
+
+        self.assertEqual(LOG_PATH + '.3', rqd.rqlogging.rotateLog(LOG_PATH, 3))
+
+    @mock.patch('rqd.rqutil.permissionsLow')
+    @mock.patch('rqd.rqutil.permissionsUser')
+    def test_compressionRunsAsLogOwner(self, permissionsUserMock, permissionsLowMock):
+        self.fs.create_file(LOG_PATH + '.1', contents='previous')
+        manager = mock.Mock()
+        manager.attach_mock(permissionsUserMock, 'permissionsUser')
+        manager.attach_mock(permissionsLowMock, 'permissionsLow')
+
+        with mock.patch('shutil.copyfileobj', side_effect=shutil.copyfileobj) as copyMock:
+            manager.attach_mock(copyMock, 'copyfileobj')
+            rqd.rqlogging.compressLog(LOG_PATH + '.1', 'gzip', 1000, 100)
+
+        # The files are opened and renamed as the owner, the compression
+        # itself runs without holding the permissions lock.
+        self.assertEqual(['permissionsUser', 'permissionsLow', 'copyfileobj',
+                          'permissionsUser', 'permissionsLow'],
+                         [call[0] for call in manager.mock_calls])
+        permissionsUserMock.assert_called_with(1000, 100)
+        self.assertFalse(os.path.exists(LOG_PATH + '.1'))
+        self.assertEqual(['job.0001-render.rqlog.1.gz'], os.listdir(os.path.dirname(LOG_PATH)))
+
+    def test_compression(self):
+        self.fs.create_file(LOG_PATH, contents='current')
+        calls = []
+
+        rotated = rqd.rqlogging.rotateLog(
+            LOG_PATH, 15, 'gzip', lambda func, *args: calls.append((func, args)))
+
+        self.assertEqual([(rqd.rqlogging.compressLog,
+                           (rotated, 'gzip', rqd.rqconstants.RQD_UID, rqd.rqconstants.RQD_GID))],
+                         calls)
+        rqd.rqlogging.compressLog(rotated, 'gzip')
+        self.assertFalse(os.path.exists(rotated))
+        with gzip.open(rotated + '.gz') as compressed:
+            self.assertEqual(b'current', compressed.read())
+
+
+class FrameLogWriterTests(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = rqd.rqscheduler.Scheduler(workers=2)
+        self.scheduler.start()
+        self.logFile = io.BytesIO()
+
+    def tearDown(self):
+        self.scheduler.stop()
+        self.scheduler.join(TIMEOUT)
+
+    def __run(self, writer, script):
+        """Runs script in a shell writing to the writer's pipe"""
+        proc = subprocess.Popen(['/bin/sh', '-c', script],
+                                stdout=writer.writeFd, stderr=writer.writeFd)
+        writer.start()
+        proc.wait()
+        writer.close(TIMEOUT)
+
+    def test_outputIsBatched(self):
+        writer = rqd.rqlogging.FrameLogWriter(self.logFile, self.scheduler, timestamps=False,
+                                              maxBytes=0, flushSec=60)
+
+        self.__run(writer, 'for i in $(seq 1 200); do echo line $i; echo err $i >&2; done')
+
+        lines = self.logFile.getvalue().decode('ascii').splitlines()
+        self.assertEqual(400, len(lines))
+        self.assertIn('line 200', lines)
+        self.assertIn('err 1', lines)
+        self.assertLess(writer.writes, 10)
+
+    def test_timestamps(self):
+        writer = rqd.rqlogging.FrameLogWriter(self.logFile, self.scheduler, timestamps=True,
+                                              maxBytes=0)
+
+        self.__run(writer, 'printf "first\\nsec"; sleep 0.1; printf "ond\\nthird\\n"')
+
+        lines = self.logFile.getvalue().decode('ascii').splitlines()
+        self.assertEqual(3, len(lines))
+        for line, text in zip(lines, ('first', 'second', 'third')):
+            self.assertTrue(re.match(r'^\[\d\d:\d\d:\d\d\] %s$' % text, line), line)
+
+    def test_maxBytes(self):
+        writer = rqd.rqlogging.FrameLogWriter(self.logFile, self.scheduler, timestamps=False,
+                                              maxBytes=100)
+
+        self.__run(writer, 'for i in $(seq 1 1000); do echo line $i; done')
+
+        output = self.logFile.getvalue()
+        self.assertTrue(output.startswith(b'line 1\n'))
+        self.assertTrue(output.endswith(b'[rqd] Log output truncated at 100 bytes\n'))
+        self.assertTrue(writer.truncated)
+        self.assertGreater(writer.bytesRead, 1000)
+
+    def test_outputIsFlushedPeriodically(self):
+        writer = rqd.rqlogging.FrameLogWriter(self.logFile, self.scheduler, timestamps=False,
+                                              maxBytes=0, flushSec=0.1)
+        proc = subprocess.Popen(['/bin/sh', '-c', 'echo started; sleep 1'],
+                                stdout=writer.writeFd)
+        writer.start()
+        try:
+            deadline = time.time() + TIMEOUT
+            while not self.logFile.getvalue() and time.time() < deadline:
+                time.sleep(0.02)
+            self.assertIsNone(proc.poll())
+            self.assertEqual(b'started\n', self.logFile.getvalue())
+        finally:
+            proc.wait()
+            writer.close(TIMEOUT)
+
+    def test_closeWithLingeringProcess(self):
+        writer = rqd.rqlogging.FrameLogWriter(self.logFile, self.scheduler, timestamps=False,
+                                              maxBytes=0)
+        proc = subprocess.Popen(['/bin/sh', '-c', 'echo done; sleep 5'], stdout=writer.writeFd)
+        writer.start()
+        try:
+            writer.close(0.5)
+            self.assertEqual(b'done\n', self.logFile.getvalue())
+        finally:
+            proc.kill()
+            proc.wait()
+
+
+if __name__ == '__main__':
+    unittest.main()
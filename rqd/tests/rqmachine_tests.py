@@ -30,6 +30,7 @@ import rqd.rqcore
 import rqd.rqmachine
 import rqd.rqnetwork
 import rqd.rqnimby
+import rqd.rqprofile
 import rqd.rqutil
 import rqd.compiled_proto.host_pb2
 import rqd.compiled_proto.report_pb2
@@ -275,6 +276,8 @@ class MachineTests(pyfakefs.fake_filesystem_unittest.TestCase):
 
         self.assertFalse(self.machine.isUserLoggedIn())
 
+    @mock.patch('rqd.rqutil.permissionsHigh', new=mock.MagicMock())
+    @mock.patch('rqd.rqutil.permissionsLow', new=mock.MagicMock())
     @mock.patch('time.time', new=mock.MagicMock(return_value=1570057887.61))
     def test_rssUpdate(self):
         rqd.rqconstants.SYS_HERTZ = 100
@@ -299,6 +302,101 @@ class MachineTests(pyfakefs.fake_filesystem_unittest.TestCase):
             {'list': [{'seconds': 1277.4100000000035, 'total_time': 44, 'pid': '105'}]},
             eval(updatedFrameInfo.attributes['ptree']))
 
+    @mock.patch('rqd.rqutil.permissionsHigh', new=mock.MagicMock())
+    @mock.patch('rqd.rqutil.permissionsLow', new=mock.MagicMock())
+    @mock.patch('time.time')
+    def test_rssUpdateReportsIo(self, timeMock):
+        pid = 105
+        self.fs.create_file('/proc/%d/stat' % pid, contents=PROC_PID_STAT)
+        ioFile = self.fs.create_file('/proc/%d/io' % pid, contents=(
+            'rchar: 10000\nwchar: 2000\nsyscr: 50\nsyscw: 20\n'
+            'read_bytes: 4096\nwrite_bytes: 0\n'))
+        runningFrame = rqd.rqnetwork.RunningFrame(self.rqCore,
+                                                  rqd.compiled_proto.rqd_pb2.RunFrame())
+        runningFrame.pid = pid
+        frameCache = {'unused-frame-id': runningFrame}
+        timeMock.return_value = 1570057880
+        self.machine.rssUpdate(frameCache)
+
+        ioFile.set_contents('rchar: 30000\nwchar: 2000\nsyscr: 90\nsyscw: 20\n'
+                            'read_bytes: 8192\nwrite_bytes: 1000\n')
+        timeMock.return_value = 1570057890
+        self.machine.rssUpdate(frameCache)
+
+        attributes = runningFrame.runningFrameInfo().attributes
+        self.assertEqual('8192', attributes['ioReadBytes'])
+        self.assertEqual('1000', attributes['ioWriteBytes'])
+        self.assertEqual('30000', attributes['ioReadChars'])
+        self.assertEqual('90', attributes['ioReadSyscalls'])
+        self.assertEqual('409', attributes['ioReadBytesPerSec'])
+        self.assertEqual('100', attributes['ioWriteBytesPerSec'])
+        self.assertEqual('2000', attributes['ioReadCharsPerSec'])
+        self.assertEqual('0', attributes['ioWriteCharsPerSec'])
+
+    @mock.patch.object(rqd.rqconstants, 'RQD_IO_ACCOUNTING', new=False)
+    def test_rssUpdateWithoutIoAccounting(self):
+        pid = 105
+        self.fs.create_file('/proc/%d/stat' % pid, contents=PROC_PID_STAT)
+        runningFrame = rqd.rqnetwork.RunningFrame(self.rqCore,
+                                                  rqd.compiled_proto.rqd_pb2.RunFrame())
+        runningFrame.pid = pid
+
+        with mock.patch('rqd.rqutil.permissionsHigh') as permissionsHighMock:
+            self.machine.rssUpdate({'unused-frame-id': runningFrame})
+
+        permissionsHighMock.assert_not_called()
+        self.assertNotIn('ioReadBytes', runningFrame.runFrame.attributes)
+
+    @mock.patch('rqd.rqutil.permissionsHigh', new=mock.MagicMock())
+    @mock.patch('rqd.rqutil.permissionsLow', new=mock.MagicMock())
+    @mock.patch('time.time', new=mock.MagicMock(return_value=1570057887.61))
+    def test_rssUpdateRecordsProfile(self):
+        rqd.rqconstants.SYS_HERTZ = 100
+        pid = 105
+        self.fs.create_file('/proc/%d/stat' % pid, contents=PROC_PID_STAT)
+        self.fs.create_file('/proc/%d/io' % pid, contents='read_bytes: 4096\nwrite_bytes: 512\n')
+        runningFrame = rqd.rqnetwork.RunningFrame(self.rqCore,
+                                                  rqd.compiled_proto.rqd_pb2.RunFrame())
+        runningFrame.pid = pid
+        runningFrame.profile = rqd.rqprofile.FrameProfile(capacity=4)
+
+        self.machine.rssUpdate({'unused-frame-id': runningFrame})
+
+        samples = runningFrame.profile.getSamples()
+        self.assertEqual(1, len(samples))
+        timestamp, rss, pcpu, readBytes, writeBytes, threads = samples[0]
+        self.assertEqual(1570057887, timestamp)
+        self.assertEqual(616, rss)
+        self.assertAlmostEqual(0.034444696691, pcpu, places=6)
+        self.assertEqual((4096, 512, 1), (readBytes, writeBytes, threads))
+
+    @mock.patch('rqd.rqutil.permissionsHigh', new=mock.MagicMock())
+    @mock.patch('rqd.rqutil.permissionsLow', new=mock.MagicMock())
+    def test_rssUpdateFromCgroup(self):
+        pid = 105
+        frameId = 'unused-frame-id'
+        self.fs.create_file('/proc/%d/stat' % pid, contents=PROC_PID_STAT)
+        runningFrame = rqd.rqnetwork.RunningFrame(self.rqCore,
+                                                  rqd.compiled_proto.rqd_pb2.RunFrame())
+        runningFrame.pid = pid
+        runningFrame.cgroup = mock.MagicMock()
+        runningFrame.cgroup.getRss.return_value = 2048
+        runningFrame.cgroup.getPids.return_value = [pid]
+        runningFrame.cgroup.getPcpu.return_value = 150.0
+        runningFrame.cgroup.getMemoryCurrent.return_value = 4096
+        runningFrame.cgroup.getMemoryPeak.return_value = 8192
+        runningFrame.cgroup.getMemoryPressure.return_value = {'full': {'avg10': 0.5}}
+
+        self.machine.rssUpdate({frameId: runningFrame})
+
+        updatedFrameInfo = runningFrame.runningFrameInfo()
+        self.assertEqual(2048, updatedFrameInfo.rss)
+        self.assertEqual(2048, updatedFrameInfo.max_rss)
+        self.assertEqual(4356, updatedFrameInfo.vsize)
+        self.assertEqual('150.0', updatedFrameInfo.attributes['pcpu'])
+        self.assertEqual('8192', updatedFrameInfo.attributes['cgroupMemoryPeak'])
+        self.assertEqual('0.5', updatedFrameInfo.attributes['cgroupMemoryPressure'])
+
     @mock.patch.object(
         rqd.rqmachine.Machine, '_Machine__enabledHT', new=mock.MagicMock(return_value=False))
     def test_getLoadAvg(self):
@@ -333,6 +431,16 @@ class MachineTests(pyfakefs.fake_filesystem_unittest.TestCase):
     @mock.patch(
         'subprocess.getoutput',
         new=mock.MagicMock(return_value=' TotalMem 1023 Mb  FreeMem 968 Mb'))
+    def test_cpuinfoIsCached(self):
+        totalCores = self.coreDetail.total_cores
+        self.fs.remove_object('/proc/cpuinfo')
+        self.fs.create_file('/proc/cpuinfo', contents='processor\t: 0\n\n')
+        coreDetail = rqd.compiled_proto.report_pb2.CoreDetail()
+
+        rqd.rqmachine.Machine(self.rqCore, coreDetail)
+
+        self.assertEqual(totalCores, coreDetail.total_cores)
+
     def test_getGpuMemory(self):
         if hasattr(self.machine, 'gpuNotSupported'):
             delattr(self.machine, 'gpuNotSupported')
@@ -426,9 +534,26 @@ class MachineTests(pyfakefs.fake_filesystem_unittest.TestCase):
 
         self.assertEqual('0,8,1,9,2,10', tasksets)
 
-        self.machine.releaseHT(tasksets)
+        self.machine.releaseHT(tasksets, 300)
+
+        fragmentation = self.machine.getCoreFragmentation()
+        self.assertEqual(4, fragmentation[0]['free'])
+        self.assertEqual(4, fragmentation[1]['free'])
+
+    def test_reserveHTFractional(self):
+        cpuInfo = os.path.join(os.path.dirname(__file__), 'cpuinfo', '_cpuinfo_shark_ht_8-4-2-2')
+        self.fs.add_real_file(cpuInfo)
+        self.machine.testInitMachineStats(cpuInfo)
+        self.machine.setupHT()
+
+        self.assertEqual('0,8,1,9', self.machine.reserveHT(150))
+        self.assertEqual('1,9', self.machine.reserveHT(50))
+        self.assertEqual(2, self.machine.getCoreFragmentation()[0]['free'])
+
+        self.machine.releaseHT('0,8,1,9', 150)
+        self.machine.releaseHT('1,9', 50)
 
-        self.assertEqual({0, 1, 2, 3, 4, 5, 6, 7}, self.machine._Machine__tasksets)
+        self.assertEqual(4, self.machine.getCoreFragmentation()[0]['free'])
 
 
 class CpuinfoTests(unittest.TestCase):
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import threading
+import unittest
+
+import mock
+
+try:
+    from urllib.request import urlopen
+except ImportError:
+    from urllib2 import urlopen
+
+import rqd.rqdservicers
+import rqd.rqmetrics
+import rqd.rqutil
+
+
+class RegistryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = rqd.rqmetrics.Registry()
+
+    def test_counter(self):
+        counter = self.registry.counter('rqd_test_total', 'Test calls', ('method',))
+
+        counter.labels('Lock').inc()
+        counter.labels('Lock').inc(2)
+        counter.labels('Unlock').inc()
+
+        self.assertEqual(
+            '# HELP rqd_test_total Test calls\n'
+            '# TYPE rqd_test_total counter\n'
+            'rqd_test_total{method="Lock"} 3\n'
+            'rqd_test_total{method="Unlock"} 1\n',
+            self.registry.render())
+
+    def test_counterFromThreads(self):
+        counter = self.registry.counter('rqd_test_total', 'Test calls')
+
+        def increment():
+            for _ in range(1000):
+                counter.inc()
+        threads = [threading.Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertIn('rqd_test_total 4000\n', self.registry.render())
+
+    def test_histogram(self):
+        histogram = self.registry.histogram('rqd_test_seconds', 'Test time', buckets=(0.1, 1))
+
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(0.5)
+        histogram.observe(3)
+
+        self.assertEqual(
+            '# HELP rqd_test_seconds Test time\n'
+            '# TYPE rqd_test_seconds histogram\n'
+            'rqd_test_seconds_bucket{le="0.1"} 2\n'
+            'rqd_test_seconds_bucket{le="1"} 3\n'
+            'rqd_test_seconds_bucket{le="+Inf"} 4\n'
+            'rqd_test_seconds_sum 3.65\n'
+            'rqd_test_seconds_count 4\n',
+            self.registry.render())
+
+    def test_wrongLabels(self):
+        counter = self.registry.counter('rqd_test_total', 'Test calls', ('method',))
+
+        self.assertRaises(ValueError, counter.labels)
+
+    def test_tracker(self):
+        tracker = rqd.rqutil.LatencyTracker()
+        tracker.record(1.0)
+        tracker.record(3.0)
+        family = rqd.rqmetrics.MetricFamily('rqd_test_seconds', 'summary', 'Test time')
+
+        family.addTracker(tracker, {'method': 'Lock'})
+
+        self.assertEqual(
+            '# HELP rqd_test_seconds Test time\n'
+            '# TYPE rqd_test_seconds summary\n'
+            'rqd_test_seconds{method="Lock",quantile="0.5"} 3\n'
+            'rqd_test_seconds{method="Lock",quantile="0.99"} 3\n'
+            'rqd_test_seconds_sum{method="Lock"} 4\n'
+            'rqd_test_seconds_count{method="Lock"} 2',
+            family.render())
+
+    def test_labelsAreEscaped(self):
+        family = rqd.rqmetrics.MetricFamily('rqd_test', 'gauge', 'Test')
+
+        family.add(1, {'path': 'a"b\\c'})
+
+        self.assertIn('rqd_test{path="a\\"b\\\\c"} 1', family.render())
+
+    def test_failingCollector(self):
+        self.registry.counter('rqd_test_total', 'Test calls').inc()
+        self.registry.addCollector(mock.MagicMock(side_effect=RuntimeError('boom')))
+
+        self.assertIn('rqd_test_total 1\n', self.registry.render())
+
+
+class MetricsServerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = rqd.rqmetrics.Registry()
+        self.registry.counter('rqd_test_total', 'Test calls').inc()
+        self.server = rqd.rqmetrics.MetricsServer(self.registry, port=0, bind='127.0.0.1')
+        self.port = self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_scrape(self):
+        response = urlopen('http://127.0.0.1:%d/metrics' % self.port, timeout=5)
+
+        self.assertEqual(rqd.rqmetrics.CONTENT_TYPE, response.headers['Content-Type'])
+        self.assertIn(b'rqd_test_total 1\n', response.read())
+
+
+class RecordCallTests(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = rqd.rqmetrics.Registry()
+        self.rqCore = mock.MagicMock()
+        self.rqCore.rpcLatency = self.registry.histogram('rqd_rpc_seconds', 'Rpc', ('method',))
+        self.rqCore.rpcErrors = self.registry.counter('rqd_rpc_errors_total', 'Rpc', ('method',))
+        self.servicer = rqd.rqdservicers.RqdInterfaceServicer(self.rqCore)
+
+    def test_callIsRecorded(self):
+        self.servicer.LockAll(mock.MagicMock(), mock.MagicMock())
+
+        text = self.registry.render()
+        self.assertIn('rqd_rpc_seconds_count{method="LockAll"} 1\n', text)
+        self.assertNotIn('rqd_rpc_errors_total{', text)
+
+    def test_errorIsRecorded(self):
+        self.rqCore.launchFrame.side_effect = RuntimeError('boom')
+
+        self.assertRaises(RuntimeError, self.servicer.LaunchFrame,
+                          mock.MagicMock(), mock.MagicMock())
+
+        text = self.registry.render()
+        self.assertIn('rqd_rpc_seconds_count{method="LaunchFrame"} 1\n', text)
+        self.assertIn('rqd_rpc_errors_total{method="LaunchFrame"} 1\n', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+from builtins import range
+from concurrent import futures
+import mock
+import threading
+import time
+import unittest
+
+import grpc
+
+import rqd.compiled_proto.report_pb2
+import rqd.compiled_proto.report_pb2_grpc
+import rqd.rqconstants
+import rqd.rqexceptions
+import rqd.rqnetwork
+
+
+class CountingReportServicer(rqd.compiled_proto.report_pb2_grpc.RqdReportInterfaceServicer):
+    """Stands in for the cuebot and counts what it receives"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def __count(self, method):
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+
+    def ReportRqdStartup(self, request, context):
+        self.__count('ReportRqdStartup')
+        return rqd.compiled_proto.report_pb2.RqdReportRqdStartupResponse()
+
+    def ReportStatus(self, request, context):
+        self.__count('ReportStatus')
+        return rqd.compiled_proto.report_pb2.RqdReportStatusResponse()
+
+    def ReportRunningFrameCompletion(self, request, context):
+        self.__count('ReportRunningFrameCompletion')
+        return rqd.compiled_proto.report_pb2.RqdReportRunningFrameCompletionResponse()
+
+
+def hostReport(frameIds):
+    report = rqd.compiled_proto.report_pb2.HostReport(
+        host=rqd.compiled_proto.report_pb2.RenderHost(name='arbitrary-host-name'))
+    for frameId in frameIds:
+        report.frames.add(frame_id=frameId, rss=1000000)
+    return report
+
+
+def startServer(servicer, port=0):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    rqd.compiled_proto.report_pb2_grpc.add_RqdReportInterfaceServicer_to_server(servicer, server)
+    port = server.add_insecure_port('localhost:%d' % port)
+    server.start()
+    return server, port
+
+
+class NetworkReportTests(unittest.TestCase):
+
+    def setUp(self):
+        self.servicer = CountingReportServicer()
+        self.server, self.port = startServer(self.servicer)
+
+        patches = [mock.patch.object(rqd.rqconstants, 'CUEBOT_HOSTNAME', new='localhost'),
+                   mock.patch.object(rqd.rqconstants, 'CUEBOT_GRPC_PORT', new=self.port),
+                   mock.patch.object(rqd.rqconstants, 'RQD_TIMEOUT', new=5),
+                   mock.patch.object(rqd.rqconstants, 'RQD_GRPC_RECONNECT_BACKOFF_INITIAL_SEC',
+                                     new=0.1),
+                   mock.patch.object(rqd.rqconstants, 'RQD_GRPC_RECONNECT_BACKOFF_MAX_SEC',
+                                     new=0.2)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.network = rqd.rqnetwork.Network(mock.MagicMock())
+
+    def tearDown(self):
+        self.network.closeChannel()
+        self.server.stop(0)
+
+    def __reportUntilSent(self, report, timeout=10):
+        deadline = time.time() + timeout
+        while True:
+            try:
+                return self.network.reportStatus(report)
+            except (grpc.RpcError, rqd.rqexceptions.CuebotUnavailableException):
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def test_statsCountCallsAndBytes(self):
+        report = hostReport(['frame1'])
+
+        self.network.reportStatus(report)
+        self.network.reportStatus(report)
+
+        request = rqd.compiled_proto.report_pb2.RqdReportStatusRequest(host_report=report)
+        self.assertEqual(2, self.servicer.calls['ReportStatus'])
+        stats = self.network.getReportStats()['ReportStatus']
+        self.assertEqual(2, stats['calls'])
+        self.assertEqual(0, stats['errors'])
+        self.assertEqual(2 * request.ByteSize(), stats['bytes'])
+        self.assertGreater(stats['max_ms'], 0)
+
+    @mock.patch('rqd.compiled_proto.report_pb2_grpc.RqdReportInterfaceStub',
+                wraps=rqd.compiled_proto.report_pb2_grpc.RqdReportInterfaceStub)
+    @mock.patch('grpc.insecure_channel', wraps=grpc.insecure_channel)
+    def test_channelAndStubAreReused(self, channelMock, stubMock):
+        self.network.reportStatus(hostReport([]))
+        self.network.reportRunningFrameCompletion(
+            rqd.compiled_proto.report_pb2.FrameCompleteReport())
+        self.network.reportStatus(hostReport([]))
+
+        self.assertEqual(1, channelMock.call_count)
+        self.assertEqual(1, stubMock.call_count)
+
+    @mock.patch.object(rqd.rqconstants, 'RQD_REPORT_SKIP_UNCHANGED', new=True)
+    def test_unchangedReportsAreSkipped(self):
+        self.assertTrue(self.network.reportStatus(hostReport(['frame1', 'frame2'])))
+        self.assertFalse(self.network.reportStatus(hostReport(['frame2', 'frame1'])))
+        self.assertTrue(self.network.reportStatus(hostReport(['frame2'])))
+
+        self.assertEqual(2, self.servicer.calls['ReportStatus'])
+
+    @mock.patch.object(rqd.rqconstants, 'RQD_REPORT_SKIP_UNCHANGED', new=True)
+    def test_failedReportIsResent(self):
+        report = hostReport(['frame1'])
+        self.network.reportStatus(report)
+        self.server.stop(0)
+
+        with self.assertRaises(grpc.RpcError):
+            self.network.reportStatus(hostReport(['frame2']))
+
+        self.assertTrue(self.network.reportFilter.shouldSend(report))
+
+    def test_failFastWhileReconnecting(self):
+        self.network.reportStatus(hostReport([]))
+        self.server.stop(0).wait()
+        with self.assertRaises(grpc.RpcError):
+            self.network.reportStatus(hostReport([]))
+
+        start = time.time()
+        with self.assertRaises(rqd.rqexceptions.CuebotUnavailableException):
+            self.network.reportStatus(hostReport([]))
+
+        self.assertLess(time.time() - start, 0.1)
+        self.assertEqual(1, self.network.getReportStats()['ReportStatus']['errors'])
+
+    def test_reconnect(self):
+        self.network.reportStatus(hostReport([]))
+        self.server.stop(0).wait()
+        with self.assertRaises(grpc.RpcError):
+            self.network.reportStatus(hostReport([]))
+
+        self.server, _ = startServer(self.servicer, self.port)
+
+        self.assertTrue(self.__reportUntilSent(hostReport([])))
+        self.assertEqual(2, self.servicer.calls['ReportStatus'])
+
+    def test_failover(self):
+        otherServicer = CountingReportServicer()
+        otherServer, otherPort = startServer(otherServicer)
+        self.addCleanup(otherServer.stop, 0)
+        self.network.channelPool = rqd.rqnetwork.ChannelPool(
+            ['localhost:%d' % self.port, 'localhost:%d' % otherPort])
+
+        self.network.reportStatus(hostReport([]))
+        self.server.stop(0).wait()
+        with self.assertRaises(grpc.RpcError):
+            self.network.reportStatus(hostReport([]))
+        self.network.reportStatus(hostReport([]))
+
+        self.assertEqual(1, self.servicer.calls['ReportStatus'])
+        self.assertEqual(1, otherServicer.calls['ReportStatus'])
+
+    def test_batchedCompletions(self):
+        reports = [rqd.compiled_proto.report_pb2.FrameCompleteReport(
+            frame=rqd.compiled_proto.report_pb2.RunningFrameInfo(frame_id='frame%d' % i))
+            for i in range(20)]
+
+        delivered, failures = self.network.reportRunningFrameCompletions(reports)
+
+        self.assertEqual(['frame%d' % i for i in range(20)], delivered)
+        self.assertEqual({}, failures)
+        self.assertEqual(20, self.servicer.calls['ReportRunningFrameCompletion'])
+        self.assertEqual(
+            20, self.network.getReportStats()['ReportRunningFrameCompletion']['calls'])
+
+    def test_throughput(self):
+        numThreads, numReports = 8, 50
+        errors = []
+
+        def sendReports():
+            try:
+                for _ in range(numReports):
+                    self.network.reportRunningFrameCompletion(
+                        rqd.compiled_proto.report_pb2.FrameCompleteReport())
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=sendReports) for _ in range(numThreads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([], errors)
+        self.assertEqual(numThreads * numReports,
+                         self.servicer.calls['ReportRunningFrameCompletion'])
+        stats = self.network.getReportStats()['ReportRunningFrameCompletion']
+        self.assertEqual(numThreads * numReports, stats['calls'])
+        self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+
+
+if __name__ == '__main__':
+    unittest.main()
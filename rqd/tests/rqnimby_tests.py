@@ -18,105 +18,170 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 
+import os
+import shutil
+import tempfile
+import time
 import mock
 import unittest
 
 import pyfakefs.fake_filesystem_unittest
 
+import rqd.rqconstants
 import rqd.rqcore
 import rqd.rqmachine
 import rqd.rqnimby
+import rqd.rqscheduler
+
+
+def immediateScheduler():
+    """A scheduler mock that runs worker calls inline and records readers"""
+    scheduler = mock.MagicMock(spec=rqd.rqscheduler.Scheduler)
+    scheduler.readers = {}
+    scheduler.isLoopThread.return_value = True
+    scheduler.runInWorker.side_effect = lambda func, *args: func(*args)
+    scheduler.addReader.side_effect = \
+        lambda fd, callback: scheduler.readers.__setitem__(fd, callback)
+    scheduler.removeReader.side_effect = lambda fd: scheduler.readers.pop(fd, None)
+    return scheduler
 
 
 @mock.patch('rqd.rqutil.permissionsHigh', new=mock.MagicMock())
 @mock.patch('rqd.rqutil.permissionsLow', new=mock.MagicMock())
+@mock.patch('rqd.rqnimby._libc', new=None)
 class RqNimbyTests(pyfakefs.fake_filesystem_unittest.TestCase):
     def setUp(self):
         self.setUpPyfakefs()
         self.inputDevice = self.fs.create_file('/dev/input/event0', contents='mouse event')
+        self.fs.create_file('/dev/input/js0')
 
         self.rqMachine = mock.MagicMock(spec=rqd.rqmachine.Machine)
         self.rqCore = mock.MagicMock(spec=rqd.rqcore.RqCore)
         self.rqCore.machine = self.rqMachine
+        self.rqCore.scheduler = immediateScheduler()
         self.nimby = rqd.rqnimby.Nimby(self.rqCore)
-        self.nimby.daemon = True
 
-    @mock.patch.object(rqd.rqnimby.Nimby, 'unlockedIdle')
-    def test_initialState(self, unlockedIdleMock):
-        self.nimby.daemon = True
+    def tearDown(self):
+        self.nimby.stop()
+
+    def __input(self):
+        """Simulates input on every watched device"""
+        for callback in list(self.rqCore.scheduler.readers.items()):
+            callback[1](callback[0])
+
+    def __lastCheck(self):
+        return self.rqCore.scheduler.callLater.call_args[0]
 
-        self.nimby.start()
-        self.nimby.join()
+    def test_initialState(self):
+        self.nimby.run()
 
         # Initial state should be "unlocked and idle".
-        unlockedIdleMock.assert_called()
+        self.assertTrue(self.nimby.active)
+        self.assertFalse(self.nimby.locked)
+        self.assertEqual(['event0'], self.nimby.watcher.getDevices())
+        self.assertEqual((rqd.rqconstants.CHECK_INTERVAL_UNLOCKED,
+                          self.rqCore.scheduler.runInWorker, self.nimby.checkResources),
+                         self.__lastCheck())
 
-        self.nimby.stop()
+    def test_devicesStayOpen(self):
+        self.nimby.run()
 
-    @mock.patch('select.select', new=mock.MagicMock(return_value=[['a new mouse event'], [], []]))
-    @mock.patch('threading.Timer')
-    def test_unlockedIdle(self, timerMock):
-        self.nimby.active = True
-        self.nimby.results = [[]]
-        self.rqCore.machine.isNimbySafeToRunJobs.return_value = True
+        with mock.patch('os.open') as openMock:
+            self.nimby.watcher.rescan()
+            self.nimby.watcher.rescan()
+
+        openMock.assert_not_called()
 
-        self.nimby.unlockedIdle()
+    def test_unlockedIdle(self):
+        self.nimby.run()
+
+        self.__input()
 
         # Given a mouse event, Nimby should transition to "locked and in use".
-        timerMock.assert_called_with(mock.ANY, self.nimby.lockedInUse)
-        timerMock.return_value.start.assert_called()
+        self.assertTrue(self.nimby.locked)
+        self.rqCore.onNimbyLock.assert_called_once_with()
+        delay, _, check = self.__lastCheck()
+        self.assertEqual(self.nimby.checkIdle, check)
+        self.assertAlmostEqual(rqd.rqconstants.MINIMUM_IDLE, delay, delta=1)
 
-    @mock.patch('select.select', new=mock.MagicMock(return_value=[[], [], []]))
-    @mock.patch.object(rqd.rqnimby.Nimby, 'unlockedIdle')
-    @mock.patch('threading.Timer')
-    def test_lockedIdleWhenIdle(self, timerMock, unlockedIdleMock):
-        self.nimby.active = True
-        self.nimby.results = [[]]
-        self.rqCore.machine.isNimbySafeToRunJobs.return_value = True
+    def test_lockedIdleWhenIdle(self):
+        self.nimby.run()
+        self.__input()
+        self.rqMachine.isNimbySafeToUnlock.return_value = True
+        self.nimby.lastActivity = time.time() - rqd.rqconstants.MINIMUM_IDLE - 1
 
-        self.nimby.lockedIdle()
+        self.nimby.checkIdle()
 
         # Given no events, Nimby should transition to "unlocked and idle".
-        unlockedIdleMock.assert_called()
+        self.assertFalse(self.nimby.locked)
+        self.rqCore.onNimbyUnlock.assert_called_once_with(asOf=self.nimby.lastActivity)
+        self.assertEqual(self.nimby.checkResources, self.__lastCheck()[2])
 
-    @mock.patch('select.select', new=mock.MagicMock(return_value=[['a new mouse event'], [], []]))
-    @mock.patch('threading.Timer')
-    def test_lockedIdleWhenInUse(self, timerMock):
-        self.nimby.active = True
-        self.nimby.results = [[]]
-        self.rqCore.machine.isNimbySafeToRunJobs.return_value = True
+    def test_lockedIdleWhenInUse(self):
+        self.nimby.run()
+        self.__input()
+        self.nimby.lastActivity = time.time() - 100
 
-        self.nimby.lockedIdle()
+        self.nimby.checkIdle()
 
-        # Given a mouse event, Nimby should transition to "locked and in use".
-        timerMock.assert_called_with(mock.ANY, self.nimby.lockedInUse)
-        timerMock.return_value.start.assert_called()
+        # Given recent input, Nimby should stay locked until the idle time is reached.
+        self.assertTrue(self.nimby.locked)
+        delay, _, check = self.__lastCheck()
+        self.assertEqual(self.nimby.checkIdle, check)
+        self.assertAlmostEqual(rqd.rqconstants.MINIMUM_IDLE - 100, delay, delta=1)
 
-    @mock.patch('select.select', new=mock.MagicMock(return_value=[[], [], []]))
-    @mock.patch.object(rqd.rqnimby.Nimby, 'lockedIdle')
-    @mock.patch('threading.Timer')
-    def test_lockedInUseWhenIdle(self, timerMock, lockedIdleMock):
-        self.nimby.active = True
-        self.nimby.results = [[]]
-        self.rqCore.machine.isNimbySafeToRunJobs.return_value = True
+    def test_lockedIdleWhenUnsafe(self):
+        self.nimby.run()
+        self.__input()
+        self.rqMachine.isNimbySafeToUnlock.return_value = False
+        self.nimby.lastActivity = time.time() - rqd.rqconstants.MINIMUM_IDLE - 1
 
-        self.nimby.lockedInUse()
+        self.nimby.checkIdle()
 
-        # Given no events, Nimby should transition to "locked and idle".
-        lockedIdleMock.assert_called()
+        self.assertTrue(self.nimby.locked)
+        self.assertEqual((rqd.rqconstants.CHECK_INTERVAL_LOCKED,
+                          self.rqCore.scheduler.runInWorker, self.nimby.checkIdle),
+                         self.__lastCheck())
 
-    @mock.patch('select.select', new=mock.MagicMock(return_value=[['a new mouse event'], [], []]))
-    @mock.patch('threading.Timer')
-    def test_lockedInUseWhenInUse(self, timerMock):
-        self.nimby.active = True
-        self.nimby.results = [[]]
-        self.rqCore.machine.isNimbySafeToRunJobs.return_value = True
+    def test_lockedInUseWhenInUse(self):
+        self.nimby.run()
+        self.__input()
 
-        self.nimby.lockedInUse()
+        self.__input()
 
         # Given a mouse event, Nimby should stay in state "locked and in use".
-        timerMock.assert_called_with(mock.ANY, self.nimby.lockedInUse)
-        timerMock.return_value.start.assert_called()
+        self.assertTrue(self.nimby.locked)
+        self.rqCore.onNimbyLock.assert_called_once_with()
+
+    def test_lowMemoryLocks(self):
+        self.nimby.run()
+        self.rqMachine.isNimbySafeToRunJobs.return_value = False
+
+        self.nimby.checkResources()
+
+        self.assertTrue(self.nimby.locked)
+        self.assertEqual(self.nimby.checkIdle, self.__lastCheck()[2])
+
+    def test_devicesAreRescanned(self):
+        self.nimby.run()
+        self.fs.create_file('/dev/input/mice')
+        os.remove('/dev/input/event0')
+
+        self.nimby.watcher.rescan()
+
+        self.assertEqual(['mice'], self.nimby.watcher.getDevices())
+        self.assertEqual(1, len(self.rqCore.scheduler.readers))
+
+    def test_stop(self):
+        self.nimby.run()
+        self.__input()
+
+        self.nimby.stop()
+
+        self.assertFalse(self.nimby.active)
+        self.assertFalse(self.nimby.locked)
+        self.assertEqual({}, self.rqCore.scheduler.readers)
+        self.rqCore.onNimbyUnlock.assert_called()
 
     def test_lockNimby(self):
         self.nimby.active = True
@@ -136,5 +201,42 @@ class RqNimbyTests(pyfakefs.fake_filesystem_unittest.TestCase):
         self.rqCore.onNimbyUnlock.assert_called()
 
 
+@unittest.skipIf(rqd.rqnimby._libc is None, 'inotify is not available')
+@mock.patch('rqd.rqutil.permissionsHigh', new=mock.MagicMock())
+@mock.patch('rqd.rqutil.permissionsLow', new=mock.MagicMock())
+class InputWatcherInotifyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.scheduler = immediateScheduler()
+        self.onInput = mock.MagicMock()
+        self.watcher = rqd.rqnimby.InputWatcher(self.scheduler, self.onInput, self.path)
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.path)
+
+    def __notify(self, inotifyFd):
+        self.scheduler.readers[inotifyFd](inotifyFd)
+
+    def test_hotplug(self):
+        self.watcher.start()
+        self.assertEqual(1, len(self.scheduler.readers))
+        inotifyFd = list(self.scheduler.readers)[0]
+        self.scheduler.callLater.assert_not_called()
+
+        open(os.path.join(self.path, 'event3'), 'w').close()
+        open(os.path.join(self.path, 'js0'), 'w').close()
+        self.__notify(inotifyFd)
+
+        self.assertEqual(['event3'], self.watcher.getDevices())
+
+        os.remove(os.path.join(self.path, 'event3'))
+        self.__notify(inotifyFd)
+
+        self.assertEqual([], self.watcher.getDevices())
+        self.assertEqual([inotifyFd], list(self.scheduler.readers))
+
+
 if __name__ == '__main__':
     unittest.main()
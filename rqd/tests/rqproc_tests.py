@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import mock
+import unittest
+
+import pyfakefs.fake_filesystem_unittest
+
+import rqd.rqconstants
+import rqd.rqproc
+
+
+def procStat(pid, session, comm='time', startTime=17385159, utime=31, rss=154):
+    return ('%d (%s) S 7 %d %d 0 -1 4210688 317 0 1 0 %d 13 0 0 20 0 1 0 %d '
+            '4460544 %d 18446744073709551615 4194304 4204692 140725890735264 0 0 0 0 '
+            '16781318 0 0 0 0 17 4 0 0 0 0 0 6303248 6304296 23932928 140725890743234 '
+            '140725890743420 140725890743420 140725890744298 0') % (
+                pid, comm, session, session, utime, startTime, rss)
+
+
+class ParseStatTests(unittest.TestCase):
+
+    def test_parseStat(self):
+        stat = rqd.rqproc.parseStat(105, procStat(105, 105))
+
+        self.assertEqual(105, stat.pid)
+        self.assertEqual(105, stat.session)
+        self.assertEqual(17385159, stat.startTime)
+        self.assertEqual(44, stat.totalTime)
+        self.assertEqual(4460544, stat.vsize)
+        self.assertEqual(154, stat.rss)
+        self.assertEqual(1, stat.numThreads)
+
+    def test_parseStatCommandWithSpaces(self):
+        stat = rqd.rqproc.parseStat(105, procStat(105, 42, comm='my (odd) cmd'))
+
+        self.assertEqual(42, stat.session)
+        self.assertEqual(154, stat.rss)
+
+
+class ReadIoTests(pyfakefs.fake_filesystem_unittest.TestCase):
+
+    def setUp(self):
+        self.setUpPyfakefs()
+
+    def test_readIo(self):
+        self.fs.create_file('/proc/105/io', contents=(
+            'rchar: 2012\nwchar: 100\nsyscr: 7\nsyscw: 2\n'
+            'read_bytes: 4096\nwrite_bytes: 8192\ncancelled_write_bytes: 0\n'))
+
+        counters = rqd.rqproc.readIo(105, '/proc')
+
+        self.assertEqual(4096, counters['read_bytes'])
+        self.assertEqual(8192, counters['write_bytes'])
+        self.assertEqual(7, counters['syscr'])
+
+    def test_readIoOfExitedProcess(self):
+        self.assertIsNone(rqd.rqproc.readIo(105, '/proc'))
+
+
+class IoAccountTests(unittest.TestCase):
+
+    def test_update(self):
+        account = rqd.rqproc.IoAccount()
+
+        account.update({'read_bytes': 1000, 'syscr': 10}, 100.0)
+        account.update({'read_bytes': 3000, 'syscr': 30}, 110.0)
+
+        self.assertEqual(3000, account.totals['read_bytes'])
+        self.assertEqual(200.0, account.rates['read_bytes'])
+        self.assertEqual(2.0, account.rates['syscr'])
+        self.assertEqual(0, account.totals['write_bytes'])
+
+    def test_exitedProcessesDoNotReduceTotals(self):
+        account = rqd.rqproc.IoAccount()
+
+        account.update({'read_bytes': 5000}, 100.0)
+        # A process that was not reaped by the frame exited.
+        account.update({'read_bytes': 1000}, 110.0)
+        account.update({'read_bytes': 1500}, 120.0)
+
+        self.assertEqual(5500, account.totals['read_bytes'])
+        self.assertEqual(50.0, account.rates['read_bytes'])
+
+
+class ProcessIndexTests(pyfakefs.fake_filesystem_unittest.TestCase):
+
+    def setUp(self):
+        self.setUpPyfakefs()
+        self.fs.create_dir('/proc')
+        self.index = rqd.rqproc.ProcessIndex('/proc')
+
+    def __createProc(self, pid, session, **kwargs):
+        return self.fs.create_file('/proc/%d/stat' % pid, contents=procStat(pid, session, **kwargs))
+
+    def test_groupsProcessesBySession(self):
+        self.__createProc(100, 100)
+        self.__createProc(101, 100)
+        self.__createProc(200, 200)
+        self.__createProc(300, 1)
+
+        procs = self.index.update([100, 200])
+
+        self.assertEqual({100, 101}, set(stat.pid for stat in procs[100]))
+        self.assertEqual([200], [stat.pid for stat in procs[200]])
+        self.assertEqual(4, len(self.index))
+
+    def test_exitedProcessesAreRemoved(self):
+        self.__createProc(100, 100)
+        self.__createProc(101, 100)
+        self.index.update([100])
+
+        self.fs.remove_object('/proc/101')
+        procs = self.index.update([100])
+
+        self.assertEqual([100], [stat.pid for stat in procs[100]])
+        self.assertEqual(1, len(self.index))
+
+    def test_frameProcessesAreResampled(self):
+        statFile = self.__createProc(100, 100, rss=10)
+        self.index.update([100])
+
+        statFile.set_contents(procStat(100, 100, rss=20))
+        procs = self.index.update([100])
+
+        self.assertEqual(20, procs[100][0].rss)
+
+    def test_otherProcessesAreNotReread(self):
+        self.__createProc(100, 100)
+        self.__createProc(300, 1)
+        self.index.update([100])
+
+        with mock.patch.object(rqd.rqproc, 'parseStat',
+                               wraps=rqd.rqproc.parseStat) as parseStatMock:
+            self.index.update([100])
+
+        parseStatMock.assert_called_once_with(100, mock.ANY)
+
+    @mock.patch.object(rqd.rqconstants, 'RSS_FULL_RESCAN_INTERVAL', new=2)
+    def test_reusedPidIsReindexed(self):
+        self.__createProc(100, 100)
+        statFile = self.__createProc(300, 1)
+        self.index.update([100])
+
+        statFile.set_contents(procStat(300, 100, startTime=17385999))
+        procs = self.index.update([100])
+
+        self.assertEqual({100, 300}, set(stat.pid for stat in procs[100]))
+
+    def test_sessionLeaderIndexedBeforeSetsid(self):
+        statFile = self.__createProc(100, 1)
+        self.index.update([])
+
+        statFile.set_contents(procStat(100, 100))
+        procs = self.index.update([100])
+
+        self.assertEqual([100], [stat.pid for stat in procs[100]])
+
+    def test_cpuHistoryIsKept(self):
+        statFile = self.__createProc(100, 100)
+        stat = self.index.update([100])[100][0]
+        stat.lastTotalTime, stat.lastSeconds, stat.lastPcpu = 44, 10, 0.5
+
+        statFile.set_contents(procStat(100, 100, utime=131))
+        stat = self.index.update([100])[100][0]
+
+        self.assertEqual(144, stat.totalTime)
+        self.assertEqual(44, stat.lastTotalTime)
+        self.assertEqual(0.5, stat.lastPcpu)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import array
+import unittest
+
+import pyfakefs.fake_filesystem_unittest
+
+import rqd.rqprofile
+
+
+def decode(data):
+    """Reads the columns back from the file layout"""
+    magic, version, count, dropped = rqd.rqprofile.HEADER.unpack_from(data)
+    offset = rqd.rqprofile.HEADER.size
+    columns = []
+    for _, typecode in rqd.rqprofile.COLUMNS:
+        column = array.array(typecode)
+        size = column.itemsize * count
+        column.frombytes(data[offset:offset + size])
+        columns.append(list(column))
+        offset += size
+    return magic, version, dropped, list(zip(*columns)), offset
+
+
+class FrameProfileTests(pyfakefs.fake_filesystem_unittest.TestCase):
+
+    def setUp(self):
+        self.setUpPyfakefs()
+        self.profile = rqd.rqprofile.FrameProfile(capacity=3)
+
+    def __record(self, *timestamps):
+        for timestamp in timestamps:
+            self.profile.record(timestamp, timestamp * 10, 0.5, 100, 200, 4)
+
+    def test_record(self):
+        self.__record(1, 2)
+
+        self.assertEqual(2, len(self.profile))
+        self.assertEqual([(1, 10, 0.5, 100, 200, 4), (2, 20, 0.5, 100, 200, 4)],
+                         self.profile.getSamples())
+
+    def test_oldestSamplesAreDropped(self):
+        self.__record(1, 2, 3, 4, 5)
+
+        self.assertEqual(3, len(self.profile))
+        self.assertEqual([3, 4, 5], [sample[0] for sample in self.profile.getSamples()])
+
+    def test_toBytes(self):
+        self.__record(1, 2, 3, 4)
+
+        data = self.profile.toBytes()
+
+        magic, version, dropped, samples, size = decode(data)
+        self.assertEqual(rqd.rqprofile.MAGIC, magic)
+        self.assertEqual(rqd.rqprofile.VERSION, version)
+        self.assertEqual(1, dropped)
+        self.assertEqual(self.profile.getSamples(), samples)
+        self.assertEqual(len(data), size)
+
+    def test_write(self):
+        self.fs.create_dir('/logs')
+        self.__record(1)
+        path = rqd.rqprofile.getProfilePath('/logs/job.0001-layer.rqlog')
+
+        self.profile.write(path)
+
+        self.assertEqual('/logs/job.0001-layer.rqprof', path)
+        with open(path, 'rb') as profileFile:
+            self.assertEqual(self.profile.toBytes(), profileFile.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import mock
+import unittest
+
+import rqd.compiled_proto.report_pb2
+import rqd.rqconstants
+import rqd.rqreport
+
+
+def hostReport(freeMem=8000000, rss=1000000, frameIds=('frame1', 'frame2'), pcpu='0.5'):
+    report = rqd.compiled_proto.report_pb2.HostReport(
+        host=rqd.compiled_proto.report_pb2.RenderHost(
+            name='arbitrary-host-name', free_mem=freeMem, load=150,
+            attributes={'swapout': '12', 'freeGpu': '0'}),
+        core_info=rqd.compiled_proto.report_pb2.CoreDetail(total_cores=800, idle_cores=600))
+    for frameId in frameIds:
+        report.frames.add(frame_id=frameId, rss=rss, max_rss=rss, attributes={'pcpu': pcpu})
+    return report
+
+
+class FingerprintTests(unittest.TestCase):
+
+    def test_smallChangesAreIgnored(self):
+        self.assertEqual(
+            rqd.rqreport.fingerprint(hostReport(freeMem=8000000, rss=1000000, pcpu='0.5')),
+            rqd.rqreport.fingerprint(hostReport(freeMem=8000100, rss=1000010, pcpu='0.7')))
+
+    def test_frameOrderIsIgnored(self):
+        self.assertEqual(
+            rqd.rqreport.fingerprint(hostReport(frameIds=('frame1', 'frame2'))),
+            rqd.rqreport.fingerprint(hostReport(frameIds=('frame2', 'frame1'))))
+
+    def test_materialChanges(self):
+        base = rqd.rqreport.fingerprint(hostReport())
+
+        self.assertNotEqual(base, rqd.rqreport.fingerprint(hostReport(frameIds=('frame1',))))
+        self.assertNotEqual(base, rqd.rqreport.fingerprint(hostReport(rss=2000000)))
+        self.assertNotEqual(base, rqd.rqreport.fingerprint(hostReport(freeMem=4000000)))
+
+    def test_reportIsNotModified(self):
+        report = hostReport()
+
+        rqd.rqreport.fingerprint(report)
+
+        self.assertEqual(hostReport(), report)
+
+
+@mock.patch.object(rqd.rqconstants, 'RQD_REPORT_SKIP_UNCHANGED', new=True)
+@mock.patch.object(rqd.rqconstants, 'RQD_REPORT_HEARTBEAT_SEC', new=60)
+class ReportFilterTests(unittest.TestCase):
+
+    def setUp(self):
+        self.filter = rqd.rqreport.ReportFilter()
+
+    def test_unchangedReportIsSkipped(self):
+        self.assertTrue(self.filter.shouldSend(hostReport(), now=100))
+        self.filter.acknowledge(hostReport(), now=100)
+
+        self.assertFalse(self.filter.shouldSend(hostReport(), now=110))
+        self.assertEqual(1, self.filter.skipped)
+
+    def test_changedReportIsSent(self):
+        self.filter.acknowledge(hostReport(), now=100)
+
+        self.assertTrue(self.filter.shouldSend(hostReport(frameIds=('frame1',)), now=110))
+
+    def test_heartbeat(self):
+        self.filter.acknowledge(hostReport(), now=100)
+
+        self.assertTrue(self.filter.shouldSend(hostReport(), now=160))
+
+    def test_unacknowledgedReportIsResent(self):
+        self.filter.acknowledge(hostReport(), now=100)
+        self.filter.reset()
+
+        self.assertTrue(self.filter.shouldSend(hostReport(), now=110))
+
+    def test_disabled(self):
+        with mock.patch.object(rqd.rqconstants, 'RQD_REPORT_SKIP_UNCHANGED', new=False):
+            self.filter.acknowledge(hostReport(), now=100)
+
+            self.assertTrue(self.filter.shouldSend(hostReport(), now=110))
+
+
+if __name__ == '__main__':
+    unittest.main()
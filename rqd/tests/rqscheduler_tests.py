@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import mock
+import os
+import subprocess
+import threading
+import unittest
+
+import rqd.rqscheduler
+
+
+TIMEOUT = 5
+
+
+class SchedulerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = rqd.rqscheduler.Scheduler(workers=2)
+        self.scheduler.start()
+
+    def tearDown(self):
+        self.scheduler.stop()
+        self.scheduler.join(TIMEOUT)
+
+    def test_callLaterRunsInOrder(self):
+        calls = []
+        done = threading.Event()
+
+        self.scheduler.callLater(0.2, lambda: (calls.append('late'), done.set()))
+        self.scheduler.callLater(0.1, calls.append, 'early')
+        self.scheduler.callSoon(calls.append, 'soon')
+
+        self.assertTrue(done.wait(TIMEOUT))
+        self.assertEqual(['soon', 'early', 'late'], calls)
+
+    def test_cancel(self):
+        calls = []
+        done = threading.Event()
+
+        call = self.scheduler.callLater(0.05, calls.append, 'cancelled')
+        call.cancel()
+        self.scheduler.callLater(0.1, done.set)
+
+        self.assertTrue(done.wait(TIMEOUT))
+        self.assertEqual([], calls)
+        self.assertFalse(call.isPending())
+
+    @mock.patch('time.time', return_value=1e9)
+    def test_callLaterIgnoresWallClock(self, timeMock):
+        done = threading.Event()
+
+        self.scheduler.callLater(0.1, done.set)
+        timeMock.return_value = 0
+
+        self.assertTrue(done.wait(TIMEOUT))
+
+    def test_failingCallDoesNotStopLoop(self):
+        done = threading.Event()
+
+        self.scheduler.callSoon(lambda: 1 // 0)
+        self.scheduler.callLater(0.05, done.set)
+
+        self.assertTrue(done.wait(TIMEOUT))
+
+    def test_callbacksRunOnLoopThread(self):
+        result = []
+        done = threading.Event()
+
+        self.scheduler.callSoon(lambda: (result.append(self.scheduler.isLoopThread()), done.set()))
+
+        self.assertTrue(done.wait(TIMEOUT))
+        self.assertEqual([True], result)
+        self.assertFalse(self.scheduler.isLoopThread())
+
+    def test_addReader(self):
+        readFd, writeFd = os.pipe()
+        data = []
+        done = threading.Event()
+
+        def onReadable(fd):
+            data.append(os.read(fd, 10))
+            self.scheduler.removeReader(fd)
+            done.set()
+
+        try:
+            self.scheduler.addReader(readFd, onReadable)
+            os.write(writeFd, b'ping')
+
+            self.assertTrue(done.wait(TIMEOUT))
+            self.assertEqual([b'ping'], data)
+        finally:
+            os.close(readFd)
+            os.close(writeFd)
+
+    def test_runInWorker(self):
+        future = self.scheduler.runInWorker(lambda a, b: a + b, 2, 3)
+
+        self.assertEqual(5, future.result(TIMEOUT))
+
+    def __watchChild(self, args):
+        result = {}
+        done = threading.Event()
+
+        def onExit(pid, status, rusage):
+            result.update(pid=pid, status=status, rusage=rusage)
+            done.set()
+
+        proc = subprocess.Popen(args)
+        self.scheduler.watchChild(proc.pid, onExit)
+
+        self.assertTrue(done.wait(TIMEOUT))
+        self.assertEqual(proc.pid, result['pid'])
+        return result
+
+    def test_watchChild(self):
+        result = self.__watchChild(['/bin/sh', '-c', 'exit 3'])
+
+        self.assertEqual(3, rqd.rqscheduler.exitCode(result['status']))
+        self.assertIsNotNone(result['rusage'])
+
+    def test_watchChildKilled(self):
+        result = self.__watchChild(['/bin/sh', '-c', 'kill -9 $$'])
+
+        self.assertEqual(-9, rqd.rqscheduler.exitCode(result['status']))
+
+    @mock.patch('os.pidfd_open', create=True, side_effect=OSError('not supported'))
+    def test_watchChildWithoutPidfd(self, pidfdOpenMock):
+        result = self.__watchChild(['/bin/sh', '-c', 'exit 4'])
+
+        self.assertEqual(4, rqd.rqscheduler.exitCode(result['status']))
+
+    def __watchProcess(self):
+        done = threading.Event()
+        proc = subprocess.Popen(['/bin/sh', '-c', 'read line'], stdin=subprocess.PIPE)
+        self.addCleanup(proc.wait)
+        self.scheduler.watchProcess(proc.pid, lambda pid: done.set(), pollSec=0.05)
+
+        self.assertFalse(done.wait(0.2))
+        proc.stdin.close()
+        self.assertTrue(done.wait(TIMEOUT))
+
+    def test_watchProcess(self):
+        self.__watchProcess()
+
+    @mock.patch('os.pidfd_open', create=True, side_effect=OSError('not supported'))
+    def test_watchProcessWithoutPidfd(self, pidfdOpenMock):
+        self.__watchProcess()
+
+
+if __name__ == '__main__':
+    unittest.main()
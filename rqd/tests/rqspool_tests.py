@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import os
+import unittest
+
+import mock
+import pyfakefs.fake_filesystem_unittest
+
+import rqd.compiled_proto.report_pb2
+import rqd.rqspool
+
+
+SPOOL_PATH = '/var/lib/rqd/completion.spool'
+SPOOL_DIR = '/var/lib/rqd'
+
+
+def completeReport(frameId, exitStatus=0):
+    return rqd.compiled_proto.report_pb2.FrameCompleteReport(
+        frame=rqd.compiled_proto.report_pb2.RunningFrameInfo(frame_id=frameId),
+        exit_status=exitStatus)
+
+
+def frameIds(spool):
+    return [report.frame.frame_id for report in spool.getBatch(len(spool))]
+
+
+class ReportSpoolTests(pyfakefs.fake_filesystem_unittest.TestCase):
+
+    def setUp(self):
+        self.setUpPyfakefs()
+
+    def test_reportsSurviveRestart(self):
+        spool = rqd.rqspool.ReportSpool(SPOOL_PATH)
+        spool.append(completeReport('frame1'))
+        spool.append(completeReport('frame2'))
+        spool.markDelivered(['frame1'])
+        spool.close()
+
+        spool = rqd.rqspool.ReportSpool(SPOOL_PATH)
+
+        self.assertEqual(['frame2'], frameIds(spool))
+
+    def test_latestReportPerFrame(self):
+        spool = rqd.rqspool.ReportSpool(SPOOL_PATH)
+        spool.append(completeReport('frame1', exitStatus=1))
+        spool.append(completeReport('frame2'))
+        spool.append(completeReport('frame1', exitStatus=2))
+        spool.close()
+
+        reports = rqd.rqspool.ReportSpool(SPOOL_PATH).getBatch(10)
+
+        self.assertEqual(['frame2', 'frame1'], [report.frame.frame_id for report in reports])
+        self.assertEqual(2, reports[1].exit_status)
+
+    def test_fileIsTruncatedOnceDelivered(self):
+        spool = rqd.rqspool.ReportSpool(SPOOL_PATH)
+        spool.append(completeReport('frame1'))
+        spool.append(completeReport('frame2'))
+
+        spool.markDelivered(['frame1', 'frame2'])
+
+        self.assertEqual(0, len(spool))
+        self.assertEqual(0, spool.getFileSize())
+        self.assertEqual(0, os.path.getsize(SPOOL_PATH))
+
+    def test_partialRecordIsDiscarded(self):
+        spool = rqd.rqspool.ReportSpool(SPOOL_PATH)
+        spool.append(completeReport('frame1'))
+        spool.close()
+        validSize = os.path.getsize(SPOOL_PATH)
+        with open(SPOOL_PATH, 'ab') as fp:
+            fp.write(rqd.rqspool.HEADER.pack(100, rqd.rqspool.RECORD_REPORT) + b'partial')
+
+        spool = rqd.rqspool.ReportSpool(SPOOL_PATH)
+
+        self.assertEqual(['frame1'], frameIds(spool))
+        self.assertEqual(validSize, os.path.getsize(SPOOL_PATH))
+
+    def test_oldestReportsAreDropped(self):
+        spool = rqd.rqspool.ReportSpool(SPOOL_PATH, maxReports=2)
+
+        for frameId in ('frame1', 'frame2', 'frame3'):
+            spool.append(completeReport(frameId))
+
+        self.assertEqual(['frame2', 'frame3'], frameIds(spool))
+        self.assertEqual(1, spool.dropped)
+
+    def test_droppedReportsStayDropped(self):
+        spool = rqd.rqspool.ReportSpool(SPOOL_PATH)
+        spool.append(completeReport('frame1'))
+        spool.append(completeReport('frame2'))
+
+        spool.drop(['frame1'], 'rejected')
+        spool.close()
+
+        self.assertEqual(['frame2'], frameIds(rqd.rqspool.ReportSpool(SPOOL_PATH)))
+        self.assertEqual(1, spool.dropped)
+
+    def test_failedReportsMoveBackAndAreDropped(self):
+        spool = rqd.rqspool.ReportSpool(SPOOL_PATH, maxAttempts=2)
+        spool.append(completeReport('frame1'))
+        spool.append(completeReport('frame2'))
+
+        spool.markFailed(['frame1'])
+        self.assertEqual(['frame2', 'frame1'], frameIds(spool))
+
+        spool.markFailed(['frame1'])
+        self.assertEqual(['frame2'], frameIds(spool))
+        self.assertEqual(1, spool.dropped)
+
+    def test_fileIsCompacted(self):
+        spool = rqd.rqspool.ReportSpool(SPOOL_PATH, maxBytes=100)
+
+        for _ in range(20):
+            spool.append(completeReport('frame1'))
+
+        self.assertLessEqual(spool.getFileSize(), 100)
+        self.assertEqual(spool.getFileSize(), os.path.getsize(SPOOL_PATH))
+        spool.close()
+        self.assertEqual(['frame1'], frameIds(rqd.rqspool.ReportSpool(SPOOL_PATH)))
+
+    def test_unusableSpoolIsKeptInMemory(self):
+        self.fs.create_file(SPOOL_DIR)
+        spool = rqd.rqspool.ReportSpool(SPOOL_PATH)
+
+        spool.append(completeReport('frame1'))
+
+        self.assertEqual(['frame1'], frameIds(spool))
+        self.assertEqual(0, spool.getFileSize())
+
+    def forgeSpool(self):
+        spool = rqd.rqspool.ReportSpool(SPOOL_PATH)
+        spool.append(completeReport('forged'))
+        spool.close()
+
+    def test_spoolOfAnotherUserIsRefused(self):
+        self.forgeSpool()
+        os.chown(SPOOL_PATH, os.geteuid() + 1, -1)
+
+        spool = rqd.rqspool.ReportSpool(SPOOL_PATH)
+
+        self.assertEqual([], frameIds(spool))
+
+    def test_directoryOfAnotherUserIsRefused(self):
+        self.forgeSpool()
+        os.chown(SPOOL_DIR, os.geteuid() + 1, -1)
+
+        self.assertEqual([], frameIds(rqd.rqspool.ReportSpool(SPOOL_PATH)))
+
+    def test_writableDirectoryIsRefused(self):
+        self.forgeSpool()
+        os.chmod(SPOOL_DIR, 0o1777)
+
+        self.assertEqual([], frameIds(rqd.rqspool.ReportSpool(SPOOL_PATH)))
+
+    def test_symlinkIsRefused(self):
+        self.fs.create_dir(SPOOL_DIR)
+        os.chmod(SPOOL_DIR, 0o700)
+        self.fs.create_file('/etc/passwd', contents='root:x:0:0')
+        os.symlink('/etc/passwd', SPOOL_PATH)
+        spool = rqd.rqspool.ReportSpool(SPOOL_PATH)
+
+        spool.append(completeReport('frame1'))
+
+        with open('/etc/passwd') as passwd:
+            self.assertEqual('root:x:0:0', passwd.read())
+
+    def test_compactionDoesNotFollowTempSymlink(self):
+        self.fs.create_file('/etc/passwd', contents='root:x:0:0')
+        spool = rqd.rqspool.ReportSpool(SPOOL_PATH, maxBytes=100)
+        spool.append(completeReport('frame1'))
+        os.symlink('/etc/passwd', SPOOL_PATH + '.tmp')
+
+        for _ in range(10):
+            spool.append(completeReport('frame1', exitStatus=1))
+
+        with open('/etc/passwd') as passwd:
+            self.assertEqual('root:x:0:0', passwd.read())
+        self.assertLess(spool.getFileSize(), 100)
+
+    def test_prepareDirectory(self):
+        with mock.patch('os.chown') as chownMock:
+            rqd.rqspool.prepareDirectory(SPOOL_PATH, 1, 2)
+
+        chownMock.assert_called_once_with(SPOOL_DIR, 1, 2)
+        self.assertEqual(0o700, os.stat(SPOOL_DIR).st_mode & 0o777)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import os
+import unittest
+
+import mock
+import pyfakefs.fake_filesystem_unittest
+
+import rqd.rqstaging
+
+
+class StageTests(pyfakefs.fake_filesystem_unittest.TestCase):
+
+    def setUp(self):
+        self.setUpPyfakefs()
+        self.fs.create_file('/shows/tex/wood.tx', contents='wood')
+        self.fs.create_dir('/staging/job')
+
+    def test_stageCopiesOnFirstUse(self):
+        staged = rqd.rqstaging.stage('/shows/tex/wood.tx', '/staging/job')
+
+        key, _ = rqd.rqstaging.getKey('/shows/tex/wood.tx')
+        self.assertEqual(os.path.join('/staging/job', key[:2], key + '.tx'), staged)
+        with open(staged) as stagedFile:
+            self.assertEqual('wood', stagedFile.read())
+        self.assertEqual(1, os.path.getsize('/staging/job/.misses'))
+        self.assertFalse(os.path.exists('/staging/job/.hits'))
+
+    def test_stageReusesCopy(self):
+        first = rqd.rqstaging.stage('/shows/tex/wood.tx', '/staging/job')
+
+        with mock.patch('shutil.copyfile') as copyMock:
+            second = rqd.rqstaging.stage('/shows/tex/wood.tx', '/staging/job')
+
+        self.assertEqual(first, second)
+        copyMock.assert_not_called()
+        self.assertEqual(1, os.path.getsize('/staging/job/.hits'))
+
+    def test_stageCopiesChangedSource(self):
+        first = rqd.rqstaging.stage('/shows/tex/wood.tx', '/staging/job')
+        with open('/shows/tex/wood.tx', 'w') as sourceFile:
+            sourceFile.write('oak wood')
+
+        second = rqd.rqstaging.stage('/shows/tex/wood.tx', '/staging/job')
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(2, os.path.getsize('/staging/job/.misses'))
+
+    def test_stageUsesEnvironment(self):
+        with mock.patch.dict(os.environ, {rqd.rqstaging.ENV_STAGING_DIR: '/staging/job'}):
+            staged = rqd.rqstaging.stage('/shows/tex/wood.tx')
+
+        self.assertTrue(staged.startswith('/staging/job/'))
+
+    def test_stageWithoutDirectory(self):
+        with mock.patch.dict(os.environ, clear=True):
+            self.assertEqual('/shows/tex/wood.tx', rqd.rqstaging.stage('/shows/tex/wood.tx'))
+
+    @mock.patch('shutil.copyfile', side_effect=IOError('No space left on device'))
+    def test_stageFallsBackToSource(self, copyMock):
+        staged = rqd.rqstaging.stage('/shows/tex/wood.tx', '/staging/job')
+
+        self.assertEqual('/shows/tex/wood.tx', staged)
+
+
+class StagingCacheTests(pyfakefs.fake_filesystem_unittest.TestCase):
+
+    def setUp(self):
+        self.setUpPyfakefs()
+        self.cache = rqd.rqstaging.StagingCache('/staging')
+
+    def __stage(self, jobName, name, size, mtime):
+        """Creates a staged copy with the given size and last use"""
+        path = os.path.join(self.cache.prepareJob(jobName), 'ab', name)
+        self.fs.create_file(path, st_size=size)
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_prepareJob(self):
+        jobDir = self.cache.prepareJob('job')
+
+        self.assertEqual('/staging/job', jobDir)
+        self.assertTrue(os.path.isdir(jobDir))
+        self.assertEqual(jobDir, self.cache.prepareJob('job'))
+
+    def test_prepareJobGivesDirectoryToUser(self):
+        with mock.patch('os.chown') as chownMock:
+            self.cache.prepareJob('job', 928, 20)
+
+        chownMock.assert_called_once_with('/staging/job', 928, 20)
+        self.assertEqual(0o755, os.stat('/staging/job').st_mode & 0o777)
+
+    def test_prepareJobReplacesSymlink(self):
+        self.fs.create_dir('/etc')
+        self.fs.create_symlink('/staging/job', '/etc')
+
+        jobDir = self.cache.prepareJob('job')
+
+        self.assertFalse(os.path.islink(jobDir))
+        self.assertTrue(os.path.isdir(jobDir))
+
+    def test_prepareJobRejectsPaths(self):
+        for jobName in ('', '..', 'a/../../etc'):
+            self.assertRaises(ValueError, self.cache.prepareJob, jobName)
+
+    def test_scanEvictsLeastRecentlyUsed(self):
+        self.cache.maxBytes = 2500
+        oldest = self.__stage('job', 'a', 1000, 100)
+        middle = self.__stage('job', 'b', 1000, 200)
+        newest = self.__stage('job', 'c', 1000, 300)
+
+        self.cache.scan(['job'])
+
+        self.assertFalse(os.path.exists(oldest))
+        self.assertTrue(os.path.exists(middle))
+        self.assertTrue(os.path.exists(newest))
+        self.assertEqual({'hits': 0, 'misses': 0, 'bytes': 2000, 'evicted': 1},
+                         self.cache.getStats())
+
+    def test_scanEvictsForFreeSpace(self):
+        self.cache.minFreeKb = 100
+        oldest = self.__stage('job', 'a', 1024, 100)
+        newest = self.__stage('job', 'b', 1024, 200)
+
+        with mock.patch.object(self.cache, 'getFreeKb', return_value=99):
+            self.cache.scan(['job'])
+
+        self.assertFalse(os.path.exists(oldest))
+        self.assertTrue(os.path.exists(newest))
+
+    def test_scanRemovesFinishedJobs(self):
+        self.__stage('done', 'a', 10, 100)
+        self.cache.maxBytes = 5
+        self.fs.create_file('/staging/done/.hits', contents='..')
+        self.fs.create_file('/staging/done/.misses', contents='.')
+        self.cache.prepareJob('running')
+
+        self.cache.scan(['running'])
+        # The first scan evicts the copy, the next one removes the empty directory.
+        self.cache.scan(['running'])
+
+        self.assertFalse(os.path.exists('/staging/done'))
+        self.assertTrue(os.path.isdir('/staging/running'))
+        stats = self.cache.getStats()
+        self.assertEqual(2, stats['hits'])
+        self.assertEqual(1, stats['misses'])
+
+    def test_scanRemovesAbandonedCopies(self):
+        self.cache.prepareJob('job')
+        self.fs.create_file('/staging/job/ab/.tmp-abc.123')
+        os.utime('/staging/job/ab/.tmp-abc.123', (0, 0))
+
+        self.cache.scan(['job'])
+
+        self.assertFalse(os.path.exists('/staging/job/ab/.tmp-abc.123'))
+
+    def test_scanSkipsSymlinks(self):
+        self.cache.maxBytes = 1
+        self.fs.create_file('/etc/passwd', st_size=1000)
+        os.utime('/etc/passwd', (0, 0))
+        self.fs.create_dir('/staging')
+        self.fs.create_symlink('/staging/job', '/etc')
+        self.cache.prepareJob('other')
+        self.fs.create_symlink('/staging/other/ab', '/etc')
+        self.fs.create_symlink('/staging/other/cd/passwd', '/etc/passwd')
+
+        self.cache.scan([])
+
+        self.assertTrue(os.path.exists('/etc/passwd'))
+        self.assertEqual(0, self.cache.getStats()['bytes'])
+
+    def test_scanDoesNotFollowSwappedDirectory(self):
+        copy = self.__stage('job', 'a', 1000, 100)
+        self.fs.create_file('/etc/a', st_size=1000)
+
+        def swap(*args):
+            # A frame replaces the directory of the copy once it was listed.
+            self.fs.remove_object('/staging/job/ab')
+            self.fs.create_symlink('/staging/job/ab', '/etc')
+            return 0
+
+        self.cache.minFreeKb = 100
+        with mock.patch.object(self.cache, 'getFreeKb', side_effect=swap):
+            self.cache.scan(['job'])
+
+        self.assertTrue(os.path.exists('/etc/a'))
+        self.assertTrue(os.path.islink(os.path.dirname(copy)))
+
+    def test_getAttributes(self):
+        self.fs.create_file('/staging/job/.hits', contents='...')
+        self.__stage('job', 'a', 10, 100)
+
+        self.cache.scan(['job'])
+
+        self.assertEqual({'stagingHits': '3', 'stagingMisses': '0', 'stagingBytes': '10'},
+                         self.cache.getAttributes())
+
+
+if __name__ == '__main__':
+    unittest.main()
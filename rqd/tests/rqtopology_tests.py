@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+#  Copyright (c) 2018 Sony Pictures Imageworks Inc.
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import os.path
+import unittest
+
+import pyfakefs.fake_filesystem_unittest
+
+import rqd.rqexceptions
+import rqd.rqtopology
+
+
+def topologyFromFixture(name):
+    """Reads the processor blocks of a cpuinfo fixture"""
+    processors = []
+    block = {}
+    with open(os.path.join(os.path.dirname(__file__), 'cpuinfo', name)) as cpuinfoFile:
+        for line in list(cpuinfoFile) + ['']:
+            key, _, value = line.partition(':')
+            if key.strip():
+                block[key.strip()] = value.strip()
+            elif block:
+                processors.append(
+                    (block['processor'], block.get('physical id'), block.get('core id')))
+                block = {}
+    return rqd.rqtopology.CpuTopology.fromCpuinfo(processors)
+
+
+class CpuTopologyTests(pyfakefs.fake_filesystem_unittest.TestCase):
+
+    def setUp(self):
+        self.setUpPyfakefs()
+        self.fs.add_real_directory(os.path.join(os.path.dirname(__file__), 'cpuinfo'))
+
+    def test_hyperthreadedSockets(self):
+        topology = topologyFromFixture('_cpuinfo_shark_ht_8-4-2-2')
+
+        self.assertEqual(8, topology.getCoreCount())
+        self.assertEqual({0: [0, 1, 2, 3], 1: [4, 5, 6, 7]}, topology.getNodes())
+        self.assertEqual([0, 8, 5, 13], topology.getCpus([0, 5]))
+        self.assertEqual([0, 5], topology.getCores([0, 8, 5, 13]))
+
+    def test_interleavedSockets(self):
+        topology = topologyFromFixture('_cpuinfo_dub_8-4-2')
+
+        self.assertEqual({0: [0, 1, 2, 3], 1: [4, 5, 6, 7]}, topology.getNodes())
+        self.assertEqual([0, 2, 4, 6], topology.getCpus([0, 1, 2, 3]))
+
+    def test_noCoreIds(self):
+        topology = topologyFromFixture('_cpuinfo_vrack_2-1-2')
+
+        self.assertEqual(2, topology.getCoreCount())
+        self.assertEqual({0: [0, 1]}, topology.getNodes())
+
+    def test_numaNodes(self):
+        self.fs.create_file('/sys/devices/system/node/node0/cpulist', contents='0-1,8-9\n')
+        self.fs.create_file('/sys/devices/system/node/node1/cpulist', contents='2-7,10-15\n')
+        self.fs.create_file('/sys/devices/system/node/possible', contents='0-1\n')
+        topology = topologyFromFixture('_cpuinfo_shark_ht_8-4-2-2')
+
+        topology.applyNumaNodes(rqd.rqtopology.readNumaNodes('/sys/devices/system/node'))
+
+        self.assertEqual({0: [0, 1], 1: [2, 3, 4, 5, 6, 7]}, topology.getNodes())
+        self.assertEqual([2, 10], topology.getCpus([2]))
+
+
+class CoreAllocatorTests(unittest.TestCase):
+
+    def setUp(self):
+        self.allocator = rqd.rqtopology.CoreAllocator(
+            topologyFromFixture('_cpuinfo_shark_ht_8-4-2-2'))
+
+    def test_frameStaysOnOneNode(self):
+        self.assertEqual([0, 1, 2], self.allocator.reserve(300))
+        # The fullest node that still fits is used first.
+        self.assertEqual([3], self.allocator.reserve(100))
+        self.assertEqual([4, 5], self.allocator.reserve(200))
+
+    def test_frameSpreadsWhenNoNodeFits(self):
+        self.allocator.reserve(100)
+
+        cores = self.allocator.reserve(500)
+
+        self.assertEqual([4, 5, 6, 7, 1], cores)
+        self.assertEqual(2, self.allocator.getFreeCores())
+
+    def test_contiguousRunIsPreferred(self):
+        for _ in range(4):
+            self.allocator.reserve(100)
+        self.allocator.release([0])
+        self.allocator.release([2])
+        self.allocator.release([3])
+
+        self.assertEqual([2, 3], self.allocator.reserve(200))
+
+    def test_fractionsShareCores(self):
+        self.assertEqual([0, 1], self.allocator.reserve(150))
+        self.assertEqual([1], self.allocator.reserve(50))
+        self.assertEqual([2], self.allocator.reserve(30))
+        self.assertEqual(5, self.allocator.getFreeCores())
+
+        self.allocator.release([1], 50)
+        self.allocator.release([0, 1], 150)
+
+        self.assertEqual(7, self.allocator.getFreeCores())
+        self.assertEqual(1, self.allocator.getFragmentation()[0]['shared'])
+
+    def test_insufficientCores(self):
+        self.allocator.reserve(800)
+
+        with self.assertRaises(rqd.rqexceptions.CoreReservationFailureException):
+            self.allocator.reserve(100)
+
+    def test_fragmentation(self):
+        for _ in range(4):
+            self.allocator.reserve(100)
+        self.allocator.release([0])
+        self.allocator.release([2])
+
+        fragmentation = self.allocator.getFragmentation()
+
+        self.assertEqual(
+            {'free': 2, 'largest_run': 1, 'shared': 0, 'fragmentation': 0.5}, fragmentation[0])
+        self.assertEqual(0, fragmentation[1]['fragmentation'])
+
+
+if __name__ == '__main__':
+    unittest.main()